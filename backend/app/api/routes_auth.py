@@ -1,19 +1,11 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from pymongo import MongoClient
-from dotenv import load_dotenv
-import os
 from datetime import datetime
 
-load_dotenv()
+from app.database.mongo import users_collection
 
 router = APIRouter()
 
-MONGODB_URI = os.getenv("MONGODB_URI")
-client = MongoClient(MONGODB_URI)
-db = client["intelliclaim"]
-users_collection = db["users"]
-
 
 class SignupRequest(BaseModel):
     name: str
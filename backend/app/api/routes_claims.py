@@ -6,15 +6,22 @@ from datetime import datetime
 from typing import Any
 from fastapi import Depends
 from app.core.dependencies import get_current_user
-from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
-
-from app.core.langgraph_builder import run_claim_workflow
+from fastapi import APIRouter, File, Form, Header, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.admission import AdmissionRejected
+from app.core.admission import pipeline as pipeline_slots
+from app.core.roles import runs_pipeline_inline
+from app.core.scheduling import classify
 from app.database.claim_repository import (
-    create_claim_record,
     get_claim_by_id,
     get_claimer_stats,
     list_claims,
 )
+from app.database.job_queue import enqueue_job, get_job
+from app.database.request_store import attach_job
 from app.models.api_schemas import (
     ClaimDetailsResponse,
     ClaimReasoningItem,
@@ -23,135 +30,34 @@ from app.models.api_schemas import (
     ClaimerDashboardResponse,
     DashboardStats,
 )
+from app.services.claim_processing import (
+    badge_for_status,
+    process_rerun,
+    process_resume,
+    process_submission,
+    process_upload,
+    risk_score_from_fraud,
+)
+from app.services.idempotency import (
+    IdempotencyConflict,
+    Reservation,
+    complete,
+    release,
+    request_key,
+    reserve,
+    wait_for_response,
+)
+from app.utils.hashing import bytes_digest, file_digest, submission_fingerprint
+from app.utils.logging import get_logger
 
 router = APIRouter(prefix="/api/claims", tags=["claims"])
+logger = get_logger(__name__)
 
 
 def _make_claim_id() -> str:
     return f"CL-{datetime.utcnow().year}-{uuid.uuid4().hex[:6].upper()}"
 
 
-def _badge_for_status(status: str) -> str:
-    mapping = {
-        "APPROVED": "Approved",
-        "REJECTED": "Rejected",
-        "PENDING_REVIEW": "Pending",
-        "FLAGGED_FOR_REVIEW": "Flagged",
-        "ESCALATED_FRAUD_REVIEW": "Flagged",
-        "REQUESTED_MORE_INFO": "Pending",
-    }
-    return mapping.get(status, "Pending")
-
-
-def _risk_score_from_fraud(fraud_score: float) -> float:
-    return min(max(fraud_score, 0.0), 1.0)
-
-
-def _first(value: Any) -> Any:
-    if isinstance(value, list):
-        return value[0] if value else None
-    return value
-
-
-def _infer_claim_data_from_node1(node1_output: dict[str, Any]) -> dict[str, Any]:
-    documents = (
-        node1_output.get("documents", []) if isinstance(node1_output, dict) else []
-    )
-    policy_number: str | None = None
-    claim_amount: float | None = None
-    claimer_name: str | None = None
-    claimer_address: str | None = None
-
-    for doc in documents:
-        fields = doc.get("structured_fields", {}) if isinstance(doc, dict) else {}
-        doc_type = doc.get("document_type") if isinstance(doc, dict) else None
-
-        if not claimer_name:
-            claimer_name = fields.get("claimer_name")
-        if not claimer_address:
-            claimer_address = fields.get("claimer_address")
-        if not policy_number:
-            policy_number = _first(fields.get("policy_number"))
-
-        if doc_type == "bill" and claim_amount is None:
-            raw_amount = _first(fields.get("amount"))
-            try:
-                claim_amount = float(raw_amount) if raw_amount is not None else None
-            except (TypeError, ValueError):
-                claim_amount = None
-
-    return {
-        "policy_number": policy_number,
-        "claim_amount": claim_amount,
-        "claimer_name": claimer_name,
-        "claimer_address": claimer_address,
-    }
-
-
-def _build_submit_response(
-    claim_id: str, final_state: dict[str, Any]
-) -> dict[str, Any]:
-    node3 = final_state.get("node3_output", {})
-    node4 = final_state.get("node4_output", {})
-    node6 = final_state.get("node6_output", {})
-    node7 = final_state.get("node7_output", {})
-
-    status = node7.get("final_status", "PENDING_REVIEW")
-    decision_reason = node7.get("reason")
-    fraud_score = float(node4.get("fraud_score", 0.0) or 0.0)
-
-    return {
-        "claim_id": claim_id,
-        "status": status,
-        "badge": _badge_for_status(status),
-        "decision_reason": decision_reason,
-        "fraud_score": fraud_score,
-        "covered": bool(node3.get("is_covered", False)),
-        "covered_amount": node3.get("covered_amount"),
-        "explanation": node6.get("explanation_text"),
-    }
-
-
-def _persist_claim(
-    claim_payload: dict[str, Any], final_state: dict[str, Any], claim_id: str
-) -> None:
-    node3 = final_state.get("node3_output", {})
-    node4 = final_state.get("node4_output", {})
-    node6 = final_state.get("node6_output", {})
-    node7 = final_state.get("node7_output", {})
-
-    status = node7.get("final_status", "PENDING_REVIEW")
-    decision_reason = node7.get("reason")
-    fraud_score = float(node4.get("fraud_score", 0.0) or 0.0)
-
-    create_claim_record(
-        {
-            "claim_id": claim_id,
-            "claim_type": claim_payload["claim_type"],
-            "claim_amount": claim_payload["claim_amount"],
-            "policy_number": claim_payload["policy_number"],
-            "claimer": claim_payload["claimer"],
-            "form_data": claim_payload.get("form_data", {}),
-            "document_paths": claim_payload["document_paths"],
-            "status": status,
-            "decision_reason": decision_reason,
-            "human_review_required": bool(node7.get("human_review_required", False)),
-            "fraud_score": fraud_score,
-            "risk_score": _risk_score_from_fraud(fraud_score),
-            "node2_output": final_state.get("node2_output", {}),
-            "node3_output": node3,
-            "node4_output": node4,
-            "node5_output": final_state.get("node5_output", {}),
-            "node6_output": node6,
-            "node7_output": node7,
-            "node8_output": final_state.get("node8_output", {}),
-            "processing_minutes": 0.0,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow(),
-        }
-    )
-
-
 def _to_summary(doc: dict[str, Any]) -> ClaimSummary:
     status = doc.get("status", "PENDING_REVIEW")
     fraud_score = float(doc.get("fraud_score", 0.0) or 0.0)
@@ -160,9 +66,9 @@ def _to_summary(doc: dict[str, Any]) -> ClaimSummary:
         claim_type=doc.get("claim_type", "Unknown"),
         claim_amount=float(doc.get("claim_amount", 0.0) or 0.0),
         status=status,
-        badge=_badge_for_status(status),
+        badge=badge_for_status(status),
         fraud_score=fraud_score,
-        risk_score=_risk_score_from_fraud(fraud_score),
+        risk_score=risk_score_from_fraud(fraud_score),
         created_at=doc.get("created_at"),
         summary=doc.get("decision_reason") or doc.get("status"),
     )
@@ -204,39 +110,170 @@ def _build_reasoning(doc: dict[str, Any]) -> list[ClaimReasoningItem]:
     return items
 
 
+def _queued(job: dict[str, Any]) -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job["job_id"],
+            "claim_id": job["claim_id"],
+            "status": job["status"],
+            "priority_class": job.get("priority_class"),
+            "status_url": f"{router.prefix}/jobs/{job['job_id']}",
+        },
+    )
+
+
+def _submitter(user: dict[str, Any] | None) -> str | None:
+    return (user or {}).get("sub")
+
+
+def _reserve(
+    idempotency_key: str | None, fingerprint: str, claim_id: str, submitter: str | None
+) -> Reservation:
+    try:
+        return reserve(request_key(idempotency_key, fingerprint, submitter), fingerprint, claim_id)
+    except IdempotencyConflict as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+def _duplicate_response(reservation: Reservation) -> JSONResponse | None:
+    """
+    Response for a submission another request already owns: its stored
+    result, its queued job, or (inline) its result once it finishes.
+    ``None`` when this request is the owner.
+    """
+    if reservation.owner:
+        return None
+    if reservation.response is None and reservation.job is None and runs_pipeline_inline():
+        reservation.response = wait_for_response(reservation)
+
+    if reservation.response is not None:
+        response = JSONResponse(content=jsonable_encoder(reservation.response))
+    elif reservation.job is not None:
+        response = _queued(reservation.job)
+    else:
+        raise HTTPException(
+            status_code=409,
+            detail=f"An identical submission for claim {reservation.claim_id} is still processing",
+            headers={"Retry-After": "5"},
+        )
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _claimer_key(email: str | None, user: dict[str, Any] | None) -> str:
+    return (email or (user or {}).get("sub") or "anonymous").strip().lower()
+
+
+def _too_busy(exc: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Claim pipeline is at capacity ({exc.reason}). Retry later.",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _run_owned(
+    reservation: Reservation,
+    kind: str,
+    job_payload: dict[str, Any],
+    run,
+    claimer: str,
+    priority_class: str,
+) -> dict[str, Any] | JSONResponse:
+    """
+    Enqueue (APP_ROLE=api, at ``priority_class``) or run the submission this
+    request owns, recording the outcome. Inline runs wait for a pipeline
+    slot in the claimer's fair-share queue and raise AdmissionRejected when
+    it is full.
+    """
+    try:
+        if not runs_pipeline_inline():
+            job = enqueue_job(kind, reservation.claim_id, job_payload, priority_class=priority_class)
+            attach_job(reservation.key, job["job_id"])
+            return _queued(job)
+        with pipeline_slots.slot(claimer):
+            response = run()
+    except Exception as exc:  # noqa: BLE001
+        release(reservation.key, str(exc))
+        raise
+    complete(reservation.key, response)
+    return response
+
+
 @router.post("/submit")
-def submit_claim(payload: ClaimSubmitRequest, user=Depends(get_current_user)):
+def submit_claim(
+    payload: ClaimSubmitRequest,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+    user=Depends(get_current_user),
+):
     if not payload.document_paths:
         raise HTTPException(
             status_code=400,
             detail="document_paths is required to run the LangGraph workflow",
         )
 
-    claim_id = payload.claim_id or _make_claim_id()
+    fingerprint = submission_fingerprint(
+        [file_digest(path) for path in payload.document_paths],
+        payload.claimer.email,
+        payload.claim_type,
+        payload.claim_id,
+        _submitter(user),
+    )
+    reservation = _reserve(
+        idempotency_key, fingerprint, payload.claim_id or _make_claim_id(), _submitter(user)
+    )
+    duplicate = _duplicate_response(reservation)
+    if duplicate is not None:
+        return duplicate
+
+    claim_id = reservation.claim_id
+    claim = {
+        "claim_type": payload.claim_type,
+        "claim_amount": payload.claim_amount,
+        "policy_number": payload.policy_number,
+        "claimer": payload.claimer.model_dump(),
+        "form_data": payload.form_data,
+        "document_paths": payload.document_paths,
+    }
 
     try:
-        final_state = run_claim_workflow(
-            claim_id=claim_id, document_paths=payload.document_paths
+        return _run_owned(
+            reservation,
+            "submit",
+            {"claim": claim},
+            lambda: process_submission(claim_id, claim),
+            _claimer_key(payload.claimer.email, user),
+            classify(payload.claim_type, payload.claim_amount),
         )
+    except AdmissionRejected as exc:
+        raise _too_busy(exc) from exc
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(
-            status_code=500, detail=f"Claim workflow failed: {exc}"
+            status_code=500,
+            detail=f"Claim workflow failed: {exc}. Resubmit with claim_id={claim_id} to resume.",
         ) from exc
 
-    _persist_claim(
-        {
-            "claim_type": payload.claim_type,
-            "claim_amount": payload.claim_amount,
-            "policy_number": payload.policy_number,
-            "claimer": payload.claimer.model_dump(),
-            "form_data": payload.form_data,
-            "document_paths": payload.document_paths,
-        },
-        final_state,
-        claim_id,
-    )
 
-    return _build_submit_response(claim_id, final_state)
+def _save_uploads(uploads: list[tuple[str, bytes]]) -> list[str]:
+    """Write the uploads under unique names; nothing is left behind if one fails."""
+    # with APP_ROLE=api this directory must be shared with the pipeline workers
+    upload_root = os.path.join("temp_images", "uploads")
+    saved_paths: list[str] = []
+    try:
+        os.makedirs(upload_root, exist_ok=True)
+        for safe_name, content in uploads:
+            unique_name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}_{safe_name}"
+            dest = os.path.join(upload_root, unique_name)
+            saved_paths.append(dest)
+            with open(dest, "wb") as out:
+                out.write(content)
+    except OSError:
+        for path in saved_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    return saved_paths
 
 
 @router.post("/submit-upload")
@@ -248,6 +285,7 @@ async def submit_claim_with_upload(
     claimer_address: str | None = Form(default=None),
     claimer_name: str | None = Form(default=None),
     claim_id: str | None = Form(default=None),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
     user=Depends(get_current_user),
 ):
     if not files:
@@ -259,10 +297,7 @@ async def submit_claim_with_upload(
             status_code=400, detail="claim_type must be one of Health, Motor, Property"
         )
 
-    upload_root = os.path.join("temp_images", "uploads")
-    os.makedirs(upload_root, exist_ok=True)
-
-    saved_paths: list[str] = []
+    uploads: list[tuple[str, bytes]] = []
     for file in files:
         if not file.filename:
             continue
@@ -272,93 +307,128 @@ async def submit_claim_with_upload(
             raise HTTPException(
                 status_code=400, detail=f"Unsupported file type for {safe_name}"
             )
+        uploads.append((safe_name, await file.read()))
 
-        unique_name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}_{safe_name}"
-        dest = os.path.join(upload_root, unique_name)
-        content = await file.read()
-        with open(dest, "wb") as out:
-            out.write(content)
-        saved_paths.append(dest)
-
-    if not saved_paths:
+    if not uploads:
         raise HTTPException(status_code=400, detail="No valid files were uploaded")
 
-    resolved_claim_id = claim_id or _make_claim_id()
+    # stored upload names are unique per attempt, so retries are matched on content
+    fingerprint = submission_fingerprint(
+        [bytes_digest(content) for _, content in uploads],
+        claimer_email,
+        claim_type,
+        claim_id,
+        _submitter(user),
+    )
+    reservation = await run_in_threadpool(
+        _reserve, idempotency_key, fingerprint, claim_id or _make_claim_id(), _submitter(user)
+    )
+    duplicate = await run_in_threadpool(_duplicate_response, reservation)
+    if duplicate is not None:
+        return duplicate
+
     try:
-        final_state = run_claim_workflow(
-            claim_id=resolved_claim_id, document_paths=saved_paths
-        )
+        saved_paths = await run_in_threadpool(_save_uploads, uploads)
+    except OSError as exc:
+        # give the reservation back so a retry can take the submission over
+        await run_in_threadpool(release, reservation.key, str(exc))
+        logger.exception("could not store the uploads for claim %s", reservation.claim_id)
+        raise HTTPException(status_code=500, detail=f"Could not store the uploaded documents: {exc}") from exc
+
+    resolved_claim_id = reservation.claim_id
+    claimer = {
+        "name": claimer_name,
+        "email": claimer_email,
+        "phone": claimer_phone,
+        "address": claimer_address,
+    }
 
-        inferred = _infer_claim_data_from_node1(final_state.get("node1_output", {}))
-        final_policy_number = inferred.get("policy_number") or "UNKNOWN"
-
-        # Robust float parsing
-        raw_amount = inferred.get("claim_amount")
-        final_claim_amount = 0.0
-        if raw_amount:
-            try:
-                # Remove non-numeric chars except decimal
-                if isinstance(raw_amount, str):
-                    clean_amt = "".join(
-                        c for c in raw_amount if c.isdigit() or c == "."
-                    )
-                    final_claim_amount = float(clean_amt) if clean_amt else 0.0
-                else:
-                    final_claim_amount = float(raw_amount)
-            except (ValueError, TypeError):
-                final_claim_amount = 0.0
-
-        final_claimer_name = (
-            claimer_name or inferred.get("claimer_name") or "Unknown Claimer"
-        )
-        final_claimer_address = claimer_address or inferred.get("claimer_address")
-        final_claimer_email = claimer_email or "unknown@example.com"
-
-        _persist_claim(
-            {
-                "claim_type": claim_type,
-                "claim_amount": final_claim_amount,
-                "policy_number": final_policy_number,
-                "claimer": {
-                    "name": final_claimer_name,
-                    "email": final_claimer_email,
-                    "phone": claimer_phone,
-                    "address": final_claimer_address,
-                },
-                "form_data": {
-                    "auto_extracted": True,
-                    "node1_output": final_state.get("node1_output", {}),
-                },
-                "document_paths": saved_paths,
-            },
-            final_state,
-            resolved_claim_id,
+    try:
+        # the workflow blocks on OCR and LLM calls; keep it off the event loop
+        return await run_in_threadpool(
+            _run_owned,
+            reservation,
+            "submit_upload",
+            {"document_paths": saved_paths, "claim_type": claim_type, "claimer": claimer},
+            lambda: process_upload(resolved_claim_id, saved_paths, claim_type, claimer),
+            _claimer_key(claimer_email, user),
+            # the amount is only known once Node 1 has read the documents; the worker reclassifies
+            classify(claim_type),
         )
+    except AdmissionRejected as exc:
+        raise _too_busy(exc) from exc
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("submit-upload failed for claim %s", resolved_claim_id)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Claim processing error: {exc}. Resubmit with claim_id={resolved_claim_id} to resume.",
+        ) from exc
+
 
-        response = _build_submit_response(resolved_claim_id, final_state)
-        response["extracted_claim_data"] = {
-            "claim_type": claim_type,
-            "claim_amount": final_claim_amount,
-            "policy_number": final_policy_number,
-            "claimer": {
-                "name": final_claimer_name,
-                "email": final_claimer_email,
-                "phone": claimer_phone,
-                "address": final_claimer_address,
-            },
-            "document_paths": saved_paths,
-        }
-        return response
+@router.post("/{claim_id}/resume")
+def resume_claim(claim_id: str, user=Depends(get_current_user)):
+    if not runs_pipeline_inline():
+        return _queued(enqueue_job("resume", claim_id))
+
+    try:
+        with pipeline_slots.slot(_claimer_key(None, user)):
+            return process_resume(claim_id)
+    except AdmissionRejected as exc:
+        raise _too_busy(exc) from exc
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
     except Exception as exc:  # noqa: BLE001
-        import traceback
+        raise HTTPException(
+            status_code=500, detail=f"Claim workflow failed: {exc}"
+        ) from exc
 
-        print(f"CRITICAL ERROR in submit-upload: {exc}")
-        traceback.print_exc()
+
+@router.post("/{claim_id}/rerun")
+def rerun_claim(
+    claim_id: str,
+    from_node: str = Query(..., description="Node to re-run from, e.g. node4_fraud_detection"),
+    user=Depends(get_current_user),
+):
+    if not runs_pipeline_inline():
+        return _queued(enqueue_job("rerun", claim_id, {"from_node": from_node}))
+
+    try:
+        with pipeline_slots.slot(_claimer_key(None, user)):
+            return process_rerun(claim_id, from_node)
+    except AdmissionRejected as exc:
+        raise _too_busy(exc) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:  # noqa: BLE001
         raise HTTPException(
-            status_code=500, detail=f"Claim processing error: {exc}"
+            status_code=500, detail=f"Claim workflow failed: {exc}"
         ) from exc
 
 
+@router.get("/jobs/{job_id}")
+def get_claim_job(job_id: str, user=Depends(get_current_user)):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "claim_id": job["claim_id"],
+        "status": job["status"],
+        "priority_class": job.get("priority_class"),
+        "sla_deadline": job.get("sla_deadline"),
+        "attempts": job.get("attempts", 0),
+        "max_attempts": job.get("max_attempts"),
+        "error": job.get("error"),
+        "result": job.get("result"),
+        "created_at": job.get("created_at"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+    }
+
+
 @router.get("/dashboard/{claimer_email}", response_model=ClaimerDashboardResponse)
 def get_claimer_dashboard(claimer_email: str):
     stats = get_claimer_stats(claimer_email)
@@ -414,7 +484,7 @@ def get_claim_details(claim_id: str):
         ai_decision=decision.get("final_status"),
         confidence=doc.get("node3_output", {}).get("confidence"),
         fraud_score=fraud_score,
-        risk_score=float(doc.get("risk_score", _risk_score_from_fraud(fraud_score))),
+        risk_score=float(doc.get("risk_score", risk_score_from_fraud(fraud_score))),
         policy_number=doc.get("policy_number"),
         claimer={
             "name": claimer.get("name", ""),
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import os
+import socket
 from collections import Counter
+from datetime import datetime
 from typing import Any
 
 from fastapi import APIRouter, HTTPException, Query
 
+from app.core.admission import capacity
+from app.core.roles import get_app_role
 from app.database.claim_repository import (
 	get_admin_metrics,
 	get_claim_by_id,
@@ -15,6 +20,7 @@ from app.database.claim_repository import (
 	search_user_claims,
 	update_claim_review,
 )
+from app.database.job_queue import queue_depth, queued_by_class
 from app.models.api_schemas import (
 	AdminDashboardResponse,
 	ClaimSummary,
@@ -69,6 +75,22 @@ def get_reviewer_history(limit: int = Query(default=100, ge=1, le=300)):
 	}
 
 
+def _settlement_outcome(claim: dict[str, Any], payload: ReviewerDecisionRequest) -> dict[str, Any] | None:
+	"""
+	The outcome labels Node 5 trains on, when an approval or rejection
+	comes with the settled cost. Settlement time runs from submission.
+	"""
+	if payload.decision == "request_more_info" or payload.final_cost is None:
+		return None
+	created_at = claim.get("created_at")
+	settlement_days = (datetime.utcnow() - created_at).days if isinstance(created_at, datetime) else None
+	return {
+		"final_cost": payload.final_cost,
+		"settlement_days": settlement_days,
+		"severity": payload.severity,
+	}
+
+
 @router.post("/reviewer/claims/{claim_id}/decision", response_model=ReviewerDecisionResponse)
 def review_claim(claim_id: str, payload: ReviewerDecisionRequest):
 	claim = get_claim_by_id(claim_id)
@@ -81,15 +103,22 @@ def review_claim(claim_id: str, payload: ReviewerDecisionRequest):
 		"request_more_info": "REQUESTED_MORE_INFO",
 	}
 	new_status = status_mapping[payload.decision]
+	outcome = _settlement_outcome(claim, payload)
 
 	ok = update_claim_review(
 		claim_id,
 		status=new_status,
 		reviewer={"name": payload.reviewer_name, "email": payload.reviewer_email},
 		note=payload.note,
+		outcome=outcome,
 	)
 	if not ok:
 		raise HTTPException(status_code=404, detail="Claim not found")
+	if outcome:
+		# the feature store pulls in numpy; keep it out of app start-up
+		from app.database.feature_store import record_claim_outcome
+
+		record_claim_outcome(claim_id, outcome)
 
 	return ReviewerDecisionResponse(
 		claim_id=claim_id,
@@ -154,6 +183,22 @@ def get_admin_dashboard():
 	)
 
 
+@router.get("/admin/capacity")
+def get_capacity():
+	"""
+	Admission gate utilization of the process that served the request (see
+	``app.core.admission``; gates are per process, so scrape ``/metrics``
+	from every replica for the fleet), plus the shared claim job queue.
+	"""
+	return {
+		"role": get_app_role(),
+		"process": {"host": socket.gethostname(), "pid": os.getpid(), "scope": "process"},
+		"gates": capacity(),
+		"jobs": queue_depth(),
+		"queued_by_class": queued_by_class(),
+	}
+
+
 @router.get("/admin/users/activity")
 def get_user_activity(limit: int = Query(default=100, ge=1, le=500)):
 	rows = list_claims(limit=limit)
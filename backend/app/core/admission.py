@@ -0,0 +1,205 @@
+"""
+Admission control for the claim pipeline.
+
+Three gates bound the work a process takes on:
+
+- ``pipeline``: whole workflow runs started by the API. When every slot
+  is busy, callers wait in a bounded queue served round-robin per claimer,
+  so one claimer's burst cannot starve the others. A full queue (or a
+  claimer's share of it) rejects immediately with AdmissionRejected, which
+  the API turns into 429 + Retry-After.
+- ``ocr``: concurrent Tesseract pages, so OCR does not oversubscribe CPUs.
+- ``llm``: concurrent requests to the local Ollama instance.
+
+The OCR and LLM gates apply to every caller in the process (API, workers,
+batch runs) and only make callers wait. Limits come from the environment;
+``capacity()`` reports current utilization (``/api/admin/capacity``).
+
+Every gate is local to its process: with several uvicorn workers or API
+replicas each has its own slots, queue and Retry-After estimate, and
+``/api/admin/capacity`` answers for whichever process served the request.
+For a fleet-wide view, sum the ``admission_*`` series that every
+process exports on ``/metrics``.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from app.utils.logging import ADMISSION_IN_USE, ADMISSION_QUEUED, ADMISSION_REJECTED, ADMISSION_WAIT
+
+PIPELINE_SLOTS_ENV = "ADMISSION_PIPELINE_SLOTS"
+PIPELINE_QUEUE_SIZE_ENV = "ADMISSION_QUEUE_SIZE"
+PIPELINE_QUEUE_PER_CLAIMER_ENV = "ADMISSION_QUEUE_PER_CLAIMER"
+PIPELINE_QUEUE_TIMEOUT_ENV = "ADMISSION_QUEUE_TIMEOUT_SECONDS"
+OCR_SLOTS_ENV = "ADMISSION_OCR_SLOTS"
+LLM_SLOTS_ENV = "ADMISSION_LLM_SLOTS"
+
+DEFAULT_KEY = "default"
+
+# starting estimate of how long a slot is held, before any run has finished
+INITIAL_HOLD_SECONDS = 5.0
+HOLD_SMOOTHING = 0.2
+MAX_RETRY_AFTER_SECONDS = 600
+
+
+def _get_int(name: str, default: int) -> int:
+	try:
+		return max(1, int(os.getenv(name, str(default))))
+	except ValueError:
+		return default
+
+
+def _get_float(name: str, default: float) -> float:
+	try:
+		return float(os.getenv(name, str(default)))
+	except ValueError:
+		return default
+
+
+class AdmissionRejected(Exception):
+	def __init__(self, gate: str, reason: str, retry_after: int):
+		super().__init__(f"{gate} capacity exhausted ({reason}); retry after {retry_after}s")
+		self.gate = gate
+		self.reason = reason
+		self.retry_after = retry_after
+
+
+class _Waiter:
+	__slots__ = ("event", "granted")
+
+	def __init__(self):
+		self.event = threading.Event()
+		self.granted = False
+
+
+class Gate:
+	"""
+	Counting semaphore with a per-key round-robin wait queue. ``queue_size``
+	and ``per_key_queue`` of ``None`` mean callers always wait.
+	"""
+
+	def __init__(
+		self,
+		name: str,
+		limit: int,
+		*,
+		queue_size: int | None = None,
+		per_key_queue: int | None = None,
+		timeout: float | None = None,
+	):
+		self.name = name
+		self.limit = limit
+		self.queue_size = queue_size
+		self.per_key_queue = per_key_queue
+		self.timeout = timeout
+		self._lock = threading.Lock()
+		self._in_use = 0
+		self._queued = 0
+		self._queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+		self._avg_hold = INITIAL_HOLD_SECONDS
+		self._in_use_gauge = ADMISSION_IN_USE.labels(gate=name)
+		self._queued_gauge = ADMISSION_QUEUED.labels(gate=name)
+		self._wait_histogram = ADMISSION_WAIT.labels(gate=name)
+
+	def retry_after(self) -> int:
+		estimate = self._avg_hold * (self._queued + 1) / self.limit
+		return max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(estimate)))
+
+	def _reject(self, reason: str):
+		ADMISSION_REJECTED.labels(gate=self.name, reason=reason).inc()
+		raise AdmissionRejected(self.name, reason, self.retry_after())
+
+	def acquire(self, key: str = DEFAULT_KEY, timeout: float | None = None) -> None:
+		timeout = self.timeout if timeout is None else timeout
+		with self._lock:
+			if self._in_use < self.limit and not self._queued:
+				self._in_use += 1
+				self._in_use_gauge.set(self._in_use)
+				return
+			if self.queue_size is not None and self._queued >= self.queue_size:
+				self._reject("queue_full")
+			waiters = self._queues.get(key)
+			if self.per_key_queue is not None and waiters and len(waiters) >= self.per_key_queue:
+				self._reject("claimer_queue_full")
+			waiter = _Waiter()
+			self._queues.setdefault(key, deque()).append(waiter)
+			self._queued += 1
+			self._queued_gauge.set(self._queued)
+
+		started = time.perf_counter()
+		waiter.event.wait(timeout)
+		with self._lock:
+			if not waiter.granted:
+				# timed out; a slot handed over after this point goes to the next waiter
+				self._queues[key].remove(waiter)
+				if not self._queues[key]:
+					del self._queues[key]
+				self._queued -= 1
+				self._queued_gauge.set(self._queued)
+				self._reject("timeout")
+		self._wait_histogram.observe(time.perf_counter() - started)
+
+	def release(self, held_seconds: float | None = None) -> None:
+		with self._lock:
+			if held_seconds is not None:
+				self._avg_hold += HOLD_SMOOTHING * (held_seconds - self._avg_hold)
+			if self._queues:
+				# hand the slot straight to the next claimer in round-robin order
+				key, waiters = next(iter(self._queues.items()))
+				waiter = waiters.popleft()
+				if waiters:
+					self._queues.move_to_end(key)
+				else:
+					del self._queues[key]
+				self._queued -= 1
+				self._queued_gauge.set(self._queued)
+				waiter.granted = True
+				waiter.event.set()
+				return
+			self._in_use -= 1
+			self._in_use_gauge.set(self._in_use)
+
+	@contextmanager
+	def slot(self, key: str = DEFAULT_KEY, timeout: float | None = None):
+		self.acquire(key, timeout)
+		started = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.release(time.perf_counter() - started)
+
+	def snapshot(self) -> dict:
+		with self._lock:
+			return {
+				"limit": self.limit,
+				"in_use": self._in_use,
+				"utilization": round(self._in_use / self.limit, 3),
+				"queued": self._queued,
+				"queued_claimers": len(self._queues),
+				"queue_size": self.queue_size,
+				"avg_hold_seconds": round(self._avg_hold, 3),
+				"retry_after_seconds": self.retry_after(),
+			}
+
+
+_cpus = os.cpu_count() or 2
+
+pipeline = Gate(
+	"pipeline",
+	_get_int(PIPELINE_SLOTS_ENV, max(4, _cpus)),
+	queue_size=_get_int(PIPELINE_QUEUE_SIZE_ENV, 4 * max(4, _cpus)),
+	per_key_queue=_get_int(PIPELINE_QUEUE_PER_CLAIMER_ENV, 4),
+	timeout=_get_float(PIPELINE_QUEUE_TIMEOUT_ENV, 30.0),
+)
+ocr = Gate("ocr", _get_int(OCR_SLOTS_ENV, _cpus))
+llm = Gate("llm", _get_int(LLM_SLOTS_ENV, 4))
+
+
+def capacity() -> dict[str, dict]:
+	"""Utilization of this process's gates; other processes are not included."""
+	return {gate.name: gate.snapshot() for gate in (pipeline, ocr, llm)}
@@ -0,0 +1,188 @@
+"""
+LangGraph checkpoint savers.
+
+With APP_ROLE=api or worker a claim can be resumed or re-run by a different
+process than the one that started it, so the checkpoints must live in
+Mongo (or be turned off with CHECKPOINT_BACKEND=none); a process-local
+sqlite or memory saver is refused at startup. Completed claims' threads
+are deleted after CHECKPOINT_RETENTION_DAYS (default 30):
+
+    python -m app.core.checkpointing --prune
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.core.roles import ROLE_ALL, get_app_role
+from app.utils.logging import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+
+CHECKPOINT_BACKEND_ENV = "CHECKPOINT_BACKEND"
+CHECKPOINT_SQLITE_PATH_ENV = "CHECKPOINT_SQLITE_PATH"
+CHECKPOINT_MONGO_DB_ENV = "CHECKPOINT_MONGO_DB"
+CHECKPOINT_RETENTION_DAYS_ENV = "CHECKPOINT_RETENTION_DAYS"
+
+# backends every api and worker process sees the same way
+SHARED_BACKENDS = ("mongo", "none")
+
+
+class CheckpointConfigError(RuntimeError):
+	pass
+
+
+class CheckpointError(ValueError):
+	"""A resume or re-run request that no retry can satisfy."""
+
+
+class CheckpointNotFoundError(CheckpointError, LookupError):
+	pass
+
+
+class WorkflowCompletedError(CheckpointError):
+	pass
+
+
+class UnknownNodeError(CheckpointError):
+	pass
+
+
+_lock = threading.Lock()
+_checkpointer = None
+_initialized = False
+
+
+def _default_sqlite_path():
+	return Path(__file__).resolve().parents[2] / "data" / "checkpoints.sqlite"
+
+
+def _build_checkpointer(backend: str):
+	if backend == "sqlite":
+		from langgraph.checkpoint.sqlite import SqliteSaver
+
+		path = Path(os.getenv(CHECKPOINT_SQLITE_PATH_ENV) or _default_sqlite_path())
+		path.parent.mkdir(parents=True, exist_ok=True)
+		# the saver serializes access itself, so one connection is shared across threads
+		return SqliteSaver(sqlite3.connect(str(path), check_same_thread=False))
+
+	if backend == "mongo":
+		from langgraph.checkpoint.mongodb import MongoDBSaver
+
+		from app.database.mongo import get_client
+
+		return MongoDBSaver(get_client(), db_name=os.getenv(CHECKPOINT_MONGO_DB_ENV, "checkpointing_db"))
+
+	if backend == "memory":
+		from langgraph.checkpoint.memory import InMemorySaver
+
+		return InMemorySaver()
+
+	return None
+
+
+def _get_retention_days():
+	try:
+		return float(os.getenv(CHECKPOINT_RETENTION_DAYS_ENV, "30"))
+	except ValueError:
+		return 30.0
+
+
+def get_checkpoint_backend() -> str:
+	"""CHECKPOINT_BACKEND, defaulting to sqlite for APP_ROLE=all and mongo otherwise."""
+	default = "sqlite" if get_app_role() == ROLE_ALL else "mongo"
+	return (os.getenv(CHECKPOINT_BACKEND_ENV) or default).strip().lower()
+
+
+def validate_checkpoint_backend() -> str:
+	"""Fail fast when a split api/worker deployment is configured with a process-local saver."""
+	backend = get_checkpoint_backend()
+	role = get_app_role()
+	if role != ROLE_ALL and backend not in SHARED_BACKENDS:
+		raise CheckpointConfigError(
+			f"CHECKPOINT_BACKEND={backend} is local to one process; "
+			f"APP_ROLE={role} needs one of: {', '.join(SHARED_BACKENDS)}"
+		)
+	return backend
+
+
+def get_checkpointer():
+	"""
+	Checkpoint saver selected by CHECKPOINT_BACKEND (sqlite, mongo, memory
+	or none). Built once per process; None disables checkpointing.
+	"""
+	global _checkpointer, _initialized
+	if _initialized:
+		return _checkpointer
+	with _lock:
+		if not _initialized:
+			backend = validate_checkpoint_backend()
+			try:
+				_checkpointer = _build_checkpointer(backend)
+			except ImportError as exc:
+				if get_app_role() != ROLE_ALL:
+					raise CheckpointConfigError(f"Checkpoint backend '{backend}' unavailable: {exc}") from exc
+				logger.warning("Checkpoint backend '%s' unavailable, running without checkpoints: %s", backend, exc)
+				_checkpointer = None
+			_initialized = True
+	return _checkpointer
+
+
+def prune_checkpoints(retention_days: float | None = None, checkpointer=None, batch_size: int = 500) -> int:
+	"""
+	Delete the checkpoint threads of stored claims last updated more than
+	``retention_days`` ago. Those claims can no longer be re-run from a
+	node; their outputs stay in the claims collection. Each pruned claim is
+	marked so later runs skip it. Returns the number of threads deleted.
+	"""
+	from app.database.mongo import claims_collection
+
+	checkpointer = checkpointer if checkpointer is not None else get_checkpointer()
+	if checkpointer is None:
+		return 0
+	retention_days = _get_retention_days() if retention_days is None else retention_days
+	cutoff = datetime.utcnow() - timedelta(days=retention_days)
+	selector = {"updated_at": {"$lt": cutoff}, "checkpoint_pruned_at": {"$exists": False}}
+
+	pruned = 0
+	cursor = claims_collection.find(selector, {"_id": 0, "claim_id": 1}).batch_size(batch_size)
+	batch = []
+	for claim in cursor:
+		batch.append(claim["claim_id"])
+		if len(batch) >= batch_size:
+			pruned += _prune_threads(checkpointer, batch)
+			batch = []
+	if batch:
+		pruned += _prune_threads(checkpointer, batch)
+	return pruned
+
+
+def _prune_threads(checkpointer, claim_ids):
+	from app.database.mongo import claims_collection
+
+	for claim_id in claim_ids:
+		checkpointer.delete_thread(claim_id)
+	claims_collection.update_many(
+		{"claim_id": {"$in": claim_ids}},
+		{"$set": {"checkpoint_pruned_at": datetime.utcnow()}},
+	)
+	return len(claim_ids)
+
+
+def main() -> None:
+	configure_logging()
+	parser = argparse.ArgumentParser(description="Maintain claim workflow checkpoints")
+	parser.add_argument("--prune", action="store_true", help="Delete checkpoints of claims past the retention period")
+	parser.add_argument("--days", type=float, default=None, help="Retention in days (default CHECKPOINT_RETENTION_DAYS)")
+	args = parser.parse_args()
+	if not args.prune:
+		parser.error("pass --prune")
+	print(json.dumps({"backend": get_checkpoint_backend(), "pruned": prune_checkpoints(args.days)}, indent=2))
+
+
+if __name__ == "__main__":
+	main()
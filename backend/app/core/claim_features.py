@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from typing import Any
+
+
+DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%d/%b/%Y", "%d-%b-%Y")
+
+_AMOUNT_PATTERN = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def _first(value: Any) -> Any:
+	if isinstance(value, list):
+		return value[0] if value else None
+	return value
+
+
+def parse_amount(value: Any) -> float | None:
+	value = _first(value)
+	if value is None or isinstance(value, bool):
+		return None
+	if isinstance(value, (int, float)):
+		return float(value)
+	match = _AMOUNT_PATTERN.search(str(value))
+	if not match:
+		return None
+	try:
+		return float(match.group().replace(",", ""))
+	except ValueError:
+		return None
+
+
+def parse_date(value: Any) -> datetime | None:
+	value = _first(value)
+	if value is None:
+		return None
+	if isinstance(value, datetime):
+		return value.replace(tzinfo=None)
+	text = str(value).strip()
+	for date_format in DATE_FORMATS:
+		try:
+			return datetime.strptime(text, date_format)
+		except ValueError:
+			continue
+	return None
+
+
+def _text(value: Any) -> str | None:
+	value = _first(value)
+	if value is None:
+		return None
+	text = str(value).strip()
+	return text or None
+
+
+class ClaimFeatures:
+	"""
+	Claim-level inputs shared by Nodes 2-8, parsed once from the Node 1
+	output. Stored in graph state as ``to_dict()`` so it survives
+	serialization, and persisted to the feature table as ``to_row()``.
+	"""
+
+	__slots__ = (
+		"claim_id",
+		"claim_amount",
+		"bill_amounts",
+		"claimant_name",
+		"claimant_email",
+		"claimant_phone",
+		"claimant_address",
+		"policy_number",
+		"incident_date",
+		"description",
+		"provider",
+		"document_types",
+	)
+
+	def __init__(
+		self,
+		claim_id: str | None = None,
+		claim_amount: float = 0.0,
+		bill_amounts: tuple[float, ...] = (),
+		claimant_name: str | None = None,
+		claimant_email: str | None = None,
+		claimant_phone: str | None = None,
+		claimant_address: str | None = None,
+		policy_number: str | None = None,
+		incident_date: datetime | None = None,
+		description: str = "",
+		provider: str | None = None,
+		document_types: tuple[str, ...] = (),
+	):
+		self.claim_id = claim_id
+		self.claim_amount = claim_amount
+		self.bill_amounts = tuple(bill_amounts)
+		self.claimant_name = claimant_name
+		self.claimant_email = claimant_email
+		self.claimant_phone = claimant_phone
+		self.claimant_address = claimant_address
+		self.policy_number = policy_number
+		self.incident_date = incident_date
+		self.description = description
+		self.provider = provider
+		self.document_types = tuple(document_types)
+
+	@classmethod
+	def from_node1_output(cls, node1_output: dict[str, Any], claim_id: str | None = None) -> "ClaimFeatures":
+		documents = node1_output.get("documents", []) if isinstance(node1_output, dict) else []
+
+		values: dict[str, Any] = {}
+		bill_amounts: list[float] = []
+		document_types: list[str] = []
+
+		for doc in documents:
+			if not isinstance(doc, dict):
+				continue
+			fields = doc.get("structured_fields", {}) or {}
+			doc_type = doc.get("document_type") or "unknown"
+			document_types.append(doc_type)
+
+			candidates = {
+				"claimant_name": fields.get("claimer_name") or _first(fields.get("holder_name")) or _first(fields.get("name")),
+				"claimant_email": fields.get("claimer_email"),
+				"claimant_phone": fields.get("claimer_phone"),
+				"claimant_address": fields.get("claimer_address") or _first(fields.get("address")),
+				"policy_number": fields.get("policy_number"),
+				"incident_date": fields.get("incident_date"),
+				"description": fields.get("summary") or fields.get("description"),
+				"provider": fields.get("provider"),
+			}
+			for key, value in candidates.items():
+				if key not in values and _text(value):
+					values[key] = value
+
+			if doc_type == "bill":
+				amount = parse_amount(fields.get("amount"))
+				if amount:
+					bill_amounts.append(amount)
+
+		return cls(
+			claim_id=claim_id or (node1_output.get("claim_id") if isinstance(node1_output, dict) else None),
+			claim_amount=bill_amounts[0] if bill_amounts else 0.0,
+			bill_amounts=tuple(bill_amounts),
+			claimant_name=_text(values.get("claimant_name")),
+			claimant_email=_text(values.get("claimant_email")),
+			claimant_phone=_text(values.get("claimant_phone")),
+			claimant_address=_text(values.get("claimant_address")),
+			policy_number=_text(values.get("policy_number")),
+			incident_date=parse_date(values.get("incident_date")),
+			description=_text(values.get("description")) or "",
+			provider=_text(values.get("provider")),
+			document_types=tuple(document_types),
+		)
+
+	@classmethod
+	def from_dict(cls, data: dict[str, Any]) -> "ClaimFeatures":
+		values = {name: data[name] for name in cls.__slots__ if name in data}
+		values["incident_date"] = parse_date(values.get("incident_date"))
+		return cls(**values)
+
+	@classmethod
+	def from_state(cls, state: dict[str, Any]) -> "ClaimFeatures":
+		"""Features stored in graph state, parsing Node 1 output only if they are missing."""
+		stored = state.get("claim_features")
+		if stored:
+			return cls.from_dict(stored)
+		return cls.from_node1_output(state.get("node1_output", {}), claim_id=state.get("claim_id"))
+
+	def to_dict(self) -> dict[str, Any]:
+		data = {name: getattr(self, name) for name in self.__slots__}
+		data["bill_amounts"] = list(self.bill_amounts)
+		data["document_types"] = list(self.document_types)
+		data["incident_date"] = self.incident_date.strftime("%Y-%m-%dT%H:%M:%S") if self.incident_date else None
+		return data
+
+	def to_row(self) -> dict[str, Any]:
+		"""Flat, scalar-only row for the columnar feature table."""
+		return {
+			"claim_id": self.claim_id,
+			"claim_amount": float(self.claim_amount or 0.0),
+			"bill_amount_count": len(self.bill_amounts),
+			"bill_amount_total": float(sum(self.bill_amounts)),
+			"claimant_name": self.claimant_name,
+			"claimant_email": self.claimant_email,
+			"claimant_phone": self.claimant_phone,
+			"claimant_address": self.claimant_address,
+			"policy_number": self.policy_number,
+			"incident_date": self.incident_date,
+			"provider": self.provider,
+			"document_count": len(self.document_types),
+			"has_policy_document": "policy" in self.document_types,
+			"has_bill_document": "bill" in self.document_types,
+			"has_report_document": "report" in self.document_types,
+			"description_length": len(self.description or ""),
+			"description": self.description or "",
+		}
+
+	@classmethod
+	def from_row(cls, row: dict[str, Any]) -> "ClaimFeatures":
+		"""
+		Rebuild from a feature table row. The row keeps only the first bill
+		amount and the policy/bill/report document flags, which is all
+		Nodes 3-5 read.
+		"""
+		claim_amount = float(row.get("claim_amount") or 0.0)
+		document_types = tuple(
+			doc_type for doc_type in ("policy", "bill", "report") if row.get(f"has_{doc_type}_document")
+		)
+		return cls(
+			claim_id=row.get("claim_id"),
+			claim_amount=claim_amount,
+			bill_amounts=(claim_amount,) if row.get("bill_amount_count") else (),
+			claimant_name=row.get("claimant_name"),
+			claimant_email=row.get("claimant_email"),
+			claimant_phone=row.get("claimant_phone"),
+			claimant_address=row.get("claimant_address"),
+			policy_number=row.get("policy_number"),
+			incident_date=parse_date(row.get("incident_date")),
+			description=row.get("description") or "",
+			provider=row.get("provider"),
+			document_types=document_types,
+		)
+
+	def __repr__(self) -> str:
+		return f"ClaimFeatures(claim_id={self.claim_id!r}, claim_amount={self.claim_amount!r}, policy_number={self.policy_number!r})"
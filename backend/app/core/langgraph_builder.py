@@ -1,17 +1,21 @@
-import os
+import threading
 from typing import Any
 
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, START, StateGraph
-from langsmith import traceable
 
+from app.core.checkpointing import (
+	CheckpointError,
+	CheckpointNotFoundError,
+	UnknownNodeError,
+	WorkflowCompletedError,
+	get_checkpointer,
+)
+from app.core.claim_features import ClaimFeatures
 from app.core.state_schema import ClaimGraphState
 from app.nodes.node1_extraction.extractor import extract_documents
 from app.nodes.node2_cross_validation.validator import cross_validate
-from app.nodes.node3_policy_coverage.policy_agent import (
-	extract_claim_context,
-	verify_policy_coverage,
-)
+from app.nodes.node3_policy_coverage.policy_agent import verify_policy_coverage
 from app.nodes.node3_policy_coverage.policy_fetcher import fetch_policy
 from app.nodes.node4_fraud_detection.fraud_agent import fraud_detection
 from app.nodes.node5_predictive.predictive_agent import predictive_analysis
@@ -19,38 +23,60 @@ from app.nodes.node6_explanation.explanation_generator import generate_explanati
 from app.nodes.node7_decision.decision_agent import make_claim_decision
 from app.nodes.node8_subrogation.subrogation_agent import analyze_subrogation
 from app.services.hitl_service import store_high_risk_claim
+from app.utils.logging import WORKFLOW_RUNS, instrument_node
+from app.utils.tracing import traced
 
 
-os.environ.setdefault("LANGSMITH_PROJECT", "insurance-claim-ai")
-
-
-@traceable(name="node1_document_ingestion")
+@instrument_node
+@traced(name="node1_document_ingestion")
 def node1_document_ingestion(state: ClaimGraphState, config: RunnableConfig | None = None):
-	document_paths = ((config or {}).get("configurable") or {}).get("document_paths")
-	if not document_paths:
-		raise ValueError("No document paths supplied. Pass config.configurable.document_paths")
-	return {"node1_output": extract_documents(document_paths)}
-
-
-@traceable(name="node2_cross_validation")
+	configurable = (config or {}).get("configurable") or {}
+	# a queued upload was already extracted to classify it (claim_processing.run_job)
+	node1_output = configurable.get("node1_output")
+	if not node1_output:
+		document_paths = configurable.get("document_paths")
+		if not document_paths:
+			raise ValueError("No document paths supplied. Pass config.configurable.document_paths")
+		node1_output = extract_documents(document_paths)
+	features = ClaimFeatures.from_node1_output(node1_output, claim_id=state["claim_id"])
+	return {"node1_output": node1_output, "claim_features": features.to_dict()}
+
+
+@instrument_node
+@traced(name="node2_cross_validation")
 def node2_cross_validation(state: ClaimGraphState):
 	return {"node2_output": cross_validate(state["node1_output"])}
 
 
-@traceable(name="node3_policy_coverage")
+@instrument_node
+@traced(name="node3_policy_coverage")
 def node3_policy_coverage(state: ClaimGraphState):
-	return {"node3_output": verify_policy_coverage(state["node1_output"])}
+	return {
+		"node3_output": verify_policy_coverage(
+			state["node1_output"],
+			features=ClaimFeatures.from_state(state),
+		)
+	}
 
 
-@traceable(name="node4_fraud_detection")
+@instrument_node
+@traced(name="node4_fraud_detection")
 def node4_fraud_detection(state: ClaimGraphState):
-	context = extract_claim_context(state["node1_output"])
-	policy_number = context.get("policy_number")
-	policy = fetch_policy(policy_number) if policy_number else {}
-	return {"node4_output": fraud_detection(state["node1_output"], policy or {})}
+	features = ClaimFeatures.from_state(state)
+	policy = fetch_policy(features.policy_number) if features.policy_number else {}
+	return {
+		"node4_output": fraud_detection(
+			state["node1_output"],
+			policy or {},
+			claim_id=state["claim_id"],
+			features=features,
+			claimer=state.get("claimer"),
+		)
+	}
 
 
-@traceable(name="node5_predictive")
+@instrument_node
+@traced(name="node5_predictive")
 def node5_predictive(state: ClaimGraphState):
 	return {
 		"node5_output": predictive_analysis(
@@ -58,11 +84,13 @@ def node5_predictive(state: ClaimGraphState):
 			state["node2_output"],
 			state["node3_output"],
 			state["node4_output"],
+			features=ClaimFeatures.from_state(state),
 		)
 	}
 
 
-@traceable(name="node6_explanation")
+@instrument_node
+@traced(name="node6_explanation")
 def node6_explanation(state: ClaimGraphState):
 	return {
 		"node6_output": generate_explanation(
@@ -73,12 +101,14 @@ def node6_explanation(state: ClaimGraphState):
 	}
 
 
-@traceable(name="node8_subrogation")
+@instrument_node
+@traced(name="node8_subrogation")
 def node8_subrogation(state: ClaimGraphState):
 	return {"node8_output": analyze_subrogation(state["node1_output"])}
 
 
-@traceable(name="node7_decision")
+@instrument_node
+@traced(name="node7_decision")
 def node7_decision(state: ClaimGraphState):
 	return {
 		"node7_output": make_claim_decision(
@@ -94,7 +124,8 @@ def route_after_node7(state: ClaimGraphState) -> str:
 	return "automated_final_decision"
 
 
-@traceable(name="hitl_storage")
+@instrument_node
+@traced(name="hitl_storage")
 def hitl_storage(state: ClaimGraphState):
 	store_high_risk_claim(
 		claim_id=state["claim_id"],
@@ -107,13 +138,14 @@ def hitl_storage(state: ClaimGraphState):
 	return {}
 
 
-@traceable(name="automated_final_decision")
+@instrument_node
+@traced(name="automated_final_decision")
 def automated_final_decision(state: ClaimGraphState):
 	return {}
 
 
-@traceable(name="build_claim_workflow")
-def build_claim_workflow():
+@traced(name="build_claim_workflow")
+def build_claim_workflow(checkpointer=None):
 	graph = StateGraph(ClaimGraphState)
 
 	graph.add_node("node1_document_ingestion", node1_document_ingestion)
@@ -148,15 +180,93 @@ def build_claim_workflow():
 	graph.add_edge("hitl_storage", END)
 	graph.add_edge("automated_final_decision", END)
 
-	return graph.compile()
+	return graph.compile(checkpointer=checkpointer)
+
 
+NODE_NAMES = (
+	"node1_document_ingestion",
+	"node2_cross_validation",
+	"node3_policy_coverage",
+	"node4_fraud_detection",
+	"node5_predictive",
+	"node6_explanation",
+	"node8_subrogation",
+	"node7_decision",
+	"hitl_storage",
+	"automated_final_decision",
+)
 
-@traceable(name="run_claim_workflow")
-def run_claim_workflow(claim_id: str, document_paths: list[str]):
-	app = build_claim_workflow()
+_workflow = None
+_workflow_lock = threading.Lock()
+
+
+def get_claim_workflow():
+	"""Compiled workflow with the configured checkpointer, built once per process."""
+	global _workflow
+	if _workflow is None:
+		with _workflow_lock:
+			if _workflow is None:
+				_workflow = build_claim_workflow(checkpointer=get_checkpointer())
+	return _workflow
+
+
+def _thread_config(
+	claim_id: str,
+	document_paths: list[str] | None = None,
+	node1_output: dict[str, Any] | None = None,
+):
+	configurable = {"thread_id": claim_id}
+	if document_paths:
+		configurable["document_paths"] = document_paths
+	if node1_output:
+		configurable["node1_output"] = node1_output
+	return {"configurable": configurable}
+
+
+def get_checkpoint(claim_id: str):
+	"""Latest checkpoint snapshot for a claim, or None without a checkpointer or history."""
+	app = get_claim_workflow()
+	if app.checkpointer is None:
+		return None
+	snapshot = app.get_state(_thread_config(claim_id))
+	return snapshot if snapshot.values else None
+
+
+def _invoke(app, state, config, mode):
+	try:
+		result = app.invoke(state, config=config)
+	except Exception:
+		WORKFLOW_RUNS.labels(mode=mode, outcome="error").inc()
+		raise
+	WORKFLOW_RUNS.labels(mode=mode, outcome="ok").inc()
+	return result
+
+
+@traced(name="run_claim_workflow")
+def run_claim_workflow(
+	claim_id: str,
+	document_paths: list[str],
+	node1_output: dict[str, Any] | None = None,
+	claimer: dict[str, Any] | None = None,
+):
+	"""
+	Run the workflow for a claim. If an earlier run of the same claim stopped
+	part-way (a node raised or the process died), it is resumed from the last
+	completed node instead of starting over. ``node1_output`` is an
+	extraction already made for these documents; Node 1 reuses it.
+	``claimer`` is the submitted claimer, if any.
+	"""
+	app = get_claim_workflow()
+	config = _thread_config(claim_id, document_paths, node1_output)
+
+	snapshot = get_checkpoint(claim_id)
+	if snapshot is not None and snapshot.next:
+		return _invoke(app, None, config, "resume")
 
 	initial_state: ClaimGraphState = {
 		"claim_id": claim_id,
+		"claimer": claimer or {},
+		"claim_features": {},
 		"node1_output": {},
 		"node2_output": {},
 		"node3_output": {},
@@ -167,7 +277,45 @@ def run_claim_workflow(claim_id: str, document_paths: list[str]):
 		"node8_output": {},
 	}
 
-	return app.invoke(
-		initial_state,
-		config={"configurable": {"document_paths": document_paths}},
-	)
+	return _invoke(app, initial_state, config, "fresh")
+
+
+@traced(name="resume_claim_workflow")
+def resume_claim_workflow(claim_id: str, document_paths: list[str] | None = None):
+	"""
+	Continue an interrupted claim from its last completed node. Document
+	paths are only needed when Node 1 itself never finished.
+	"""
+	snapshot = get_checkpoint(claim_id)
+	if snapshot is None:
+		raise CheckpointNotFoundError(f"No checkpoint found for claim {claim_id}")
+	if not snapshot.next:
+		raise WorkflowCompletedError(f"Claim {claim_id} already completed; use rerun_claim_workflow_from to re-run a node")
+	return _invoke(get_claim_workflow(), None, _thread_config(claim_id, document_paths), "resume")
+
+
+@traced(name="rerun_claim_workflow_from")
+def rerun_claim_workflow_from(claim_id: str, node_name: str, document_paths: list[str] | None = None):
+	"""
+	Re-run a claim starting at ``node_name``, reusing the checkpointed outputs
+	of every node before it. The run forks from the most recent checkpoint
+	taken just before that node executed.
+	"""
+	if node_name not in NODE_NAMES:
+		raise UnknownNodeError(f"Unknown node '{node_name}'. Expected one of: {', '.join(NODE_NAMES)}")
+
+	app = get_claim_workflow()
+	if app.checkpointer is None:
+		raise CheckpointError("Checkpointing is disabled; set CHECKPOINT_BACKEND to re-run from a node")
+
+	for snapshot in app.get_state_history(_thread_config(claim_id)):
+		if node_name in snapshot.next:
+			config = {
+				"configurable": {
+					**snapshot.config["configurable"],
+					**_thread_config(claim_id, document_paths)["configurable"],
+				}
+			}
+			return _invoke(app, None, config, "rerun")
+
+	raise CheckpointNotFoundError(f"No checkpoint for claim {claim_id} before node '{node_name}'")
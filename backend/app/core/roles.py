@@ -0,0 +1,28 @@
+"""
+Deployable process roles, selected by APP_ROLE.
+
+- ``api``: serves the claims, reviewer, admin and auth routes. Submissions
+  are written to the claim job queue and processed elsewhere, so the
+  process never imports the OCR/LLM pipeline.
+- ``worker``: ``python -m app.worker``; leases claim jobs and runs the
+  workflow.
+- ``all`` (default): a single process that runs submissions inline, as a
+  development setup or a small deployment.
+"""
+import os
+
+APP_ROLE_ENV = "APP_ROLE"
+
+ROLE_API = "api"
+ROLE_WORKER = "worker"
+ROLE_ALL = "all"
+ROLES = (ROLE_API, ROLE_WORKER, ROLE_ALL)
+
+
+def get_app_role() -> str:
+	role = os.getenv(APP_ROLE_ENV, ROLE_ALL).strip().lower()
+	return role if role in ROLES else ROLE_ALL
+
+
+def runs_pipeline_inline() -> bool:
+	return get_app_role() == ROLE_ALL
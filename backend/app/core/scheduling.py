@@ -0,0 +1,94 @@
+"""
+Priority classes for queued claim jobs.
+
+Every job is classified when it is enqueued:
+
+- ``expedited``: Health claims up to SCHEDULER_SMALL_HEALTH_LIMIT, which
+  carry the tightest SLA;
+- ``high_value``: Property claims of at least SCHEDULER_HIGH_VALUE_LIMIT.
+  Workers keep ``--reserved-high-value`` slots that only run this class, so
+  a flood of other work never leaves them waiting for a slot;
+- ``standard``: everything else. Uploads start here, since their amount
+  is only known after extraction; the worker runs Node 1 and re-queues
+  the job under its real class;
+- ``backfill``: batch re-processing (``python -m app.main --batch ... --enqueue``).
+
+Workers take the job with the smallest ``sched_at``: its enqueue time plus
+its class delay. A class delay is the head start every more urgent job gets
+over it, and it doubles as aging: once a backfill job has waited its delay
+it competes with fresh standard work as an equal, so nothing starves.
+Delays and SLAs can be overridden with SCHEDULER_<CLASS>_DELAY_SECONDS and
+SCHEDULER_<CLASS>_SLA_SECONDS.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+SMALL_HEALTH_LIMIT_ENV = "SCHEDULER_SMALL_HEALTH_LIMIT"
+HIGH_VALUE_LIMIT_ENV = "SCHEDULER_HIGH_VALUE_LIMIT"
+
+EXPEDITED = "expedited"
+HIGH_VALUE = "high_value"
+STANDARD = "standard"
+BACKFILL = "backfill"
+
+
+def _get_float(name: str, default: float) -> float:
+	try:
+		return float(os.getenv(name, str(default)))
+	except ValueError:
+		return default
+
+
+@dataclass(frozen=True)
+class PriorityClass:
+	name: str
+	delay_seconds: float
+	sla_seconds: float | None
+
+
+_DEFAULTS = {
+	EXPEDITED: (0.0, 15 * 60.0),
+	HIGH_VALUE: (60.0, 60 * 60.0),
+	STANDARD: (120.0, 4 * 3600.0),
+	BACKFILL: (1800.0, None),
+}
+
+
+def _load_classes() -> dict[str, PriorityClass]:
+	classes = {}
+	for name, (delay, sla) in _DEFAULTS.items():
+		prefix = f"SCHEDULER_{name.upper()}"
+		sla_seconds = _get_float(f"{prefix}_SLA_SECONDS", sla) if sla is not None else None
+		classes[name] = PriorityClass(name, max(0.0, _get_float(f"{prefix}_DELAY_SECONDS", delay)), sla_seconds)
+	return classes
+
+
+CLASSES = _load_classes()
+
+
+def get_class(name: str | None) -> PriorityClass:
+	return CLASSES.get(name or STANDARD, CLASSES[STANDARD])
+
+
+def classify(claim_type: str | None, claim_amount: float | None = None, *, backfill: bool = False) -> str:
+	if backfill:
+		return BACKFILL
+	if claim_amount is None:
+		return STANDARD
+	if claim_type == "Health" and claim_amount <= _get_float(SMALL_HEALTH_LIMIT_ENV, 50_000):
+		return EXPEDITED
+	if claim_type == "Property" and claim_amount >= _get_float(HIGH_VALUE_LIMIT_ENV, 1_000_000):
+		return HIGH_VALUE
+	return STANDARD
+
+
+def sched_at(priority_class: str, enqueued_at: datetime) -> datetime:
+	return enqueued_at + timedelta(seconds=get_class(priority_class).delay_seconds)
+
+
+def sla_deadline(priority_class: str, enqueued_at: datetime) -> datetime | None:
+	sla = get_class(priority_class).sla_seconds
+	return enqueued_at + timedelta(seconds=sla) if sla is not None else None
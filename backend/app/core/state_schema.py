@@ -3,6 +3,9 @@ from typing import Any, TypedDict
 
 class ClaimGraphState(TypedDict):
 	claim_id: str
+	# the claimer as submitted; Node 4 links it into the claim network
+	claimer: dict[str, Any]
+	claim_features: dict[str, Any]
 	node1_output: dict[str, Any]
 	node2_output: dict[str, Any]
 	node3_output: dict[str, Any]
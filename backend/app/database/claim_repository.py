@@ -11,11 +11,20 @@ def _utcnow() -> datetime:
 
 
 def create_claim_record(claim_document: dict[str, Any]) -> str:
+	"""
+	Store a claim. A retried or resumed submission reuses its claim_id, so
+	this upserts on it rather than inserting a second record.
+	"""
 	now = _utcnow()
-	claim_document.setdefault("created_at", now)
-	claim_document.setdefault("updated_at", now)
-	result = claims_collection.insert_one(claim_document)
-	return str(result.inserted_id)
+	document = dict(claim_document)
+	created_at = document.pop("created_at", None) or now
+	document.setdefault("updated_at", now)
+	result = claims_collection.update_one(
+		{"claim_id": document["claim_id"]},
+		{"$set": document, "$setOnInsert": {"created_at": created_at}},
+		upsert=True,
+	)
+	return str(result.upserted_id) if result.upserted_id is not None else document["claim_id"]
 
 
 def get_claim_by_id(claim_id: str) -> dict[str, Any] | None:
@@ -83,6 +92,7 @@ def update_claim_review(
 	status: str,
 	reviewer: dict[str, Any],
 	note: str | None,
+	outcome: dict[str, Any] | None = None,
 ) -> bool:
 	update_doc: dict[str, Any] = {
 		"status": status,
@@ -93,10 +103,41 @@ def update_claim_review(
 		},
 		"updated_at": _utcnow(),
 	}
+	if outcome:
+		update_doc["outcome"] = outcome
 	result = claims_collection.update_one({"claim_id": claim_id}, {"$set": update_doc})
 	return result.matched_count > 0
 
 
+def update_claim_outputs(claim_id: str, fields: dict[str, Any], *, keep_review: bool = True) -> bool:
+	"""
+	Overwrite the pipeline outputs of a stored claim. A claim that already
+	has a human review keeps its reviewed status.
+	"""
+	selector: dict[str, Any] = {"claim_id": claim_id}
+	update_doc = {**fields, "updated_at": _utcnow()}
+	if keep_review and claims_collection.count_documents({"claim_id": claim_id, "review": {"$exists": True}}, limit=1):
+		for key in ("status", "decision_reason", "human_review_required"):
+			update_doc.pop(key, None)
+	result = claims_collection.update_one(selector, {"$set": update_doc})
+	return result.matched_count > 0
+
+
+def ensure_claim_indexes(collection=None) -> list[str]:
+	"""Indexes behind the claim lookups, reviewer queue and dashboard queries."""
+	collection = collection if collection is not None else claims_collection
+	return [
+		collection.create_index("claim_id", unique=True),
+		collection.create_index([("status", 1), ("fraud_score", -1)]),
+		collection.create_index([("status", 1), ("updated_at", -1)]),
+		collection.create_index([("claimer.email", 1), ("created_at", -1)]),
+		collection.create_index("policy_number"),
+		collection.create_index("created_at"),
+		# fraud history catch-up (node4_fraud_detection.history_sync)
+		collection.create_index("updated_at"),
+	]
+
+
 def get_claimer_stats(claimer_email: str) -> dict[str, Any]:
 	pipeline = [
 		{"$match": {"claimer.email": claimer_email}},
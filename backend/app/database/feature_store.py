@@ -0,0 +1,260 @@
+"""
+Columnar claim feature table.
+
+One row per claim: the ``ClaimFeatures.to_row()`` fields, the scores the
+pipeline produced (``SCORE_COLUMNS``) and, once a claim settles, its
+outcome (``OUTCOME_COLUMNS``). Node 5 training and bulk re-scoring read it
+as NumPy columns instead of re-parsing stored Node 1 output.
+
+    python -m app.database.feature_store --backfill
+    python -m app.database.feature_store --export features.npz
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+from datetime import datetime
+from typing import Any, Iterable
+
+import numpy as np
+from pymongo import UpdateOne
+
+from app.core.claim_features import ClaimFeatures
+from app.database.mongo import insurance_db
+from app.utils.logging import configure_logging
+
+claim_features_collection = insurance_db["claim_features"]
+
+SCORE_COLUMNS = ("fraud_score", "consistency_score", "is_covered")
+OUTCOME_COLUMNS = ("outcome_final_cost", "outcome_settlement_days")
+
+NUMERIC_COLUMNS = (
+	"claim_amount",
+	"bill_amount_count",
+	"bill_amount_total",
+	"document_count",
+	"has_policy_document",
+	"has_bill_document",
+	"has_report_document",
+	"description_length",
+	*SCORE_COLUMNS,
+	*OUTCOME_COLUMNS,
+)
+DATE_COLUMNS = ("incident_date", "updated_at")
+# numeric columns that are missing (NaN) rather than zero until known
+SPARSE_COLUMNS = SCORE_COLUMNS + OUTCOME_COLUMNS
+
+_indexes_lock = threading.Lock()
+_indexes_ready = False
+
+
+def ensure_feature_indexes() -> list[str]:
+	global _indexes_ready
+	with _indexes_lock:
+		names = [
+			claim_features_collection.create_index("claim_id", unique=True),
+			claim_features_collection.create_index("policy_number"),
+			claim_features_collection.create_index("claimant_email"),
+			claim_features_collection.create_index("outcome_severity", sparse=True),
+		]
+		_indexes_ready = True
+	return names
+
+
+def _ready() -> None:
+	if not _indexes_ready:
+		# the unique claim_id index keeps concurrent upserts to one row per claim
+		ensure_feature_indexes()
+
+
+def scores_from_outputs(outputs: dict[str, Any]) -> dict[str, Any]:
+	"""``SCORE_COLUMNS`` from a final graph state or a stored claim document."""
+	node4 = outputs.get("node4_output") or {}
+	fraud_score = node4.get("fraud_score", outputs.get("fraud_score"))
+	node2 = outputs.get("node2_output") or {}
+	node3 = outputs.get("node3_output") or {}
+	return {
+		"fraud_score": float(fraud_score) if fraud_score is not None else None,
+		"consistency_score": float(node2["consistency_score"]) if node2.get("consistency_score") is not None else None,
+		"is_covered": bool(node3["is_covered"]) if "is_covered" in node3 else None,
+	}
+
+
+def outcome_fields(outcome: dict[str, Any] | None) -> dict[str, Any]:
+	outcome = outcome or {}
+	return {
+		"outcome_final_cost": outcome.get("final_cost"),
+		"outcome_settlement_days": outcome.get("settlement_days"),
+		"outcome_severity": outcome.get("severity"),
+	}
+
+
+def feature_row(
+	features: ClaimFeatures,
+	scores: dict[str, Any] | None = None,
+	outcome: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+	row = features.to_row()
+	if scores:
+		row.update(scores)
+	if outcome:
+		row.update(outcome_fields(outcome))
+	row["updated_at"] = datetime.utcnow()
+	return row
+
+
+def save_claim_features(
+	features: ClaimFeatures,
+	scores: dict[str, Any] | None = None,
+	outcome: dict[str, Any] | None = None,
+) -> None:
+	_ready()
+	row = feature_row(features, scores, outcome)
+	claim_features_collection.update_one({"claim_id": features.claim_id}, {"$set": row}, upsert=True)
+
+
+def save_feature_scores(scores_by_claim: dict[str, dict[str, Any]]) -> int:
+	"""Refresh ``SCORE_COLUMNS`` for many claims in one bulk write (after re-scoring)."""
+	if not scores_by_claim:
+		return 0
+	now = datetime.utcnow()
+	result = claim_features_collection.bulk_write(
+		[
+			UpdateOne({"claim_id": claim_id}, {"$set": {**scores, "updated_at": now}})
+			for claim_id, scores in scores_by_claim.items()
+		],
+		ordered=False,
+	)
+	return result.matched_count
+
+
+def record_claim_outcome(claim_id: str, outcome: dict[str, Any]) -> bool:
+	"""Label a claim's row with its settled ``final_cost``, ``settlement_days`` and ``severity``."""
+	result = claim_features_collection.update_one(
+		{"claim_id": claim_id},
+		{"$set": {**outcome_fields(outcome), "updated_at": datetime.utcnow()}},
+	)
+	return result.matched_count > 0
+
+
+def load_feature_rows(claim_ids: Iterable[str]) -> dict[str, dict[str, Any]]:
+	"""Stored rows for ``claim_ids``, keyed by claim id; missing claims are left out."""
+	cursor = claim_features_collection.find({"claim_id": {"$in": list(claim_ids)}}, {"_id": 0})
+	return {row["claim_id"]: row for row in cursor}
+
+
+def _numeric(value: Any) -> float:
+	if value is None:
+		return np.nan
+	try:
+		return float(value)
+	except (TypeError, ValueError):
+		return np.nan
+
+
+def rows_to_columns(rows: Iterable[dict[str, Any]], columns: Iterable[str] | None = None) -> dict[str, np.ndarray]:
+	"""
+	Pivot feature rows into one array per column: float64 for numeric
+	columns (NaN when a score or outcome is missing, 0 otherwise),
+	datetime64[s] for dates (NaT when missing) and fixed-width unicode for
+	the rest (empty when missing). No column needs pickling to save or load.
+	"""
+	rows = list(rows)
+	names = list(columns) if columns else sorted({key for row in rows for key in row})
+	result: dict[str, np.ndarray] = {}
+	for name in names:
+		values = [row.get(name) for row in rows]
+		if name in NUMERIC_COLUMNS:
+			if name not in SPARSE_COLUMNS:
+				values = [value or 0.0 for value in values]
+			result[name] = np.fromiter((_numeric(value) for value in values), dtype=np.float64, count=len(rows))
+		elif name in DATE_COLUMNS:
+			result[name] = np.array(
+				[np.datetime64(value, "s") if isinstance(value, datetime) else np.datetime64("NaT") for value in values],
+				dtype="datetime64[s]",
+			)
+		else:
+			result[name] = np.array(["" if value is None else str(value) for value in values], dtype=np.str_)
+	return result
+
+
+def load_feature_columns(
+	query: dict[str, Any] | None = None,
+	columns: Iterable[str] | None = None,
+	batch_size: int = 10000,
+) -> dict[str, np.ndarray]:
+	"""Read the feature table into NumPy columns for training and re-scoring."""
+	columns = list(columns) if columns else None
+	projection: dict[str, int] = {"_id": 0}
+	if columns:
+		projection.update({name: 1 for name in columns})
+	cursor = claim_features_collection.find(query or {}, projection).batch_size(batch_size)
+	return rows_to_columns(cursor, columns)
+
+
+def export_feature_table(path: str, query: dict[str, Any] | None = None) -> int:
+	"""Snapshot the feature table as a compressed columnar ``.npz`` file."""
+	table = load_feature_columns(query)
+	np.savez_compressed(path, **table)
+	return len(next(iter(table.values()))) if table else 0
+
+
+def backfill_feature_table(query: dict[str, Any] | None = None, batch_size: int = 1000) -> int:
+	"""
+	Build rows for stored claims from their Node 1 output, scores and
+	outcomes: a one-off migration for claims persisted before the feature
+	table existed, or loaded directly (synthetic datasets).
+	"""
+	from app.database.mongo import claims_collection
+
+	_ready()
+	projection = {
+		"_id": 0,
+		"claim_id": 1,
+		"fraud_score": 1,
+		"node2_output.consistency_score": 1,
+		"node3_output.is_covered": 1,
+		"node4_output.fraud_score": 1,
+		"form_data.node1_output": 1,
+		"outcome": 1,
+	}
+	written = 0
+	batch = []
+	cursor = claims_collection.find(query or {}, projection).batch_size(batch_size)
+	for claim in cursor:
+		node1_output = (claim.get("form_data") or {}).get("node1_output") or {}
+		features = ClaimFeatures.from_node1_output(node1_output, claim_id=claim["claim_id"])
+		features.claim_id = claim["claim_id"]
+		row = feature_row(features, scores_from_outputs(claim), claim.get("outcome"))
+		batch.append(UpdateOne({"claim_id": claim["claim_id"]}, {"$set": row}, upsert=True))
+		if len(batch) >= batch_size:
+			claim_features_collection.bulk_write(batch, ordered=False)
+			written += len(batch)
+			batch = []
+	if batch:
+		claim_features_collection.bulk_write(batch, ordered=False)
+		written += len(batch)
+	return written
+
+
+def main() -> None:
+	configure_logging()
+	parser = argparse.ArgumentParser(description="Maintain the claim feature table")
+	parser.add_argument("--backfill", action="store_true", help="Build rows for every stored claim")
+	parser.add_argument("--export", metavar="PATH", help="Write the table to a compressed .npz file")
+	args = parser.parse_args()
+	if not args.backfill and not args.export:
+		parser.error("pass --backfill and/or --export PATH")
+
+	summary: dict[str, Any] = {"indexes": ensure_feature_indexes()}
+	if args.backfill:
+		summary["backfilled"] = backfill_feature_table()
+	if args.export:
+		summary["exported"] = export_feature_table(args.export)
+		summary["path"] = args.export
+	print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+	main()
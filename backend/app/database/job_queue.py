@@ -0,0 +1,240 @@
+"""
+Claim job queue backed by the ``claim_jobs`` collection.
+
+The read API enqueues; pipeline workers (``python -m app.worker``) take
+jobs with an atomic ``find_one_and_update`` that sets a lease. A worker
+extends its lease while it runs; a job whose lease lapses (the worker
+died) becomes available to the next worker. Failed jobs are retried with
+a delay until ``max_attempts`` is reached.
+
+Jobs carry a priority class (``app.core.scheduling``) and are leased in
+``sched_at`` order, the enqueue time plus the class delay, so urgent
+classes run first and older work ages its way up. A retry keeps its
+``sched_at``, so it is not sent to the back of the queue. An upload's
+amount is only known after extraction, so the worker re-queues it under
+its real class once Node 1 has run (``reclassify_job``).
+"""
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta
+from typing import Any
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+
+from app.core.scheduling import STANDARD, sched_at, sla_deadline
+from app.database.mongo import insurance_db
+
+claim_jobs_collection = insurance_db["claim_jobs"]
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def _utcnow() -> datetime:
+	return datetime.utcnow()
+
+
+def enqueue_job(
+	kind: str,
+	claim_id: str,
+	payload: dict[str, Any] | None = None,
+	*,
+	priority_class: str = STANDARD,
+	max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> dict[str, Any]:
+	now = _utcnow()
+	job = {
+		"job_id": f"JOB-{uuid.uuid4().hex[:12].upper()}",
+		"kind": kind,
+		"claim_id": claim_id,
+		"payload": payload or {},
+		"status": QUEUED,
+		"priority_class": priority_class,
+		"sched_at": sched_at(priority_class, now),
+		"sla_deadline": sla_deadline(priority_class, now),
+		"attempts": 0,
+		"max_attempts": max_attempts,
+		"available_at": now,
+		"lease_owner": None,
+		"lease_expires_at": None,
+		"created_at": now,
+		"updated_at": now,
+	}
+	claim_jobs_collection.insert_one(job)
+	job.pop("_id", None)
+	return job
+
+
+def lease_job(
+	worker_id: str,
+	lease_seconds: int = DEFAULT_LEASE_SECONDS,
+	priority_classes: list[str] | None = None,
+) -> dict[str, Any] | None:
+	"""
+	Atomically take the runnable job with the earliest ``sched_at``, or
+	``None`` when the queue is empty. ``priority_classes`` restricts the
+	lease to those classes (reserved worker slots).
+	"""
+	now = _utcnow()
+	query: dict[str, Any] = {
+		"$or": [
+			{"status": QUEUED, "available_at": {"$lte": now}},
+			{"status": RUNNING, "lease_expires_at": {"$lt": now}},
+		]
+	}
+	if priority_classes:
+		query["priority_class"] = {"$in": list(priority_classes)}
+	job = claim_jobs_collection.find_one_and_update(
+		query,
+		{
+			"$set": {
+				"status": RUNNING,
+				"lease_owner": worker_id,
+				"lease_expires_at": now + timedelta(seconds=lease_seconds),
+				"started_at": now,
+				"updated_at": now,
+			},
+			"$inc": {"attempts": 1},
+		},
+		sort=[("sched_at", ASCENDING), ("available_at", ASCENDING)],
+		return_document=ReturnDocument.AFTER,
+	)
+	if job is not None:
+		job.pop("_id", None)
+	return job
+
+
+def extend_lease(job_id: str, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> bool:
+	"""Heartbeat. ``False`` means the lease was lost to another worker."""
+	now = _utcnow()
+	result = claim_jobs_collection.update_one(
+		{"job_id": job_id, "status": RUNNING, "lease_owner": worker_id},
+		{"$set": {"lease_expires_at": now + timedelta(seconds=lease_seconds), "updated_at": now}},
+	)
+	return result.matched_count == 1
+
+
+def complete_job(job_id: str, worker_id: str, result: dict[str, Any] | None = None) -> bool:
+	now = _utcnow()
+	update = claim_jobs_collection.update_one(
+		{"job_id": job_id, "lease_owner": worker_id},
+		{
+			"$set": {
+				"status": SUCCEEDED,
+				"result": result or {},
+				"error": None,
+				"lease_owner": None,
+				"lease_expires_at": None,
+				"finished_at": now,
+				"updated_at": now,
+			}
+		},
+	)
+	return update.matched_count == 1
+
+
+def fail_job(
+	job_id: str,
+	worker_id: str,
+	error: str,
+	*,
+	retry_delay_seconds: int = 30,
+	permanent: bool = False,
+) -> str | None:
+	"""
+	Record a failed attempt. The job is re-queued after ``retry_delay_seconds``
+	(doubling per attempt) until it has used ``max_attempts``; ``permanent``
+	fails it straight away. Returns the new status, or ``None`` if this
+	worker no longer held the lease.
+	"""
+	job = claim_jobs_collection.find_one({"job_id": job_id, "lease_owner": worker_id}, {"attempts": 1, "max_attempts": 1})
+	if not job:
+		return None
+
+	now = _utcnow()
+	attempts = int(job.get("attempts") or 1)
+	exhausted = permanent or attempts >= int(job.get("max_attempts") or DEFAULT_MAX_ATTEMPTS)
+	fields: dict[str, Any] = {
+		"status": FAILED if exhausted else QUEUED,
+		"error": error,
+		"lease_owner": None,
+		"lease_expires_at": None,
+		"updated_at": now,
+	}
+	if exhausted:
+		fields["finished_at"] = now
+	else:
+		fields["available_at"] = now + timedelta(seconds=retry_delay_seconds * 2 ** (attempts - 1))
+	claim_jobs_collection.update_one({"job_id": job_id, "lease_owner": worker_id}, {"$set": fields})
+	return fields["status"]
+
+
+def reclassify_job(job_id: str, worker_id: str, priority_class: str, payload: dict[str, Any]) -> bool:
+	"""
+	Put a running job back in the queue under ``priority_class`` with a new
+	payload. Its ``sched_at`` and SLA are recomputed from the original
+	enqueue time, as if it had been classified on arrival, and the attempt
+	is not counted. ``False`` if this worker no longer held the lease.
+	"""
+	job = claim_jobs_collection.find_one({"job_id": job_id, "lease_owner": worker_id}, {"created_at": 1, "priority_class": 1})
+	if not job:
+		return False
+
+	now = _utcnow()
+	result = claim_jobs_collection.update_one(
+		{"job_id": job_id, "lease_owner": worker_id},
+		{
+			"$set": {
+				"status": QUEUED,
+				"payload": payload,
+				"priority_class": priority_class,
+				"reclassified_from": job.get("priority_class") or STANDARD,
+				"sched_at": sched_at(priority_class, job["created_at"]),
+				"sla_deadline": sla_deadline(priority_class, job["created_at"]),
+				"available_at": now,
+				"lease_owner": None,
+				"lease_expires_at": None,
+				"updated_at": now,
+			},
+			"$inc": {"attempts": -1},
+		},
+	)
+	return result.matched_count == 1
+
+
+def get_job(job_id: str) -> dict[str, Any] | None:
+	return claim_jobs_collection.find_one({"job_id": job_id}, {"_id": 0})
+
+
+def queue_depth() -> dict[str, int]:
+	rows = claim_jobs_collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+	return {row["_id"]: int(row["count"]) for row in rows}
+
+
+def queued_by_class() -> dict[str, dict[str, Any]]:
+	"""Waiting jobs per priority class, with the oldest one's enqueue time."""
+	rows = claim_jobs_collection.aggregate(
+		[
+			{"$match": {"status": QUEUED}},
+			{"$group": {"_id": "$priority_class", "count": {"$sum": 1}, "oldest": {"$min": "$created_at"}}},
+		]
+	)
+	return {(row["_id"] or STANDARD): {"count": int(row["count"]), "oldest": row["oldest"]} for row in rows}
+
+
+def ensure_job_indexes() -> list[str]:
+	return [
+		claim_jobs_collection.create_index("job_id", unique=True),
+		claim_jobs_collection.create_index([("status", ASCENDING), ("sched_at", ASCENDING)]),
+		claim_jobs_collection.create_index(
+			[("priority_class", ASCENDING), ("status", ASCENDING), ("sched_at", ASCENDING)]
+		),
+		claim_jobs_collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+		claim_jobs_collection.create_index([("claim_id", ASCENDING), ("created_at", DESCENDING)]),
+	]
@@ -1,17 +1,105 @@
-from pymongo import MongoClient
+"""
+Mongo clients and collection handles.
+
+Nothing connects at import time: the collection names below are lazy
+handles that resolve against ``get_client()`` on first use, so importing a
+route module (or the CLI) costs no sockets or monitor threads. The API
+creates the clients in its lifespan handler and closes them on shutdown.
+"""
+from __future__ import annotations
+
 import os
+import threading
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
-MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI)
+MONGO_URI_ENV = "MONGO_URI"
+# the auth routes historically read their own variable; it usually points at the same server
+USERS_MONGO_URI_ENV = "MONGODB_URI"
+
+_clients: dict[str | None, object] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(uri_env: str = MONGO_URI_ENV):
+	"""Shared MongoClient for the URI in ``uri_env``, created on first call."""
+	uri = os.getenv(uri_env) or os.getenv(MONGO_URI_ENV)
+	client = _clients.get(uri)
+	if client is not None:
+		return client
+	with _clients_lock:
+		if uri not in _clients:
+			from pymongo import MongoClient
+
+			from app.utils.logging import mongo_command_metrics
+
+			_clients[uri] = MongoClient(uri, event_listeners=[mongo_command_metrics])
+		return _clients[uri]
+
+
+def close_clients() -> None:
+	with _clients_lock:
+		clients = list(_clients.values())
+		_clients.clear()
+	for client in clients:
+		client.close()
+
+
+class LazyCollection:
+	"""Stands in for a pymongo Collection until first attribute access."""
+
+	def __init__(self, db_name: str, name: str, uri_env: str = MONGO_URI_ENV):
+		self._db_name = db_name
+		self._name = name
+		self._uri_env = uri_env
+		self._client = None
+		self._collection = None
+
+	def _resolve(self):
+		client = get_client(self._uri_env)
+		if client is not self._client:
+			self._collection = client[self._db_name][self._name]
+			self._client = client
+		return self._collection
+
+	def __getattr__(self, attr):
+		return getattr(self._resolve(), attr)
+
+	def __getitem__(self, name):
+		return self._resolve()[name]
+
+	def __repr__(self):
+		return f"LazyCollection({self._db_name}.{self._name})"
+
+
+class LazyDatabase:
+	"""Stands in for a pymongo Database; ``db["name"]`` gives a LazyCollection."""
+
+	def __init__(self, name: str, uri_env: str = MONGO_URI_ENV):
+		self._name = name
+		self._uri_env = uri_env
+
+	def __getitem__(self, name: str) -> LazyCollection:
+		return LazyCollection(self._name, name, self._uri_env)
+
+	def __getattr__(self, attr):
+		return getattr(get_client(self._uri_env)[self._name], attr)
+
+	def __repr__(self):
+		return f"LazyDatabase({self._name})"
+
 
 # main system DB
-insurance_db = client["insurance_db"]
+insurance_db = LazyDatabase("insurance_db")
 policies_collection = insurance_db["policies"]
 claims_collection = insurance_db["claims"]
 
 # ⭐ HITL DATABASE (NEW)
-hitl_db = client["hitl_db"]
-high_risk_claims_collection = hitl_db["high_risk_claims"]
\ No newline at end of file
+hitl_db = LazyDatabase("hitl_db")
+high_risk_claims_collection = hitl_db["high_risk_claims"]
+
+# auth users
+users_db = LazyDatabase("intelliclaim", USERS_MONGO_URI_ENV)
+users_collection = users_db["users"]
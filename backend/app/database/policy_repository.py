@@ -0,0 +1,369 @@
+"""
+Versioned policy store and bulk import.
+
+``policies`` holds the current version of every policy; each change is also
+appended to ``policy_versions`` so a coverage decision can be reproduced
+against the exact version it used (``node3_output.policy_version``). Caches
+keyed on ``(policyNumber, version)`` are invalidated by construction.
+
+    python -m app.database.policy_repository policies.jsonl
+    python -m app.database.policy_repository dump.csv --batch-size 2000
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from pymongo import ReplaceOne
+
+from app.core.claim_features import parse_date
+from app.database.mongo import insurance_db, policies_collection
+from app.utils.logging import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+policy_versions_collection = insurance_db["policy_versions"]
+# extra current documents moved aside before the unique policyNumber index is built
+policy_duplicates_collection = insurance_db["policy_duplicates"]
+
+REQUIRED_FIELDS = ("policyNumber", "effectiveDate", "expiryDate", "sumInsured")
+
+# stored alongside the policy content but not part of it
+META_FIELDS = ("_id", "version", "content_hash", "imported_at", "updated_at", "source")
+
+LIST_SEPARATORS = ("|", ";")
+
+# coverageDetails leaves that are amounts; everything else (add-on names,
+# flags, notes) is stored as given
+NUMERIC_COVERAGE_FIELDS = ("deductible", "copay", "coinsurance")
+NUMERIC_COVERAGE_GROUPS = ("limits", "subLimits")
+
+
+class PolicyValidationError(ValueError):
+	pass
+
+
+def normalize_policy_number(value: Any) -> str:
+	"""The stored form of a policy number, for imports and lookups alike."""
+	return str(value).strip().upper()
+
+
+def _number(value: Any, field: str) -> float:
+	if isinstance(value, bool):
+		raise PolicyValidationError(f"{field} must be a number")
+	if isinstance(value, (int, float)):
+		return value
+	try:
+		text = str(value).replace(",", "").strip()
+		number = float(text)
+	except (TypeError, ValueError) as exc:
+		raise PolicyValidationError(f"{field} must be a number, got {value!r}") from exc
+	return int(number) if number.is_integer() else number
+
+
+def _split_list(value: Any) -> list[str]:
+	if value is None or value == "":
+		return []
+	if isinstance(value, list):
+		return [str(item).strip() for item in value if str(item).strip()]
+	text = str(value).strip()
+	if text.startswith("["):
+		return _split_list(json.loads(text))
+	for separator in LIST_SEPARATORS:
+		if separator in text:
+			return [item.strip() for item in text.split(separator) if item.strip()]
+	return [text]
+
+
+def _normalize_coverage(value: Any, path: str, numeric: bool = False) -> Any:
+	if isinstance(value, dict):
+		items = (
+			(key, _normalize_coverage(
+				item,
+				f"{path}.{key}",
+				numeric or key in NUMERIC_COVERAGE_FIELDS or key in NUMERIC_COVERAGE_GROUPS,
+			))
+			for key, item in value.items()
+		)
+		return {key: item for key, item in items if item is not None}
+	if value is None or value == "":
+		return None
+	return _number(value, path) if numeric else value
+
+
+def normalize_policy(raw: dict[str, Any]) -> dict[str, Any]:
+	"""
+	Validate one policy record and coerce it to the stored shape. Raises
+	PolicyValidationError describing the first problem found.
+	"""
+	missing = [field for field in REQUIRED_FIELDS if raw.get(field) in (None, "")]
+	if missing:
+		raise PolicyValidationError(f"missing required field(s): {', '.join(missing)}")
+
+	policy = {key: value for key, value in raw.items() if key not in META_FIELDS}
+	policy["policyNumber"] = normalize_policy_number(raw["policyNumber"])
+
+	for field in ("effectiveDate", "expiryDate"):
+		value = parse_date(raw[field])
+		if value is None:
+			raise PolicyValidationError(f"{field} is not a recognised date: {raw[field]!r}")
+		policy[field] = value
+	if policy["expiryDate"] <= policy["effectiveDate"]:
+		raise PolicyValidationError("expiryDate must be after effectiveDate")
+
+	policy["sumInsured"] = _number(raw["sumInsured"], "sumInsured")
+	if policy["sumInsured"] <= 0:
+		raise PolicyValidationError("sumInsured must be positive")
+
+	coverage = raw.get("coverageDetails") or {}
+	if not isinstance(coverage, dict):
+		raise PolicyValidationError("coverageDetails must be an object")
+	policy["coverageDetails"] = _normalize_coverage(coverage, "coverageDetails")
+	policy["exclusions"] = _split_list(raw.get("exclusions"))
+	return policy
+
+
+def content_hash(policy: dict[str, Any]) -> str:
+	content = {key: value for key, value in policy.items() if key not in META_FIELDS}
+	canonical = json.dumps(content, sort_keys=True, default=str, separators=(",", ":"))
+	return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def _nest(row: dict[str, Any]) -> dict[str, Any]:
+	"""Turn dotted CSV headers (``coverageDetails.limits.ownDamage``) into nested dicts."""
+	nested: dict[str, Any] = {}
+	for key, value in row.items():
+		if key is None:
+			continue
+		target = nested
+		*parents, leaf = key.strip().split(".")
+		for parent in parents:
+			target = target.setdefault(parent, {})
+		target[leaf] = value
+	return nested
+
+
+def iter_csv(path: str | Path) -> Iterator[dict[str, Any]]:
+	with open(path, newline="", encoding="utf-8") as handle:
+		for row in csv.DictReader(handle):
+			yield _nest(row)
+
+
+def iter_jsonl(path: str | Path) -> Iterator[dict[str, Any]]:
+	with open(path, encoding="utf-8") as handle:
+		for line in handle:
+			if line.strip():
+				yield json.loads(line)
+
+
+def iter_json_array(path: str | Path, chunk_size: int = 1 << 16) -> Iterator[dict[str, Any]]:
+	"""Stream the objects of a top-level JSON array without loading the whole file."""
+	decoder = json.JSONDecoder()
+	buffer = ""
+	started = False
+	with open(path, encoding="utf-8") as handle:
+		while True:
+			chunk = handle.read(chunk_size)
+			buffer += chunk
+			while True:
+				buffer = buffer.lstrip()
+				if not started:
+					if not buffer:
+						break
+					if buffer[0] != "[":
+						raise PolicyValidationError("expected a JSON array of policies")
+					buffer = buffer[1:]
+					started = True
+					continue
+				buffer = buffer.lstrip(", \t\r\n")
+				if not buffer or buffer[0] == "]":
+					break
+				try:
+					item, end = decoder.raw_decode(buffer)
+				except json.JSONDecodeError:
+					if not chunk:
+						raise
+					break
+				yield item
+				buffer = buffer[end:]
+			if not chunk:
+				return
+
+
+def iter_policy_file(path: str | Path) -> Iterator[dict[str, Any]]:
+	path = Path(path)
+	suffix = path.suffix.lower()
+	if suffix == ".csv":
+		return iter_csv(path)
+	if suffix in (".jsonl", ".ndjson"):
+		return iter_jsonl(path)
+	return iter_json_array(path)
+
+
+def _batches(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+	batch: list[Any] = []
+	for item in items:
+		batch.append(item)
+		if len(batch) >= size:
+			yield batch
+			batch = []
+	if batch:
+		yield batch
+
+
+def _write_batch(batch: list[dict[str, Any]], source: str | None, stats: dict[str, Any], db=None) -> None:
+	policies = db["policies"] if db is not None else policies_collection
+	versions = db["policy_versions"] if db is not None else policy_versions_collection
+	numbers = list({policy["policyNumber"] for policy in batch})
+	current = {
+		doc["policyNumber"]: doc
+		for doc in policies.find(
+			{"policyNumber": {"$in": numbers}},
+			{"_id": 0, "policyNumber": 1, "version": 1, "content_hash": 1},
+		)
+	}
+
+	now = datetime.utcnow()
+	latest: dict[str, dict[str, Any]] = {}
+	version_ops = []
+	for policy in batch:
+		number = policy["policyNumber"]
+		previous = latest.get(number) or current.get(number)
+		digest = content_hash(policy)
+		if previous and previous.get("content_hash") == digest:
+			stats["unchanged"] += 1
+			continue
+
+		version = int((previous or {}).get("version") or 0) + 1
+		document = {**policy, "version": version, "content_hash": digest, "updated_at": now}
+		if source:
+			document["source"] = source
+		latest[number] = document
+		# an upsert on (policyNumber, version), so a batch whose versions were
+		# written before a crash, but not its current documents, can be re-run
+		version_ops.append(
+			ReplaceOne({"policyNumber": number, "version": version}, {**document, "imported_at": now}, upsert=True)
+		)
+		stats["created" if version == 1 else "updated"] += 1
+
+	if version_ops:
+		versions.bulk_write(version_ops, ordered=False)
+		policies.bulk_write(
+			[ReplaceOne({"policyNumber": number}, document, upsert=True) for number, document in latest.items()],
+			ordered=False,
+		)
+
+
+def import_policies(
+	records: Iterable[dict[str, Any]],
+	batch_size: int = 1000,
+	source: str | None = None,
+	max_errors: int = 100,
+	db=None,
+) -> dict[str, Any]:
+	"""
+	Validate and upsert policies in ``bulk_write`` batches. A record whose
+	content is unchanged keeps its version; any change writes version N+1
+	to ``policy_versions`` and replaces the current document. Invalid
+	records are skipped and reported (the first ``max_errors`` of them).
+	``db`` targets another database than ``insurance_db`` (synthetic loads).
+	"""
+	stats: dict[str, Any] = {"read": 0, "created": 0, "updated": 0, "unchanged": 0, "invalid": 0, "errors": []}
+
+	def valid_records():
+		for line, raw in enumerate(records, start=1):
+			stats["read"] += 1
+			try:
+				yield normalize_policy(raw)
+			except (PolicyValidationError, ValueError, TypeError) as exc:
+				stats["invalid"] += 1
+				if len(stats["errors"]) < max_errors:
+					stats["errors"].append({"record": line, "policyNumber": raw.get("policyNumber"), "error": str(exc)})
+
+	for batch in _batches(valid_records(), batch_size):
+		_write_batch(batch, source, stats, db)
+	return stats
+
+
+def import_policy_file(path: str | Path, batch_size: int = 1000) -> dict[str, Any]:
+	return import_policies(iter_policy_file(path), batch_size=batch_size, source=Path(path).name)
+
+
+def dedupe_policies() -> int:
+	"""
+	Leave one current document per policyNumber, so the unique index can be
+	built on a collection loaded before it existed. The highest version wins,
+	then the most recently updated, then the last inserted; the others are
+	moved to ``policy_duplicates``. Returns how many were moved.
+	"""
+	groups = policies_collection.aggregate([
+		{"$sort": {"version": -1, "updated_at": -1, "_id": -1}},
+		{"$group": {"_id": "$policyNumber", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+		{"$match": {"count": {"$gt": 1}}},
+	])
+	moved = 0
+	now = datetime.utcnow()
+	for group in groups:
+		kept, extra = group["ids"][0], group["ids"][1:]
+		duplicates = list(policies_collection.find({"_id": {"$in": extra}}))
+		# upserts by _id, so a run interrupted before the delete can simply be repeated
+		policy_duplicates_collection.bulk_write(
+			[
+				ReplaceOne({"_id": doc["_id"]}, {**doc, "duplicate_of": kept, "moved_at": now}, upsert=True)
+				for doc in duplicates
+			],
+			ordered=False,
+		)
+		policies_collection.delete_many({"_id": {"$in": extra}})
+		moved += len(duplicates)
+	if moved:
+		logger.warning("Moved %d duplicate policy documents to policy_duplicates", moved)
+	return moved
+
+
+def ensure_policy_indexes() -> list[str]:
+	dedupe_policies()
+	return [
+		policies_collection.create_index("policyNumber", unique=True),
+		policy_versions_collection.create_index([("policyNumber", 1), ("version", -1)], unique=True),
+	]
+
+
+def get_policy(policy_number: str, version: int | None = None) -> dict[str, Any] | None:
+	"""Current policy, or a specific historical version."""
+	policy_number = normalize_policy_number(policy_number)
+	if version is None:
+		return policies_collection.find_one({"policyNumber": policy_number}, {"_id": 0})
+	return policy_versions_collection.find_one(
+		{"policyNumber": policy_number, "version": version}, {"_id": 0, "imported_at": 0}
+	)
+
+
+def list_policy_versions(policy_number: str) -> list[dict[str, Any]]:
+	cursor = policy_versions_collection.find(
+		{"policyNumber": normalize_policy_number(policy_number)},
+		{"_id": 0, "version": 1, "content_hash": 1, "imported_at": 1, "source": 1},
+	).sort("version", -1)
+	return list(cursor)
+
+
+def main():
+	configure_logging()
+	parser = argparse.ArgumentParser(description="Import policies from a JSON, JSONL or CSV dump")
+	parser.add_argument("path")
+	parser.add_argument("--batch-size", type=int, default=1000)
+	args = parser.parse_args()
+
+	indexes = ensure_policy_indexes()
+	summary = import_policy_file(args.path, batch_size=args.batch_size)
+	summary["indexes"] = indexes
+	print(json.dumps(summary, indent=2, default=str))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,126 @@
+"""
+Submission records for idempotent claim intake (``claim_requests``).
+
+One document per idempotency key, unique on ``key``: the insert that wins
+owns the submission and every concurrent duplicate sees its record. A
+record moves ``in_progress`` -> ``completed`` (with the stored response)
+or ``failed``; failed and stale records can be taken over with a
+compare-and-set on their ``updated_at``. Records expire after
+IDEMPOTENCY_TTL_HOURS (24 by default) through a TTL index.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.database.mongo import insurance_db
+
+claim_requests_collection = insurance_db["claim_requests"]
+
+IDEMPOTENCY_TTL_HOURS_ENV = "IDEMPOTENCY_TTL_HOURS"
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+FAILED = "failed"
+
+_indexes_ready = False
+_indexes_lock = threading.Lock()
+
+
+def _utcnow() -> datetime:
+	return datetime.utcnow()
+
+
+def _get_ttl_hours() -> float:
+	try:
+		return float(os.getenv(IDEMPOTENCY_TTL_HOURS_ENV, "24"))
+	except ValueError:
+		return 24.0
+
+
+def ensure_request_indexes() -> list[str]:
+	global _indexes_ready
+	with _indexes_lock:
+		names = [
+			claim_requests_collection.create_index("key", unique=True),
+			claim_requests_collection.create_index("expires_at", expireAfterSeconds=0),
+		]
+		_indexes_ready = True
+	return names
+
+
+def create_request(key: str, fingerprint: str, claim_id: str) -> dict[str, Any] | None:
+	"""Insert an in-progress record; ``None`` if ``key`` is already taken."""
+	if not _indexes_ready:
+		# the unique index is what makes the insert a lock
+		ensure_request_indexes()
+	now = _utcnow()
+	record = {
+		"key": key,
+		"fingerprint": fingerprint,
+		"claim_id": claim_id,
+		"status": IN_PROGRESS,
+		"job_id": None,
+		"response": None,
+		"error": None,
+		"created_at": now,
+		"updated_at": now,
+		"expires_at": now + timedelta(hours=_get_ttl_hours()),
+	}
+	try:
+		claim_requests_collection.insert_one(record)
+	except DuplicateKeyError:
+		return None
+	record.pop("_id", None)
+	return record
+
+
+def get_request(key: str) -> dict[str, Any] | None:
+	return claim_requests_collection.find_one({"key": key}, {"_id": 0})
+
+
+def take_over_request(record: dict[str, Any]) -> dict[str, Any] | None:
+	"""
+	Move a failed or abandoned record back to in-progress for a new owner.
+	Only one caller wins; the others get ``None`` and should re-read.
+	"""
+	now = _utcnow()
+	taken = claim_requests_collection.find_one_and_update(
+		{"key": record["key"], "status": record["status"], "updated_at": record["updated_at"]},
+		{
+			"$set": {
+				"status": IN_PROGRESS,
+				"job_id": None,
+				"error": None,
+				"updated_at": now,
+				"expires_at": now + timedelta(hours=_get_ttl_hours()),
+			}
+		},
+		return_document=ReturnDocument.AFTER,
+	)
+	if taken is not None:
+		taken.pop("_id", None)
+	return taken
+
+
+def attach_job(key: str, job_id: str) -> None:
+	claim_requests_collection.update_one({"key": key}, {"$set": {"job_id": job_id, "updated_at": _utcnow()}})
+
+
+def complete_request(key: str, response: dict[str, Any]) -> None:
+	claim_requests_collection.update_one(
+		{"key": key},
+		{"$set": {"status": COMPLETED, "response": response, "error": None, "updated_at": _utcnow()}},
+	)
+
+
+def fail_request(key: str, error: str) -> None:
+	claim_requests_collection.update_one(
+		{"key": key, "status": IN_PROGRESS},
+		{"$set": {"status": FAILED, "error": error, "updated_at": _utcnow()}},
+	)
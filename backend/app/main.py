@@ -2,14 +2,15 @@ import argparse
 import json
 import os
 import uuid
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes_auth import router as auth_router
 from app.api.routes_claims import router as claims_router
 from app.api.routes_underwriter import router as underwriter_router
-from app.core.langgraph_builder import run_claim_workflow
+from app.utils.logging import PROMETHEUS_CONTENT_TYPE, configure_logging, render_metrics
 
 
 def parse_args():
@@ -18,7 +19,7 @@ def parse_args():
     )
     parser.add_argument(
         "documents",
-        nargs="+",
+        nargs="*",
         help="One or more document paths for ingestion",
     )
     parser.add_argument(
@@ -26,19 +27,111 @@ def parse_args():
         default=None,
         help="Optional claim id. Auto-generated when omitted.",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--batch",
+        default=None,
+        metavar="MANIFEST_OR_DIR",
+        help="Run many claims from a CSV/JSONL manifest or a directory tree.",
+    )
+    parser.add_argument(
+        "--output",
+        default="batch_results.jsonl",
+        help="Batch mode: JSONL file results are streamed to.",
+    )
+    parser.add_argument(
+        "--ledger",
+        default=None,
+        help="Batch mode: progress ledger used to resume. Defaults to <output>.ledger.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Batch mode: number of claims processed concurrently.",
+    )
+    parser.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="Batch mode: queue the claims as low-priority backfill jobs for pipeline workers.",
+    )
+    parser.add_argument(
+        "--from-node",
+        default=None,
+        help="Re-run --claim-id from this node using its checkpoint, e.g. node4_fraud_detection.",
+    )
+    args = parser.parse_args()
+    if args.from_node and not args.claim_id:
+        parser.error("--from-node requires --claim-id")
+    if not args.batch and not args.documents and not args.from_node:
+        parser.error("pass document paths, --batch MANIFEST_OR_DIR or --claim-id with --from-node")
+    return args
 
 
 def run_cli():
     load_dotenv()
+    configure_logging()
     args = parse_args()
 
+    if args.batch and args.enqueue:
+        from app.services.batch_runner import enqueue_batch
+
+        print(json.dumps(enqueue_batch(args.batch, ledger_path=args.ledger), indent=2))
+        return
+
+    if args.batch:
+        from app.services.batch_runner import run_batch
+
+        summary = run_batch(
+            args.batch,
+            args.output,
+            ledger_path=args.ledger,
+            workers=args.workers,
+        )
+        print(json.dumps(summary, indent=2))
+        return
+
+    if args.from_node:
+        from app.core.langgraph_builder import rerun_claim_workflow_from
+
+        final_state = rerun_claim_workflow_from(
+            args.claim_id, args.from_node, document_paths=args.documents or None
+        )
+        print(json.dumps(final_state, default=str, indent=2))
+        return
+
+    from app.core.langgraph_builder import run_claim_workflow
+
     claim_id = args.claim_id or f"CLM-{uuid.uuid4().hex[:8].upper()}"
     final_state = run_claim_workflow(claim_id=claim_id, document_paths=args.documents)
 
     print(json.dumps(final_state, default=str, indent=2))
 
 
+# "1" imports the claim workflow (OCR, LangGraph, models) during startup
+# instead of on the first submission
+PRELOAD_WORKFLOW_ENV = "PRELOAD_WORKFLOW"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.core.checkpointing import validate_checkpoint_backend
+    from app.database.job_queue import ensure_job_indexes
+    from app.database.mongo import close_clients, get_client
+
+    configure_logging()
+    # refuse a process-local checkpoint store before serving resume/rerun requests
+    validate_checkpoint_backend()
+    get_client()
+    # the API enqueues and polls jobs too; don't wait for a worker to build the indexes
+    ensure_job_indexes()
+    if os.getenv(PRELOAD_WORKFLOW_ENV) == "1":
+        from app.core.langgraph_builder import get_claim_workflow
+
+        get_claim_workflow()
+    yield
+    close_clients()
+
+
 def create_app() -> FastAPI:
     load_dotenv()
 
@@ -46,6 +139,7 @@ def create_app() -> FastAPI:
         title="Intelli Claim API",
         description="FastAPI integration layer for LangGraph insurance claim workflow",
         version="1.0.0",
+        lifespan=lifespan,
     )
 
     allowed_origins = [
@@ -69,6 +163,10 @@ def create_app() -> FastAPI:
     def health_check():
         return {"status": "ok"}
 
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
     # ✅ Include routers (NO indentation issues)
     app.include_router(auth_router, prefix="/auth", tags=["auth"])
     app.include_router(claims_router)
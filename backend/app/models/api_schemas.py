@@ -79,6 +79,9 @@ class ReviewerDecisionRequest(BaseModel):
     reviewer_name: str
     reviewer_email: str
     note: str | None = None
+    # settlement, when the decision closes the claim: labels it for Node 5 training
+    final_cost: float | None = Field(default=None, ge=0)
+    severity: Literal["LOW", "MEDIUM", "HIGH"] | None = None
 
 
 class ReviewerDecisionResponse(BaseModel):
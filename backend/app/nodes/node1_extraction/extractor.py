@@ -1,6 +1,6 @@
 import os
 import re
-from app.nodes.node1_extraction.ocr_engine import extract_text_from_image, extract_text_from_pdf
+from app.services.ocr_service import recognize
 
 
 def extract_money(text):
@@ -62,21 +62,20 @@ def extract_report_fields(text):
 
 
 def process_documents(claim_id: str, file_paths: list[str]):
-    documents = []
-
+    texts = []
+    ocr_results = []
     for path in file_paths:
-        if path.lower().endswith(".pdf"):
-            text = extract_text_from_pdf(path)
-        else:
-            text = extract_text_from_image(path)
+        ocr = recognize(path)
+        ocr_results.append(ocr)
+        texts.append((ocr.text, classify_document(ocr.text)))
 
-        doc_type = classify_document(text)
-        fields = {}
+    # Use LLM for better extraction: one request covers all of the claim's documents
+    from app.services.llm_service import llm_service
+    llm_results = llm_service.extract_claim_documents(texts)
 
-        # Use LLM for better extraction
-        from app.services.llm_service import llm_service
-        llm_data = llm_service.extract_structured_data(text, doc_type)
-        
+    documents = []
+    for path, (text, doc_type), ocr, llm_data in zip(file_paths, texts, ocr_results, llm_results):
+        fields = {}
         if llm_data:
             # Merge LLM data into fields, preserving legacy structure where expected
             fields = {
@@ -104,7 +103,9 @@ def process_documents(claim_id: str, file_paths: list[str]):
             "file": path,
             "document_type": doc_type,
             "structured_fields": fields,
-            "extracted_text": text
+            "extracted_text": text,
+            "ocr_provider": ocr.provider,
+            "ocr_confidence": ocr.confidence,
         })
 
     return {
@@ -1,32 +1,226 @@
+"""
+Page loading and image preparation for the local OCR providers.
+
+PDF pages that already carry a text layer are returned as text and not
+OCR'd. Other pages are rendered at a DPI chosen from a 72 DPI preview so
+their glyphs come out near OCR_TARGET_GLYPH_PX tall.
+
+With OCR_ADAPTIVE on (the default) every page is profiled on a reduced
+copy: glyph height from connected components, text density, skew from
+projection profiles, and uneven lighting. Each page is then:
+- rescaled to the target glyph height, which downsamples oversized phone
+  photos;
+- deskewed;
+- binarized with Otsu, or with an adaptive threshold when the lighting
+  is uneven;
+- given a Tesseract page segmentation mode to match its density.
+OCR_ADAPTIVE=0 restores the fixed blur + Otsu pipeline at PSM 4.
+
+PDF pages are rendered straight to single-channel pixmaps, and a page's
+image is a view over the pixmap's samples rather than a converted copy.
+"""
 import os
-import pytesseract
-import fitz  # PyMuPDF
+from dataclasses import dataclass
+
 import cv2
+import fitz  # PyMuPDF
 import numpy as np
-from dotenv import load_dotenv
 
-load_dotenv()
+from app.services.ocr_service import recognize
+
+OCR_ADAPTIVE_ENV = "OCR_ADAPTIVE"
+OCR_TARGET_GLYPH_PX_ENV = "OCR_TARGET_GLYPH_PX"
+OCR_MAX_SIDE_ENV = "OCR_MAX_SIDE"
+OCR_TEXT_LAYER_MIN_CHARS_ENV = "OCR_TEXT_LAYER_MIN_CHARS"
+
+DEFAULT_PSM = 4
+SPARSE_PSM = 11
+# profiling runs on a copy no larger than this
+ANALYSIS_SIDE = 1000
+SKEW_ANGLES = np.arange(-5.0, 5.01, 0.5)
+PDF_DPI_RANGE = (100, 400)
+DEFAULT_PDF_DPI = 300
+
+
+def _get_int(name, default):
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def adaptive_enabled():
+    return os.getenv(OCR_ADAPTIVE_ENV, "1") != "0"
+
+
+@dataclass
+class Page:
+    image: np.ndarray | None
+    source: str
+    # set for PDF pages with a usable text layer; no OCR needed
+    text: str | None = None
+    # the pixmap whose samples ``image`` views; keeps that buffer alive
+    pixmap: fitz.Pixmap | None = None
+
+
+@dataclass
+class PageProfile:
+    source: str
+    glyph_px: float | None
+    density: float
+    components: int
+    skew: float
+    uneven: bool
+
+    @property
+    def psm(self):
+        return SPARSE_PSM if self.components < 40 or self.density < 0.01 else DEFAULT_PSM
 
-pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_CMD")
 
 def preprocess_image(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     blur = cv2.GaussianBlur(gray, (5, 5), 0)
     thresh = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
     return thresh
 
+
+def _reduced(gray):
+    scale = min(1.0, ANALYSIS_SIDE / max(gray.shape))
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray, scale
+
+
+def _glyph_height(ink):
+    """Median height of letter-sized connected components, or None."""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    letters = (heights >= 3) & (heights <= 120) & (widths <= 5 * heights) & (areas >= 6)
+    if letters.sum() < 20:
+        return None, int(letters.sum())
+    return float(np.median(heights[letters])), int(letters.sum())
+
+
+def _skew_angle(ink):
+    """Angle (degrees) that makes text rows sharpest in the horizontal projection."""
+    height, width = ink.shape
+    center = (width / 2, height / 2)
+    best_angle, best_score = 0.0, -1.0
+    for angle in SKEW_ANGLES:
+        rotated = cv2.warpAffine(ink, cv2.getRotationMatrix2D(center, angle, 1.0), (width, height), flags=cv2.INTER_NEAREST)
+        rows = rotated.sum(axis=1, dtype=np.float64)
+        score = float(np.square(np.diff(rows)).sum())
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def analyze_page(gray, source="image"):
+    small, scale = _reduced(gray)
+    # lighting: the page with its text dilated away, heavily blurred; dividing
+    # it out lets one global threshold find the ink under a shadow or gradient
+    background = cv2.blur(cv2.dilate(small, np.ones((15, 15), np.uint8)), (31, 31))
+    flat = cv2.divide(small, background, scale=255)
+    ink = cv2.threshold(flat, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    glyph, components = _glyph_height(ink)
+    shade_low, shade_high = np.percentile(background, (5, 95))
+    return PageProfile(
+        source=source,
+        glyph_px=glyph / scale if glyph else None,
+        density=float(np.count_nonzero(ink)) / ink.size,
+        components=components,
+        skew=_skew_angle(ink) if components >= 20 else 0.0,
+        uneven=float(shade_high - shade_low) > 40.0,
+    )
+
+
+def normalize_page(gray, profile):
+    """Rescale to the target glyph height (capped at OCR_MAX_SIDE) and deskew."""
+    target = _get_int(OCR_TARGET_GLYPH_PX_ENV, 24)
+    max_side = _get_int(OCR_MAX_SIDE_ENV, 3500)
+    scale = target / profile.glyph_px if profile.glyph_px else 1.0
+    scale = min(max(scale, 0.25), 2.0, max_side / max(gray.shape))
+    if scale < 0.8 or scale > 1.25:
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+        if profile.glyph_px:
+            profile.glyph_px *= scale
+    if abs(profile.skew) >= 0.5:
+        height, width = gray.shape
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), profile.skew, 1.0)
+        gray = cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        profile.skew = 0.0
+    return gray
+
+
+def binarize(gray, profile):
+    if profile.uneven:
+        block = int(max(15, 2 * (profile.glyph_px or 12))) | 1
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block, 15)
+    if profile.source != "pdf_page":
+        # photos carry sensor noise; rendered pages are clean
+        gray = cv2.GaussianBlur(gray, (3, 3), 0)
+    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def prepare_page(gray, source):
+    """Normalized grayscale page and its profile; the profile is None with OCR_ADAPTIVE=0."""
+    if not adaptive_enabled():
+        return gray, None
+    profile = analyze_page(gray, source)
+    return normalize_page(gray, profile), profile
+
+
+def render_gray(page, dpi=72):
+    """Render a PDF page to a grayscale pixmap and a uint8 view of its samples.
+
+    The view shares the pixmap's memory, so the pixmap must outlive it.
+    """
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    image = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, : pix.width]
+    return pix, image
+
+
+def _render_dpi(page):
+    """DPI that renders the page's glyphs near the target height, from a 72 DPI preview."""
+    if not adaptive_enabled():
+        return 72
+    _, preview = render_gray(page)
+    glyph, _ = _glyph_height(cv2.threshold(preview, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1])
+    if not glyph:
+        return DEFAULT_PDF_DPI
+    low, high = PDF_DPI_RANGE
+    return int(min(max(72 * _get_int(OCR_TARGET_GLYPH_PX_ENV, 24) / glyph, low), high))
+
+
+def load_pages(path):
+    """Yield a ``Page`` for an image or for each page of a PDF."""
+    if not path.lower().endswith(".pdf"):
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"Cannot read image {path}")
+        yield Page(image, "image")
+        return
+
+    min_chars = _get_int(OCR_TEXT_LAYER_MIN_CHARS_ENV, 50)
+    doc = fitz.open(path)
+    try:
+        for page in doc:
+            text = page.get_text("text")
+            if min_chars > 0 and len(text.strip()) >= min_chars:
+                yield Page(None, "pdf_text", text)
+                continue
+            pix, image = render_gray(page, _render_dpi(page))
+            yield Page(image, "pdf_page", pixmap=pix)
+    finally:
+        doc.close()
+
+
 def extract_text_from_image(path):
-    img = cv2.imread(path)
-    processed = preprocess_image(img)
-    return pytesseract.image_to_string(processed, config="--oem 3 --psm 4")
+    return recognize(path).text
+
 
 def extract_text_from_pdf(path):
-    doc = fitz.open(path)
-    text = ""
-    for page in doc:
-        pix = page.get_pixmap()
-        img_array = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
-        processed = preprocess_image(img_array)
-        text += pytesseract.image_to_string(processed, config="--oem 3 --psm 4")
-    doc.close()
-    return text
\ No newline at end of file
+    return recognize(path).text
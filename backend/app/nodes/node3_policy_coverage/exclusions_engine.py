@@ -1,24 +1,249 @@
-def check_exclusions(policy, claim_context):
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+
+from app.utils.logging import record_cache
+
+
+SYNONYMS_PATH_ENV = "EXCLUSION_SYNONYMS_PATH"
+CACHE_SIZE_ENV = "EXCLUSION_CACHE_SIZE"
+
+
+def _default_synonyms_path():
+    return Path(__file__).resolve().parents[3] / "data" / "exclusion_synonyms.json"
+
+
+def _resolve_synonyms_path():
+    configured = os.getenv(SYNONYMS_PATH_ENV)
+    return Path(configured) if configured else _default_synonyms_path()
+
+
+def _get_cache_size():
+    try:
+        return int(os.getenv(CACHE_SIZE_ENV, "256"))
+    except ValueError:
+        return 256
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher. All patterns are found in a single left-to-right
+    pass over the text, independent of how many patterns were added.
+    Matches must start and end on word boundaries.
+    """
+
+    def __init__(self, patterns):
+        # patterns: iterable of (term, payload)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for term, payload in patterns:
+            term = term.lower().strip()
+            if not term:
+                continue
+            state = 0
+            for ch in term:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = nxt
+            self._output[state].append((len(term), term, payload))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def scan(self, text):
+        text = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        size = len(text)
+
+        for index, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not output[state]:
+                continue
+            end = index + 1
+            if end < size and _is_word_char(text[end]):
+                continue
+            for length, term, payload in output[state]:
+                start = end - length
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                yield start, end, term, payload
+
+
+STRONG = "strong"
+WEAK = "weak"
+
+# a match right after one of these ("was not drunk") does not count
+NEGATIONS = {"not", "no", "never", "nor", "non", "without", "wasn't", "isn't", "didn't", "neither"}
+NEGATION_WINDOW = 3
+
+
+def _parse_concept(entry):
+    """
+    A concept in the synonyms file: ``clause`` words identify it in policy
+    wording; ``strong`` terms trigger it in a claim description on their
+    own, ``weak`` ones only alongside a second term of the same concept.
+    A plain list is read as clause and strong terms.
+    """
+    if isinstance(entry, list):
+        entry = {"clause": entry, "strong": entry}
+    return {
+        "clause": {str(term).lower() for term in entry.get("clause", [])},
+        STRONG: {str(term).lower() for term in entry.get(STRONG, [])},
+        WEAK: {str(term).lower() for term in entry.get(WEAK, [])},
+    }
 
-    triggered = []
 
-    exclusions = policy.get("exclusions", [])
-    incident_type = claim_context.get("incident_type", "").lower()
-    description = claim_context.get("description", "").lower()
+_lexicon_lock = threading.Lock()
+_lexicon = None
 
-    for exclusion in exclusions:
-        e = exclusion.lower()
 
-        if "alcohol" in e and "alcohol" in description:
-            triggered.append(exclusion)
+def _load_lexicon():
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            path = _resolve_synonyms_path()
+            try:
+                concepts = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                concepts = {}
+            concepts = {concept: _parse_concept(entry) for concept, entry in concepts.items()}
+            matcher = AhoCorasick((term, concept) for concept, entry in concepts.items() for term in entry["clause"])
+            _lexicon = (concepts, matcher)
+        return _lexicon
 
-        if "commercial" in e and "commercial" in description:
-            triggered.append(exclusion)
 
-        if "intentional" in e and "intentional" in description:
-            triggered.append(exclusion)
+def _clause_text(exclusion):
+    if isinstance(exclusion, dict):
+        return str(exclusion.get("clause") or exclusion.get("text") or "")
+    return str(exclusion)
 
-        if "racing" in e and "race" in description:
-            triggered.append(exclusion)
 
-    return triggered
\ No newline at end of file
+def _clause_terms(exclusion, lexicon_concepts, lexicon_matcher):
+    """
+    Trigger terms for one clause, mapped to STRONG or WEAK: its own wording
+    and explicit terms are strong; concepts it mentions add their terms.
+    """
+    clause = _clause_text(exclusion)
+    terms = {}
+
+    for _, _, _, concept in lexicon_matcher.scan(clause):
+        for strength in (WEAK, STRONG):
+            terms.update(dict.fromkeys(lexicon_concepts[concept][strength], strength))
+
+    terms[clause.lower().strip()] = STRONG
+    if isinstance(exclusion, dict):
+        terms.update(dict.fromkeys((str(term).lower() for term in exclusion.get("terms", [])), STRONG))
+
+    return {term: strength for term, strength in terms.items() if term}
+
+
+def _negated(text, start):
+    words = text[max(0, start - 40):start].lower().split()
+    return any(word.strip(".,;:!?") in NEGATIONS for word in words[-NEGATION_WINDOW:])
+
+
+class CompiledExclusions:
+    def __init__(self, exclusions):
+        lexicon_concepts, lexicon_matcher = _load_lexicon()
+        self.clauses = [_clause_text(exclusion) for exclusion in exclusions]
+        self._matcher = AhoCorasick(
+            (term, (index, strength))
+            for index, exclusion in enumerate(exclusions)
+            for term, strength in _clause_terms(exclusion, lexicon_concepts, lexicon_matcher).items()
+        )
+
+    def scan(self, text):
+        """
+        Return one match per clause as ``{clause, term, start, end}``, in
+        clause order. A clause matches on its first strong term, or on its
+        first weak term once a second, different term backs it up (listed
+        under ``context``). Negated mentions are ignored.
+        """
+        text = text or ""
+        strong = {}
+        weak = {}
+        for start, end, term, (index, strength) in self._matcher.scan(text):
+            if _negated(text, start):
+                continue
+            match = {"clause": self.clauses[index], "term": term, "start": start, "end": end}
+            if strength == STRONG:
+                strong.setdefault(index, match)
+            else:
+                weak.setdefault(index, {})
+                weak[index].setdefault(term, match)
+
+        matches = dict(strong)
+        for index, by_term in weak.items():
+            if index in matches:
+                continue
+            if len(by_term) > 1:
+                first, *others = by_term.values()
+                matches[index] = {**first, "context": [match["term"] for match in others]}
+        return [matches[index] for index in sorted(matches)]
+
+
+_cache_lock = threading.Lock()
+_compiled_cache = OrderedDict()
+
+
+def _cache_key(policy, exclusions):
+    version = policy.get("version")
+    if version is None:
+        version = hashlib.sha1(json.dumps(exclusions, sort_keys=True, default=str).encode()).hexdigest()
+    return policy.get("policyNumber"), version
+
+
+def compile_exclusions(policy):
+    """Compiled matcher for a policy's exclusions, cached per policy version."""
+    exclusions = policy.get("exclusions", []) or []
+    key = _cache_key(policy, exclusions)
+
+    with _cache_lock:
+        compiled = _compiled_cache.get(key)
+        if compiled is not None:
+            _compiled_cache.move_to_end(key)
+    record_cache("exclusions", compiled is not None)
+    if compiled is not None:
+        return compiled
+
+    compiled = CompiledExclusions(exclusions)
+
+    with _cache_lock:
+        _compiled_cache[key] = compiled
+        while len(_compiled_cache) > _get_cache_size():
+            _compiled_cache.popitem(last=False)
+    return compiled
+
+
+def scan_exclusions(policy, claim_context):
+    """Scan the claim description once against every exclusion clause of the policy."""
+    return compile_exclusions(policy).scan(claim_context.get("description", ""))
+
+
+def check_exclusions(policy, claim_context):
+    return [match["clause"] for match in scan_exclusions(policy, claim_context)]
@@ -1,53 +1,22 @@
-from datetime import datetime
+from app.core.claim_features import ClaimFeatures
 from .policy_fetcher import fetch_policy
 from .coverage_checker import is_policy_active, calculate_covered_amount
-from .exclusions_engine import check_exclusions
+from .exclusions_engine import scan_exclusions
 
 
 # --------------------------------
 # extract claim context from node1 output
 # --------------------------------
 
-def extract_claim_context(node1_output):
+def extract_claim_context(node1_output, features=None):
 
-    policy_number = None
-    claim_amount = 0
-    incident_date = None
-    description = ""
-
-    for doc in node1_output["documents"]:
-
-        fields = doc.get("structured_fields", {})
-        dtype = doc.get("document_type")
-
-        # Prioritize richer fields
-        if not policy_number:
-            res = fields.get("policy_number")
-            policy_number = res[0] if isinstance(res, list) and res else res
-            
-        if not incident_date:
-            res = fields.get("incident_date")
-            incident_date = res[0] if isinstance(res, list) and res else res
-
-        if not description:
-            description = fields.get("summary") or fields.get("description", "")
-
-        if dtype == "bill" and claim_amount == 0:
-            res = fields.get("amount")
-            amt = res[0] if isinstance(res, list) and res else res
-            try:
-                claim_amount = float(amt or 0)
-            except (TypeError, ValueError):
-                pass
-
-    if incident_date:
-        incident_date = datetime.strptime(incident_date, "%d/%m/%Y")
+    features = features or ClaimFeatures.from_node1_output(node1_output)
 
     return {
-        "policy_number": policy_number,
-        "claim_amount": claim_amount,
-        "incident_date": incident_date,
-        "description": description,
+        "policy_number": features.policy_number,
+        "claim_amount": features.claim_amount,
+        "incident_date": features.incident_date,
+        "description": features.description,
         "incident_type": "accident"
     }
 
@@ -56,9 +25,9 @@ def extract_claim_context(node1_output):
 # NODE 3 MAIN FUNCTION
 # --------------------------------
 
-def verify_policy_coverage(node1_output):
+def verify_policy_coverage(node1_output, features=None):
 
-    context = extract_claim_context(node1_output)
+    context = extract_claim_context(node1_output, features)
 
     policy = fetch_policy(context["policy_number"])
 
@@ -68,23 +37,33 @@ def verify_policy_coverage(node1_output):
             "reason": "policy not found"
         }
 
+    if context["incident_date"] is None:
+        return {
+            "is_covered": False,
+            "reason": "incident date could not be determined",
+            "policy_version": policy.get("version")
+        }
+
     # policy active?
     active = is_policy_active(policy, context["incident_date"])
 
     if not active:
         return {
             "is_covered": False,
-            "reason": "policy not active on incident date"
+            "reason": "policy not active on incident date",
+            "policy_version": policy.get("version")
         }
 
     # exclusions
-    exclusions_triggered = check_exclusions(policy, context)
+    exclusion_matches = scan_exclusions(policy, context)
 
-    if exclusions_triggered:
+    if exclusion_matches:
         return {
             "is_covered": False,
             "reason": "policy exclusion triggered",
-            "exclusions": exclusions_triggered
+            "exclusions": [match["clause"] for match in exclusion_matches],
+            "exclusion_matches": exclusion_matches,
+            "policy_version": policy.get("version")
         }
 
     # payout
@@ -98,6 +77,7 @@ def verify_policy_coverage(node1_output):
         "covered_amount": covered_amount,
         "deductible": deductible,
         "policy_limit": policy["sumInsured"],
+        "policy_version": policy.get("version"),
         "exclusions_triggered": [],
         "confidence": 0.95
     }
\ No newline at end of file
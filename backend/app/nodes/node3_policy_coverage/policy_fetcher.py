@@ -1,10 +1,10 @@
-from app.database.mongo import policies_collection
+from app.database.policy_repository import get_policy
 
 
-def fetch_policy(policy_number: str):
-    policy = policies_collection.find_one({"policyNumber": policy_number})
+def fetch_policy(policy_number: str, version: int | None = None):
+    policy = get_policy(policy_number, version)
 
     if not policy:
         return None
 
-    return policy
\ No newline at end of file
+    return policy
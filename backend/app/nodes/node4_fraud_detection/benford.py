@@ -1,21 +1,273 @@
-import math
+import os
+import threading
 
-def first_digit(n):
-    while n >= 10:
-        n //= 10
-    return n
+import numpy as np
 
+from app.core.claim_features import ClaimFeatures
+from app.utils.logging import get_logger, record_cache
 
-def benford_probability(d):
-    return math.log10(1 + 1/d)
+from .history_sync import HistorySync, stored_claims_query
+from .network_analysis import UNKNOWN_CLAIMERS
 
+logger = get_logger(__name__)
 
-def benford_score(amount):
-    if amount <= 0:
-        return 0
 
-    d = first_digit(int(amount))
-    expected = benford_probability(d)
+MIN_SAMPLES_ENV = "BENFORD_MIN_SAMPLES"
 
-    # deviation from expected distribution
-    return abs(0.301 - expected)  # simplified
\ No newline at end of file
+SCOPES = ("claimant", "provider", "policy")
+
+DIGITS = np.arange(1, 10)
+EXPECTED = np.log10(1 + 1 / DIGITS)
+
+# Nigrini's first-digit MAD bound for "nonconformity" and the chi-square
+# critical value for 8 degrees of freedom at alpha = 0.05.
+MAD_NONCONFORMITY = 0.015
+CHI2_CRITICAL = 15.507
+
+
+def _get_min_samples():
+    try:
+        return int(os.getenv(MIN_SAMPLES_ENV, "30"))
+    except ValueError:
+        return 30
+
+
+def first_digits(amounts):
+    values = np.abs(np.asarray(amounts, dtype=float).ravel())
+    values = values[np.isfinite(values) & (values >= 1)]
+    if values.size == 0:
+        return np.empty(0, dtype=np.int64)
+    digits = (values / 10 ** np.floor(np.log10(values))).astype(np.int64)
+    return np.clip(digits, 1, 9)
+
+
+def digit_histogram(amounts):
+    return np.bincount(first_digits(amounts), minlength=10)[1:]
+
+
+def benford_tests(histograms):
+    """
+    Chi-square and MAD against Benford's first-digit distribution for every
+    row of an ``(n, 9)`` histogram matrix in one pass.
+    """
+    counts = np.atleast_2d(np.asarray(histograms, dtype=float))
+    totals = counts.sum(axis=1)
+    safe_totals = np.where(totals > 0, totals, 1.0)
+
+    expected_counts = np.outer(safe_totals, EXPECTED)
+    chi2 = ((counts - expected_counts) ** 2 / expected_counts).sum(axis=1)
+    mad = np.abs(counts / safe_totals[:, None] - EXPECTED).mean(axis=1)
+
+    chi2[totals == 0] = 0.0
+    mad[totals == 0] = 0.0
+    return {"samples": totals.astype(np.int64), "chi2": chi2, "mad": mad}
+
+
+class BenfordEngine:
+    """
+    First-digit histograms per claimant, provider and policy, updated as
+    claims arrive. Test results are cached per key and only the keys touched
+    since the last evaluation are recomputed.
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._counts = np.zeros((1024, 9), dtype=np.int64)
+        self._results = {}
+        self._dirty = set()
+        self._seen_claims = set()
+        self._lock = threading.Lock()
+
+    def _row(self, key):
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._rows)
+            if row >= len(self._counts):
+                grown = np.zeros((len(self._counts) * 2, 9), dtype=np.int64)
+                grown[: len(self._counts)] = self._counts
+                self._counts = grown
+            self._rows[key] = row
+        return row
+
+    def _add(self, keys, digits):
+        rows = np.fromiter((self._row(key) for key in keys), dtype=np.int64, count=len(keys))
+        np.add.at(self._counts, (rows, digits - 1), 1)
+        self._dirty.update(keys)
+
+    def observe(self, claim_id, scope_keys, amount):
+        """
+        Count a claim's amount once. Without a ``claim_id`` a repeat call
+        cannot be told apart from a new claim, so nothing is recorded.
+        """
+        if not claim_id:
+            return False
+        keys = [(scope, key) for scope, key in scope_keys.items() if key]
+        digits = first_digits([amount])
+        with self._lock:
+            if claim_id in self._seen_claims or not keys or digits.size == 0:
+                return False
+            self._seen_claims.add(claim_id)
+            self._add(keys, np.repeat(digits, len(keys)))
+            return True
+
+    def observe_many(self, records):
+        """``observe`` for ``(claim_id, scope_keys, amount)`` records; returns how many were new."""
+        return sum(self.observe(claim_id, scope_keys, amount) for claim_id, scope_keys, amount in records)
+
+    def evaluate(self, scope_keys):
+        keys = [(scope, key) for scope, key in scope_keys.items() if key]
+        with self._lock:
+            stale = [key for key in keys if key in self._dirty or key not in self._results]
+            stale = [key for key in stale if key in self._rows]
+            for key in keys:
+                record_cache("benford_results", key not in stale)
+            if stale:
+                rows = [self._rows[key] for key in stale]
+                tests = benford_tests(self._counts[rows])
+                for i, key in enumerate(stale):
+                    self._results[key] = {
+                        "scope": key[0],
+                        "key": key[1],
+                        "samples": int(tests["samples"][i]),
+                        "chi2": round(float(tests["chi2"][i]), 3),
+                        "mad": round(float(tests["mad"][i]), 4),
+                    }
+                    self._dirty.discard(key)
+            return [self._results[key] for key in keys if key in self._results]
+
+    def backfill(self, records):
+        """
+        Rebuild all histograms from ``(claim_id, scope_keys, amount)`` records.
+        Digits are extracted for the whole batch at once and scattered into
+        the histogram matrix with a single ``np.add.at``. As with ``observe``,
+        each claim counts once and records without a claim_id are skipped.
+        """
+        fresh = BenfordEngine()
+        claim_ids, keys, amounts = set(), [], []
+        for claim_id, scope_keys, amount in records:
+            if not claim_id or claim_id in claim_ids:
+                continue
+            claim_ids.add(claim_id)
+            for scope, key in scope_keys.items():
+                if key:
+                    keys.append((scope, key))
+                    amounts.append(amount)
+
+        values = np.abs(np.asarray(amounts, dtype=float))
+        valid = np.isfinite(values) & (values >= 1)
+        keys = [key for key, ok in zip(keys, valid) if ok]
+        if keys:
+            fresh._add(keys, first_digits(values[valid]))
+
+        self.restore({"rows": fresh._rows, "counts": fresh._counts, "seen_claims": claim_ids})
+        return len(claim_ids)
+
+    def snapshot(self):
+        """A picklable copy of the histograms, for handing to another process."""
+        with self._lock:
+            return {
+                "rows": dict(self._rows),
+                "counts": self._counts.copy(),
+                "seen_claims": set(self._seen_claims),
+            }
+
+    def restore(self, state):
+        """Swap in histograms built elsewhere (``backfill`` or a ``snapshot``)."""
+        with self._lock:
+            self._rows = state["rows"]
+            self._counts = state["counts"]
+            self._results = {}
+            self._dirty = set()
+            self._seen_claims = state["seen_claims"]
+
+
+def _normalize_key(value):
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text or text.lower() in UNKNOWN_CLAIMERS or text.upper() == "UNKNOWN":
+        return None
+    return text.upper()
+
+
+def claim_scope_keys(features, claimer=None):
+    """
+    Histogram keys for a claim, built the same way for a live claim and for
+    one reloaded from Mongo: the claimant is the first known email, then
+    name, from the extracted fields and then from the submitted claimer.
+    """
+    claimer = claimer or {}
+    claimant = (
+        features.claimant_email,
+        claimer.get("email"),
+        features.claimant_name,
+        claimer.get("name"),
+    )
+    return {
+        "claimant": next(filter(None, map(_normalize_key, claimant)), None),
+        "provider": _normalize_key(features.provider),
+        "policy": _normalize_key(features.policy_number),
+    }
+
+
+def _stored_features(claim):
+    """
+    Features of a stored claim from the Node 1 output it was scored on.
+    Claims stored before that output was kept fall back to their top-level
+    amount and policy number.
+    """
+    node1_output = (claim.get("form_data") or {}).get("node1_output") or {}
+    if node1_output.get("documents"):
+        return ClaimFeatures.from_node1_output(node1_output)
+    return ClaimFeatures(claim_amount=claim.get("claim_amount") or 0.0, policy_number=claim.get("policy_number"))
+
+
+def iter_stored_amounts(since=None, batch_size=5000):
+    from app.database.mongo import claims_collection
+
+    projection = {
+        "_id": 0,
+        "claim_id": 1,
+        "claim_amount": 1,
+        "claimer.email": 1,
+        "claimer.name": 1,
+        "policy_number": 1,
+        "form_data.node1_output.documents.document_type": 1,
+        "form_data.node1_output.documents.structured_fields": 1,
+    }
+    cursor = claims_collection.find(stored_claims_query(since), projection).batch_size(batch_size)
+    for claim in cursor:
+        features = _stored_features(claim)
+        yield claim.get("claim_id"), claim_scope_keys(features, claim.get("claimer")), features.claim_amount
+
+
+def backfill_benford(records=None):
+    """Rebuild the shared engine, streaming from the claims collection by default."""
+    return benford_engine.backfill(records if records is not None else iter_stored_amounts())
+
+
+def benford_risk(claim_id, features, claimer=None):
+    """
+    Record the claim amount and return the test results for every scope whose
+    history does not conform to Benford's law.
+    """
+    benford_sync.ensure()
+
+    scope_keys = claim_scope_keys(features, claimer)
+    benford_engine.observe(claim_id, scope_keys, features.claim_amount)
+
+    min_samples = _get_min_samples()
+    return [
+        result
+        for result in benford_engine.evaluate(scope_keys)
+        if result["samples"] >= min_samples
+        and (result["mad"] > MAD_NONCONFORMITY or result["chi2"] > CHI2_CRITICAL)
+    ]
+
+
+benford_engine = BenfordEngine()
+benford_sync = HistorySync(
+    "Benford histograms",
+    load=backfill_benford,
+    catch_up=lambda since: benford_engine.observe_many(iter_stored_amounts(since)),
+)
@@ -1,86 +1,42 @@
-from datetime import datetime
+from app.core.claim_features import ClaimFeatures, parse_date
 from .fraud_rules import round_amount_check
-from .benford import benford_score
+from .benford import benford_risk
 from .watchlist_scan import watchlist_match
 from .anomaly_models import anomaly_score
+from .network_analysis import network_features
+from .rule_engine import coerce_features, get_rule_set
 
 
-def _parse_date(value):
-    if value is None:
-        return None
-    if isinstance(value, datetime):
-        return value.replace(tzinfo=None)
-    if isinstance(value, str):
-        for date_format in ("%d/%m/%Y", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S"):
-            try:
-                return datetime.strptime(value, date_format)
-            except ValueError:
-                continue
-    return None
+def extract_context(node1_output, policy, features=None):
 
+    features = features or ClaimFeatures.from_node1_output(node1_output)
 
-def _first_field_value(fields, key, default):
-    value = fields.get(key, default)
-    if isinstance(value, list):
-        return value[0] if value else default
-    return value
-
-
-def extract_context(node1_output, policy):
-
-    claim_amount = 0
-    claimant_name = ""
-    incident_date = None
-
-    for doc in node1_output.get("documents", []):
-        fields = doc.get("structured_fields", {})
-        dtype = doc.get("document_type")
-
-        if dtype == "bill":
-            raw_amount = _first_field_value(fields, "amount", 0)
-            try:
-                if isinstance(raw_amount, str):
-                    clean_amt = "".join(c for c in raw_amount if c.isdigit() or c == ".")
-                    claim_amount = float(clean_amt) if clean_amt else 0.0
-                else:
-                    claim_amount = float(raw_amount or 0)
-            except (TypeError, ValueError):
-                claim_amount = 0.0
-
-        # Prefer richer LLM extraction
-        if not claimant_name:
-            claimant_name = fields.get("claimer_name") or str(_first_field_value(fields, "holder_name", "") or "")
-
-        if not incident_date:
-            res = fields.get("incident_date")
-            incident_date = res[0] if isinstance(res, list) and res else res
-
-    incident_date = _parse_date(incident_date)
-
-    policy_start = _parse_date(policy.get("effectiveDate"))
+    policy_start = parse_date(policy.get("effectiveDate"))
     days_since_policy = 0
-    if incident_date and policy_start:
-        days_since_policy = (incident_date - policy_start).days
+    if features.incident_date and policy_start:
+        days_since_policy = (features.incident_date - policy_start).days
 
-    return claim_amount, claimant_name, days_since_policy
+    return features.claim_amount, features.claimant_name or "", days_since_policy
 
 
-def fraud_detection(node1_output, policy):
+def fraud_detection(node1_output, policy, claim_id=None, features=None, ai_analysis=None, claimer=None):
 
-    amount, name, days_since_policy = extract_context(node1_output, policy)
+    features = features or ClaimFeatures.from_node1_output(node1_output, claim_id=claim_id)
+    amount, name, days_since_policy = extract_context(node1_output, policy, features)
 
     indicators = []
     score = 0
 
-    # 1. Qualitative AI Analysis
-    from app.services.llm_service import llm_service
-    # Combine all document texts for context
-    context_text = "\n\n".join([
-        f"Doc: {doc.get('document_type')}\nText: {doc.get('extracted_text', '')[:1000]}"
-        for doc in node1_output.get("documents", [])
-    ])
-    ai_analysis = llm_service.analyze_claim_context(context_text)
-    
+    # 1. Qualitative AI Analysis (re-scoring passes the stored one)
+    if ai_analysis is None:
+        from app.services.llm_service import llm_service
+        # Combine all document texts for context
+        context_text = "\n\n".join([
+            f"Doc: {doc.get('document_type')}\nText: {doc.get('extracted_text', '')[:1000]}"
+            for doc in node1_output.get("documents", [])
+        ])
+        ai_analysis = llm_service.analyze_claim_context(context_text)
+
     if ai_analysis:
         indicators.extend(ai_analysis.get("fraud_indicators", []))
         # Initial score from AI
@@ -88,53 +44,46 @@ def fraud_detection(node1_output, policy):
         score += ai_risk_map.get(ai_analysis.get("risk_level", "LOW"), 0.1)
 
     # 2. Programmatic Rules (Supplemental)
-    # round amount rule
-    if round_amount_check(amount):
-        if "round number claim amount" not in indicators:
-            indicators.append("round number claim amount")
-        score += 0.05
-
-    # timing fraud
-    if days_since_policy < 7:
-        if "claim too soon after policy start" not in indicators:
-            indicators.append("claim too soon after policy start")
-        score += 0.1
-
-    # benford
-    b_score = benford_score(amount)
-    if b_score > 0.2:
-        if "benford distribution anomaly" not in indicators:
-            indicators.append("benford distribution anomaly")
-        score += 0.1
-
-    # watchlist
+    benford_hits = benford_risk(claim_id, features, claimer)
     matched, name_hit = watchlist_match(name)
-    if matched:
-        indicators.append(f"watchlist match: {name_hit}")
-        score += 0.3
-
-    # ML anomaly
-    if anomaly_score(amount, days_since_policy):
-        if "ml anomaly detected" not in indicators:
-            indicators.append("ml anomaly detected")
-        score += 0.2
+    network = network_features(claim_id, node1_output, features, claimer) if claim_id else {}
+
+    rule_features = coerce_features({
+        "claim_amount": amount,
+        "days_since_policy": days_since_policy,
+        "round_amount": round_amount_check(amount),
+        "benford_nonconforming": bool(benford_hits),
+        "watchlist_hit": matched,
+        "ml_anomaly": anomaly_score(amount, days_since_policy),
+        "network_component_claims": network.get("component_claims", 0),
+        "network_component_claimants": network.get("component_claimants", 0),
+        "network_max_entity_degree": network.get("max_entity_degree", 0),
+        "network_max_entity_claimants": network.get("max_entity_claimants", 0),
+    })
+
+    rule_set = get_rule_set()
+    rule_score, rule_indicators, fired_rules = rule_set.evaluate(
+        rule_features,
+        context={"watchlist_name": name_hit},
+    )
+    for indicator in rule_indicators:
+        if indicator not in indicators:
+            indicators.append(indicator)
+    score += rule_score
 
     score = min(score, 1.0)
-
-    # risk level (Recalculate based on total score)
-    if score < 0.3:
-        risk = "LOW"
-    elif score < 0.6:
-        risk = "MEDIUM"
-    elif score < 0.85:
-        risk = "HIGH"
-    else:
-        risk = "CRITICAL"
+    risk = rule_set.risk_level(score)
 
     return {
         "fraud_score": round(score, 2),
         "fraud_indicators": indicators,
         "risk_level": risk,
         "reasoning": ai_analysis.get("reasoning", "No qualitative analysis available"),
-        "confidence": ai_analysis.get("extraction_confidence", 0.8)
+        "confidence": ai_analysis.get("extraction_confidence", 0.8),
+        "network": network,
+        "benford": benford_hits,
+        "rule_features": rule_features,
+        "fired_rules": fired_rules,
+        "rule_set_version": rule_set.version,
+        "ai_analysis": ai_analysis
     }
\ No newline at end of file
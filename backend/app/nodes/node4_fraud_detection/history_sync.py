@@ -0,0 +1,88 @@
+"""
+Keeps a process-local fraud history (the claim network, the Benford
+histograms) in step with the claims collection.
+
+Every API, worker and re-scoring process scores against its own copy. The
+first use loads it from Mongo; after that, claims other processes stored
+are pulled in by ``updated_at`` at most once per FRAUD_HISTORY_SYNC_SECONDS
+(default 10, 0 = before every claim). FRAUD_HISTORY_SYNC=0 turns loading
+off, for processes handed a snapshot instead.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+SYNC_ENV = "FRAUD_HISTORY_SYNC"
+SYNC_SECONDS_ENV = "FRAUD_HISTORY_SYNC_SECONDS"
+
+# a claim stored by another process just before a pull can carry an
+# updated_at behind the watermark; re-reading it is harmless
+OVERLAP = timedelta(seconds=60)
+
+
+def _get_interval():
+    try:
+        return float(os.getenv(SYNC_SECONDS_ENV, "10"))
+    except ValueError:
+        return 10.0
+
+
+def sync_enabled():
+    return os.getenv(SYNC_ENV, "1") != "0"
+
+
+def stored_claims_query(since=None):
+    return {"updated_at": {"$gte": since}} if since is not None else {}
+
+
+class HistorySync:
+    """
+    ``load()`` rebuilds the history from every stored claim, ``catch_up(since)``
+    adds the claims updated since then. Calls are serialized, so concurrent
+    first callers wait for one backfill rather than each running their own.
+    """
+
+    def __init__(self, name, load, catch_up):
+        self.name = name
+        self._load = load
+        self._catch_up = catch_up
+        self._lock = threading.Lock()
+        self._watermark = None
+        self._checked_at = None
+
+    def _fresh(self):
+        return self._checked_at is not None and time.monotonic() - self._checked_at < _get_interval()
+
+    def mark_loaded(self, watermark):
+        """Record a history installed from elsewhere (a snapshot) as current up to ``watermark``."""
+        with self._lock:
+            self._watermark = watermark
+            self._checked_at = time.monotonic()
+
+    @property
+    def watermark(self):
+        return self._watermark
+
+    def ensure(self):
+        if not sync_enabled() or self._fresh():
+            return
+        with self._lock:
+            if self._fresh():
+                return
+            started = datetime.utcnow()
+            try:
+                if self._watermark is None:
+                    count = self._load()
+                    logger.info("Loaded %s from %s stored claims", self.name, count)
+                else:
+                    self._catch_up(self._watermark - OVERLAP)
+                self._watermark = started
+            except Exception as exc:
+                logger.warning("%s sync failed: %s", self.name, exc)
+            self._checked_at = time.monotonic()
@@ -0,0 +1,345 @@
+import copy
+import hashlib
+import re
+import threading
+
+from app.core.claim_features import ClaimFeatures
+from app.nodes.node1_extraction.insurance_extractors import extract_vehicle_number
+from app.utils.logging import get_logger
+
+from .history_sync import HistorySync, stored_claims_query
+
+logger = get_logger(__name__)
+
+
+# structured_fields key -> entity kind. The policy number is left out on
+# purpose: every claim on a policy shares it, which says nothing about rings.
+FIELD_ENTITIES = {
+    "claimer_phone": "phone",
+    "claimer_email": "email",
+    "claimer_address": "address",
+    "bank_account": "bank",
+    "vehicle_number": "vehicle",
+}
+
+# placeholders claim_processing stores when the claimer is not known
+UNKNOWN_CLAIMERS = {"unknown@example.com", "unknown claimer"}
+
+BANK_ACCOUNT_PATTERN = re.compile(
+    r"(?:a/?c|account)\s*(?:no\.?|number)?\s*[:\-]?\s*(\d{9,18})", re.I
+)
+
+
+def _first(value):
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def normalize_entity(kind, value):
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+
+    if kind == "phone":
+        digits = re.sub(r"\D", "", text)
+        # compare on the subscriber number so +91/0 prefixes still link
+        return digits[-10:] if len(digits) >= 7 else None
+    if kind == "email":
+        return text.lower()
+    if kind in ("address", "vehicle", "bank"):
+        return re.sub(r"[\s\-/.,]+", "", text).upper() or None
+    if kind == "name":
+        return " ".join(text.upper().split())
+    return text
+
+
+def claimant_key(features, claimer=None):
+    """
+    Who made a claim: email, then phone, then name, from the extracted
+    fields and then from the stored claimer. None when nobody is known.
+    """
+    claimer = claimer or {}
+    candidates = (
+        ("email", features.claimant_email),
+        ("email", claimer.get("email")),
+        ("phone", features.claimant_phone),
+        ("phone", claimer.get("phone")),
+        ("name", features.claimant_name),
+        ("name", claimer.get("name")),
+    )
+    for kind, value in candidates:
+        if value is None or str(value).strip().lower() in UNKNOWN_CLAIMERS:
+            continue
+        key = normalize_entity(kind, value)
+        if key:
+            return f"{kind}:{key}"
+    return None
+
+
+def extract_entities(node1_output):
+    """Return the set of ``kind:value`` entity keys referenced by a claim."""
+    entities = set()
+
+    for doc in node1_output.get("documents", []):
+        fields = doc.get("structured_fields", {}) or {}
+        text = doc.get("extracted_text", "") or ""
+
+        for field, kind in FIELD_ENTITIES.items():
+            value = normalize_entity(kind, _first(fields.get(field)))
+            if value:
+                entities.add(f"{kind}:{value}")
+
+        vehicle = normalize_entity("vehicle", extract_vehicle_number(text))
+        if vehicle:
+            entities.add(f"vehicle:{vehicle}")
+
+        for account in BANK_ACCOUNT_PATTERN.findall(text):
+            entities.add(f"bank:{account}")
+
+        if text.strip():
+            digest = hashlib.md5(text.encode()).hexdigest()
+            entities.add(f"doc:{digest}")
+
+    return entities
+
+
+class ClaimNetwork:
+    """
+    Claims and the entities they reference, kept as a bipartite graph whose
+    connected components are tracked with a union-find. Inserting a claim costs
+    O(k * α(n)) for k entities, so ring features are available immediately.
+
+    Components and entities also track the distinct claimants behind their
+    claims: one customer's repeat claims share an email or address with each
+    other, and only links across claimants point at a ring.
+    """
+
+    STATE = (
+        "_parent",
+        "_claims_in_component",
+        "_entities_in_component",
+        "_claimants_in_component",
+        "_entity_degree",
+        "_entity_claimants",
+        "_claim_entities",
+    )
+
+    def __init__(self):
+        self._parent = {}
+        self._claims_in_component = {}
+        self._entities_in_component = {}
+        self._claimants_in_component = {}
+        self._entity_degree = {}
+        self._entity_claimants = {}
+        self._claim_entities = {}
+        self._lock = threading.Lock()
+
+    def _find(self, node):
+        parent = self._parent
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    def _add_node(self, node, is_claim, claimant=None):
+        if node in self._parent:
+            return
+        self._parent[node] = node
+        self._claims_in_component[node] = 1 if is_claim else 0
+        self._entities_in_component[node] = 0 if is_claim else 1
+        self._claimants_in_component[node] = {claimant} if is_claim else set()
+
+    def _union(self, a, b):
+        root_a = self._find(a)
+        root_b = self._find(b)
+        if root_a == root_b:
+            return root_a
+
+        size_a = self._claims_in_component[root_a] + self._entities_in_component[root_a]
+        size_b = self._claims_in_component[root_b] + self._entities_in_component[root_b]
+        if size_a < size_b:
+            root_a, root_b = root_b, root_a
+
+        self._parent[root_b] = root_a
+        self._claims_in_component[root_a] += self._claims_in_component.pop(root_b)
+        self._entities_in_component[root_a] += self._entities_in_component.pop(root_b)
+        claimants_a = self._claimants_in_component[root_a]
+        claimants_b = self._claimants_in_component.pop(root_b)
+        if len(claimants_a) < len(claimants_b):
+            claimants_a, claimants_b = claimants_b, claimants_a
+        claimants_a |= claimants_b
+        self._claimants_in_component[root_a] = claimants_a
+        return root_a
+
+    def _insert(self, claim_id, entities, claimant=None):
+        claim_node = f"claim:{claim_id}"
+        if claim_node in self._parent:
+            return claim_node
+
+        # a claim with no known claimant only vouches for itself
+        claimant = claimant or claim_node
+        self._add_node(claim_node, is_claim=True, claimant=claimant)
+        self._claim_entities[claim_node] = tuple(entities)
+        for entity in entities:
+            self._add_node(entity, is_claim=False)
+            self._entity_degree[entity] = self._entity_degree.get(entity, 0) + 1
+            self._entity_claimants.setdefault(entity, set()).add(claimant)
+            self._union(claim_node, entity)
+        return claim_node
+
+    def _features(self, claim_node):
+        root = self._find(claim_node)
+        entities = self._claim_entities.get(claim_node, ())
+        degrees = [self._entity_degree.get(entity, 0) for entity in entities]
+        claimants = [len(self._entity_claimants.get(entity, ())) for entity in entities]
+        shared = [entity for entity, count in zip(entities, claimants) if count > 1]
+
+        return {
+            "component_claims": self._claims_in_component[root],
+            "component_claimants": len(self._claimants_in_component[root]),
+            "component_entities": self._entities_in_component[root],
+            "entity_count": len(entities),
+            "shared_entities": sorted(shared),
+            "max_entity_degree": max(degrees, default=0),
+            "max_entity_claimants": max(claimants, default=0),
+        }
+
+    def add_claim(self, claim_id, entities, claimant=None):
+        with self._lock:
+            claim_node = self._insert(claim_id, entities, claimant)
+            return self._features(claim_node)
+
+    def add_claims(self, claims):
+        """Insert ``(claim_id, entities, claimant)`` records; known claims are skipped."""
+        added = 0
+        with self._lock:
+            for claim_id, entities, claimant in claims:
+                if f"claim:{claim_id}" not in self._parent:
+                    self._insert(claim_id, entities, claimant)
+                    added += 1
+        return added
+
+    def claim_features(self, claim_id):
+        claim_node = f"claim:{claim_id}"
+        with self._lock:
+            if claim_node not in self._parent:
+                return None
+            return self._features(claim_node)
+
+    def rebuild(self, claims):
+        """
+        Recompute the whole graph from ``(claim_id, entities, claimant)`` records.
+
+        The fresh graph is built off to the side and swapped in at the end,
+        so scoring keeps working against the old graph while a large backfill
+        runs.
+        """
+        fresh = ClaimNetwork()
+        for claim_id, entities, claimant in claims:
+            fresh._insert(claim_id, entities, claimant)
+
+        self.restore(fresh._state())
+        return len(self._claim_entities)
+
+    def _state(self):
+        return {name: getattr(self, name) for name in self.STATE}
+
+    def snapshot(self):
+        """A picklable copy of the graph, for handing to another process."""
+        with self._lock:
+            return copy.deepcopy(self._state())
+
+    def restore(self, state):
+        """Swap in a graph built elsewhere (``rebuild`` or a ``snapshot``)."""
+        with self._lock:
+            for name in self.STATE:
+                setattr(self, name, state[name])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "claims": len(self._claim_entities),
+                "entities": len(self._entity_degree),
+                "components": len(self._claims_in_component),
+            }
+
+
+def claim_entry(node1_output, claimer=None, features=None):
+    """
+    ``(entities, claimant)`` for a claim: the extracted entities plus the
+    claimer's contact details. Node 4 (with the submitted claimer) and the
+    stored-claim loaders (with the persisted one) both go through here, so
+    every process builds the same graph.
+    """
+    features = features or ClaimFeatures.from_node1_output(node1_output)
+    claimer = claimer or {}
+    entities = extract_entities(node1_output)
+
+    # the persisted claimer falls back to these extracted details, so adding
+    # them here keeps a live entry equal to the stored one
+    candidates = (
+        ("phone", features.claimant_phone),
+        ("email", features.claimant_email),
+        ("address", features.claimant_address),
+        ("phone", claimer.get("phone")),
+        ("email", claimer.get("email")),
+        ("address", claimer.get("address")),
+    )
+    for kind, value in candidates:
+        if value is None or str(value).strip().lower() in UNKNOWN_CLAIMERS:
+            continue
+        key = normalize_entity(kind, value)
+        if key:
+            entities.add(f"{kind}:{key}")
+
+    return entities, claimant_key(features, claimer)
+
+
+def _stored_claim(claim):
+    node1_output = (claim.get("form_data") or {}).get("node1_output") or {"documents": []}
+    return claim_entry(node1_output, claim.get("claimer"))
+
+
+def iter_stored_claims(since=None, batch_size=5000):
+    """``(claim_id, entities, claimant)`` for stored claims, optionally only those updated since ``since``."""
+    from app.database.mongo import claims_collection
+
+    projection = {
+        "_id": 0,
+        "claim_id": 1,
+        "claimer": 1,
+        "form_data.node1_output.documents.structured_fields": 1,
+        "form_data.node1_output.documents.extracted_text": 1,
+    }
+    cursor = claims_collection.find(stored_claims_query(since), projection).batch_size(batch_size)
+    for claim in cursor:
+        if claim.get("claim_id"):
+            yield (claim["claim_id"], *_stored_claim(claim))
+
+
+def rebuild_claim_network(claims=None):
+    """Rebuild the shared graph, streaming from the claims collection by default."""
+    return claim_network.rebuild(claims if claims is not None else iter_stored_claims())
+
+
+def network_features(claim_id, node1_output, features=None, claimer=None):
+    """
+    Insert the claim into the network and return its ring features for
+    Node 4. ``claimer`` is the submitted claimer, as it will be persisted.
+    """
+    network_sync.ensure()
+    features = features or ClaimFeatures.from_node1_output(node1_output, claim_id=claim_id)
+    return claim_network.add_claim(claim_id, *claim_entry(node1_output, claimer, features))
+
+
+claim_network = ClaimNetwork()
+network_sync = HistorySync(
+    "claim network",
+    load=rebuild_claim_network,
+    catch_up=lambda since: claim_network.add_claims(iter_stored_claims(since)),
+)
@@ -0,0 +1,363 @@
+import argparse
+import json
+import operator
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.utils.logging import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+
+RULES_PATH_ENV = "FRAUD_RULES_PATH"
+RULES_SOURCE_ENV = "FRAUD_RULES_SOURCE"
+RELOAD_INTERVAL_ENV = "FRAUD_RULES_RELOAD_SECONDS"
+
+# Typed claim feature vector the rules are evaluated against.
+FEATURE_SCHEMA = {
+    "claim_amount": float,
+    "days_since_policy": int,
+    "round_amount": bool,
+    "benford_nonconforming": bool,
+    "watchlist_hit": bool,
+    "ml_anomaly": bool,
+    "network_component_claims": int,
+    "network_component_claimants": int,
+    "network_max_entity_degree": int,
+    "network_max_entity_claimants": int,
+}
+
+SCALAR_OPS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "in": lambda value, options: value in options,
+}
+
+VECTOR_OPS = {
+    "eq": np.equal,
+    "ne": np.not_equal,
+    "lt": np.less,
+    "lte": np.less_equal,
+    "gt": np.greater,
+    "gte": np.greater_equal,
+    "in": np.isin,
+}
+
+
+class RuleConfigError(ValueError):
+    pass
+
+
+def _default_rules_path():
+    return Path(__file__).resolve().parents[3] / "data" / "fraud_rules.json"
+
+
+def _resolve_rules_path():
+    configured = os.getenv(RULES_PATH_ENV)
+    return Path(configured) if configured else _default_rules_path()
+
+
+def _get_reload_interval():
+    try:
+        return float(os.getenv(RELOAD_INTERVAL_ENV, "5"))
+    except ValueError:
+        return 5.0
+
+
+def coerce_features(raw):
+    """Cast a feature mapping onto FEATURE_SCHEMA, filling missing values with zero."""
+    features = {}
+    for name, kind in FEATURE_SCHEMA.items():
+        value = raw.get(name)
+        try:
+            features[name] = kind(value or 0)
+        except (TypeError, ValueError):
+            features[name] = kind(0)
+    return features
+
+
+def feature_columns(rows):
+    """Turn a sequence of feature mappings into one NumPy column per feature."""
+    rows = [coerce_features(row) for row in rows]
+    return {
+        name: np.fromiter((row[name] for row in rows), dtype=np.float64, count=len(rows))
+        for name in FEATURE_SCHEMA
+    }
+
+
+def _compile_condition(condition, rule_id):
+    """
+    Compile a condition tree into a scalar predicate and a column predicate.
+
+    Conditions are either a leaf ``{"feature", "op", "value"}`` or one of the
+    combinators ``{"all": [...]}``, ``{"any": [...]}`` and ``{"not": {...}}``.
+    """
+    if "all" in condition or "any" in condition:
+        combinator = "all" if "all" in condition else "any"
+        children = [_compile_condition(child, rule_id) for child in condition[combinator]]
+        if not children:
+            raise RuleConfigError(f"rule {rule_id}: empty '{combinator}' condition")
+        scalars = [child[0] for child in children]
+        vectors = [child[1] for child in children]
+        if combinator == "all":
+            return (
+                lambda f: all(fn(f) for fn in scalars),
+                lambda c: np.logical_and.reduce([fn(c) for fn in vectors]),
+            )
+        return (
+            lambda f: any(fn(f) for fn in scalars),
+            lambda c: np.logical_or.reduce([fn(c) for fn in vectors]),
+        )
+
+    if "not" in condition:
+        scalar, vector = _compile_condition(condition["not"], rule_id)
+        return (lambda f: not scalar(f), lambda c: np.logical_not(vector(c)))
+
+    feature = condition.get("feature")
+    op = condition.get("op")
+    if feature not in FEATURE_SCHEMA:
+        raise RuleConfigError(f"rule {rule_id}: unknown feature '{feature}'")
+    if op not in SCALAR_OPS:
+        raise RuleConfigError(f"rule {rule_id}: unknown operator '{op}'")
+
+    value = condition.get("value")
+    if op == "in":
+        value = tuple(value or ())
+    scalar_op = SCALAR_OPS[op]
+    vector_op = VECTOR_OPS[op]
+    return (
+        lambda f: scalar_op(f[feature], value),
+        lambda c: vector_op(c[feature], value),
+    )
+
+
+class CompiledRule:
+    __slots__ = ("id", "indicator", "weight", "predicate", "vector_predicate", "hits", "evaluations", "total_ns")
+
+    def __init__(self, spec):
+        self.id = spec["id"]
+        self.indicator = spec.get("indicator", self.id)
+        self.weight = float(spec.get("weight", 0.0))
+        self.predicate, self.vector_predicate = _compile_condition(spec["when"], self.id)
+        self.hits = 0
+        self.evaluations = 0
+        self.total_ns = 0
+
+
+class RuleSet:
+    def __init__(self, config, source=None):
+        self.version = config.get("version")
+        self.source = source
+        self.rules = []
+        seen = set()
+        for spec in config.get("rules", []):
+            if spec.get("enabled", True) is False:
+                continue
+            if "id" not in spec or "when" not in spec:
+                raise RuleConfigError("every rule needs an 'id' and a 'when' condition")
+            if spec["id"] in seen:
+                raise RuleConfigError(f"duplicate rule id '{spec['id']}'")
+            seen.add(spec["id"])
+            self.rules.append(CompiledRule(spec))
+
+        levels = config.get("risk_levels") or [[0.3, "LOW"], [0.6, "MEDIUM"], [0.85, "HIGH"]]
+        self.risk_levels = [(float(bound), level) for bound, level in levels]
+        self.top_risk_level = config.get("top_risk_level", "CRITICAL")
+        self._lock = threading.Lock()
+
+    def risk_level(self, score):
+        for bound, level in self.risk_levels:
+            if score < bound:
+                return level
+        return self.top_risk_level
+
+    def evaluate(self, features, context=None):
+        """
+        Run every rule against one feature vector.
+
+        Returns ``(score, indicators, rule_ids)`` where ``score`` is the sum
+        of the weights of the rules that fired.
+        """
+        features = coerce_features(features)
+        context = {**features, **(context or {})}
+        score = 0.0
+        indicators = []
+        fired = []
+
+        for rule in self.rules:
+            started = time.perf_counter_ns()
+            hit = rule.predicate(features)
+            elapsed = time.perf_counter_ns() - started
+            with self._lock:
+                rule.evaluations += 1
+                rule.total_ns += elapsed
+                if hit:
+                    rule.hits += 1
+            if hit:
+                score += rule.weight
+                fired.append(rule.id)
+                try:
+                    indicators.append(rule.indicator.format_map(context))
+                except (KeyError, ValueError):
+                    indicators.append(rule.indicator)
+
+        return score, indicators, fired
+
+    def evaluate_batch(self, columns):
+        """
+        Evaluate the rule set against feature columns (see ``feature_columns``).
+
+        Returns a boolean hit matrix of shape ``(n_rules, n_claims)`` and the
+        summed rule score per claim.
+        """
+        size = len(next(iter(columns.values()))) if columns else 0
+        if not self.rules:
+            return {"rule_ids": [], "hits": np.zeros((0, size), dtype=bool), "scores": np.zeros(size)}
+        hits = np.vstack([
+            np.broadcast_to(rule.vector_predicate(columns), (size,)) for rule in self.rules
+        ])
+        weights = np.array([rule.weight for rule in self.rules])
+        return {
+            "rule_ids": [rule.id for rule in self.rules],
+            "hits": hits,
+            "scores": weights @ hits,
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self.version,
+                "source": self.source,
+                "rules": [
+                    {
+                        "id": rule.id,
+                        "weight": rule.weight,
+                        "hits": rule.hits,
+                        "evaluations": rule.evaluations,
+                        "avg_us": round(rule.total_ns / rule.evaluations / 1000, 3) if rule.evaluations else 0.0,
+                    }
+                    for rule in self.rules
+                ],
+            }
+
+
+def _load_config_from_mongo():
+    from app.database.mongo import insurance_db
+
+    config = insurance_db["fraud_rules"].find_one({"active": True}, {"_id": 0}, sort=[("version", -1)])
+    if not config:
+        raise RuleConfigError("no active fraud rule set in the fraud_rules collection")
+    return config
+
+
+class RuleRegistry:
+    """
+    Holds the active rule set and recompiles it when the source changes.
+    Sources are checked at most once per reload interval.
+    """
+
+    def __init__(self):
+        self._rule_set = None
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _source_fingerprint(self):
+        if os.getenv(RULES_SOURCE_ENV, "file").lower() == "mongo":
+            config = _load_config_from_mongo()
+            return ("mongo", config.get("version")), config, "mongo"
+        path = _resolve_rules_path()
+        stat = path.stat()
+        return (str(path), stat.st_mtime_ns, stat.st_size), None, str(path)
+
+    def get(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._rule_set is not None and now - self._checked_at < _get_reload_interval():
+                return self._rule_set
+            self._checked_at = now
+
+            try:
+                fingerprint, config, source = self._source_fingerprint()
+                if fingerprint != self._fingerprint:
+                    if config is None:
+                        config = json.loads(Path(source).read_text(encoding="utf-8"))
+                    self._rule_set = RuleSet(config, source=source)
+                    self._fingerprint = fingerprint
+            except (OSError, ValueError, RuleConfigError) as exc:
+                if self._rule_set is None:
+                    raise
+                logger.warning("Fraud rule reload failed, keeping version %s: %s", self._rule_set.version, exc)
+
+            return self._rule_set
+
+
+def get_rule_set():
+    return rule_registry.get()
+
+
+def iter_stored_rule_features(batch_size=5000):
+    from app.database.mongo import claims_collection
+
+    cursor = claims_collection.find(
+        {"node4_output.rule_features": {"$exists": True}},
+        {"_id": 0, "claim_id": 1, "fraud_score": 1, "node4_output.rule_features": 1},
+    ).batch_size(batch_size)
+    for claim in cursor:
+        yield claim.get("claim_id"), claim.get("fraud_score", 0.0), claim["node4_output"]["rule_features"]
+
+
+def backtest(rule_set, records):
+    """Score stored rule features with ``rule_set`` and summarise how it behaves."""
+    claim_ids, stored_scores, rows = [], [], []
+    for claim_id, stored_score, features in records:
+        claim_ids.append(claim_id)
+        stored_scores.append(float(stored_score or 0.0))
+        rows.append(features)
+
+    result = rule_set.evaluate_batch(feature_columns(rows))
+    hits = result["hits"]
+    size = len(rows)
+    return {
+        "version": rule_set.version,
+        "claims": size,
+        "rules": [
+            {
+                "id": rule_id,
+                "hits": int(hits[i].sum()),
+                "hit_rate": round(float(hits[i].mean()), 4) if size else 0.0,
+            }
+            for i, rule_id in enumerate(result["rule_ids"])
+        ],
+        "mean_rule_score": round(float(result["scores"].mean()), 4) if size else 0.0,
+        "mean_stored_fraud_score": round(float(np.mean(stored_scores)), 4) if size else 0.0,
+    }
+
+
+def main():
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Back-test a fraud rule set against stored claims")
+    parser.add_argument("rules", nargs="?", help="Rule set JSON file. Defaults to the active rule set.")
+    args = parser.parse_args()
+
+    if args.rules:
+        rule_set = RuleSet(json.loads(Path(args.rules).read_text(encoding="utf-8")), source=args.rules)
+    else:
+        rule_set = get_rule_set()
+
+    print(json.dumps(backtest(rule_set, iter_stored_rule_features()), indent=2))
+
+
+rule_registry = RuleRegistry()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Single-claim vs batched Node 5 inference latency.
+
+    python -m app.nodes.node5_predictive.benchmark --claims 10000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from .predictive_agent import predictive_analysis_batch
+
+
+def run(claims, seed=11):
+    rng = np.random.default_rng(seed)
+    amounts = rng.lognormal(10, 1.2, claims)
+    fraud_scores = rng.uniform(0, 1, claims)
+    consistency_scores = rng.uniform(0.5, 1, claims)
+    covered = rng.uniform(0, 1, claims) > 0.2
+
+    # warm up model loading
+    predictive_analysis_batch(amounts[:1], fraud_scores[:1], consistency_scores[:1], covered[:1])
+
+    started = time.perf_counter()
+    for i in range(claims):
+        predictive_analysis_batch(amounts[i:i + 1], fraud_scores[i:i + 1], consistency_scores[i:i + 1], covered[i:i + 1])
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    predictive_analysis_batch(amounts, fraud_scores, consistency_scores, covered)
+    batched = time.perf_counter() - started
+
+    return {
+        "claims": claims,
+        "single_total_s": round(single, 4),
+        "single_per_claim_us": round(single / claims * 1e6, 2),
+        "batched_total_s": round(batched, 4),
+        "batched_per_claim_us": round(batched / claims * 1e6, 2),
+        "speedup": round(single / batched, 1) if batched else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Node 5 single vs batched inference")
+    parser.add_argument("--claims", type=int, default=10000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.claims), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import numpy as np
+
+from .linear_models import ModelHandle, build_feature_matrix
+
+
+MODEL_PATH_ENV = "COST_MODEL_PATH"
+
+cost_model = ModelHandle("cost_model", MODEL_PATH_ENV)
+
+
+def heuristic_cost_batch(X):
+    amounts = np.expm1(X[:, 0])
+    fraud_scores = X[:, 1]
+    consistency_scores = X[:, 2]
+
+    # risk inflation and inconsistency uncertainty
+    inflation = 1 + fraud_scores * 0.3
+    uncertainty = 1 + (1 - consistency_scores) * 0.2
+    return amounts * inflation * uncertainty
+
+
+def predict_cost_batch(X):
+    """Predicted final cost for each row of a Node 5 feature matrix."""
+    artifact = cost_model.get()
+    if artifact is None:
+        predicted = heuristic_cost_batch(X)
+    else:
+        # trained on log1p(final cost)
+        predicted = np.expm1(artifact["model"].predict(X))
+    return np.round(np.clip(predicted, 0, None), 2)
+
+
+def predict_cost(amount, fraud_score, consistency_score, is_covered=True):
+    X = build_feature_matrix([amount], [fraud_score], [consistency_score], [is_covered])
+    return float(predict_cost_batch(X)[0])
@@ -0,0 +1,185 @@
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+MODELS_DIR_ENV = "MODELS_DIR"
+
+FEATURE_NAMES = ("log_amount", "fraud_score", "consistency_score", "is_covered")
+
+
+def build_feature_matrix(amounts, fraud_scores, consistency_scores, covered):
+    """Stack Node 5 inputs into an ``(n, len(FEATURE_NAMES))`` float matrix."""
+    amounts = np.asarray(amounts, dtype=float)
+    return np.column_stack([
+        np.log1p(np.clip(amounts, 0, None)),
+        np.asarray(fraud_scores, dtype=float),
+        np.asarray(consistency_scores, dtype=float),
+        np.asarray(covered, dtype=float),
+    ])
+
+
+def _with_bias(X):
+    return np.hstack([np.ones((X.shape[0], 1)), X])
+
+
+class RidgeRegressor:
+    """Closed-form ridge regression on standardized features."""
+
+    kind = "ridge"
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.mean = None
+        self.scale = None
+        self.coef = None
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        self.mean = X.mean(axis=0)
+        self.scale = np.where(X.std(axis=0) > 0, X.std(axis=0), 1.0)
+        Z = _with_bias((X - self.mean) / self.scale)
+        penalty = self.alpha * np.eye(Z.shape[1])
+        penalty[0, 0] = 0.0
+        self.coef = np.linalg.solve(Z.T @ Z + penalty, Z.T @ np.asarray(y, dtype=float))
+        return self
+
+    def predict(self, X):
+        Z = _with_bias((np.asarray(X, dtype=float) - self.mean) / self.scale)
+        return Z @ self.coef
+
+
+class SoftmaxClassifier:
+    """Multinomial logistic regression trained with full-batch gradient descent."""
+
+    kind = "softmax"
+
+    def __init__(self, classes, alpha=1e-3, learning_rate=0.5, epochs=500):
+        self.classes = list(classes)
+        self.alpha = alpha
+        self.learning_rate = learning_rate
+        self.epochs = epochs
+        self.mean = None
+        self.scale = None
+        self.coef = None
+
+    def _probabilities(self, Z):
+        logits = Z @ self.coef
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def fit(self, X, labels):
+        X = np.asarray(X, dtype=float)
+        self.mean = X.mean(axis=0)
+        self.scale = np.where(X.std(axis=0) > 0, X.std(axis=0), 1.0)
+        Z = _with_bias((X - self.mean) / self.scale)
+
+        index = {label: i for i, label in enumerate(self.classes)}
+        targets = np.zeros((len(labels), len(self.classes)))
+        targets[np.arange(len(labels)), [index[label] for label in labels]] = 1.0
+
+        self.coef = np.zeros((Z.shape[1], len(self.classes)))
+        for _ in range(self.epochs):
+            gradient = Z.T @ (self._probabilities(Z) - targets) / len(Z) + self.alpha * self.coef
+            self.coef -= self.learning_rate * gradient
+        return self
+
+    def predict(self, X):
+        Z = _with_bias((np.asarray(X, dtype=float) - self.mean) / self.scale)
+        return np.asarray(self.classes, dtype=object)[self._probabilities(Z).argmax(axis=1)]
+
+
+def models_dir():
+    """Where trained artifacts are written and read: MODELS_DIR, or app/models."""
+    configured = os.getenv(MODELS_DIR_ENV)
+    return Path(configured) if configured else Path(__file__).resolve().parents[2] / "models"
+
+
+def _resolve_model_path(name, env_name):
+    configured = os.getenv(env_name)
+    if configured:
+        return Path(configured)
+    return models_dir() / f"{name}.pkl"
+
+
+def next_version(name):
+    versions = [
+        int(match.group(1))
+        for path in models_dir().glob(f"{name}.v*.pkl")
+        if (match := re.fullmatch(rf"{re.escape(name)}\.v(\d+)\.pkl", path.name))
+    ]
+    return max(versions, default=0) + 1
+
+
+def save_model(name, model, metrics=None):
+    """
+    Write ``<name>.v<N>.pkl`` and make it the current ``<name>.pkl``.
+    Returns the new version number.
+    """
+    version = next_version(name)
+    artifact = {
+        "name": name,
+        "version": version,
+        "trained_at": datetime.utcnow().isoformat(),
+        "features": FEATURE_NAMES,
+        "metrics": metrics or {},
+        "model": model,
+    }
+    directory = models_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    joblib.dump(artifact, directory / f"{name}.v{version}.pkl")
+    joblib.dump(artifact, directory / f"{name}.pkl")
+    return version
+
+
+class ModelHandle:
+    """
+    Loads a model artifact on first use and keeps it in memory. An empty or
+    missing file means "no trained model" and callers fall back to heuristics.
+    """
+
+    def __init__(self, name, env_name):
+        self.name = name
+        self.env_name = env_name
+        self._artifact = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._loaded:
+            return self._artifact
+        with self._lock:
+            if not self._loaded:
+                path = _resolve_model_path(self.name, self.env_name)
+                artifact = None
+                if path.exists() and path.stat().st_size > 0:
+                    try:
+                        artifact = joblib.load(path)
+                    except Exception as exc:
+                        logger.warning("Failed to load %s from %s: %s", self.name, path, exc)
+                        artifact = None
+                if artifact is not None and tuple(artifact.get("features", ())) != FEATURE_NAMES:
+                    logger.warning("Ignoring %s v%s: feature set mismatch", self.name, artifact.get("version"))
+                    artifact = None
+                self._artifact = artifact
+                self._loaded = True
+        return self._artifact
+
+    def version(self):
+        artifact = self.get()
+        return artifact["version"] if artifact else None
+
+    def reload(self):
+        with self._lock:
+            self._loaded = False
+            self._artifact = None
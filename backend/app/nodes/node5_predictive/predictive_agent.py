@@ -1,95 +1,102 @@
-import random
+import numpy as np
+
+from app.core.claim_features import ClaimFeatures
+from .cost_model import cost_model, predict_cost, predict_cost_batch
+from .linear_models import build_feature_matrix
+from .severity_model import predict_severity, predict_severity_batch, severity_model
+from .timeline_model import heuristic_settlement_days_batch, predict_settlement_days_batch, timeline_model
 
 
 # --------------------------------
 # Helper: extract claim amount
 # --------------------------------
 def extract_claim_amount(node1_output):
-    for doc in node1_output["documents"]:
-        if doc["document_type"] == "bill":
-            fields = doc.get("structured_fields", {})
-            raw_amt = fields.get("amount")
-            
-            # Handle list vs scalar from different extraction sources
-            if isinstance(raw_amt, list):
-                raw_amt = raw_amt[0] if raw_amt else 0
-            
-            if not raw_amt:
-                continue
-
-            try:
-                if isinstance(raw_amt, str):
-                    # Remove non-numeric chars except decimal
-                    clean_amt = "".join(c for c in raw_amt if c.isdigit() or c == ".")
-                    return float(clean_amt) if clean_amt else 0.0
-                return float(raw_amt)
-            except (TypeError, ValueError):
-                return 0.0
-    return 0.0
+    return ClaimFeatures.from_node1_output(node1_output).claim_amount
 
 
 # --------------------------------
 # Damage severity classification
 # --------------------------------
 def estimate_severity(amount):
-
-    if amount < 20000:
-        return "LOW"
-    elif amount < 80000:
-        return "MEDIUM"
-    else:
-        return "HIGH"
+    return predict_severity(amount)
 
 
 # --------------------------------
 # Settlement time estimation
 # --------------------------------
 def estimate_settlement_days(severity, fraud_score):
-
-    base_days = {
-        "LOW": 7,
-        "MEDIUM": 21,
-        "HIGH": 45
-    }[severity]
-
-    # fraud increases investigation time
-    extra = int(fraud_score * 30)
-
-    return base_days + extra
+    return int(heuristic_settlement_days_batch([severity], [fraud_score])[0])
 
 
 # --------------------------------
 # Reserve recommendation
 # --------------------------------
-def estimate_reserve(amount, fraud_score):
+def estimate_reserve_batch(amounts, fraud_scores):
 
     # insurers keep extra buffer for risky claims
-    buffer = amount * (0.1 + fraud_score * 0.2)
-    return round(amount + buffer, 2)
+    buffer = amounts * (0.1 + fraud_scores * 0.2)
+    return np.round(amounts + buffer, 2)
+
+
+def estimate_reserve(amount, fraud_score):
+    return float(estimate_reserve_batch(np.asarray([amount], dtype=float), np.asarray([fraud_score], dtype=float))[0])
 
 
 # --------------------------------
 # Final cost estimation
 # --------------------------------
 def predict_final_cost(amount, fraud_score, consistency_score):
-
-    # risk inflation
-    inflation = 1 + (fraud_score * 0.3)
-
-    # inconsistency uncertainty
-    uncertainty = 1 + (1 - consistency_score) * 0.2
-
-    predicted = amount * inflation * uncertainty
-    return round(predicted, 2)
+    return predict_cost(amount, fraud_score, consistency_score)
 
 
 # --------------------------------
 # Confidence score
 # --------------------------------
+def prediction_confidence_batch(consistency_scores, fraud_scores):
+
+    confidence = 0.7 * consistency_scores + 0.3 * (1 - fraud_scores)
+    return np.round(confidence, 2)
+
+
 def prediction_confidence(consistency_score, fraud_score):
+    return float(prediction_confidence_batch(np.asarray([consistency_score], dtype=float), np.asarray([fraud_score], dtype=float))[0])
 
-    confidence = 0.7 * consistency_score + 0.3 * (1 - fraud_score)
-    return round(confidence, 2)
+
+# --------------------------------
+# Batch scoring
+# --------------------------------
+def predictive_analysis_batch(amounts, fraud_scores, consistency_scores, covered):
+    """
+    Score many claims at once. Inputs are equal-length sequences; returns
+    one Node 5 output dict per claim.
+    """
+    fraud_scores = np.asarray(fraud_scores, dtype=float)
+    consistency_scores = np.asarray(consistency_scores, dtype=float)
+    X = build_feature_matrix(amounts, fraud_scores, consistency_scores, covered)
+
+    severities = predict_severity_batch(X)
+    predicted_costs = predict_cost_batch(X)
+    settlement_days = predict_settlement_days_batch(X, severities)
+    reserves = estimate_reserve_batch(np.expm1(X[:, 0]), fraud_scores)
+    confidences = prediction_confidence_batch(consistency_scores, fraud_scores)
+
+    versions = {
+        "cost": cost_model.version(),
+        "severity": severity_model.version(),
+        "timeline": timeline_model.version(),
+    }
+
+    return [
+        {
+            "predicted_final_cost": float(predicted_costs[i]),
+            "damage_severity": str(severities[i]),
+            "recommended_reserve": float(reserves[i]),
+            "estimated_settlement_days": int(settlement_days[i]),
+            "prediction_confidence": float(confidences[i]),
+            "model_versions": versions,
+        }
+        for i in range(len(X))
+    ]
 
 
 # --------------------------------
@@ -99,37 +106,18 @@ def predictive_analysis(
     node1_output,
     node2_output,
     node3_output,
-    node4_output
+    node4_output,
+    features=None
 ):
 
-    claim_amount = extract_claim_amount(node1_output)
-    fraud_score = node4_output.get("fraud_score", 0)
-    consistency_score = node2_output.get("consistency_score", 1)
-
-    severity = estimate_severity(claim_amount)
-
-    predicted_cost = predict_final_cost(
-        claim_amount,
-        fraud_score,
-        consistency_score
-    )
-
-    reserve = estimate_reserve(claim_amount, fraud_score)
-
-    settlement_days = estimate_settlement_days(
-        severity,
-        fraud_score
-    )
-
-    confidence = prediction_confidence(
-        consistency_score,
-        fraud_score
-    )
-
-    return {
-        "predicted_final_cost": predicted_cost,
-        "damage_severity": severity,
-        "recommended_reserve": reserve,
-        "estimated_settlement_days": settlement_days,
-        "prediction_confidence": confidence
-    }
\ No newline at end of file
+    if features is not None:
+        claim_amount = features.claim_amount
+    else:
+        claim_amount = extract_claim_amount(node1_output)
+
+    return predictive_analysis_batch(
+        [claim_amount],
+        [node4_output.get("fraud_score", 0)],
+        [node2_output.get("consistency_score", 1)],
+        [bool(node3_output.get("is_covered", False))],
+    )[0]
@@ -0,0 +1,32 @@
+import numpy as np
+
+from .linear_models import ModelHandle, build_feature_matrix
+
+
+MODEL_PATH_ENV = "SEVERITY_MODEL_PATH"
+
+SEVERITY_CLASSES = ("LOW", "MEDIUM", "HIGH")
+
+severity_model = ModelHandle("severity_model", MODEL_PATH_ENV)
+
+
+def heuristic_severity_batch(X):
+    amounts = np.expm1(X[:, 0])
+    return np.select(
+        [amounts < 20000, amounts < 80000],
+        ["LOW", "MEDIUM"],
+        default="HIGH",
+    ).astype(object)
+
+
+def predict_severity_batch(X):
+    """Damage severity label for each row of a Node 5 feature matrix."""
+    artifact = severity_model.get()
+    if artifact is None:
+        return heuristic_severity_batch(X)
+    return artifact["model"].predict(X)
+
+
+def predict_severity(amount, fraud_score=0.0, consistency_score=1.0, is_covered=True):
+    X = build_feature_matrix([amount], [fraud_score], [consistency_score], [is_covered])
+    return str(predict_severity_batch(X)[0])
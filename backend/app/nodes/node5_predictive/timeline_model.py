@@ -0,0 +1,34 @@
+import numpy as np
+
+from .linear_models import ModelHandle, build_feature_matrix
+
+
+MODEL_PATH_ENV = "TIMELINE_MODEL_PATH"
+
+BASE_DAYS = {"LOW": 7, "MEDIUM": 21, "HIGH": 45}
+
+timeline_model = ModelHandle("timeline_model", MODEL_PATH_ENV)
+
+
+def heuristic_settlement_days_batch(severities, fraud_scores):
+    base_days = np.array([BASE_DAYS[severity] for severity in severities], dtype=float)
+
+    # fraud increases investigation time
+    extra = np.floor(np.asarray(fraud_scores, dtype=float) * 30)
+    return base_days + extra
+
+
+def predict_settlement_days_batch(X, severities):
+    """Estimated settlement days for each row of a Node 5 feature matrix."""
+    artifact = timeline_model.get()
+    if artifact is None:
+        days = heuristic_settlement_days_batch(severities, X[:, 1])
+    else:
+        # trained on log1p(settlement days)
+        days = np.expm1(artifact["model"].predict(X))
+    return np.clip(np.rint(days), 1, None).astype(int)
+
+
+def predict_settlement_days(amount, fraud_score, consistency_score=1.0, is_covered=True, severity="LOW"):
+    X = build_feature_matrix([amount], [fraud_score], [consistency_score], [is_covered])
+    return int(predict_settlement_days_batch(X, [severity])[0])
@@ -0,0 +1,161 @@
+"""
+Offline training for the Node 5 cost, severity and timeline models.
+
+Training rows need the Node 5 inputs plus settled outcomes. The default
+source is the claim feature table (``app.database.feature_store``), read
+as NumPy columns. ``--source claims`` reads the claims collection and
+``--source jsonl`` a JSONL export, where rows carry ``claim_amount``,
+``fraud_score``, ``node2_output.consistency_score``,
+``node3_output.is_covered`` and ``outcome.final_cost``,
+``outcome.settlement_days``, ``outcome.severity``.
+
+Outcomes are recorded when an underwriter approves or rejects a claim with
+its settled cost (``POST /api/reviewer/claims/{claim_id}/decision``), on
+both the claim and its feature row.
+
+    python -m app.nodes.node5_predictive.train_models
+    python -m app.nodes.node5_predictive.train_models --source claims
+    python -m app.nodes.node5_predictive.train_models --source jsonl claims.jsonl
+"""
+import argparse
+import json
+
+import numpy as np
+
+from app.utils.logging import configure_logging
+
+from .linear_models import RidgeRegressor, SoftmaxClassifier, build_feature_matrix, save_model
+from .severity_model import SEVERITY_CLASSES
+
+
+TRAINING_COLUMNS = (
+    "claim_amount",
+    "fraud_score",
+    "consistency_score",
+    "is_covered",
+    "outcome_final_cost",
+    "outcome_settlement_days",
+    "outcome_severity",
+)
+
+
+def load_feature_training_set(query=None):
+    """Labelled rows of the feature table, as ``load_training_set`` returns them."""
+    from app.database.feature_store import load_feature_columns
+
+    selector = {
+        "outcome_severity": {"$in": list(SEVERITY_CLASSES)},
+        "outcome_final_cost": {"$ne": None},
+        "outcome_settlement_days": {"$ne": None},
+    }
+    if query:
+        selector.update(query)
+    columns = load_feature_columns(selector, TRAINING_COLUMNS)
+
+    # scores missing from a row default as in load_training_set
+    X = build_feature_matrix(
+        columns["claim_amount"],
+        np.nan_to_num(columns["fraud_score"], nan=0.0),
+        np.nan_to_num(columns["consistency_score"], nan=1.0),
+        np.nan_to_num(columns["is_covered"], nan=0.0) > 0,
+    )
+    return (
+        X,
+        columns["outcome_final_cost"],
+        columns["outcome_settlement_days"],
+        columns["outcome_severity"].astype(object),
+    )
+
+
+def iter_mongo_rows(batch_size=5000):
+    from app.database.mongo import claims_collection
+
+    projection = {
+        "_id": 0,
+        "claim_amount": 1,
+        "fraud_score": 1,
+        "node2_output.consistency_score": 1,
+        "node3_output.is_covered": 1,
+        "outcome": 1,
+    }
+    yield from claims_collection.find({"outcome": {"$exists": True}}, projection).batch_size(batch_size)
+
+
+def iter_jsonl_rows(path):
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_training_set(rows):
+    amounts, fraud_scores, consistency_scores, covered = [], [], [], []
+    costs, days, severities = [], [], []
+
+    for row in rows:
+        outcome = row.get("outcome") or {}
+        if outcome.get("final_cost") is None or outcome.get("settlement_days") is None:
+            continue
+        if outcome.get("severity") not in SEVERITY_CLASSES:
+            continue
+        amounts.append(float(row.get("claim_amount") or 0.0))
+        fraud_scores.append(float(row.get("fraud_score") or 0.0))
+        consistency_scores.append(float((row.get("node2_output") or {}).get("consistency_score", 1.0)))
+        covered.append(bool((row.get("node3_output") or {}).get("is_covered", False)))
+        costs.append(float(outcome["final_cost"]))
+        days.append(float(outcome["settlement_days"]))
+        severities.append(outcome["severity"])
+
+    X = build_feature_matrix(amounts, fraud_scores, consistency_scores, covered)
+    return X, np.array(costs), np.array(days), np.array(severities, dtype=object)
+
+
+def train(X, costs, days, severities, holdout=0.2, seed=7):
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(X))
+    split = int(len(X) * (1 - holdout))
+    train_idx, test_idx = order[:split], order[split:]
+
+    cost = RidgeRegressor().fit(X[train_idx], np.log1p(costs[train_idx]))
+    timeline = RidgeRegressor().fit(X[train_idx], np.log1p(days[train_idx]))
+    severity = SoftmaxClassifier(SEVERITY_CLASSES).fit(X[train_idx], severities[train_idx])
+
+    metrics = {}
+    if len(test_idx):
+        metrics["cost_mae"] = float(np.abs(np.expm1(cost.predict(X[test_idx])) - costs[test_idx]).mean())
+        metrics["timeline_mae_days"] = float(np.abs(np.expm1(timeline.predict(X[test_idx])) - days[test_idx]).mean())
+        metrics["severity_accuracy"] = float((severity.predict(X[test_idx]) == severities[test_idx]).mean())
+
+    return {"cost_model": cost, "timeline_model": timeline, "severity_model": severity}, metrics
+
+
+def main():
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Train Node 5 predictive models from historical claims")
+    parser.add_argument("--source", choices=["features", "claims", "mongo", "jsonl"], default="features",
+                        help="features: the claim feature table; claims (or mongo): the claims collection")
+    parser.add_argument("path", nargs="?", help="JSONL file when --source jsonl")
+    parser.add_argument("--min-rows", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.source == "features":
+        X, costs, days, severities = load_feature_training_set()
+    elif args.source == "jsonl":
+        if not args.path:
+            parser.error("a JSONL path is required with --source jsonl")
+        X, costs, days, severities = load_training_set(iter_jsonl_rows(args.path))
+    else:
+        X, costs, days, severities = load_training_set(iter_mongo_rows())
+
+    if len(X) < args.min_rows:
+        raise SystemExit(f"Only {len(X)} labelled claims found, need at least {args.min_rows}")
+
+    models, metrics = train(X, costs, days, severities)
+    for name, model in models.items():
+        version = save_model(name, model, metrics)
+        print(f"Saved {name} v{version}")
+    print(json.dumps({"rows": int(len(X)), **metrics}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
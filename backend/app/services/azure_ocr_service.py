@@ -0,0 +1,83 @@
+"""
+Azure Form Recognizer (Document Intelligence) OCR through its REST API.
+
+Documents are sent to the ``prebuilt-read`` model and the result is polled
+until it is ready. Configure AZURE_FORM_RECOGNIZER_ENDPOINT and
+AZURE_FORM_RECOGNIZER_KEY; the provider reports itself unavailable without
+them, so fallback chains skip it.
+
+Recognition does not take an ``ocr`` admission slot: those bound local
+Tesseract work to the CPUs, while this call mostly waits on the network.
+Concurrent Azure requests are bounded only by how many workflows run at
+once; Azure's own rate limit answers with a 429, which fails the provider
+and moves the chain on.
+"""
+from __future__ import annotations
+
+import os
+import time
+
+import requests
+
+from app.services.ocr_service import OcrPage, OcrProvider, OcrResult
+
+AZURE_ENDPOINT_ENV = "AZURE_FORM_RECOGNIZER_ENDPOINT"
+AZURE_KEY_ENV = "AZURE_FORM_RECOGNIZER_KEY"
+AZURE_API_VERSION_ENV = "AZURE_FORM_RECOGNIZER_API_VERSION"
+AZURE_TIMEOUT_SECONDS_ENV = "AZURE_OCR_TIMEOUT_SECONDS"
+
+READ_MODEL = "prebuilt-read"
+
+
+class AzureReadProvider(OcrProvider):
+    name = "azure"
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    def available(self) -> bool:
+        return bool(os.getenv(AZURE_ENDPOINT_ENV) and os.getenv(AZURE_KEY_ENV))
+
+    def _analyze(self, content: bytes) -> dict:
+        endpoint = os.environ[AZURE_ENDPOINT_ENV].rstrip("/")
+        headers = {"Ocp-Apim-Subscription-Key": os.environ[AZURE_KEY_ENV]}
+        timeout = float(os.getenv(AZURE_TIMEOUT_SECONDS_ENV, "60"))
+        deadline = time.monotonic() + timeout
+
+        response = self.session.post(
+            f"{endpoint}/formrecognizer/documentModels/{READ_MODEL}:analyze",
+            params={"api-version": os.getenv(AZURE_API_VERSION_ENV, "2023-07-31")},
+            headers={**headers, "Content-Type": "application/octet-stream"},
+            data=content,
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        operation_url = response.headers["Operation-Location"]
+
+        while True:
+            poll = self.session.get(operation_url, headers=headers, timeout=timeout)
+            poll.raise_for_status()
+            body = poll.json()
+            status = body.get("status")
+            if status == "succeeded":
+                return body.get("analyzeResult") or {}
+            if status == "failed":
+                raise RuntimeError(f"Azure read failed: {body.get('error')}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Azure read did not finish within {timeout:.0f}s")
+            time.sleep(min(float(poll.headers.get("Retry-After", "1")), 5.0))
+
+    def recognize(self, path: str) -> OcrResult:
+        with open(path, "rb") as handle:
+            analysis = self._analyze(handle.read())
+        result = OcrResult(provider=self.name)
+        for page in analysis.get("pages", []):
+            lines = [line.get("content", "") for line in page.get("lines", [])]
+            scores = [word["confidence"] for word in page.get("words", []) if "confidence" in word]
+            result.pages.append(
+                OcrPage(
+                    text="".join(line + "\n" for line in lines),
+                    confidence=sum(scores) / len(scores) if scores else None,
+                )
+            )
+        return result
@@ -0,0 +1,226 @@
+"""
+Batch execution of the claim workflow over a manifest or a directory tree.
+
+Claims run concurrently on a bounded worker pool. Each result is stored
+like any other claim (``claim_processing.persist_resumed_claim``: the
+claims collection and the feature table) and streamed to a JSONL file as
+it finishes. A progress ledger records every finished claim, so an
+interrupted run can be restarted with the same arguments and skips claims
+that already succeeded. With ``--enqueue`` the claims go to
+the job queue as ``backfill`` jobs instead, behind all live traffic.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+
+SUPPORTED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".webp"}
+
+PATH_COLUMNS = ("file_path", "path", "document", "document_path")
+
+
+def _is_document(path):
+    return path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS
+
+
+def jobs_from_directory(root):
+    """
+    Each sub-directory is one claim named after the directory; documents
+    placed directly in ``root`` are one claim each, named after the file.
+    """
+    root = Path(root)
+    jobs = []
+    for entry in sorted(root.iterdir()):
+        if entry.is_dir():
+            documents = sorted(str(path) for path in entry.rglob("*") if _is_document(path))
+            if documents:
+                jobs.append((entry.name, documents))
+        elif _is_document(entry):
+            jobs.append((entry.stem, [str(entry)]))
+    return jobs
+
+
+def _resolve(base, path):
+    path = Path(path)
+    return str(path if path.is_absolute() else base / path)
+
+
+def jobs_from_manifest(manifest):
+    """
+    Read ``claim_id -> documents`` from a CSV (``claim_id,file_path`` rows,
+    repeated per document) or JSONL (``{"claim_id", "documents": [...]}``)
+    manifest. Relative paths are resolved against the manifest's directory.
+    """
+    manifest = Path(manifest)
+    base = manifest.parent
+    grouped = {}
+
+    if manifest.suffix.lower() == ".csv":
+        with manifest.open(newline="", encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                claim_id = (row.get("claim_id") or "").strip()
+                path = next((row[column] for column in PATH_COLUMNS if row.get(column)), None)
+                if claim_id and path:
+                    grouped.setdefault(claim_id, []).append(_resolve(base, path.strip()))
+    else:
+        with manifest.open(encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                claim_id = str(row.get("claim_id") or "").strip()
+                documents = row.get("documents") or [
+                    row[column] for column in PATH_COLUMNS if row.get(column)
+                ]
+                if claim_id and documents:
+                    grouped.setdefault(claim_id, []).extend(_resolve(base, path) for path in documents)
+
+    return list(grouped.items())
+
+
+def load_jobs(source):
+    source = Path(source)
+    if source.is_dir():
+        return jobs_from_directory(source)
+    return jobs_from_manifest(source)
+
+
+class ProgressLedger:
+    """Append-only JSONL record of finished claims, fsynced per entry."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def completed(self):
+        done = set()
+        if not self.path.exists():
+            return done
+        with self.path.open(encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # a crash can leave a torn last line
+                    continue
+                if entry.get("status") == "ok":
+                    done.add(entry["claim_id"])
+                else:
+                    done.discard(entry.get("claim_id"))
+        return done
+
+    def record(self, claim_id, status):
+        line = json.dumps({"claim_id": claim_id, "status": status, "at": datetime.utcnow().isoformat()})
+        with self._lock, self.path.open("a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+def enqueue_batch(source, ledger_path=None):
+    """
+    Queue every claim in ``source`` as a lowest-priority ``backfill`` job for
+    the pipeline workers instead of running it here. Claims already marked
+    done in the ledger are skipped.
+    """
+    from app.core.scheduling import BACKFILL
+    from app.database.job_queue import enqueue_job
+
+    jobs = load_jobs(source)
+    done = ProgressLedger(ledger_path).completed() if ledger_path else set()
+    job_ids = [
+        enqueue_job("backfill", claim_id, {"document_paths": documents}, priority_class=BACKFILL)["job_id"]
+        for claim_id, documents in jobs
+        if claim_id not in done
+    ]
+    return {"total": len(jobs), "skipped": len(jobs) - len(job_ids), "enqueued": len(job_ids)}
+
+
+def run_batch(source, output, ledger_path=None, workers=4, workflow=None, persist=True):
+    """
+    Run every claim in ``source``, store each result and stream it to
+    ``output``. A claim is only marked done in the ledger once it has been
+    stored. Returns a throughput/latency summary.
+    """
+    if workflow is None:
+        from app.core.langgraph_builder import run_claim_workflow as workflow
+    if persist:
+        from app.services.claim_processing import persist_resumed_claim
+
+    jobs = load_jobs(source)
+    ledger = ProgressLedger(ledger_path or f"{output}.ledger")
+    done = ledger.completed()
+    pending = [(claim_id, documents) for claim_id, documents in jobs if claim_id not in done]
+
+    latencies = []
+    failures = 0
+    write_lock = threading.Lock()
+
+    def run_one(claim_id, documents):
+        started = time.perf_counter()
+        try:
+            state = workflow(claim_id=claim_id, document_paths=documents)
+            if persist:
+                persist_resumed_claim(claim_id, state, documents)
+            record = {"claim_id": claim_id, "status": "ok", "result": state}
+        except Exception as exc:
+            record = {"claim_id": claim_id, "status": "failed", "error": str(exc)}
+        record["latency_s"] = round(time.perf_counter() - started, 3)
+        return record
+
+    started = time.perf_counter()
+    with open(output, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        queue = iter(pending)
+
+        def finish(future):
+            nonlocal failures
+            record = future.result()
+            with write_lock:
+                out.write(json.dumps(record, default=str) + "\n")
+                out.flush()
+            ledger.record(record["claim_id"], record["status"])
+            latencies.append(record["latency_s"])
+            if record["status"] != "ok":
+                failures += 1
+
+        for claim_id, documents in queue:
+            in_flight.add(pool.submit(run_one, claim_id, documents))
+            if len(in_flight) >= workers * 2:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    finish(future)
+        for future in in_flight:
+            finish(future)
+
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    processed = len(latencies)
+    return {
+        "total": len(jobs),
+        "skipped": len(jobs) - len(pending),
+        "processed": processed,
+        "succeeded": processed - failures,
+        "failed": failures,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 2),
+        "claims_per_s": round(processed / elapsed, 3) if elapsed else None,
+        "latency_s": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
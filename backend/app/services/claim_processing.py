@@ -0,0 +1,339 @@
+"""
+Run the claim workflow for a submission and persist its outcome.
+
+Shared by the API (APP_ROLE=all runs submissions inline) and the pipeline
+workers (``app.worker``), which execute the same functions for jobs taken
+from the claim job queue. ``run_job`` dispatches on the job's ``kind``.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from app.core.checkpointing import CheckpointError, CheckpointNotFoundError, WorkflowCompletedError
+from app.core.claim_features import ClaimFeatures
+from app.core.scheduling import STANDARD, classify
+from app.database.claim_repository import create_claim_record, update_claim_outputs
+
+
+STATUS_BADGES = {
+    "APPROVED": "Approved",
+    "REJECTED": "Rejected",
+    "PENDING_REVIEW": "Pending",
+    "FLAGGED_FOR_REVIEW": "Flagged",
+    "ESCALATED_FRAUD_REVIEW": "Flagged",
+    "REQUESTED_MORE_INFO": "Pending",
+}
+
+
+def badge_for_status(status: str) -> str:
+    return STATUS_BADGES.get(status, "Pending")
+
+
+def risk_score_from_fraud(fraud_score: float) -> float:
+    return min(max(fraud_score, 0.0), 1.0)
+
+
+def infer_claim_data_from_node1(
+    node1_output: dict[str, Any], claim_features: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    if claim_features:
+        features = ClaimFeatures.from_dict(claim_features)
+    else:
+        features = ClaimFeatures.from_node1_output(node1_output)
+
+    return {
+        "policy_number": features.policy_number,
+        "claim_amount": features.claim_amount,
+        "claimer_name": features.claimant_name,
+        "claimer_address": features.claimant_address,
+    }
+
+
+def build_submit_response(
+    claim_id: str, final_state: dict[str, Any]
+) -> dict[str, Any]:
+    node3 = final_state.get("node3_output", {})
+    node4 = final_state.get("node4_output", {})
+    node6 = final_state.get("node6_output", {})
+    node7 = final_state.get("node7_output", {})
+
+    status = node7.get("final_status", "PENDING_REVIEW")
+    decision_reason = node7.get("reason")
+    fraud_score = float(node4.get("fraud_score", 0.0) or 0.0)
+
+    return {
+        "claim_id": claim_id,
+        "status": status,
+        "badge": badge_for_status(status),
+        "decision_reason": decision_reason,
+        "fraud_score": fraud_score,
+        "covered": bool(node3.get("is_covered", False)),
+        "covered_amount": node3.get("covered_amount"),
+        "explanation": node6.get("explanation_text"),
+    }
+
+
+def pipeline_fields(final_state: dict[str, Any]) -> dict[str, Any]:
+    node4 = final_state.get("node4_output", {})
+    node7 = final_state.get("node7_output", {})
+    fraud_score = float(node4.get("fraud_score", 0.0) or 0.0)
+
+    return {
+        "status": node7.get("final_status", "PENDING_REVIEW"),
+        "decision_reason": node7.get("reason"),
+        "human_review_required": bool(node7.get("human_review_required", False)),
+        "fraud_score": fraud_score,
+        "risk_score": risk_score_from_fraud(fraud_score),
+        "node2_output": final_state.get("node2_output", {}),
+        "node3_output": final_state.get("node3_output", {}),
+        "node4_output": node4,
+        "node5_output": final_state.get("node5_output", {}),
+        "node6_output": final_state.get("node6_output", {}),
+        "node7_output": node7,
+        "node8_output": final_state.get("node8_output", {}),
+    }
+
+
+def _save_features(claim_id: str, final_state: dict[str, Any]) -> None:
+    # the feature store pulls in numpy; keep it off the API import path
+    from app.database.feature_store import save_claim_features, scores_from_outputs
+
+    save_claim_features(
+        ClaimFeatures.from_state({**final_state, "claim_id": claim_id}),
+        scores_from_outputs(final_state),
+    )
+
+
+def persist_claim(
+    claim_payload: dict[str, Any], final_state: dict[str, Any], claim_id: str
+) -> None:
+    create_claim_record(
+        {
+            "claim_id": claim_id,
+            "claim_type": claim_payload["claim_type"],
+            "claim_amount": claim_payload["claim_amount"],
+            "policy_number": claim_payload["policy_number"],
+            "claimer": claim_payload["claimer"],
+            # the extraction is what the fraud history and re-scoring rebuild from
+            "form_data": {
+                **(claim_payload.get("form_data") or {}),
+                "node1_output": final_state.get("node1_output", {}),
+            },
+            "document_paths": claim_payload["document_paths"],
+            **pipeline_fields(final_state),
+            "processing_minutes": 0.0,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        }
+    )
+    _save_features(claim_id, final_state)
+
+
+def persist_resumed_claim(
+    claim_id: str, final_state: dict[str, Any], document_paths: list[str] | None = None
+) -> None:
+    """
+    Store the result of a resumed, re-run or batch workflow. Claims that
+    were never persisted (their first run failed, or a batch sees them for
+    the first time) are created from the Node 1 extraction, since the
+    original submission payload is not checkpointed.
+    """
+    if update_claim_outputs(claim_id, pipeline_fields(final_state)):
+        _save_features(claim_id, final_state)
+        return
+
+    inferred = infer_claim_data_from_node1(
+        final_state.get("node1_output", {}), final_state.get("claim_features")
+    )
+    persist_claim(
+        {
+            "claim_type": "Unknown",
+            "claim_amount": float(inferred.get("claim_amount") or 0.0),
+            "policy_number": inferred.get("policy_number") or "UNKNOWN",
+            "claimer": {
+                "name": inferred.get("claimer_name") or "Unknown Claimer",
+                "email": "unknown@example.com",
+                "phone": None,
+                "address": inferred.get("claimer_address"),
+            },
+            "form_data": {
+                "auto_extracted": True,
+                "node1_output": final_state.get("node1_output", {}),
+            },
+            "document_paths": document_paths or [],
+        },
+        final_state,
+        claim_id,
+    )
+
+
+def process_submission(claim_id: str, claim: dict[str, Any]) -> dict[str, Any]:
+    """A claim submitted with its form fields and ``document_paths``."""
+    from app.core.langgraph_builder import run_claim_workflow
+
+    final_state = run_claim_workflow(
+        claim_id=claim_id, document_paths=claim["document_paths"], claimer=claim.get("claimer")
+    )
+    persist_claim(claim, final_state, claim_id)
+    return build_submit_response(claim_id, final_state)
+
+
+def process_upload(
+    claim_id: str,
+    document_paths: list[str],
+    claim_type: str,
+    claimer: dict[str, Any],
+    node1_output: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """
+    Uploaded documents only: policy number, amount and any claimer details
+    not supplied with the upload are taken from the Node 1 extraction
+    (``node1_output`` when the documents were already extracted).
+    """
+    from app.core.langgraph_builder import run_claim_workflow
+
+    final_state = run_claim_workflow(
+        claim_id=claim_id, document_paths=document_paths, node1_output=node1_output, claimer=claimer
+    )
+
+    inferred = infer_claim_data_from_node1(
+        final_state.get("node1_output", {}), final_state.get("claim_features")
+    )
+    claim_data = {
+        "claim_type": claim_type,
+        "claim_amount": float(inferred.get("claim_amount") or 0.0),
+        "policy_number": inferred.get("policy_number") or "UNKNOWN",
+        "claimer": {
+            "name": claimer.get("name") or inferred.get("claimer_name") or "Unknown Claimer",
+            "email": claimer.get("email") or "unknown@example.com",
+            "phone": claimer.get("phone"),
+            "address": claimer.get("address") or inferred.get("claimer_address"),
+        },
+        "document_paths": document_paths,
+    }
+    persist_claim(
+        {
+            **claim_data,
+            "form_data": {
+                "auto_extracted": True,
+                "node1_output": final_state.get("node1_output", {}),
+            },
+        },
+        final_state,
+        claim_id,
+    )
+
+    response = build_submit_response(claim_id, final_state)
+    response["extracted_claim_data"] = claim_data
+    return response
+
+
+def process_backfill(claim_id: str, document_paths: list[str]) -> dict[str, Any]:
+    """A batch re-processing run: updates the stored claim, or creates it from the extraction."""
+    from app.core.langgraph_builder import run_claim_workflow
+
+    final_state = run_claim_workflow(claim_id=claim_id, document_paths=document_paths)
+    persist_resumed_claim(claim_id, final_state, document_paths)
+    return build_submit_response(claim_id, final_state)
+
+
+def process_resume(claim_id: str) -> dict[str, Any]:
+    """
+    Continue a workflow from its last checkpoint. Raises
+    CheckpointNotFoundError (a LookupError) when the claim has no checkpoint
+    and WorkflowCompletedError (a ValueError) when it already finished.
+    """
+    from app.core.langgraph_builder import get_checkpoint, resume_claim_workflow
+
+    snapshot = get_checkpoint(claim_id)
+    if snapshot is None:
+        raise CheckpointNotFoundError("No checkpoint found for claim")
+    if not snapshot.next:
+        raise WorkflowCompletedError("Claim workflow already completed")
+
+    final_state = resume_claim_workflow(claim_id)
+    persist_resumed_claim(claim_id, final_state)
+    return build_submit_response(claim_id, final_state)
+
+
+def process_rerun(claim_id: str, from_node: str) -> dict[str, Any]:
+    """Re-run from ``from_node``; CheckpointError for an unknown node or missing checkpoint."""
+    from app.core.langgraph_builder import rerun_claim_workflow_from
+
+    final_state = rerun_claim_workflow_from(claim_id, from_node)
+    persist_resumed_claim(claim_id, final_state)
+    response = build_submit_response(claim_id, final_state)
+    response["rerun_from"] = from_node
+    return response
+
+
+JOB_HANDLERS = {
+    "submit": lambda claim_id, payload: process_submission(claim_id, payload["claim"]),
+    "submit_upload": lambda claim_id, payload: process_upload(
+        claim_id,
+        payload["document_paths"],
+        payload["claim_type"],
+        payload.get("claimer", {}),
+        payload.get("node1_output"),
+    ),
+    "backfill": lambda claim_id, payload: process_backfill(claim_id, payload["document_paths"]),
+    "resume": lambda claim_id, payload: process_resume(claim_id),
+    "rerun": lambda claim_id, payload: process_rerun(claim_id, payload["from_node"]),
+}
+
+JOB_PAYLOAD_FIELDS = {
+    "submit": ("claim",),
+    "submit_upload": ("document_paths", "claim_type"),
+    "backfill": ("document_paths",),
+    "resume": (),
+    "rerun": ("from_node",),
+}
+
+
+class JobValidationError(ValueError):
+    """A job the queue should never have accepted: unknown kind or missing payload."""
+
+
+class Reclassified(Exception):
+    """
+    An upload whose extracted amount puts it in another priority class. The
+    worker re-queues the job under ``priority_class`` with ``payload``, which
+    carries the extraction, so Node 1 does not run twice.
+    """
+
+    def __init__(self, priority_class: str, payload: dict[str, Any]):
+        super().__init__(f"reclassified as {priority_class}")
+        self.priority_class = priority_class
+        self.payload = payload
+
+
+def upload_priority_class(claim_type: str, node1_output: dict[str, Any]) -> str:
+    amount = infer_claim_data_from_node1(node1_output).get("claim_amount")
+    return classify(claim_type, amount or None)
+
+
+# errors no retry can fix: malformed jobs, bad node names, missing
+# checkpoints, finished workflows. Anything else (a JSONDecodeError from a
+# model reply, a dropped connection) is retried.
+PERMANENT_ERRORS = (JobValidationError, CheckpointError)
+
+
+def run_job(job: dict[str, Any]) -> dict[str, Any]:
+    handler = JOB_HANDLERS.get(job["kind"])
+    if handler is None:
+        raise JobValidationError(f"Unknown job kind: {job['kind']}")
+    payload = job.get("payload") or {}
+    missing = [field for field in JOB_PAYLOAD_FIELDS[job["kind"]] if field not in payload]
+    if missing:
+        raise JobValidationError(f"{job['kind']} job is missing payload field(s): {', '.join(missing)}")
+
+    if job["kind"] == "submit_upload" and not payload.get("node1_output"):
+        # uploads are queued as standard; the amount is only known once Node 1 has read them
+        from app.nodes.node1_extraction.extractor import extract_documents
+
+        payload = {**payload, "node1_output": extract_documents(payload["document_paths"])}
+        priority_class = upload_priority_class(payload["claim_type"], payload["node1_output"])
+        if priority_class != (job.get("priority_class") or STANDARD):
+            raise Reclassified(priority_class, payload)
+    return handler(job["claim_id"], payload)
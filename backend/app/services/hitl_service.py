@@ -1,5 +1,8 @@
 from datetime import datetime
 from app.database.mongo import high_risk_claims_collection
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
 
 
 def store_high_risk_claim(
@@ -27,4 +30,4 @@ def store_high_risk_claim(
     }
 
     high_risk_claims_collection.insert_one(doc)
-    print("Stored claim in HITL database")
\ No newline at end of file
+    logger.info("Stored claim %s in HITL database", claim_id)
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+Idempotent claim submission.
+
+Every submission is keyed by its ``Idempotency-Key`` header, or, without
+one, by a fingerprint of its documents and claimer
+(``app.utils.hashing``). Both are scoped to the authenticated user (the
+token's ``sub``), so two users who pick the same key, or upload the same
+files, never see each other's submission. ``reserve`` decides what a request does:
+
+- first sight of the key: it owns the submission and runs (or enqueues) it;
+- the key already completed: the stored response is replayed;
+- the key is in flight: the request is coalesced onto the running
+  submission, inline callers wait for its response (up to
+  IDEMPOTENCY_WAIT_SECONDS) and queued ones get the existing job;
+- the previous attempt failed, or its owner vanished (no progress for
+  IDEMPOTENCY_STALE_SECONDS): the request takes it over and keeps the
+  claim id, so the workflow resumes from its checkpoint.
+
+Reusing a key for a different submission raises IdempotencyConflict.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from app.database.request_store import (
+    COMPLETED,
+    FAILED,
+    IN_PROGRESS,
+    complete_request,
+    create_request,
+    fail_request,
+    get_request,
+    take_over_request,
+)
+from app.utils.logging import IDEMPOTENT_REQUESTS
+
+
+IDEMPOTENCY_WAIT_SECONDS_ENV = "IDEMPOTENCY_WAIT_SECONDS"
+IDEMPOTENCY_STALE_SECONDS_ENV = "IDEMPOTENCY_STALE_SECONDS"
+
+POLL_SECONDS = 0.5
+
+# owners in this process; lets same-process duplicates wake without polling Mongo
+_local_events = {}
+_local_events_lock = threading.Lock()
+
+
+class IdempotencyConflict(ValueError):
+    pass
+
+
+@dataclass
+class Reservation:
+    key: str
+    claim_id: str
+    owner: bool
+    response: dict | None = None
+    job: dict | None = None
+
+
+def _get_seconds(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return float(default)
+
+
+def request_key(idempotency_key, fingerprint, submitter=None):
+    """Store key for a submission; ``fingerprint`` already covers the submitter."""
+    if idempotency_key:
+        return f"key:{submitter or 'anonymous'}:{idempotency_key.strip()}"
+    return f"auto:{fingerprint}"
+
+
+def _is_stale(record):
+    cutoff = datetime.utcnow() - timedelta(seconds=_get_seconds(IDEMPOTENCY_STALE_SECONDS_ENV, 900))
+    return record["updated_at"] < cutoff
+
+
+def _own(key, claim_id, result):
+    with _local_events_lock:
+        _local_events[key] = threading.Event()
+    IDEMPOTENT_REQUESTS.labels(result=result).inc()
+    return Reservation(key=key, claim_id=claim_id, owner=True)
+
+
+def _queued_job(record):
+    if not record.get("job_id"):
+        return None
+    from app.database.job_queue import get_job
+
+    return get_job(record["job_id"])
+
+
+def reserve(key, fingerprint, claim_id):
+    """Claim ``key`` for this request, or describe the submission that already holds it."""
+    record = None
+    for _ in range(3):
+        if create_request(key, fingerprint, claim_id) is not None:
+            return _own(key, claim_id, "new")
+
+        record = get_request(key)
+        if record is None:
+            # expired between the insert and the read
+            continue
+        if record["fingerprint"] != fingerprint:
+            IDEMPOTENT_REQUESTS.labels(result="conflict").inc()
+            raise IdempotencyConflict("Idempotency-Key was already used for a different submission")
+
+        if record["status"] == COMPLETED:
+            IDEMPOTENT_REQUESTS.labels(result="replayed").inc()
+            return Reservation(key=key, claim_id=record["claim_id"], owner=False, response=record["response"])
+
+        if record["status"] == IN_PROGRESS:
+            job = _queued_job(record)
+            if job is not None and job["status"] == "succeeded":
+                complete_request(key, job.get("result") or {})
+                IDEMPOTENT_REQUESTS.labels(result="replayed").inc()
+                return Reservation(key=key, claim_id=record["claim_id"], owner=False, response=job.get("result"))
+            abandoned = (job is not None and job["status"] == "failed") or (job is None and _is_stale(record))
+            if not abandoned:
+                IDEMPOTENT_REQUESTS.labels(result="coalesced").inc()
+                return Reservation(key=key, claim_id=record["claim_id"], owner=False, job=job)
+
+        taken = take_over_request(record)
+        if taken is not None:
+            return _own(key, taken["claim_id"], "takeover")
+
+    IDEMPOTENT_REQUESTS.labels(result="coalesced").inc()
+    return Reservation(key=key, claim_id=(record or {}).get("claim_id", claim_id), owner=False)
+
+
+def wait_for_response(reservation, timeout=None):
+    """Block until the owning request completes; ``None`` if it failed or took too long."""
+    timeout = _get_seconds(IDEMPOTENCY_WAIT_SECONDS_ENV, 90) if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    event = _local_events.get(reservation.key)
+    while True:
+        record = get_request(reservation.key)
+        if record is None or record["status"] == FAILED:
+            return None
+        if record["status"] == COMPLETED:
+            return record["response"]
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        if event is not None:
+            event.wait(min(POLL_SECONDS, remaining))
+        else:
+            time.sleep(min(POLL_SECONDS, remaining))
+
+
+def _wake(key):
+    with _local_events_lock:
+        event = _local_events.pop(key, None)
+    if event is not None:
+        event.set()
+
+
+def complete(key, response):
+    complete_request(key, response)
+    _wake(key)
+
+
+def release(key, error):
+    """The owner failed; a retry may take the submission over."""
+    fail_request(key, error)
+    _wake(key)
@@ -1,67 +1,391 @@
 import json
 import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import requests
-from typing import Any, Dict, List
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Tuple
+
+from app.core.admission import llm as llm_slots
+from app.utils.logging import (
+    CACHE_REQUESTS,
+    LLM_BATCH_SIZE,
+    LLM_ERRORS,
+    LLM_FIRST_TOKEN,
+    LLM_LATENCY,
+    LLM_STREAM_STOPS,
+    LLM_TOKEN_SECONDS,
+    get_logger,
+)
+
+logger = get_logger(__name__)
+
+# milliseconds to collect concurrent requests before sending them; 0 sends each at once
+LLM_BATCH_WINDOW_MS_ENV = "LLM_BATCH_WINDOW_MS"
+LLM_BATCH_MAX_ENV = "LLM_BATCH_MAX"
+# "0" extracts each document with its own prompt
+LLM_COMBINE_DOCUMENTS_ENV = "LLM_COMBINE_DOCUMENTS"
+LLM_COMBINE_MAX_DOCUMENTS_ENV = "LLM_COMBINE_MAX_DOCUMENTS"
+# how long Ollama keeps the model loaded between requests
+OLLAMA_KEEP_ALIVE_ENV = "OLLAMA_KEEP_ALIVE"
+# "0" waits for whole completions instead of streaming tokens
+LLM_STREAM_ENV = "LLM_STREAM"
+# generation budget per answer (per document for combined extraction)
+LLM_MAX_TOKENS_ENV = "LLM_MAX_TOKENS"
+LLM_TIMEOUT_SECONDS_ENV = "LLM_TIMEOUT_SECONDS"
+
+EXTRACTION_SYSTEM_PROMPT = "You are an expert insurance claim adjuster. Your task is to extract structured data from OCR text and return ONLY a valid JSON object."
+
+EXTRACTION_FIELDS = """
+        - claimer_name (Full name of the person)
+        - claimer_email
+        - claimer_phone
+        - claimer_address
+        - policy_number
+        - amount (Numerical value only)
+        - date (DD/MM/YYYY)
+        - summary (Brief description of content)"""
+
+
+def _get_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class _JsonStreamScanner:
+    """
+    Follows a streamed completion character by character and reports where
+    its top-level JSON object closes. Raises ValueError as soon as the
+    output cannot be a JSON object.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.length = 0
+
+    def feed(self, chunk: str):
+        """Offset just past the closing brace, counted over all text fed so far, or None."""
+        for index, char in enumerate(chunk):
+            if not self.started:
+                if char.isspace():
+                    continue
+                if char != "{":
+                    raise ValueError(f"completion does not start with a JSON object: {chunk[index:index + 20]!r}")
+                self.started = True
+                self.depth = 1
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    end = self.length + index + 1
+                    self.length += len(chunk)
+                    return end
+        self.length += len(chunk)
+        return None
+
+
+class _Batcher:
+    """
+    Collects Ollama requests for a short window after the first one arrives
+    and sends them together, one connection each, so concurrent claims reach
+    Ollama at the same time and it can run them as one parallel batch
+    (OLLAMA_NUM_PARALLEL). Identical prompts pending or in flight share a
+    single request.
+    """
+
+    def __init__(self, call, window: float, max_batch: int, workers: int):
+        self._call = call
+        self.window = window
+        self.max_batch = max_batch
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-batch")
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._futures: Dict[tuple, Future] = {}
+        self._timer = None
+
+    def submit(self, *args) -> Future:
+        batch = None
+        with self._lock:
+            future = self._futures.get(args)
+            if future is not None:
+                CACHE_REQUESTS.labels(cache="llm_inflight", result="hit").inc()
+                return future
+            CACHE_REQUESTS.labels(cache="llm_inflight", result="miss").inc()
+            future = Future()
+            self._futures[args] = future
+            self._pending.append(args)
+            if len(self._pending) >= self.max_batch:
+                batch = self._take()
+            elif len(self._pending) == 1:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._dispatch(batch)
+        return future
+
+    def _take(self) -> List[tuple]:
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[tuple]):
+        LLM_BATCH_SIZE.observe(len(batch))
+        for args in batch:
+            self._pool.submit(self._run, args)
+
+    def _run(self, args: tuple):
+        try:
+            result = self._call(*args)
+        except BaseException as exc:  # noqa: BLE001
+            with self._lock:
+                future = self._futures.pop(args)
+            future.set_exception(exc)
+            return
+        with self._lock:
+            future = self._futures.pop(args)
+        future.set_result(result)
+
 
 class LLMService:
     def __init__(self):
         self.base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         self.model = "gemma3:4b"  # Found on user's system
+        self.keep_alive = os.getenv(OLLAMA_KEEP_ALIVE_ENV, "30m")
+        # one pooled keep-alive connection per LLM slot instead of a new socket per call
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=llm_slots.limit))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=llm_slots.limit))
+        window_ms = _get_int(LLM_BATCH_WINDOW_MS_ENV, 10)
+        self._batcher = (
+            _Batcher(self._call_ollama, window_ms / 1000, max(1, _get_int(LLM_BATCH_MAX_ENV, 16)), llm_slots.limit)
+            if window_ms > 0
+            else None
+        )
+
+    def _stream_ollama(self, url: str, payload: Dict[str, Any], operation: str, timeout: float) -> str:
+        """
+        Read the completion token by token and hang up as soon as the JSON
+        object is closed, the output stops looking like JSON, the token
+        budget runs out or ``timeout`` passes; closing the connection makes
+        Ollama stop generating. Returns "" for aborted generations.
+        """
+        max_tokens = payload["options"]["num_predict"]
+        deadline = time.monotonic() + timeout
+        scanner = _JsonStreamScanner()
+        parts: List[str] = []
+        tokens = 0
+        first_token_at = last_token_at = None
+        end = None
+        reason = "done"
+        started = time.perf_counter()
+        with self.session.post(url, json=payload, stream=True, timeout=(5, timeout)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                piece = chunk.get("response", "")
+                if piece:
+                    last_token_at = time.perf_counter()
+                    if first_token_at is None:
+                        first_token_at = last_token_at
+                        LLM_FIRST_TOKEN.labels(operation=operation).observe(first_token_at - started)
+                    tokens += 1
+                    parts.append(piece)
+                    try:
+                        end = scanner.feed(piece)
+                    except ValueError as e:
+                        logger.warning("Ollama %s stream rejected: %s", operation, e)
+                        reason = "invalid"
+                        break
+                    # checked before the budget and deadline below
+                    if end is not None:
+                        break
+                if chunk.get("done"):
+                    break
+                if tokens >= max_tokens:
+                    reason = "budget"
+                    break
+                if time.monotonic() > deadline:
+                    reason = "deadline"
+                    break
 
-    def _call_ollama(self, prompt: str, system_prompt: str = "") -> str:
+        if end is not None:
+            # a closed object is a complete answer, even if it used the last token of the budget
+            reason = "complete"
+        LLM_STREAM_STOPS.labels(operation=operation, reason=reason).inc()
+        if tokens > 1:
+            LLM_TOKEN_SECONDS.labels(operation=operation).observe((last_token_at - first_token_at) / (tokens - 1))
+        text = "".join(parts)
+        if end is not None:
+            return text[:end]
+        if reason in ("invalid", "budget", "deadline"):
+            LLM_ERRORS.labels(operation=operation, kind=reason).inc()
+            return ""
+        return text
+
+    def _call_ollama(
+        self, prompt: str, system_prompt: str = "", operation: str = "generate", max_tokens: int | None = None
+    ) -> str:
         url = f"{self.base_url}/api/generate"
+        stream = os.getenv(LLM_STREAM_ENV, "1") != "0"
+        timeout = float(_get_int(LLM_TIMEOUT_SECONDS_ENV, 60))
         payload = {
             "model": self.model,
             "prompt": prompt,
             "system": system_prompt,
-            "stream": False,
-            "format": "json"
+            "stream": stream,
+            "format": "json",
+            "keep_alive": self.keep_alive,
+            # Ollama stops generating here even if the client never hangs up
+            "options": {"num_predict": max_tokens or _get_int(LLM_MAX_TOKENS_ENV, 512)},
         }
-        try:
-            response = requests.post(url, json=payload, timeout=60)
-            response.raise_for_status()
-            res_text = response.json().get("response", "")
-            print(f"DEBUG: Ollama Raw Response: {res_text[:200]}")
-            return res_text
-        except Exception as e:
-            print(f"Ollama Call Error: {e}")
-            return ""
+        with llm_slots.slot():
+            started = time.perf_counter()
+            try:
+                if stream:
+                    res_text = self._stream_ollama(url, payload, operation, timeout)
+                else:
+                    response = self.session.post(url, json=payload, timeout=timeout)
+                    response.raise_for_status()
+                    res_text = response.json().get("response", "")
+                logger.debug("Ollama raw response: %s", res_text[:200])
+                return res_text
+            except Exception as e:
+                LLM_ERRORS.labels(operation=operation, kind="request").inc()
+                logger.warning("Ollama call error: %s", e)
+                return ""
+            finally:
+                LLM_LATENCY.labels(operation=operation).observe(time.perf_counter() - started)
 
-    def extract_structured_data(self, text: str, document_type: str) -> Dict[str, Any]:
-        """
-        Extract structured information from OCR text using local Ollama.
-        """
-        system_prompt = "You are an expert insurance claim adjuster. Your task is to extract structured data from OCR text and return ONLY a valid JSON object."
-        
-        prompt = f"""
+    def _submit(self, prompt: str, system_prompt: str, operation: str, max_tokens: int | None = None) -> Future:
+        if self._batcher is not None:
+            return self._batcher.submit(prompt, system_prompt, operation, max_tokens)
+        future = Future()
+        future.set_result(self._call_ollama(prompt, system_prompt, operation, max_tokens))
+        return future
+
+    def _generate(self, prompt: str, system_prompt: str = "", operation: str = "generate") -> str:
+        return self._submit(prompt, system_prompt, operation).result()
+
+    def _extraction_prompt(self, text: str, document_type: str) -> str:
+        return f"""
         Extract the following information from the provided OCR text of a {document_type} document.
-        Return the data in a valid JSON format with these exact keys:
-        - claimer_name (Full name of the person)
-        - claimer_email
-        - claimer_phone
-        - claimer_address
-        - policy_number
-        - amount (Numerical value only)
-        - date (DD/MM/YYYY)
-        - summary (Brief description of content)
+        Return the data in a valid JSON format with these exact keys:{EXTRACTION_FIELDS}
 
         OCR Text:
         {text[:2000]}
         """
 
-        raw_response = self._call_ollama(prompt, system_prompt)
+    def _parse_extraction(self, raw_response: str) -> Dict[str, Any]:
         try:
             return json.loads(raw_response)
         except Exception as e:
-            print(f"Ollama JSON Parse Error: {e}\nRaw: {raw_response}")
+            LLM_ERRORS.labels(operation="extract_structured_data", kind="parse").inc()
+            logger.warning("Ollama JSON parse error: %s; raw: %s", e, raw_response[:200])
             return {}
 
+    def extract_structured_data(self, text: str, document_type: str) -> Dict[str, Any]:
+        """
+        Extract structured information from OCR text using local Ollama.
+        """
+        raw_response = self._generate(
+            self._extraction_prompt(text, document_type),
+            EXTRACTION_SYSTEM_PROMPT,
+            operation="extract_structured_data",
+        )
+        return self._parse_extraction(raw_response)
+
+    def _combined_prompt(self, documents: List[Tuple[str, str]]) -> str:
+        sections = "\n".join(
+            f"### Document {index} ({document_type})\n{text[:2000]}"
+            for index, (text, document_type) in enumerate(documents, start=1)
+        )
+        return f"""
+        The {len(documents)} documents below belong to one insurance claim.
+        Extract the following information from each document's OCR text separately.
+        Return a valid JSON object {{"documents": [...]}} with exactly one entry per
+        document, in the order given, each with these exact keys:{EXTRACTION_FIELDS}
+
+        Documents:
+        {sections}
+        """
+
+    def extract_claim_documents(self, documents: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Structured fields for every ``(text, document_type)`` of one claim.
+        Documents are sent in groups of LLM_COMBINE_MAX_DOCUMENTS per prompt;
+        a group whose answer does not have one entry per document is
+        re-extracted document by document.
+        """
+        group_size = _get_int(LLM_COMBINE_MAX_DOCUMENTS_ENV, 4)
+        if len(documents) < 2 or group_size < 2 or os.getenv(LLM_COMBINE_DOCUMENTS_ENV, "1") == "0":
+            return self._extract_separately(documents)
+
+        groups = [documents[start:start + group_size] for start in range(0, len(documents), group_size)]
+        futures = [
+            self._submit(
+                self._combined_prompt(group),
+                EXTRACTION_SYSTEM_PROMPT,
+                "extract_claim_documents",
+                _get_int(LLM_MAX_TOKENS_ENV, 512) * len(group),
+            )
+            for group in groups
+        ]
+        results: List[Dict[str, Any]] = []
+        for group, future in zip(groups, futures):
+            raw_response = future.result()
+            try:
+                entries = json.loads(raw_response)["documents"]
+                if not isinstance(entries, list) or len(entries) != len(group):
+                    raise ValueError(f"expected {len(group)} documents, got {len(entries)}")
+                results.extend(entry if isinstance(entry, dict) else {} for entry in entries)
+            except Exception as e:
+                LLM_ERRORS.labels(operation="extract_claim_documents", kind="parse").inc()
+                logger.warning("Combined extraction unusable (%s); extracting documents one by one", e)
+                results.extend(self._extract_separately(group))
+        return results
+
+    def _extract_separately(self, documents: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        # submitted together so the batcher sends them in parallel
+        futures = [
+            self._submit(self._extraction_prompt(text, doc_type), EXTRACTION_SYSTEM_PROMPT, "extract_structured_data")
+            for text, doc_type in documents
+        ]
+        return [self._parse_extraction(future.result()) for future in futures]
+
     def analyze_claim_context(self, documents_context: str) -> Dict[str, Any]:
         """
         Perform qualitative analysis on the entire claim context using Ollama.
         """
         system_prompt = "You are an insurance fraud expert. Analyze sequences of documents and return results in JSON format."
-        
+
         prompt = f"""
         Analyze the following insurance claim document context for fraud and risk.
         Look for inconsistencies in names, dates, amounts, or missing critical info.
@@ -75,11 +399,12 @@ class LLMService:
         {documents_context[:4000]}
         """
 
-        raw_response = self._call_ollama(prompt, system_prompt)
+        raw_response = self._generate(prompt, system_prompt, operation="analyze_claim_context")
         try:
             return json.loads(raw_response)
         except Exception as e:
-            print(f"Ollama Analysis Parse Error: {e}")
+            LLM_ERRORS.labels(operation="analyze_claim_context", kind="parse").inc()
+            logger.warning("Ollama analysis parse error: %s", e)
             return {
                 "risk_level": "UNKNOWN",
                 "fraud_indicators": ["Local AI Error"],
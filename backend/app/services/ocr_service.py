@@ -0,0 +1,338 @@
+"""
+OCR providers for Node 1.
+
+An ``OcrProvider`` reads a document into ``OcrPage``s: the page text and,
+when the engine reports one, a 0-1 confidence. Built in:
+
+- ``tesseract``: local Tesseract (the default). When tesserocr is installed
+  pages are handed to the library in memory, with one API handle per
+  thread; otherwise pytesseract runs the tesseract binary per page.
+  OCR_TESSEROCR=0 forces the binary;
+- ``easyocr``: EasyOCR on the CPU, when the package is installed;
+- ``azure``: Azure Form Recognizer ``prebuilt-read``
+  (``app.services.azure_ocr_service``), when its endpoint and key are set.
+
+``register_provider`` adds others; the test suite registers a fake.
+
+``recognize`` runs a fallback chain per document. The chain comes from
+OCR_PROVIDERS_<TYPE>, where TYPE is the document type guessed from the
+file name (policy, bill, id_proof, report). Failing that it uses
+OCR_PROVIDERS_PDF or OCR_PROVIDERS_IMAGE, then OCR_PROVIDERS
+("tesseract"); each is a comma-separated list of provider names. A
+provider is skipped when it is unavailable or raises. The next provider
+also gets the document when any page reads below OCR_MIN_CONFIDENCE.
+When no provider passes, the most confident result is returned.
+"""
+from __future__ import annotations
+
+import importlib.util
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+from app.core.admission import ocr as ocr_slots
+from app.utils.logging import OCR_CONFIDENCE, OCR_DOCUMENT_LATENCY, OCR_FALLBACKS, OCR_PAGE_LATENCY, get_logger
+
+logger = get_logger(__name__)
+
+OCR_PROVIDERS_ENV = "OCR_PROVIDERS"
+OCR_MIN_CONFIDENCE_ENV = "OCR_MIN_CONFIDENCE"
+OCR_EASYOCR_LANGUAGES_ENV = "OCR_EASYOCR_LANGUAGES"
+OCR_TESSEROCR_ENV = "OCR_TESSEROCR"
+OCR_TESSERACT_LANG_ENV = "OCR_TESSERACT_LANG"
+
+DEFAULT_CHAIN = "tesseract"
+
+# file name words that identify a document type before it is read
+FILENAME_TYPES = {
+    "policy": "policy",
+    "schedule": "policy",
+    "bill": "bill",
+    "invoice": "bill",
+    "receipt": "bill",
+    "aadhaar": "id_proof",
+    "report": "report",
+    "fir": "report",
+}
+
+
+@dataclass
+class OcrPage:
+    text: str
+    confidence: float | None = None
+
+
+@dataclass
+class OcrResult:
+    provider: str
+    pages: list[OcrPage] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def text(self) -> str:
+        return "".join(page.text for page in self.pages)
+
+    @property
+    def confidence(self) -> float | None:
+        scores = [page.confidence for page in self.pages if page.confidence is not None]
+        return sum(scores) / len(scores) if scores else None
+
+    @property
+    def min_confidence(self) -> float | None:
+        scores = [page.confidence for page in self.pages if page.confidence is not None]
+        return min(scores) if scores else None
+
+
+class OcrProvider:
+    """
+    Base provider. Local engines implement ``recognize_page`` and inherit
+    ``recognize``, which takes PDF text layers as they are and runs every
+    other page through the adaptive preparation in ``ocr_engine`` under an
+    OCR admission slot; remote ones override ``recognize``.
+    """
+
+    name = ""
+
+    def available(self) -> bool:
+        return True
+
+    def recognize_page(self, image, profile=None) -> OcrPage:
+        """OCR one grayscale page; ``profile`` is None when adaptive preparation is off."""
+        raise NotImplementedError
+
+    def recognize(self, path: str) -> OcrResult:
+        from app.nodes.node1_extraction.ocr_engine import load_pages, prepare_page
+
+        result = OcrResult(provider=self.name)
+        for page in load_pages(path):
+            if page.text is not None:
+                result.pages.append(OcrPage(text=page.text, confidence=1.0))
+                continue
+            with ocr_slots.slot(), OCR_PAGE_LATENCY.labels(source=page.source).time():
+                image, profile = prepare_page(page.image, page.source)
+                result.pages.append(self.recognize_page(image, profile))
+        return result
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+
+def _tesserocr_enabled() -> bool:
+    return os.getenv(OCR_TESSEROCR_ENV, "1") != "0" and importlib.util.find_spec("tesserocr") is not None
+
+
+class TesseractProvider(OcrProvider):
+    name = "tesseract"
+
+    def __init__(self):
+        self._available = None
+        self._local = threading.local()
+
+    def available(self) -> bool:
+        if _tesserocr_enabled():
+            return True
+        if self._available is None:
+            try:
+                import pytesseract
+
+                if os.getenv("TESSERACT_CMD"):
+                    pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_CMD")
+                pytesseract.get_tesseract_version()
+                self._available = True
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Tesseract unavailable: %s", exc)
+                self._available = False
+        return self._available
+
+    def _api(self):
+        """This thread's tesserocr handle, so the model loads once per thread rather than per page."""
+        api = getattr(self._local, "api", None)
+        if api is None:
+            import tesserocr
+
+            kwargs = {"lang": os.getenv(OCR_TESSERACT_LANG_ENV, "eng"), "oem": tesserocr.OEM.DEFAULT}
+            if os.getenv("TESSDATA_PREFIX"):
+                kwargs["path"] = os.environ["TESSDATA_PREFIX"]
+            api = self._local.api = tesserocr.PyTessBaseAPI(**kwargs)
+        return api
+
+    def _read_in_process(self, binary, psm) -> OcrPage:
+        api = self._api()
+        api.SetPageSegMode(psm)
+        height, width = binary.shape
+        api.SetImageBytes(binary.tobytes(), width, height, 1, width)
+        text = api.GetUTF8Text()
+        score = api.MeanTextConf()
+        return OcrPage(text=text, confidence=score / 100 if text.strip() and score >= 0 else None)
+
+    def _read_with_binary(self, binary, psm) -> OcrPage:
+        import pytesseract
+
+        data = pytesseract.image_to_data(
+            binary, config=f"--oem 3 --psm {psm}", output_type=pytesseract.Output.DICT
+        )
+        # rebuild the text from the word boxes so one pass gives text and confidence
+        lines: dict[tuple, list[str]] = {}
+        scores = []
+        for index, word in enumerate(data["text"]):
+            if not word.strip():
+                continue
+            key = (data["block_num"][index], data["par_num"][index], data["line_num"][index])
+            lines.setdefault(key, []).append(word)
+            score = float(data["conf"][index])
+            if score >= 0:
+                scores.append(score / 100)
+        text = ""
+        previous = None
+        for key, words in lines.items():
+            if previous is not None and key[:2] != previous[:2]:
+                text += "\n"
+            text += " ".join(words) + "\n"
+            previous = key
+        return OcrPage(text=text, confidence=_mean(scores))
+
+    def recognize_page(self, image, profile=None) -> OcrPage:
+        from app.nodes.node1_extraction.ocr_engine import DEFAULT_PSM, binarize, preprocess_image
+
+        if profile is None:
+            binary, psm = preprocess_image(image), DEFAULT_PSM
+        else:
+            binary, psm = binarize(image, profile), profile.psm
+        if _tesserocr_enabled():
+            return self._read_in_process(binary, psm)
+        return self._read_with_binary(binary, psm)
+
+
+class EasyOcrProvider(OcrProvider):
+    """EasyOCR on the CPU; one shared reader, used by one page at a time."""
+
+    name = "easyocr"
+
+    def __init__(self):
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("easyocr") is not None
+
+    def _get_reader(self):
+        if self._reader is None:
+            import easyocr
+
+            languages = [lang.strip() for lang in os.getenv(OCR_EASYOCR_LANGUAGES_ENV, "en").split(",") if lang.strip()]
+            self._reader = easyocr.Reader(languages, gpu=False, verbose=False)
+        return self._reader
+
+    def recognize_page(self, image, profile=None) -> OcrPage:
+        with self._lock:
+            detections = self._get_reader().readtext(image)
+        # group the (box, text, confidence) detections into lines by vertical centre
+        words = []
+        for box, text, score in detections:
+            ys = [point[1] for point in box]
+            words.append((sum(ys) / len(ys), max(ys) - min(ys), box[0][0], text, float(score)))
+        words.sort()
+        lines: list[list[tuple]] = []
+        for word in words:
+            if lines and abs(word[0] - lines[-1][0][0]) <= max(lines[-1][0][1], word[1]) / 2:
+                lines[-1].append(word)
+            else:
+                lines.append([word])
+        text = "".join(" ".join(word[3] for word in sorted(line, key=lambda word: word[2])) + "\n" for line in lines)
+        return OcrPage(text=text, confidence=_mean([word[4] for word in words]))
+
+
+_providers: dict[str, OcrProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def register_provider(provider: OcrProvider) -> None:
+    with _providers_lock:
+        _providers[provider.name] = provider
+
+
+def get_provider(name: str) -> OcrProvider | None:
+    return _providers.get(name)
+
+
+def _register_builtins() -> None:
+    from app.services.azure_ocr_service import AzureReadProvider
+
+    for provider in (TesseractProvider(), EasyOcrProvider(), AzureReadProvider()):
+        register_provider(provider)
+
+
+def guess_document_type(path: str) -> str | None:
+    words = re.split(r"[^a-z0-9]+", os.path.splitext(os.path.basename(path))[0].lower())
+    for word in words:
+        if word in FILENAME_TYPES:
+            return FILENAME_TYPES[word]
+    return None
+
+
+def _split(value: str) -> list[str]:
+    return [name.strip().lower() for name in value.split(",") if name.strip()]
+
+
+def provider_chain(path: str, document_type: str | None = None) -> list[str]:
+    kind = "pdf" if path.lower().endswith(".pdf") else "image"
+    for key in (document_type or guess_document_type(path), kind):
+        value = os.getenv(f"{OCR_PROVIDERS_ENV}_{key.upper()}") if key else None
+        if value:
+            return _split(value)
+    return _split(os.getenv(OCR_PROVIDERS_ENV, DEFAULT_CHAIN))
+
+
+def _min_confidence() -> float:
+    try:
+        return float(os.getenv(OCR_MIN_CONFIDENCE_ENV, "0.6"))
+    except ValueError:
+        return 0.6
+
+
+def _rank(result: OcrResult) -> tuple:
+    return (bool(result.text.strip()), result.confidence or 0.0)
+
+
+def recognize(path: str, document_type: str | None = None) -> OcrResult:
+    """OCR ``path`` with the first provider in its chain that reads it confidently."""
+    threshold = _min_confidence()
+    best = None
+    errors = []
+    for name in provider_chain(path, document_type):
+        provider = get_provider(name)
+        if provider is None or not provider.available():
+            OCR_FALLBACKS.labels(provider=name, reason="unavailable").inc()
+            continue
+
+        started = time.perf_counter()
+        try:
+            result = provider.recognize(path)
+        except Exception as exc:  # noqa: BLE001
+            OCR_DOCUMENT_LATENCY.labels(provider=name, outcome="error").observe(time.perf_counter() - started)
+            OCR_FALLBACKS.labels(provider=name, reason="error").inc()
+            logger.warning("OCR provider %s failed on %s: %s", name, path, exc)
+            errors.append(f"{name}: {exc}")
+            continue
+        result.seconds = time.perf_counter() - started
+        OCR_DOCUMENT_LATENCY.labels(provider=name, outcome="ok").observe(result.seconds)
+        for page in result.pages:
+            if page.confidence is not None:
+                OCR_CONFIDENCE.labels(provider=name).observe(page.confidence)
+
+        weakest = result.min_confidence
+        if result.text.strip() and (weakest is None or weakest >= threshold):
+            return result
+        OCR_FALLBACKS.labels(provider=name, reason="low_confidence" if result.text.strip() else "empty").inc()
+        if best is None or _rank(result) > _rank(best):
+            best = result
+
+    if best is not None:
+        return best
+    raise RuntimeError(f"No OCR provider could read {path}: {'; '.join(errors) or 'none available'}")
+
+
+_register_builtins()
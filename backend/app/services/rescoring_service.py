@@ -0,0 +1,338 @@
+"""
+Bulk re-scoring of stored claims.
+
+Re-runs Nodes 2-8 from the persisted ``form_data.node1_output`` without
+re-OCRing documents, so changed fraud rules, policy data or Node 5 models
+can be evaluated against the backlog. Claim features come from the
+feature table when a claim has a row there, and are parsed from the
+Node 1 output otherwise. Runs as a dry run by default and
+writes a JSONL diff of every claim whose decision would change.
+
+The parent loads the fraud history (claim network, Benford histograms)
+once and hands each worker process a snapshot, so workers only catch up on
+claims stored since rather than each backfilling from the collection.
+
+    python -m app.services.rescoring_service --workers 4 --diff-report diff.jsonl
+    python -m app.services.rescoring_service --apply
+"""
+import argparse
+import json
+import multiprocessing
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from pymongo import UpdateOne
+
+from app.utils.logging import configure_logging
+
+
+PROJECTION = {
+    "_id": 0,
+    "claim_id": 1,
+    "claimer": 1,
+    "status": 1,
+    "review": 1,
+    "fraud_score": 1,
+    "form_data.node1_output": 1,
+    "node4_output.ai_analysis": 1,
+    "node4_output.reasoning": 1,
+    "node4_output.confidence": 1,
+}
+
+MISSING_AI_ANALYSIS = {
+    "risk_level": "LOW",
+    "fraud_indicators": [],
+    "reasoning": "AI analysis not stored for this claim; re-scored with rules only",
+}
+
+
+def iter_claims(query=None, batch_size=500, limit=0):
+    from app.database.mongo import claims_collection
+
+    selector = {"form_data.node1_output.documents": {"$exists": True}}
+    if query:
+        selector.update(query)
+    cursor = claims_collection.find(selector, PROJECTION).batch_size(batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+    yield from cursor
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _bounded_map(pool, fn, items, max_in_flight):
+    """Like ``pool.map`` but keeps only ``max_in_flight`` chunks in memory at a time."""
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def fraud_history_snapshot():
+    """The parent's claim network and Benford histograms, with their sync watermarks."""
+    from app.nodes.node4_fraud_detection.benford import benford_engine, benford_sync
+    from app.nodes.node4_fraud_detection.network_analysis import claim_network, network_sync
+
+    network_sync.ensure()
+    benford_sync.ensure()
+    return {
+        "network": (claim_network.snapshot(), network_sync.watermark),
+        "benford": (benford_engine.snapshot(), benford_sync.watermark),
+    }
+
+
+def install_fraud_history(snapshot):
+    """Pool initializer: start a worker from the parent's fraud history instead of a full backfill."""
+    from app.nodes.node4_fraud_detection.benford import benford_engine, benford_sync
+    from app.nodes.node4_fraud_detection.network_analysis import claim_network, network_sync
+
+    for (state, watermark), target, sync in (
+        (snapshot["network"], claim_network, network_sync),
+        (snapshot["benford"], benford_engine, benford_sync),
+    ):
+        target.restore(state)
+        if watermark is not None:
+            sync.mark_loaded(watermark)
+
+
+def _stored_ai_analysis(claim, allow_llm):
+    node4 = claim.get("node4_output") or {}
+    if node4.get("ai_analysis"):
+        return node4["ai_analysis"]
+    if allow_llm:
+        return None
+    return {
+        **MISSING_AI_ANALYSIS,
+        "reasoning": node4.get("reasoning") or MISSING_AI_ANALYSIS["reasoning"],
+        "extraction_confidence": node4.get("confidence", 0.8),
+    }
+
+
+def rescore_chunk(claims, allow_llm=False):
+    """
+    Re-run Nodes 2-8 for a chunk of stored claims. Node 5 is scored for the
+    whole chunk in one batch call. Returns one result dict per claim.
+    """
+    from app.core.claim_features import ClaimFeatures
+    from app.database.feature_store import load_feature_rows
+    from app.nodes.node2_cross_validation.validator import cross_validate
+    from app.nodes.node3_policy_coverage.policy_agent import verify_policy_coverage
+    from app.nodes.node3_policy_coverage.policy_fetcher import fetch_policy
+    from app.nodes.node4_fraud_detection.fraud_agent import fraud_detection
+    from app.nodes.node5_predictive.predictive_agent import predictive_analysis_batch
+    from app.nodes.node6_explanation.explanation_generator import generate_explanation
+    from app.nodes.node7_decision.decision_agent import make_claim_decision
+    from app.nodes.node8_subrogation.subrogation_agent import analyze_subrogation
+
+    policies = {}
+    staged = []
+    stored_features = load_feature_rows(claim["claim_id"] for claim in claims)
+
+    for claim in claims:
+        claim_id = claim["claim_id"]
+        node1_output = claim["form_data"]["node1_output"]
+        try:
+            row = stored_features.get(claim_id)
+            # rows written before the table kept descriptions are re-parsed
+            if row and "description" in row:
+                features = ClaimFeatures.from_row(row)
+            else:
+                features = ClaimFeatures.from_node1_output(node1_output, claim_id=claim_id)
+            if features.policy_number not in policies:
+                policies[features.policy_number] = fetch_policy(features.policy_number) if features.policy_number else None
+
+            node2 = cross_validate(node1_output)
+            node3 = verify_policy_coverage(node1_output, features=features)
+            node4 = fraud_detection(
+                node1_output,
+                policies[features.policy_number] or {},
+                claim_id=claim_id,
+                features=features,
+                ai_analysis=_stored_ai_analysis(claim, allow_llm),
+                claimer=claim.get("claimer"),
+            )
+            staged.append((claim, features, node2, node3, node4))
+        except Exception as exc:
+            staged.append((claim, None, None, None, {"error": str(exc)}))
+
+    ok = [item for item in staged if item[1] is not None]
+    predictions = predictive_analysis_batch(
+        [features.claim_amount for _, features, _, _, _ in ok],
+        [node4.get("fraud_score", 0) for _, _, _, _, node4 in ok],
+        [node2.get("consistency_score", 1) for _, _, node2, _, _ in ok],
+        [bool(node3.get("is_covered", False)) for _, _, _, node3, _ in ok],
+    ) if ok else []
+    predictions = iter(predictions)
+
+    results = []
+    for claim, features, node2, node3, node4 in staged:
+        if features is None:
+            results.append({"claim_id": claim["claim_id"], "error": node4["error"]})
+            continue
+
+        node1_output = claim["form_data"]["node1_output"]
+        node5 = next(predictions)
+        node6 = generate_explanation(node2, node3, node4)
+        node8 = analyze_subrogation(node1_output)
+        node7 = make_claim_decision(node3, node4)
+
+        results.append({
+            "claim_id": claim["claim_id"],
+            "reviewed": bool(claim.get("review")),
+            "old_status": claim.get("status"),
+            "old_fraud_score": float(claim.get("fraud_score") or 0.0),
+            "new_status": node7.get("final_status", "PENDING_REVIEW"),
+            "new_fraud_score": float(node4.get("fraud_score", 0.0) or 0.0),
+            "outputs": {
+                "node2_output": node2,
+                "node3_output": node3,
+                "node4_output": node4,
+                "node5_output": node5,
+                "node6_output": node6,
+                "node7_output": node7,
+                "node8_output": node8,
+            },
+        })
+    return results
+
+
+def _update_for(result, run_id):
+    outputs = result["outputs"]
+    node7 = outputs["node7_output"]
+    fraud_score = result["new_fraud_score"]
+
+    update = {
+        **outputs,
+        "fraud_score": fraud_score,
+        "risk_score": min(max(fraud_score, 0.0), 1.0),
+        "rescore": {"run_id": run_id, "rescored_at": datetime.utcnow()},
+        "updated_at": datetime.utcnow(),
+    }
+    # a human decision always wins over a re-score
+    if not result["reviewed"]:
+        update["status"] = result["new_status"]
+        update["decision_reason"] = node7.get("reason")
+        update["human_review_required"] = bool(node7.get("human_review_required", False))
+
+    return UpdateOne({"claim_id": result["claim_id"]}, {"$set": update})
+
+
+def run_rescore(
+    query=None,
+    workers=4,
+    chunk_size=200,
+    apply=False,
+    allow_llm=False,
+    diff_report=None,
+    limit=0,
+):
+    from app.database.feature_store import save_feature_scores, scores_from_outputs
+    from app.database.mongo import claims_collection
+
+    run_id = f"RS-{uuid.uuid4().hex[:8].upper()}"
+    transitions = Counter()
+    totals = Counter()
+    started = time.perf_counter()
+    report = open(diff_report, "w", encoding="utf-8") if diff_report else None
+
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=install_fraud_history,
+            initargs=(fraud_history_snapshot(),),
+        ) as pool:
+            chunks = _chunks(iter_claims(query, limit=limit), chunk_size)
+            for results in _bounded_map(pool, partial(rescore_chunk, allow_llm=allow_llm), chunks, workers * 2):
+                updates = []
+                scores = {}
+                for result in results:
+                    totals["claims"] += 1
+                    if "error" in result:
+                        totals["errors"] += 1
+                        continue
+
+                    changed = result["old_status"] != result["new_status"]
+                    transitions[(result["old_status"], result["new_status"])] += 1
+                    if changed:
+                        totals["changed"] += 1
+                        if report:
+                            report.write(json.dumps({
+                                key: result[key]
+                                for key in ("claim_id", "reviewed", "old_status", "new_status", "old_fraud_score", "new_fraud_score")
+                            }) + "\n")
+                    if apply:
+                        updates.append(_update_for(result, run_id))
+                        scores[result["claim_id"]] = scores_from_outputs(result["outputs"])
+
+                if updates:
+                    claims_collection.bulk_write(updates, ordered=False)
+                    totals["written"] += len(updates)
+                    # keep the feature table's score columns in step for training and exports
+                    totals["features_refreshed"] += save_feature_scores(scores)
+    finally:
+        if report:
+            report.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "run_id": run_id,
+        "applied": apply,
+        "claims": totals["claims"],
+        "changed": totals["changed"],
+        "errors": totals["errors"],
+        "written": totals["written"],
+        "features_refreshed": totals["features_refreshed"],
+        "elapsed_s": round(elapsed, 2),
+        "claims_per_s": round(totals["claims"] / elapsed, 2) if elapsed else None,
+        "transitions": [
+            {"from": old, "to": new, "count": count}
+            for (old, new), count in transitions.most_common()
+        ],
+    }
+
+
+def main():
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Re-score stored claims with the current rules and models")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--status", action="append", help="Only re-score claims in this status (repeatable)")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--apply", action="store_true", help="Write results back. Without it this is a dry run.")
+    parser.add_argument("--allow-llm", action="store_true", help="Call the LLM for claims without a stored AI analysis")
+    parser.add_argument("--diff-report", help="JSONL file listing every claim whose decision changes")
+    args = parser.parse_args()
+
+    query = {"status": {"$in": args.status}} if args.status else None
+    summary = run_rescore(
+        query=query,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        apply=args.apply,
+        allow_llm=args.allow_llm,
+        diff_report=args.diff_report,
+        limit=args.limit,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
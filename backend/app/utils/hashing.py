@@ -0,0 +1,75 @@
+"""
+Content hashes used to recognise repeated claim submissions.
+
+A submission's fingerprint covers the bytes of its documents (order
+independent), the claimer, the claim type and the authenticated user who
+sent it, so a client retry that
+re-uploads the same files maps to the same fingerprint even though the
+stored upload names differ.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+CHUNK_SIZE = 1 << 20
+MAX_CACHED_DIGESTS = 4096
+
+_file_digests = OrderedDict()
+_file_digests_lock = threading.Lock()
+
+
+def bytes_digest(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_digest(path):
+    """
+    SHA-256 of a file's contents, cached on (path, size, mtime) so repeated
+    submissions of the same stored documents are not re-read. The cache
+    keeps the ``MAX_CACHED_DIGESTS`` most recently used files. A missing
+    file hashes its path instead.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return bytes_digest(f"missing:{path}".encode())
+
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _file_digests_lock:
+        digest = _file_digests.get(key)
+        if digest is not None:
+            _file_digests.move_to_end(key)
+            return digest
+
+    hasher = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+    with _file_digests_lock:
+        _file_digests[key] = digest
+        while len(_file_digests) > MAX_CACHED_DIGESTS:
+            _file_digests.popitem(last=False)
+    return digest
+
+
+def submission_fingerprint(document_digests, claimer_email=None, claim_type=None, claim_id=None, submitter=None):
+    """
+    Hash of the document set, who is claiming and who submitted it
+    (``submitter``, the token's ``sub``); identical retries by the same user
+    share it, the same files from another user do not.
+    """
+    canonical = json.dumps(
+        {
+            "documents": sorted(document_digests),
+            "claimer": (claimer_email or "").strip().lower(),
+            "claim_type": claim_type or "",
+            "claim_id": claim_id or "",
+            "submitter": submitter or "",
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
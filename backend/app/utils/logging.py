@@ -0,0 +1,388 @@
+"""
+In-process logging and metrics.
+
+Metrics are plain counters, gauges and histograms kept in memory and
+rendered in the Prometheus text exposition format by ``render_metrics()``
+(served on ``/metrics``). Label children are resolved once, where the
+instrumentation is declared, so the hot path is a bisect and an increment
+under a lock.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from pymongo import monitoring
+
+
+LOG_LEVEL_ENV = "LOG_LEVEL"
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# queued work is measured against SLAs of minutes to hours
+QUEUE_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 900.0, 1800.0, 3600.0, 7200.0, 14400.0)
+
+_logging_configured = False
+
+
+def configure_logging():
+    """
+    Root handler and LOG_LEVEL for a process. Called by the entrypoints (the
+    API lifespan, the worker and the CLIs), never on import, so embedding
+    applications and tests keep their own logging setup.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    logging.basicConfig(
+        level=os.getenv(LOG_LEVEL_ENV, "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    _logging_configured = True
+
+
+def get_logger(name):
+    return logging.getLogger(name)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1, **labels):
+        self.labels(**labels).inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value, **labels):
+        self.labels(**labels).set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            cumulative += count
+            labels = _format_labels(labelnames, key, (("le", _format_value(float(bound))),))
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(labelnames, key)
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value, **labels):
+        self.labels(**labels).observe(value)
+
+
+class _Timer:
+    __slots__ = ("child", "started")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+NODE_LATENCY = REGISTRY.histogram(
+    "claim_node_duration_seconds", "Wall time of each claim workflow node", ("node",)
+)
+NODE_ERRORS = REGISTRY.counter(
+    "claim_node_errors_total", "Claim workflow node invocations that raised", ("node",)
+)
+WORKFLOW_RUNS = REGISTRY.counter(
+    "claim_workflow_runs_total", "Claim workflow runs by outcome", ("mode", "outcome")
+)
+OCR_PAGE_LATENCY = REGISTRY.histogram(
+    "ocr_page_duration_seconds", "OCR time per image or PDF page", ("source",)
+)
+OCR_DOCUMENT_LATENCY = REGISTRY.histogram(
+    "ocr_document_duration_seconds", "OCR time per document by provider", ("provider", "outcome")
+)
+OCR_CONFIDENCE = REGISTRY.histogram(
+    "ocr_page_confidence", "Per-page OCR confidence by provider", ("provider",),
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0),
+)
+OCR_FALLBACKS = REGISTRY.counter(
+    "ocr_fallbacks_total", "Documents passed on to the next OCR provider in the chain", ("provider", "reason")
+)
+LLM_LATENCY = REGISTRY.histogram(
+    "llm_request_duration_seconds", "Ollama request latency", ("operation",)
+)
+LLM_BATCH_SIZE = REGISTRY.histogram(
+    "llm_batch_size", "Ollama requests sent together per batching window", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+LLM_FIRST_TOKEN = REGISTRY.histogram(
+    "llm_time_to_first_token_seconds", "Time until Ollama streamed the first token", ("operation",)
+)
+LLM_TOKEN_SECONDS = REGISTRY.histogram(
+    "llm_seconds_per_token", "Mean time between streamed tokens per request", ("operation",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+LLM_STREAM_STOPS = REGISTRY.counter(
+    "llm_stream_stops_total", "Why streamed generations ended", ("operation", "reason")
+)
+LLM_ERRORS = REGISTRY.counter(
+    "llm_errors_total", "Ollama requests or responses that failed", ("operation", "kind")
+)
+MONGO_LATENCY = REGISTRY.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("command",)
+)
+MONGO_ERRORS = REGISTRY.counter(
+    "mongo_command_errors_total", "MongoDB commands that failed", ("command",)
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "In-process cache lookups", ("cache", "result")
+)
+JOB_LATENCY = REGISTRY.histogram(
+    "claim_job_duration_seconds", "Time a pipeline worker spent on each claim job", ("kind",)
+)
+JOB_RUNS = REGISTRY.counter(
+    "claim_jobs_total", "Claim jobs finished by pipeline workers", ("kind", "outcome")
+)
+JOB_QUEUE_WAIT = REGISTRY.histogram(
+    "claim_job_queue_wait_seconds", "Time a claim job waited before a worker leased it", ("priority_class",),
+    buckets=QUEUE_BUCKETS,
+)
+JOB_TURNAROUND = REGISTRY.histogram(
+    "claim_job_turnaround_seconds", "Enqueue to finish time of claim jobs", ("priority_class", "outcome"),
+    buckets=QUEUE_BUCKETS,
+)
+JOB_SLA_MISSED = REGISTRY.counter(
+    "claim_job_sla_missed_total", "Claim jobs that finished after their class SLA", ("priority_class",)
+)
+ADMISSION_IN_USE = REGISTRY.gauge(
+    "admission_slots_in_use", "Slots currently held per admission gate", ("gate",)
+)
+ADMISSION_QUEUED = REGISTRY.gauge(
+    "admission_queue_depth", "Callers waiting for a slot per admission gate", ("gate",)
+)
+ADMISSION_WAIT = REGISTRY.histogram(
+    "admission_wait_seconds", "Time spent queued for a slot", ("gate",)
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "admission_rejected_total", "Callers turned away because a gate was saturated", ("gate", "reason")
+)
+IDEMPOTENT_REQUESTS = REGISTRY.counter(
+    "claim_submissions_deduplicated_total", "Claim submissions by idempotency outcome", ("result",)
+)
+
+
+def render_metrics():
+    return REGISTRY.render()
+
+
+def timed(histogram, errors=None, **labels):
+    """
+    Decorator recording the wall time of every call in ``histogram`` and
+    counting exceptions in ``errors``. Labels are bound once, here.
+    """
+    latency = histogram.labels(**labels)
+    failures = errors.labels(**labels) if errors is not None else None
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                if failures is not None:
+                    failures.inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_node(fn):
+    """Latency and error metrics for a workflow node, labelled with its function name."""
+    return timed(NODE_LATENCY, NODE_ERRORS, node=fn.__name__)(fn)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Feeds driver command events into the Mongo latency histogram."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(command=event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_LATENCY.labels(command=event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_ERRORS.labels(command=event.command_name).inc()
+
+
+mongo_command_metrics = MongoCommandMetrics()
@@ -0,0 +1,489 @@
+"""
+Synthetic policies and claims for scale testing.
+
+Every entity is derived from ``(seed, kind, index)`` alone, so any slice of
+the dataset can be generated independently and in parallel, and two runs
+with the same arguments produce the same documents. Claims are shaped like
+the records ``/api/claims/submit`` persists (including
+``form_data.node1_output``), so indexes, aggregations, the fraud network,
+Benford histograms, re-scoring and Node 5 training all work on them.
+
+Ground truth is kept under ``synthetic``: ``ring_id`` for members of a
+fraud ring (shared phone, address and bank account, round amounts) and
+``duplicate_of`` for resubmitted documents.
+
+    python -m app.utils.synthetic_data --policies 50000 --claims 2000000 --workers 8
+    python -m app.utils.synthetic_data --claims 100000 --output claims.jsonl
+    python -m app.utils.synthetic_data --claims 5000 --render-images sample_docs/synthetic --image-fraction 0.1
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.utils.logging import configure_logging
+
+
+CLAIM_TYPES = {
+    # claim type: (policy type, weight, lognormal median amount, sigma)
+    "Motor": ("motor", 0.5, 60000, 0.8),
+    "Health": ("health", 0.35, 40000, 0.9),
+    "Property": ("property", 0.15, 150000, 1.0),
+}
+
+POLICY_PREFIX = {"motor": "MOT", "health": "HLT", "property": "PRP"}
+
+EXCLUSIONS = {
+    "motor": ("Driving under influence of alcohol", "Commercial use of vehicle", "Intentional damage", "Racing", "Driving without a valid licence"),
+    "health": ("Pre-existing conditions", "Cosmetic surgery", "Self-inflicted injury", "Experimental treatment"),
+    "property": ("Flood damage", "War and terrorism", "Wear and tear", "Intentional damage"),
+}
+
+FIRST_NAMES = ("John", "Asha", "Ravi", "Meera", "Karan", "Priya", "Vikram", "Neha", "Arjun", "Divya", "Rahul", "Sneha", "Amit", "Pooja", "Sanjay", "Kavya")
+LAST_NAMES = ("Smith", "Rao", "Iyer", "Shah", "Gupta", "Nair", "Das", "Mehta", "Kapoor", "Reddy", "Joshi", "Menon", "Patel", "Singh")
+STREETS = ("MG Road", "Park Street", "Station Road", "Lake View", "Hill Road", "Church Street", "Ring Road", "Temple Lane")
+CITIES = ("Pune", "Mumbai", "Bengaluru", "Chennai", "Delhi", "Hyderabad", "Kolkata", "Jaipur")
+STATES = ("MH", "KA", "TN", "DL", "TS", "WB", "RJ")
+PROVIDERS = {
+    "Motor": ("Speedy Auto Works", "City Garage", "Prime Motors Service", "Highway Body Shop"),
+    "Health": ("Sunrise Hospital", "CarePlus Clinic", "Lifeline Medical Centre", "Apollo Diagnostics"),
+    "Property": ("HomeFix Contractors", "BuildRight Repairs", "SafeShield Restoration"),
+}
+INCIDENTS = {
+    "Motor": ("Rear-end collision at a signal", "Side impact while parking", "Vehicle skidded on a wet road", "Hit by an unknown vehicle"),
+    "Health": ("Emergency admission for fever", "Fracture after a fall", "Planned knee surgery", "Day-care procedure"),
+    "Property": ("Kitchen fire", "Water leakage from the roof", "Burglary at the residence", "Storm damage to windows"),
+}
+STATUSES = ("APPROVED", "REJECTED", "PENDING_REVIEW", "FLAGGED_FOR_REVIEW", "ESCALATED_FRAUD_REVIEW")
+
+
+class DatasetSpec:
+    """Sizes and distributions of a synthetic dataset."""
+
+    def __init__(
+        self,
+        seed=42,
+        policies=10000,
+        claimants=10000,
+        claims=100000,
+        ring_fraction=0.02,
+        ring_size=8,
+        duplicate_fraction=0.01,
+        days=365,
+        start=datetime(2026, 1, 1),
+    ):
+        self.seed = seed
+        self.policies = policies
+        self.claimants = claimants
+        self.claims = claims
+        self.ring_fraction = ring_fraction
+        self.ring_size = ring_size
+        self.duplicate_fraction = duplicate_fraction
+        self.days = days
+        self.start = start
+
+    @property
+    def policy_holders(self):
+        """Claimants that hold a policy, and so can file claims."""
+        return min(self.claimants, self.policies)
+
+    @property
+    def rings(self):
+        return max(1, int(self.claims * self.ring_fraction / max(self.ring_size, 1)))
+
+    def to_dict(self):
+        return dict(vars(self), start=self.start.isoformat())
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{**data, "start": datetime.fromisoformat(data["start"])})
+
+
+def _rng(spec, kind, index):
+    return random.Random(f"{spec.seed}:{kind}:{index}")
+
+
+def _claim_type(rng):
+    types = list(CLAIM_TYPES)
+    return rng.choices(types, weights=[CLAIM_TYPES[name][1] for name in types])[0]
+
+
+def _phone(rng):
+    return f"9{rng.randrange(10**8, 10**9)}"
+
+
+def _address(rng):
+    return f"{rng.randrange(1, 999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}"
+
+
+def policy_holder(spec, index):
+    """Policy ``index`` is held by claimant ``index % claimants``."""
+    return index % spec.claimants
+
+
+def claimant_policy(spec, claimant_index, rng):
+    """One of the policies ``claimant_index`` holds; only the first ``policies`` claimants hold any."""
+    held = len(range(claimant_index, spec.policies, spec.claimants))
+    return claimant_index + spec.claimants * rng.randrange(held)
+
+
+def policy_number(spec, index):
+    rng = _rng(spec, "policy", index)
+    policy_type = CLAIM_TYPES[_claim_type(rng)][0]
+    return f"{POLICY_PREFIX[policy_type]}-{10000000 + index:08d}"
+
+
+def make_policy(spec, index):
+    rng = _rng(spec, "policy", index)
+    claim_type = _claim_type(rng)
+    policy_type, _, median, _ = CLAIM_TYPES[claim_type]
+    effective = spec.start - timedelta(days=rng.randrange(0, 365))
+    sum_insured = int(round(median * rng.choice((5, 8, 10, 15, 20)), -4))
+    return {
+        "policyNumber": f"{POLICY_PREFIX[policy_type]}-{10000000 + index:08d}",
+        "policyType": policy_type,
+        "holderName": make_claimant(spec, policy_holder(spec, index))["name"].upper(),
+        "effectiveDate": effective,
+        "expiryDate": effective + timedelta(days=365 * rng.choice((1, 1, 1, 2, 3))),
+        "sumInsured": sum_insured,
+        "coverageDetails": {
+            "deductible": rng.choice((0, 1000, 2500, 5000, 10000)),
+            "limits": {"total": sum_insured},
+        },
+        "exclusions": rng.sample(EXCLUSIONS[policy_type], k=rng.randint(2, len(EXCLUSIONS[policy_type]))),
+        "synthetic": True,
+    }
+
+
+def make_claimant(spec, index):
+    rng = _rng(spec, "claimant", index)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    return {
+        "name": name,
+        "email": f"{name.lower().replace(' ', '.')}.{index}@example.com",
+        "phone": _phone(rng),
+        "address": _address(rng),
+        "bank_account": str(rng.randrange(10**11, 10**12)),
+        "vehicle_number": f"{rng.choice(STATES)}{rng.randrange(10, 99)}{chr(65 + rng.randrange(26))}{chr(65 + rng.randrange(26))}{rng.randrange(1000, 9999)}",
+    }
+
+
+def make_ring(spec, ring_id):
+    """Entities every member of a fraud ring reuses."""
+    rng = _rng(spec, "ring", ring_id)
+    return {
+        "phone": _phone(rng),
+        "address": _address(rng),
+        "bank_account": str(rng.randrange(10**11, 10**12)),
+        "provider_index": rng.randrange(4),
+        "members": [rng.randrange(spec.policy_holders) for _ in range(spec.ring_size)],
+    }
+
+
+def _severity(amount):
+    if amount < 20000:
+        return "LOW"
+    if amount < 80000:
+        return "MEDIUM"
+    return "HIGH"
+
+
+def _documents(claim_id, claim_type, claimant, policy_no, amount, incident_date, provider, description):
+    date_text = incident_date.strftime("%d/%m/%Y")
+    contact = {
+        "claimer_name": claimant["name"],
+        "claimer_email": claimant["email"],
+        "claimer_phone": claimant["phone"],
+        "claimer_address": claimant["address"],
+    }
+    texts = {
+        "policy": (
+            f"POLICY SCHEDULE\nPolicy Number: {policy_no}\nInsured: {claimant['name']}\n"
+            f"Address: {claimant['address']}\nPhone: {claimant['phone']}"
+        ),
+        "bill": (
+            f"INVOICE {claim_id}\n{provider}\nTotal Amount: Rs {amount:,.0f}\nDate: {date_text}\n"
+            f"Account No: {claimant['bank_account']}"
+        ),
+        "report": (
+            f"INCIDENT REPORT\n{description}\nDate: {date_text}\n"
+            + (f"Vehicle: {claimant['vehicle_number']}\n" if claim_type == "Motor" else "")
+            + f"Reported by {claimant['name']}, {claimant['phone']}"
+        ),
+    }
+    fields = {
+        "policy": {**contact, "policy_number": [policy_no], "summary": f"{claim_type} policy schedule"},
+        "bill": {**contact, "amount": [f"{amount:.2f}"], "incident_date": [date_text], "provider": provider, "summary": f"Invoice from {provider}"},
+        "report": {**contact, "incident_date": [date_text], "summary": description},
+    }
+    return [
+        {
+            "file": f"{claim_id}_{doc_type}.png",
+            "document_type": doc_type,
+            "structured_fields": fields[doc_type],
+            "extracted_text": texts[doc_type],
+        }
+        for doc_type in ("policy", "bill", "report")
+    ]
+
+
+def make_claim(spec, index):
+    rng = _rng(spec, "claim", index)
+    claim_id = f"SYN-{spec.seed}-{index:09d}"
+    created_at = spec.start + timedelta(seconds=rng.randrange(spec.days * 86400))
+
+    ring_id = rng.randrange(spec.rings) if rng.random() < spec.ring_fraction else None
+    if ring_id is not None:
+        ring = make_ring(spec, ring_id)
+        claimant_index = rng.choice(ring["members"])
+        claimant = dict(make_claimant(spec, claimant_index))
+        # members claim on their own policies; the ring shows in the entities they share
+        claimant.update(phone=ring["phone"], address=ring["address"], bank_account=ring["bank_account"])
+    else:
+        ring = None
+        claimant_index = rng.randrange(spec.policy_holders)
+        claimant = make_claimant(spec, claimant_index)
+    policy_index = claimant_policy(spec, claimant_index, rng)
+
+    policy_no = policy_number(spec, policy_index)
+    claim_type = next(name for name, meta in CLAIM_TYPES.items() if POLICY_PREFIX[meta[0]] == policy_no[:3])
+    _, _, median, sigma = CLAIM_TYPES[claim_type]
+    amount = round(rng.lognormvariate(math.log(median), sigma), 2)
+    if ring is not None:
+        # rings inflate their bills and file round figures
+        amount = float(round(amount * rng.uniform(1.2, 2.0), -3))
+
+    providers = PROVIDERS[claim_type]
+    provider = providers[ring["provider_index"] % len(providers)] if ring else rng.choice(providers)
+    description = rng.choice(INCIDENTS[claim_type])
+    incident_date = created_at - timedelta(days=rng.randrange(1, 30))
+    documents = _documents(claim_id, claim_type, claimant, policy_no, amount, incident_date, provider, description)
+
+    fraud_score = round(min(1.0, rng.betavariate(2, 12) + (0.45 if ring else 0.0)), 3)
+    if fraud_score >= 0.7:
+        status = "ESCALATED_FRAUD_REVIEW"
+    elif fraud_score >= 0.5:
+        status = "FLAGGED_FOR_REVIEW"
+    else:
+        status = rng.choices(STATUSES[:3], weights=(0.7, 0.15, 0.15))[0]
+    covered = status != "REJECTED"
+    consistency_score = round(rng.uniform(0.7, 1.0) if not ring else rng.uniform(0.4, 0.9), 3)
+
+    claim = {
+        "claim_id": claim_id,
+        "claim_type": claim_type,
+        "claim_amount": amount,
+        "policy_number": policy_no,
+        "provider": provider,
+        "claimer": {key: claimant[key] for key in ("name", "email", "phone", "address")},
+        "form_data": {"synthetic": True, "node1_output": {"claim_id": claim_id, "documents": documents, "extraction_confidence": 0.95}},
+        "document_paths": [],
+        "status": status,
+        "decision_reason": "Synthetic decision",
+        "human_review_required": status in ("FLAGGED_FOR_REVIEW", "ESCALATED_FRAUD_REVIEW"),
+        "fraud_score": fraud_score,
+        "risk_score": fraud_score,
+        "node2_output": {"consistency_score": consistency_score},
+        "node3_output": {"is_covered": covered},
+        "processing_minutes": round(rng.uniform(0.5, 20.0), 2),
+        "created_at": created_at,
+        "updated_at": created_at,
+        "synthetic": {"ring_id": ring_id, "duplicate_of": None},
+    }
+    if status in ("APPROVED", "REJECTED"):
+        days = max(1, round(rng.lognormvariate(math.log(7 if claim_type == "Health" else 14), 0.5)))
+        claim["outcome"] = {
+            "final_cost": round(amount * rng.uniform(0.6, 1.0), 2) if covered else 0.0,
+            "settlement_days": days,
+            "severity": _severity(amount),
+        }
+    return claim
+
+
+def _duplicate(spec, index, original):
+    """Resubmission of ``original``'s documents under a new claim id."""
+    rng = _rng(spec, "duplicate", index)
+    claim = dict(original)
+    claim_id = f"SYN-{spec.seed}-{index:09d}"
+    created_at = original["created_at"] + timedelta(days=rng.randrange(1, 90))
+    claim.update(
+        claim_id=claim_id,
+        created_at=created_at,
+        updated_at=created_at,
+        status="PENDING_REVIEW",
+        synthetic={"ring_id": original["synthetic"]["ring_id"], "duplicate_of": original["claim_id"]},
+    )
+    claim.pop("outcome", None)
+    node1_output = dict(original["form_data"]["node1_output"], claim_id=claim_id)
+    claim["form_data"] = {"synthetic": True, "node1_output": node1_output}
+    return claim
+
+
+def claim_at(spec, index):
+    """Claim number ``index``; duplicates resubmit an earlier claim of the dataset."""
+    rng = _rng(spec, "pick", index)
+    if index > 0 and rng.random() < spec.duplicate_fraction:
+        return _duplicate(spec, index, claim_at(spec, rng.randrange(index)))
+    return make_claim(spec, index)
+
+
+def iter_claims(spec, start, stop):
+    for index in range(start, stop):
+        yield claim_at(spec, index)
+
+
+def _render(claim, directory):
+    from PIL import Image, ImageDraw
+
+    paths = []
+    for doc in claim["form_data"]["node1_output"]["documents"]:
+        if doc["document_type"] not in ("bill", "policy"):
+            continue
+        lines = doc["extracted_text"].splitlines()
+        image = Image.new("L", (1000, 60 + 34 * len(lines)), color=255)
+        draw = ImageDraw.Draw(image)
+        for row, line in enumerate(lines):
+            draw.text((30, 30 + 34 * row), line, fill=0)
+        path = Path(directory) / doc["file"]
+        image.save(path)
+        paths.append(str(path))
+    return paths
+
+
+def _chunks(total, size):
+    for start in range(0, total, size):
+        yield start, min(start + size, total)
+
+
+def load_policy_chunk(spec_data, start, stop, database):
+    """Import a chunk through the policy repository, so every policy is versioned like a real import."""
+    from app.database.mongo import get_client
+    from app.database.policy_repository import import_policies
+
+    spec = DatasetSpec.from_dict(spec_data)
+    stats = import_policies(
+        (make_policy(spec, index) for index in range(start, stop)),
+        batch_size=stop - start,
+        source="synthetic",
+        db=get_client()[database],
+    )
+    if stats["invalid"]:
+        raise ValueError(f"synthetic policies failed validation: {stats['errors'][:3]}")
+    return stats["created"] + stats["updated"] + stats["unchanged"]
+
+
+def load_claim_chunk(spec_data, start, stop, database, image_dir=None, image_fraction=0.0):
+    from app.database.mongo import get_client
+
+    spec = DatasetSpec.from_dict(spec_data)
+    if image_dir:
+        Path(image_dir).mkdir(parents=True, exist_ok=True)
+    docs = []
+    for claim in iter_claims(spec, start, stop):
+        if image_dir and _rng(spec, "image", claim["claim_id"]).random() < image_fraction:
+            claim["document_paths"] = _render(claim, image_dir)
+        docs.append(claim)
+    get_client()[database]["claims"].insert_many(docs, ordered=False)
+    return len(docs)
+
+
+def load_dataset(spec, database="insurance_db", workers=4, chunk_size=5000, image_dir=None, image_fraction=0.0):
+    """
+    Generate and insert ``spec.policies`` policies and ``spec.claims`` claims.
+    Each worker process generates its own chunk and writes it with one
+    unordered ``insert_many``, so nothing but chunk bounds crosses processes.
+    """
+    spec_data = spec.to_dict()
+    totals = {"policies": 0, "claims": 0}
+    started = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {
+            pool.submit(load_policy_chunk, spec_data, start, stop, database): "policies"
+            for start, stop in _chunks(spec.policies, chunk_size)
+        }
+        futures.update({
+            pool.submit(load_claim_chunk, spec_data, start, stop, database, image_dir, image_fraction): "claims"
+            for start, stop in _chunks(spec.claims, chunk_size)
+        })
+        for future in as_completed(futures):
+            totals[futures[future]] += future.result()
+
+    elapsed = time.perf_counter() - started
+    return {
+        **totals,
+        "database": database,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 2),
+        "docs_per_s": round((totals["policies"] + totals["claims"]) / elapsed, 1) if elapsed else None,
+    }
+
+
+def write_jsonl(spec, path):
+    """Write the claims as JSONL (for rescoring or Node 5 training without Mongo)."""
+    with open(path, "w", encoding="utf-8") as handle:
+        for claim in iter_claims(spec, 0, spec.claims):
+            handle.write(json.dumps(claim, default=str) + "\n")
+    return spec.claims
+
+
+def main():
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Generate a synthetic claims dataset")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--policies", type=int, default=10000)
+    parser.add_argument(
+        "--claimants", type=int, default=10000, help="Distinct claimants; claimant i holds every policy j with j %% claimants == i"
+    )
+    parser.add_argument("--claims", type=int, default=100000)
+    parser.add_argument("--ring-fraction", type=float, default=0.02, help="Share of claims filed by fraud rings")
+    parser.add_argument("--ring-size", type=int, default=8)
+    parser.add_argument("--duplicate-fraction", type=float, default=0.01, help="Share of claims resubmitting earlier documents")
+    parser.add_argument("--days", type=int, default=365, help="Spread of created_at from 2026-01-01")
+    parser.add_argument("--database", default="insurance_db")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--render-images", metavar="DIR", help="Render bill and policy images for OCR load into DIR")
+    parser.add_argument("--image-fraction", type=float, default=0.01)
+    parser.add_argument("--output", help="Write claims to this JSONL file instead of MongoDB")
+    parser.add_argument("--create-indexes", action="store_true", help="Build the claim indexes after loading")
+    args = parser.parse_args()
+
+    spec = DatasetSpec(
+        seed=args.seed,
+        policies=args.policies,
+        claimants=args.claimants,
+        claims=args.claims,
+        ring_fraction=args.ring_fraction,
+        ring_size=args.ring_size,
+        duplicate_fraction=args.duplicate_fraction,
+        days=args.days,
+    )
+
+    if args.output:
+        print(json.dumps({"claims": write_jsonl(spec, args.output), "output": args.output}, indent=2))
+        return
+
+    summary = load_dataset(
+        spec,
+        database=args.database,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        image_dir=args.render_images,
+        image_fraction=args.image_fraction,
+    )
+    if args.create_indexes:
+        from app.database.claim_repository import ensure_claim_indexes
+        from app.database.mongo import get_client
+
+        summary["indexes"] = ensure_claim_indexes(get_client()[args.database]["claims"])
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
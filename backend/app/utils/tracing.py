@@ -0,0 +1,277 @@
+"""
+Pluggable, sampled tracing for the claim workflow.
+
+``@traced(name)`` replaces direct use of ``langsmith.traceable``. The backend
+is chosen once, when the decorated module is imported, from
+TRACING_BACKEND:
+
+    off        (default) the decorator returns the function unchanged
+    jsonl      spans are appended to TRACING_JSONL_PATH by a background thread
+    langsmith  sampled calls go through ``langsmith.traceable``
+    otel       sampled calls open OpenTelemetry spans; export is left to the
+               configured OpenTelemetry SDK (e.g. a BatchSpanProcessor)
+
+Sampling is head-based: the outermost traced call keeps its trace with
+probability TRACING_SAMPLE_RATE and every nested call follows that
+decision, so a trace is either complete or absent.
+"""
+import atexit
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from functools import wraps
+from pathlib import Path
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+BACKEND_ENV = "TRACING_BACKEND"
+SAMPLE_RATE_ENV = "TRACING_SAMPLE_RATE"
+JSONL_PATH_ENV = "TRACING_JSONL_PATH"
+FLUSH_SECONDS_ENV = "TRACING_FLUSH_SECONDS"
+QUEUE_SIZE_ENV = "TRACING_QUEUE_SIZE"
+
+BATCH_SIZE = 256
+
+# Current span for nested calls; _UNSAMPLED marks a trace that was dropped.
+_current_span = contextvars.ContextVar("current_span", default=None)
+_UNSAMPLED = object()
+
+
+def _get_sample_rate():
+    try:
+        return min(max(float(os.getenv(SAMPLE_RATE_ENV, "1.0")), 0.0), 1.0)
+    except ValueError:
+        return 1.0
+
+
+def _get_flush_seconds():
+    try:
+        return float(os.getenv(FLUSH_SECONDS_ENV, "1.0"))
+    except ValueError:
+        return 1.0
+
+
+def _get_queue_size():
+    try:
+        return int(os.getenv(QUEUE_SIZE_ENV, "10000"))
+    except ValueError:
+        return 10000
+
+
+def _default_jsonl_path():
+    return Path(__file__).resolve().parents[2] / "data" / "traces.jsonl"
+
+
+class BatchExporter:
+    """
+    Buffers finished spans and writes them from a daemon thread in batches.
+    The buffer is bounded; when it is full new spans are dropped and counted
+    rather than blocking the traced code.
+    """
+
+    def __init__(self, write_batch, flush_seconds=1.0, max_queue=10000):
+        self._write_batch = write_batch
+        self._flush_seconds = flush_seconds
+        self._max_queue = max_queue
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def export(self, span):
+        if len(self._queue) >= self._max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+        if len(self._queue) >= BATCH_SIZE:
+            self._wakeup.set()
+
+    def _drain(self):
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < BATCH_SIZE:
+                batch.append(self._queue.popleft())
+            try:
+                self._write_batch(batch)
+            except Exception as exc:
+                logger.warning("Dropping %d spans, export failed: %s", len(batch), exc)
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self._flush_seconds)
+            self._wakeup.clear()
+            self._drain()
+
+    def shutdown(self):
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self._drain()
+
+
+class Tracer:
+    """Sampling and span bookkeeping shared by every backend."""
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+
+    def _sampled(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def wrap(self, fn, name):
+        call = self.prepare(fn, name)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            parent = _current_span.get()
+            if parent is _UNSAMPLED:
+                return fn(*args, **kwargs)
+            if parent is None and not self._sampled():
+                token = _current_span.set(_UNSAMPLED)
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    _current_span.reset(token)
+
+            span = {
+                "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex,
+                "span_id": uuid.uuid4().hex[:16],
+                "parent_id": parent["span_id"] if parent else None,
+                "name": name,
+            }
+            token = _current_span.set(span)
+            started = time.perf_counter()
+            span["start"] = time.time()
+            try:
+                result = call(*args, **kwargs)
+                span["status"] = "ok"
+                return result
+            except Exception as exc:
+                span["status"] = "error"
+                span["error"] = f"{type(exc).__name__}: {exc}"
+                raise
+            finally:
+                span["duration_s"] = round(time.perf_counter() - started, 6)
+                _current_span.reset(token)
+                self.finish(span)
+
+        return wrapper
+
+    def prepare(self, fn, name):
+        """Return the callable to run for a sampled call."""
+        return fn
+
+    def finish(self, span):
+        pass
+
+
+class JsonlTracer(Tracer):
+    def __init__(self, sample_rate, path):
+        super().__init__(sample_rate)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.exporter = BatchExporter(self._write, _get_flush_seconds(), _get_queue_size())
+
+    def _write(self, batch):
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write("".join(json.dumps(span) + "\n" for span in batch))
+
+    def finish(self, span):
+        self.exporter.export(span)
+
+
+class LangSmithTracer(Tracer):
+    def __init__(self, sample_rate):
+        super().__init__(sample_rate)
+        from langsmith import traceable
+
+        os.environ.setdefault("LANGSMITH_PROJECT", "insurance-claim-ai")
+        self._traceable = traceable
+
+    def prepare(self, fn, name):
+        # langsmith batches and uploads runs from its own background thread
+        return self._traceable(name=name)(fn)
+
+
+class OpenTelemetryTracer(Tracer):
+    def __init__(self, sample_rate):
+        super().__init__(sample_rate)
+        from opentelemetry import trace
+
+        self._tracer = trace.get_tracer("intelliclaim")
+        self._status = trace.Status
+        self._error = trace.StatusCode.ERROR
+
+    def prepare(self, fn, name):
+        tracer = self._tracer
+
+        def call(*args, **kwargs):
+            with tracer.start_as_current_span(name, record_exception=True) as span:
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as exc:
+                    span.set_status(self._status(self._error, str(exc)))
+                    raise
+
+        return call
+
+
+_tracer_lock = threading.Lock()
+_tracer = None
+_tracer_resolved = False
+
+
+def _build_tracer(backend):
+    sample_rate = _get_sample_rate()
+    if backend in ("", "off", "none") or sample_rate <= 0.0:
+        return None
+    if backend == "jsonl":
+        return JsonlTracer(sample_rate, os.getenv(JSONL_PATH_ENV) or _default_jsonl_path())
+    if backend == "langsmith":
+        return LangSmithTracer(sample_rate)
+    if backend in ("otel", "opentelemetry"):
+        return OpenTelemetryTracer(sample_rate)
+    logger.warning("Unknown tracing backend '%s', tracing disabled", backend)
+    return None
+
+
+def get_tracer():
+    global _tracer, _tracer_resolved
+    if _tracer_resolved:
+        return _tracer
+    with _tracer_lock:
+        if not _tracer_resolved:
+            backend = os.getenv(BACKEND_ENV, "off").strip().lower()
+            try:
+                _tracer = _build_tracer(backend)
+            except ImportError as exc:
+                logger.warning("Tracing backend '%s' unavailable, tracing disabled: %s", backend, exc)
+                _tracer = None
+            _tracer_resolved = True
+    return _tracer
+
+
+def traced(name=None):
+    """
+    Trace calls to the decorated function under ``name``. With tracing off
+    the function is returned as-is, so there is no per-call cost at all.
+    """
+
+    def decorator(fn):
+        tracer = get_tracer()
+        if tracer is None:
+            return fn
+        return tracer.wrap(fn, name or fn.__name__)
+
+    return decorator
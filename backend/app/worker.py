@@ -0,0 +1,257 @@
+"""
+Pipeline worker: leases claim jobs from the queue and runs the workflow.
+
+Run one or more of these next to an API started with APP_ROLE=api; both
+roles scale independently. Each worker thread takes one job at a time,
+heartbeats its lease while the workflow runs, and records the submit
+response as the job result. SIGTERM/SIGINT stop taking new jobs and let
+running ones finish.
+
+Jobs are taken in priority order (``app.core.scheduling``). The first
+``--reserved-high-value`` slots only run high-value Property claims, so
+those always find capacity; the remaining slots run any class.
+
+    python -m app.worker --concurrency 4
+    python -m app.worker --concurrency 4 --reserved-high-value 1 --metrics-port 9100
+"""
+import argparse
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+from app.core.scheduling import HIGH_VALUE, STANDARD
+from app.database.job_queue import (
+    DEFAULT_LEASE_SECONDS,
+    complete_job,
+    ensure_job_indexes,
+    extend_lease,
+    fail_job,
+    lease_job,
+    reclassify_job,
+)
+from app.utils.logging import (
+    JOB_LATENCY,
+    JOB_QUEUE_WAIT,
+    JOB_RUNS,
+    JOB_SLA_MISSED,
+    JOB_TURNAROUND,
+    PROMETHEUS_CONTENT_TYPE,
+    configure_logging,
+    get_logger,
+    render_metrics,
+)
+
+logger = get_logger(__name__)
+
+
+def _default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+
+
+class _Heartbeat:
+    """Extends a job's lease every third of the lease period until stopped."""
+
+    def __init__(self, job_id, worker_id, lease_seconds):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            if not extend_lease(self.job_id, self.worker_id, self.lease_seconds):
+                self.lost = True
+                logger.warning("Lost the lease on job %s", self.job_id)
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _observe_turnaround(job, outcome):
+    priority_class = job.get("priority_class") or STANDARD
+    finished = datetime.utcnow()
+    JOB_TURNAROUND.labels(priority_class=priority_class, outcome=outcome).observe(
+        (finished - job["created_at"]).total_seconds()
+    )
+    deadline = job.get("sla_deadline")
+    if deadline is not None and finished > deadline:
+        JOB_SLA_MISSED.labels(priority_class=priority_class).inc()
+
+
+class Worker:
+    def __init__(
+        self,
+        worker_id=None,
+        concurrency=1,
+        lease_seconds=DEFAULT_LEASE_SECONDS,
+        poll_interval=1.0,
+        reserved_high_value=0,
+    ):
+        self.worker_id = worker_id or _default_worker_id()
+        self.concurrency = concurrency
+        # never reserve every slot; the other classes need somewhere to run
+        self.reserved_high_value = max(0, min(reserved_high_value, concurrency - 1))
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+
+    def process_one(self, slot_id, priority_classes=None):
+        """Lease and run a single job. Returns False when the queue was empty."""
+        from app.services.claim_processing import PERMANENT_ERRORS, Reclassified, run_job
+
+        job = lease_job(slot_id, self.lease_seconds, priority_classes)
+        if job is None:
+            return False
+
+        kind = job["kind"]
+        if job["attempts"] == 1 and not job.get("reclassified_from"):
+            JOB_QUEUE_WAIT.labels(priority_class=job.get("priority_class") or STANDARD).observe(
+                (job["started_at"] - job["created_at"]).total_seconds()
+            )
+        if job["attempts"] > job.get("max_attempts", job["attempts"]):
+            # re-leased after its previous holder died on the final attempt
+            fail_job(job["job_id"], slot_id, job.get("error") or "lease expired", permanent=True)
+            JOB_RUNS.labels(kind=kind, outcome="failed").inc()
+            _observe_turnaround(job, "failed")
+            return True
+
+        started = time.perf_counter()
+        with _Heartbeat(job["job_id"], slot_id, self.lease_seconds) as heartbeat:
+            try:
+                result = run_job(job)
+            except Reclassified as exc:
+                requeued = reclassify_job(job["job_id"], slot_id, exc.priority_class, exc.payload)
+                outcome = "reclassified" if requeued and not heartbeat.lost else "lease_lost"
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Job %s (%s, claim %s) failed", job["job_id"], kind, job["claim_id"])
+                status = fail_job(
+                    job["job_id"], slot_id, str(exc), permanent=isinstance(exc, PERMANENT_ERRORS)
+                )
+                outcome = "retried" if status == "queued" else "failed"
+            else:
+                completed = complete_job(job["job_id"], slot_id, result)
+                outcome = "succeeded" if completed and not heartbeat.lost else "lease_lost"
+        JOB_LATENCY.labels(kind=kind).observe(time.perf_counter() - started)
+        JOB_RUNS.labels(kind=kind, outcome=outcome).inc()
+        if outcome in ("succeeded", "failed"):
+            _observe_turnaround(job, outcome)
+        return True
+
+    def _loop(self, slot):
+        slot_id = f"{self.worker_id}/{slot}"
+        priority_classes = [HIGH_VALUE] if slot < self.reserved_high_value else None
+        while not self.stopping.is_set():
+            try:
+                busy = self.process_one(slot_id, priority_classes)
+            except Exception:  # noqa: BLE001
+                # queue unreachable; back off and try again
+                logger.exception("Worker %s could not poll the job queue", slot_id)
+                busy = False
+            if not busy:
+                # jitter keeps idle workers from polling in lockstep
+                self.stopping.wait(self.poll_interval * random.uniform(0.5, 1.5))
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self._loop, args=(slot,), name=f"claim-worker-{slot}")
+            for slot in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        logger.info(
+            "Worker %s started with %d slot(s), %d reserved for high-value claims",
+            self.worker_id,
+            self.concurrency,
+            self.reserved_high_value,
+        )
+        for thread in threads:
+            thread.join()
+
+    def stop(self, *_):
+        logger.info("Worker %s stopping after running jobs finish", self.worker_id)
+        self.stopping.set()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ("/metrics", "/health"):
+            self.send_error(404)
+            return
+        body = render_metrics().encode() if self.path == "/metrics" else b'{"status": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE if self.path == "/metrics" else "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port):
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run claim pipeline jobs from the queue")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "2")))
+    parser.add_argument("--lease-seconds", type=int, default=DEFAULT_LEASE_SECONDS)
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Idle wait between polls (s)")
+    parser.add_argument(
+        "--reserved-high-value",
+        type=int,
+        default=int(os.getenv("WORKER_RESERVED_HIGH_VALUE", "0")),
+        help="Slots that only run high-value Property claims",
+    )
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve /metrics and /health here")
+    return parser.parse_args()
+
+
+def main():
+    load_dotenv()
+    configure_logging()
+    args = parse_args()
+
+    from app.core.checkpointing import validate_checkpoint_backend
+    from app.core.langgraph_builder import get_claim_workflow
+
+    validate_checkpoint_backend()
+    # pay the OCR/LangGraph import before taking the first job
+    get_claim_workflow()
+    ensure_job_indexes()
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+
+    worker = Worker(
+        worker_id=args.worker_id,
+        concurrency=args.concurrency,
+        lease_seconds=args.lease_seconds,
+        poll_interval=args.poll_interval,
+        reserved_high_value=args.reserved_high_value,
+    )
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
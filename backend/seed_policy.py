@@ -1,30 +1,16 @@
-from app.database.mongo import policies_collection
-from datetime import datetime
+import sys
+from pathlib import Path
 
-policy = {
-    "policyNumber": "MOT-12345678",
-    "policyType": "motor",
-    "holderName": "JOHN SMITH",
+from app.database.policy_repository import ensure_policy_indexes, import_policy_file
 
-    "effectiveDate": datetime(2026,1,1),
-    "expiryDate": datetime(2026,12,31),
+# python seed_policy.py [policies.json|.jsonl|.csv]
+path = sys.argv[1] if len(sys.argv) > 1 else Path(__file__).parent / "data" / "policies_seed.json"
 
-    "sumInsured": 500000,
-
-    "coverageDetails": {
-        "deductible": 5000,
-        "limits": {
-            "ownDamage": 500000
-        }
-    },
-
-    "exclusions": [
-        "Driving under influence of alcohol",
-        "Commercial use of vehicle",
-        "Intentional damage",
-        "Racing"
-    ]
-}
-
-policies_collection.insert_one(policy)
-print("Policy inserted successfully")
\ No newline at end of file
+ensure_policy_indexes()
+summary = import_policy_file(path)
+print(
+    f"Policies imported: {summary['created']} new, {summary['updated']} updated, "
+    f"{summary['unchanged']} unchanged, {summary['invalid']} invalid"
+)
+for error in summary["errors"]:
+    print(f"  record {error['record']} ({error['policyNumber']}): {error['error']}")
@@ -0,0 +1,151 @@
+"""
+Shared fixtures for the offline pipeline benchmarks.
+
+Mongo is replaced by mongomock before any app module is imported, Ollama
+by a local fake HTTP server, and Tesseract by the synthetic documents'
+ground truth (set BENCHMARK_REAL_OCR=1 to OCR the generated images).
+
+Regression gate: ``--update-benchmark-baseline`` records the mean of every
+benchmark in ``--benchmark-baseline`` (tests/benchmark_baseline.json by
+default). Later runs fail any benchmark whose mean exceeds its recorded
+baseline by more than ``--benchmark-regression`` (0.25 = 25%). Record the
+baseline on the machine that runs the gate and commit it. With
+``--require-benchmark-baseline`` (on by default when CI is set) a benchmark
+without a recorded baseline, or a run without pytest-benchmark, fails
+instead of passing unchecked.
+"""
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+os.environ["MONGODB_URI"] = "mongodb://localhost:27017"
+os.environ.setdefault("CHECKPOINT_BACKEND", "none")
+os.environ.setdefault("TRACING_BACKEND", "off")
+
+from tests.stand_ins import FakeOcrProvider, FakeOllamaServer, generate_claims, patch_mongo, seed_policy  # noqa: E402
+
+_mongo_patcher = patch_mongo()
+
+DEFAULT_BASELINE = Path(__file__).with_name("benchmark_baseline.json")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("pipeline benchmarks")
+    group.addoption("--benchmark-baseline", default=str(DEFAULT_BASELINE))
+    group.addoption("--benchmark-regression", type=float, default=0.25)
+    group.addoption("--update-benchmark-baseline", action="store_true")
+    group.addoption(
+        "--require-benchmark-baseline",
+        action="store_true",
+        default=os.getenv("CI", "").lower() in ("1", "true", "yes"),
+    )
+    group.addoption("--bench-claims", type=int, default=24, help="Synthetic claims per throughput round")
+
+
+def pytest_configure(config):
+    config._benchmark_means = {}
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if config.getoption("--update-benchmark-baseline") and config._benchmark_means:
+        path = Path(config.getoption("--benchmark-baseline"))
+        baseline = json.loads(path.read_text()) if path.exists() else {}
+        baseline.update(config._benchmark_means)
+        path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+    _mongo_patcher.stop()
+
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+
+    class _SinglePass:
+        """Runs the function once when pytest-benchmark is not installed."""
+
+        stats = None
+
+        def __init__(self):
+            self.extra_info = {}
+
+        def __call__(self, fn, *args, **kwargs):
+            return fn(*args, **kwargs)
+
+        def pedantic(self, fn, args=(), kwargs=None, setup=None, rounds=1, iterations=1, **_):
+            return fn(*args, **(kwargs or {}))
+
+    @pytest.fixture
+    def benchmark():
+        return _SinglePass()
+
+
+@pytest.fixture(autouse=True)
+def benchmark_regression_gate(request):
+    if "benchmark" not in request.fixturenames:
+        yield
+        return
+    bench = request.getfixturevalue("benchmark")
+    yield
+    config = request.config
+    required = config.getoption("--require-benchmark-baseline")
+    stats = getattr(bench, "stats", None)
+    if not stats:
+        if required:
+            pytest.fail("pytest-benchmark is not installed; the regression gate cannot run", pytrace=False)
+        return
+
+    name = request.node.nodeid
+    mean = stats.stats.mean
+    config._benchmark_means[name] = mean
+    if config.getoption("--update-benchmark-baseline"):
+        return
+
+    path = Path(config.getoption("--benchmark-baseline"))
+    reference = json.loads(path.read_text()).get(name) if path.exists() else None
+    if reference is None:
+        if required:
+            pytest.fail(
+                f"{name}: no baseline in {path}; record one with --update-benchmark-baseline",
+                pytrace=False,
+            )
+        return
+    limit = config.getoption("--benchmark-regression")
+    if mean > reference * (1 + limit):
+        pytest.fail(
+            f"{name}: mean {mean * 1e3:.3f} ms regressed more than {limit:.0%} "
+            f"over baseline {reference * 1e3:.3f} ms",
+            pytrace=False,
+        )
+
+
+@pytest.fixture(scope="session")
+def fake_ollama():
+    server = FakeOllamaServer(latency_s=float(os.getenv("FAKE_OLLAMA_LATENCY", "0"))).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def offline_pipeline(fake_ollama):
+    """Point the app at the stand-ins and seed the policy the synthetic claims use."""
+    from app.database.mongo import policies_collection
+    from app.services.llm_service import llm_service
+    from app.services.ocr_service import OCR_PROVIDERS_ENV, register_provider
+
+    patch = pytest.MonkeyPatch()
+    patch.setattr(llm_service, "base_url", fake_ollama.base_url)
+    register_provider(FakeOcrProvider())
+    if os.getenv("BENCHMARK_REAL_OCR") != "1":
+        patch.setenv(OCR_PROVIDERS_ENV, "fake")
+    seed_policy(policies_collection)
+    yield
+    patch.undo()
+
+
+@pytest.fixture(scope="session")
+def synthetic_claims(request, tmp_path_factory, offline_pipeline):
+    count = request.config.getoption("--bench-claims")
+    return generate_claims(tmp_path_factory.mktemp("claims"), count)
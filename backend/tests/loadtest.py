@@ -0,0 +1,301 @@
+"""
+HTTP load harness for the claims API.
+
+By default it boots ``create_app()`` under uvicorn in-process, against the
+offline stand-ins in ``tests.stand_ins`` (mongomock, fake Ollama, ground-
+truth OCR), seeds stored claims for the read endpoints and drives a
+traffic profile with a fixed number of closed-loop virtual users. Pass
+``--target`` to drive an already running server instead; uploads are then
+synthetic documents, or existing ones with ``--documents``.
+
+    python -m tests.loadtest --profile mixed --users 16 --duration 30
+    python -m tests.loadtest --target http://localhost:8000 --profile read_heavy --report load.json
+    python -m tests.loadtest --target http://localhost:8000 --documents sample_docs/
+"""
+import argparse
+import asyncio
+import json
+import mimetypes
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+
+PROFILES = {
+    "read_heavy": {"reviewer_queue": 0.45, "admin_dashboard": 0.45, "submit_upload": 0.10},
+    "mixed": {"reviewer_queue": 0.35, "admin_dashboard": 0.35, "submit_upload": 0.30},
+    "write_heavy": {"reviewer_queue": 0.10, "admin_dashboard": 0.10, "submit_upload": 0.80},
+}
+
+STATUSES = ("APPROVED", "REJECTED", "PENDING_REVIEW", "FLAGGED_FOR_REVIEW", "ESCALATED_FRAUD_REVIEW")
+CLAIM_TYPES = ("Health", "Motor", "Property")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_stored_claims(claims_collection, count, seed=11):
+    """Insert ``count`` already-decided claims so the read endpoints have data to scan."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    docs = []
+    for index in range(count):
+        fraud_score = round(rng.random(), 3)
+        docs.append({
+            "claim_id": f"SEED-{index:06d}",
+            "claim_type": rng.choice(CLAIM_TYPES),
+            "claim_amount": float(rng.randrange(1000, 500000)),
+            "policy_number": f"POL-{rng.randrange(1000):04d}",
+            "claimer": {"name": f"Claimer {index % 500}", "email": f"claimer{index % 500}@example.com"},
+            "status": rng.choice(STATUSES),
+            "fraud_score": fraud_score,
+            "risk_score": fraud_score,
+            "processing_minutes": round(rng.uniform(0.5, 20), 2),
+            "created_at": now - timedelta(minutes=index),
+            "updated_at": now - timedelta(minutes=index),
+        })
+    if docs:
+        claims_collection.insert_many(docs)
+
+
+class LocalStack:
+    """uvicorn serving ``create_app()`` on a free port, wired to the offline stand-ins."""
+
+    def __init__(self, seed_claims=2000, ollama_latency_s=0.0, documents=8):
+        self.seed_claims = seed_claims
+        self.ollama_latency_s = ollama_latency_s
+        self.documents = documents
+        self.workdir = tempfile.TemporaryDirectory(prefix="loadtest-")
+        self.claims = []
+        self._server = None
+        self._thread = None
+        self._ollama = None
+        self._mongo = None
+
+    def start(self):
+        os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+        os.environ["MONGODB_URI"] = "mongodb://localhost:27017"
+        os.environ.setdefault("CHECKPOINT_BACKEND", "none")
+        os.environ.setdefault("TRACING_BACKEND", "off")
+
+        from tests.stand_ins import FakeOcrProvider, FakeOllamaServer, generate_claims, patch_mongo, seed_policy
+
+        self._mongo = patch_mongo()
+        self._ollama = FakeOllamaServer(latency_s=self.ollama_latency_s).start()
+
+        import uvicorn
+
+        from app.database.mongo import claims_collection, policies_collection
+        from app.main import create_app
+        from app.services.llm_service import llm_service
+        from app.services.ocr_service import OCR_PROVIDERS_ENV, register_provider
+
+        llm_service.base_url = self._ollama.base_url
+        register_provider(FakeOcrProvider())
+        os.environ[OCR_PROVIDERS_ENV] = "fake"
+        seed_policy(policies_collection)
+        seed_stored_claims(claims_collection, self.seed_claims)
+
+        # uploads are written relative to the working directory
+        os.chdir(self.workdir.name)
+        self.claims = generate_claims(os.path.join(self.workdir.name, "docs"), self.documents)
+
+        port = _free_port()
+        config = uvicorn.Config(create_app(), host="127.0.0.1", port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.05)
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join(timeout=10)
+        if self._ollama:
+            self._ollama.stop()
+        if self._mongo:
+            self._mongo.stop()
+
+
+def _auth_headers():
+    from app.core.security import create_access_token
+
+    token = create_access_token({"sub": "loadtest@example.com", "role": "Claimer"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _documents_payload(claims, rng):
+    _, paths = rng.choice(claims)
+    files = []
+    for path in paths:
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        with open(path, "rb") as handle:
+            files.append(("files", (os.path.basename(path), handle.read(), content_type)))
+    return files
+
+
+def upload_claims(documents=None):
+    """
+    Claims to upload against ``--target``: the existing documents under
+    ``documents`` (a directory tree or CSV/JSONL manifest, grouped as by
+    the batch runner), or eight synthetic claims written to a temp directory.
+    """
+    if documents:
+        from app.services.batch_runner import load_jobs
+
+        claims = load_jobs(documents)
+        if not claims:
+            raise SystemExit(f"No PDF or image documents found in {documents}")
+        return claims
+
+    from tests.stand_ins import generate_claims
+
+    return generate_claims(tempfile.mkdtemp(prefix="loadtest-docs-"), 8)
+
+
+async def _request(client, operation, claims, rng):
+    if operation == "reviewer_queue":
+        return await client.get("/api/reviewer/queue", params={"fraud_threshold": 0.6, "limit": 50})
+    if operation == "admin_dashboard":
+        return await client.get("/api/admin/dashboard")
+    return await client.post(
+        "/api/claims/submit-upload",
+        files=_documents_payload(claims, rng),
+        # a distinct claimer per upload, or identical resubmissions are deduplicated
+        data={"claim_type": "Motor", "claimer_email": f"loadtest+{rng.randrange(10**9)}@example.com"},
+    )
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index] * 1000, 2)
+
+
+def summarize(samples, elapsed):
+    """Per-operation and overall latency (ms), throughput, error rate and 429s."""
+    grouped = defaultdict(list)
+    for sample in samples:
+        grouped[sample["operation"]].append(sample)
+    grouped["all"] = samples
+
+    report = {}
+    for operation, rows in grouped.items():
+        latencies = sorted(row["latency_s"] for row in rows)
+        errors = sum(1 for row in rows if not row["ok"])
+        report[operation] = {
+            "requests": len(rows),
+            "errors": errors,
+            # admission control turning work away, included in errors
+            "rejected_429": sum(1 for row in rows if row["status"] == 429),
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "rps": round(len(rows) / elapsed, 2) if elapsed else None,
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "p99_ms": _percentile(latencies, 99),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+        }
+    return report
+
+
+async def drive(base_url, profile, users, duration_s, claims, think_time_s=0.0, seed=3, timeout_s=120.0):
+    import httpx
+
+    weights = PROFILES[profile]
+    operations = list(weights)
+    headers = _auth_headers()
+    samples = []
+    deadline = time.perf_counter() + duration_s
+
+    async def user(index, client):
+        rng = random.Random(seed + index)
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights=[weights[op] for op in operations])[0]
+            started = time.perf_counter()
+            try:
+                response = await _request(client, operation, claims, rng)
+                ok = response.status_code < 400
+                status = response.status_code
+            except httpx.HTTPError as exc:
+                ok, status = False, type(exc).__name__
+            samples.append({
+                "operation": operation,
+                "latency_s": time.perf_counter() - started,
+                "ok": ok,
+                "status": status,
+            })
+            if think_time_s:
+                await asyncio.sleep(rng.expovariate(1 / think_time_s))
+
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout_s, limits=limits) as client:
+        await asyncio.gather(*(user(index, client) for index in range(users)))
+    return samples, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the claims API")
+    parser.add_argument("--target", help="Base URL of a running server. Boots a local stack when omitted.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent closed-loop virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of traffic")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between a user's requests (s)")
+    parser.add_argument("--seed-claims", type=int, default=2000, help="Local stack: stored claims for the read endpoints")
+    parser.add_argument("--ollama-latency", type=float, default=0.0, help="Local stack: fake Ollama delay per call (s)")
+    parser.add_argument(
+        "--documents",
+        default=None,
+        help="With --target: upload these existing documents (directory or CSV/JSONL manifest) "
+        "instead of synthetic ones",
+    )
+    parser.add_argument("--report", help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+    if args.documents and not args.target:
+        parser.error("--documents needs --target; the local stack uploads its synthetic claims")
+
+    stack = None
+    if args.target:
+        base_url = args.target
+        claims = upload_claims(args.documents)
+    else:
+        stack = LocalStack(seed_claims=args.seed_claims, ollama_latency_s=args.ollama_latency).start()
+        base_url = stack.base_url
+        claims = stack.claims
+
+    try:
+        samples, elapsed = asyncio.run(
+            drive(base_url, args.profile, args.users, args.duration, claims, think_time_s=args.think_time)
+        )
+    finally:
+        if stack:
+            stack.stop()
+
+    report = {
+        "target": args.target or "local",
+        "profile": args.profile,
+        "users": args.users,
+        "duration_s": round(elapsed, 2),
+        "operations": summarize(samples, elapsed),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Offline stand-ins for the services the claim pipeline talks to.
+
+- ``FakeOllamaServer``: a deterministic ``/api/generate`` endpoint on a
+  local port. Extraction prompts (single or combined per claim) are
+  answered from the ``Key: value`` lines of the OCR text, analysis prompts
+  with a fixed low-risk verdict. Latency can model a real server: a fixed
+  cost, a cost per 1k prompt characters and a cap on parallel requests
+  (OLLAMA_NUM_PARALLEL).
+- ``patch_mongo()``: swaps ``pymongo.MongoClient`` for mongomock before the
+  app is imported, so every module-level client shares one in-memory store.
+- ``generate_claims()``: synthetic claim documents (PNG images with known
+  ground-truth text) plus ``fake_ocr`` which returns that text, so runs do
+  not depend on a Tesseract install. ``FakeOcrProvider`` serves it as the
+  ``fake`` OCR provider.
+"""
+import contextlib
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import mongomock
+
+from app.services.ocr_service import OcrPage, OcrProvider, OcrResult
+
+
+FIELD_PATTERN = re.compile(r"^\s*([A-Za-z ]+):\s*(.+?)\s*$", re.M)
+# characters per streamed token
+TOKEN_CHARS = 4
+DOCUMENT_HEADER = re.compile(r"^\s*### Document \d+ \([^)]*\)\s*$", re.M)
+
+EXTRACTION_KEYS = {
+    "name": "claimer_name",
+    "email": "claimer_email",
+    "phone": "claimer_phone",
+    "address": "claimer_address",
+    "policy number": "policy_number",
+    "amount": "amount",
+    "date": "date",
+}
+
+ANALYSIS_RESPONSE = {
+    "risk_level": "LOW",
+    "fraud_indicators": [],
+    "reasoning": "Synthetic claim; no anomalies detected by the stand-in model.",
+    "extraction_confidence": 0.9,
+}
+
+
+def _extract_fields(text):
+    fields = {"summary": text.strip().splitlines()[0] if text.strip() else ""}
+    for key, value in FIELD_PATTERN.findall(text):
+        mapped = EXTRACTION_KEYS.get(key.strip().lower())
+        if mapped:
+            fields[mapped] = value
+    return fields
+
+
+def answer_prompt(prompt):
+    """Deterministic JSON answer for the prompts LLMService sends."""
+    if DOCUMENT_HEADER.search(prompt):
+        sections = DOCUMENT_HEADER.split(prompt.split("Documents:", 1)[1])[1:]
+        return {"documents": [_extract_fields(section) for section in sections]}
+    if "OCR Text:" in prompt:
+        return _extract_fields(prompt.split("OCR Text:", 1)[1])
+    return ANALYSIS_RESPONSE
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    # chunked streaming and keep-alive, as Ollama serves them
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        prompt = body.get("prompt", "")
+        server = self.server
+        with server.counter_lock:
+            server.requests += 1
+
+        answer = json.dumps(server.answer(prompt))
+        tokens = [answer[start:start + TOKEN_CHARS] for start in range(0, len(answer), TOKEN_CHARS)]
+        # a model that keeps emitting whitespace after the object, until num_predict
+        tokens += ["\n"] * server.trailing_tokens
+        num_predict = (body.get("options") or {}).get("num_predict")
+        if num_predict:
+            tokens = tokens[:num_predict]
+        prefill = server.latency_s + server.latency_per_1k_chars * len(prompt) / 1000
+
+        with server.slots:
+            if body.get("stream", True):
+                self._stream(body.get("model"), tokens, prefill)
+                return
+            if prefill or server.token_latency_s:
+                time.sleep(prefill + server.token_latency_s * len(tokens))
+        payload = json.dumps({"model": body.get("model"), "response": "".join(tokens), "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, model, tokens, prefill):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if prefill:
+            time.sleep(prefill)
+        try:
+            for token in tokens:
+                if self.server.token_latency_s:
+                    time.sleep(self.server.token_latency_s)
+                self._write_chunk(json.dumps({"model": model, "response": token, "done": False}).encode() + b"\n")
+            self._write_chunk(json.dumps({"model": model, "response": "", "done": True}).encode() + b"\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # the client hung up; Ollama aborts the generation here
+            with self.server.counter_lock:
+                self.server.cancelled += 1
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeOllamaServer:
+    """
+    Local Ollama stand-in. Each request sleeps ``latency_s`` plus
+    ``latency_per_1k_chars`` per 1000 prompt characters (prompt processing),
+    then ``token_latency_s`` per generated token, with at most ``parallel``
+    requests being answered at once (``None``: unlimited). The answer is
+    followed by ``trailing_tokens`` of whitespace, as a model does when it
+    keeps generating after its JSON is complete. ``answer`` replaces
+    ``answer_prompt`` to script a misbehaving model.
+    """
+
+    def __init__(
+        self,
+        latency_s=0.0,
+        latency_per_1k_chars=0.0,
+        parallel=None,
+        token_latency_s=0.0,
+        trailing_tokens=0,
+        answer=answer_prompt,
+    ):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaHandler)
+        self._server.answer = answer
+        self._server.latency_s = latency_s
+        self._server.latency_per_1k_chars = latency_per_1k_chars
+        self._server.token_latency_s = token_latency_s
+        self._server.trailing_tokens = trailing_tokens
+        self._server.slots = threading.BoundedSemaphore(parallel) if parallel else contextlib.nullcontext()
+        self._server.counter_lock = threading.Lock()
+        self._server.requests = 0
+        self._server.cancelled = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        return self._server.requests
+
+    @property
+    def cancelled(self):
+        return self._server.cancelled
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _accept_bulk_sort():
+    # pymongo >= 4.11 passes ``sort=`` to the bulk builder for ReplaceOne/UpdateOne,
+    # which mongomock's builder does not accept yet
+    builder = mongomock.collection.BulkOperationBuilder
+    if getattr(builder, "_accepts_sort", False):
+        return
+    add_update, add_replace = builder.add_update, builder.add_replace
+
+    def update(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+
+    def replace(self, *args, sort=None, **kwargs):
+        return add_replace(self, *args, **kwargs)
+
+    builder.add_update, builder.add_replace, builder._accepts_sort = update, replace, True
+
+
+def patch_mongo():
+    """Start (and return) a patcher that makes every MongoClient a shared mongomock client."""
+    _accept_bulk_sort()
+    patcher = mongomock.patch(servers=(("localhost", 27017),))
+    patcher.start()
+    return patcher
+
+
+POLICY_NUMBER = "MOT-12345678"
+
+
+def seed_policy(policies_collection):
+    policies_collection.delete_many({"policyNumber": POLICY_NUMBER})
+    policies_collection.insert_one({
+        "policyNumber": POLICY_NUMBER,
+        "policyType": "motor",
+        "holderName": "JOHN SMITH",
+        "effectiveDate": datetime(2026, 1, 1),
+        "expiryDate": datetime(2026, 12, 31),
+        "sumInsured": 500000,
+        "coverageDetails": {"deductible": 5000, "limits": {"ownDamage": 500000}},
+        "exclusions": [
+            "Driving under influence of alcohol",
+            "Commercial use of vehicle",
+            "Intentional damage",
+            "Racing",
+        ],
+    })
+
+
+FIRST_NAMES = ("John", "Asha", "Ravi", "Meera", "Karan", "Priya", "Vikram", "Neha")
+LAST_NAMES = ("Smith", "Rao", "Iyer", "Shah", "Gupta", "Nair", "Das", "Mehta")
+
+# file name -> ground-truth text of every synthetic document written
+_GROUND_TRUTH = {}
+
+
+def _claim_texts(index, rng):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    email = f"{name.lower().replace(' ', '.')}{index}@example.com"
+    phone = f"9{rng.randrange(10**8, 10**9)}"
+    address = f"{rng.randrange(1, 500)} MG Road, Pune"
+    amount = rng.randrange(5000, 400000)
+    date = f"{rng.randrange(1, 28):02d}/{rng.randrange(1, 12):02d}/2026"
+    contact = f"Name: {name}\nEmail: {email}\nPhone: {phone}\nAddress: {address}\n"
+    return {
+        "policy": f"MOTOR POLICY SCHEDULE\nPolicy Number: {POLICY_NUMBER}\n{contact}",
+        "bill": f"INVOICE\nGarage repair total\nAmount: {amount}\nDate: {date}\n{contact}",
+        "report": f"INCIDENT REPORT\nRear-end collision at a signal\nDate: {date}\n{contact}",
+    }
+
+
+def _render_png(path, text):
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        path.write_bytes(b"")
+        return
+    image = Image.new("L", (900, 40 + 28 * len(text.splitlines())), color=255)
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(text.splitlines()):
+        draw.text((20, 20 + 28 * row), line, fill=0)
+    image.save(path)
+
+
+def generate_claims(root, count, seed=7):
+    """
+    Write ``count`` synthetic claims (policy, bill and incident report
+    images) under ``root``. Returns ``[(claim_id, [paths])]``.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    claims = []
+    for index in range(count):
+        claim_id = f"BENCH-{index:05d}"
+        paths = []
+        for kind, text in _claim_texts(index, rng).items():
+            path = root / f"{claim_id}_{kind}.png"
+            if not path.exists():
+                _render_png(path, text)
+            _GROUND_TRUTH[path.name] = text
+            paths.append(str(path))
+        claims.append((claim_id, paths))
+    return claims
+
+
+def photo_variant(path, out_path, angle=3.0, scale=3.0, shading=60):
+    """
+    Re-shoot a synthetic document like a phone photo: enlarged, rotated by
+    ``angle`` degrees and lit unevenly. The ground truth carries over.
+    """
+    import cv2
+    import numpy as np
+
+    image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+    image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    height, width = image.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    image = cv2.warpAffine(image, matrix, (width, height), borderValue=255)
+    gradient = np.linspace(0, shading, width, dtype=np.float32)[None, :]
+    image = np.clip(image.astype(np.float32) - gradient, 0, 255).astype(np.uint8)
+    cv2.imwrite(str(out_path), image)
+    _GROUND_TRUTH[Path(out_path).name] = _GROUND_TRUTH[Path(path).name]
+    return str(out_path)
+
+
+def fake_ocr(path):
+    """Ground-truth text for a synthetic document, standing in for Tesseract."""
+    name = Path(path).name
+    # uploads are stored as "<timestamp>_<hex>_<original name>"
+    for candidate in (name, name.split("_", 2)[-1]):
+        if candidate in _GROUND_TRUTH:
+            return _GROUND_TRUTH[candidate]
+    return hashlib.md5(name.encode()).hexdigest()
+
+
+class FakeOcrProvider(OcrProvider):
+    """Deterministic OCR: one page holding the document's ground truth, full confidence."""
+
+    name = "fake"
+
+    def recognize(self, path):
+        return OcrResult(provider=self.name, pages=[OcrPage(text=fake_ocr(path), confidence=1.0)])
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
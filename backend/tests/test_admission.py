@@ -0,0 +1,107 @@
+"""Admission gates: round-robin hand-off between claimers, bounded queues and 429 + Retry-After."""
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes_claims
+from app.core.admission import AdmissionRejected, Gate
+from app.core.dependencies import get_current_user
+from app.core.roles import APP_ROLE_ENV
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out waiting for the gate"
+        time.sleep(0.005)
+
+
+def _queue(gate, key, granted):
+    """Start a thread that waits on ``gate`` as ``key``; returns once it is queued."""
+    queued = gate.snapshot()["queued"]
+
+    def wait():
+        gate.acquire(key)
+        granted.append(key)
+
+    thread = threading.Thread(target=wait, daemon=True)
+    thread.start()
+    _wait_until(lambda: gate.snapshot()["queued"] == queued + 1)
+    return thread
+
+
+def test_released_slots_go_round_robin_across_claimers():
+    gate = Gate("test_fair", 1, timeout=5)
+    gate.acquire("holder")
+    granted = []
+    threads = [_queue(gate, key, granted) for key in ("alice", "alice", "alice", "bob", "carol")]
+
+    for count in range(1, 6):
+        gate.release()
+        _wait_until(lambda: len(granted) == count)
+
+    # alice queued three requests first, but bob and carol are served before her second
+    assert granted == ["alice", "bob", "carol", "alice", "alice"]
+    assert gate.snapshot()["queued"] == 0 and gate.snapshot()["in_use"] == 1
+    for thread in threads:
+        thread.join()
+
+
+def test_full_queues_and_timeouts_reject_with_a_retry_after():
+    gate = Gate("test_full", 1, queue_size=2, per_key_queue=1, timeout=5)
+    gate.acquire("holder")
+    granted = []
+    threads = [_queue(gate, "alice", granted)]
+
+    with pytest.raises(AdmissionRejected) as claimer_full:
+        gate.acquire("alice")
+    assert claimer_full.value.reason == "claimer_queue_full"
+
+    threads.append(_queue(gate, "bob", granted))
+    with pytest.raises(AdmissionRejected) as queue_full:
+        gate.acquire("carol")
+    assert queue_full.value.reason == "queue_full"
+    # five-second average hold, two queued ahead of the next caller, one slot
+    assert queue_full.value.retry_after == 15
+
+    busy = Gate("test_timeout", 1)
+    busy.acquire("holder")
+    with pytest.raises(AdmissionRejected) as timed_out:
+        busy.acquire("alice", timeout=0.01)
+    assert timed_out.value.reason == "timeout" and busy.snapshot()["queued"] == 0
+
+    gate.release()
+    gate.release()
+    for thread in threads:
+        thread.join()
+    assert granted == ["alice", "bob"]
+
+
+def test_a_saturated_pipeline_returns_429_with_retry_after(monkeypatch):
+    from app.main import app
+
+    gate = Gate("test_api", 1, queue_size=0)
+    gate.acquire("someone-else")
+    monkeypatch.setattr(routes_claims, "pipeline_slots", gate)
+    monkeypatch.setenv(APP_ROLE_ENV, "all")
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "alice"}
+    try:
+        response = TestClient(app).post("/api/claims/CL-BUSY/resume")
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+    assert response.status_code == 429
+    assert "queue_full" in response.json()["detail"]
+    assert response.headers["Retry-After"] == str(gate.retry_after())
+
+
+def test_capacity_reports_the_serving_process():
+    from app.main import app
+
+    body = TestClient(app).get("/api/admin/capacity").json()
+
+    assert body["process"]["pid"] == os.getpid() and body["process"]["scope"] == "process"
+    assert set(body["gates"]) == {"pipeline", "ocr", "llm"}
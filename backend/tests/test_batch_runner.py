@@ -0,0 +1,135 @@
+"""Batch runner: manifests, persistence through claim_processing, the progress ledger and resume."""
+import json
+
+import pytest
+
+from app.database import feature_store
+from app.services.batch_runner import ProgressLedger, jobs_from_directory, jobs_from_manifest, run_batch
+
+
+PREFIX = "BATCH-"
+
+
+def _state(claim_id, amount):
+    return {
+        "claim_id": claim_id,
+        "node1_output": {"documents": [{
+            "file": f"{claim_id}.png",
+            "document_type": "bill",
+            "extracted_text": "",
+            "structured_fields": {"amount": f"Rs. {amount}", "policy_number": "MOT-12345678", "claimer_name": claim_id},
+        }]},
+        "node2_output": {"consistency_score": 0.9},
+        "node3_output": {"is_covered": True, "covered_amount": amount},
+        "node4_output": {"fraud_score": 0.2},
+        "node7_output": {"final_status": "APPROVED", "reason": "ok"},
+    }
+
+
+class _Workflow:
+    """Records calls; claims listed in ``failing`` raise."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def __call__(self, claim_id, document_paths):
+        self.calls.append(claim_id)
+        if claim_id in self.failing:
+            raise RuntimeError("OCR timed out")
+        return _state(claim_id, 1000 * len(self.calls))
+
+
+@pytest.fixture
+def claims_dir(tmp_path):
+    from app.database.mongo import claims_collection
+
+    selector = {"claim_id": {"$regex": f"^{PREFIX}"}}
+    claims_collection.delete_many(selector)
+    feature_store.claim_features_collection.delete_many(selector)
+    root = tmp_path / "claims"
+    for index in range(4):
+        claim = root / f"{PREFIX}{index}"
+        claim.mkdir(parents=True)
+        (claim / "bill.png").write_bytes(b"png")
+        (claim / "notes.txt").write_text("ignored")
+    yield root
+    claims_collection.delete_many(selector)
+    feature_store.claim_features_collection.delete_many(selector)
+
+
+def test_manifests_group_documents_per_claim(tmp_path):
+    (tmp_path / "a.png").write_bytes(b"png")
+    csv_manifest = tmp_path / "claims.csv"
+    csv_manifest.write_text("claim_id,file_path\nC1,a.png\nC1,/abs/b.pdf\nC2,c.jpg\n,skipped.png\n")
+    jsonl_manifest = tmp_path / "claims.jsonl"
+    jsonl_manifest.write_text('{"claim_id": "C1", "documents": ["a.png"]}\n\n{"claim_id": "C2", "path": "c.jpg"}\n')
+
+    assert jobs_from_manifest(csv_manifest) == [("C1", [str(tmp_path / "a.png"), "/abs/b.pdf"]), ("C2", [str(tmp_path / "c.jpg")])]
+    assert jobs_from_manifest(jsonl_manifest) == [("C1", [str(tmp_path / "a.png")]), ("C2", [str(tmp_path / "c.jpg")])]
+    assert jobs_from_directory(tmp_path) == [("a", [str(tmp_path / "a.png")])]
+
+
+def test_ledger_keeps_the_latest_status_and_skips_torn_lines(tmp_path):
+    ledger = ProgressLedger(tmp_path / "run.ledger")
+    assert ledger.completed() == set()
+
+    ledger.record("A", "ok")
+    ledger.record("B", "ok")
+    ledger.record("B", "failed")
+    with ledger.path.open("a", encoding="utf-8") as handle:
+        handle.write('{"claim_id": "C", "sta')
+
+    assert ledger.completed() == {"A"}
+
+
+def test_results_are_persisted_like_any_claim(claims_dir, tmp_path):
+    from app.database.mongo import claims_collection
+
+    output = tmp_path / "results.jsonl"
+    summary = run_batch(claims_dir, str(output), workers=2, workflow=_Workflow())
+
+    assert summary["processed"] == 4 and summary["succeeded"] == 4
+    stored = {claim["claim_id"]: claim for claim in claims_collection.find({"claim_id": {"$regex": f"^{PREFIX}"}})}
+    assert sorted(stored) == [f"{PREFIX}{index}" for index in range(4)]
+    claim = stored[f"{PREFIX}1"]
+    assert claim["status"] == "APPROVED" and claim["fraud_score"] == 0.2
+    assert claim["document_paths"] == [str(claims_dir / f"{PREFIX}1" / "bill.png")]
+    rows = feature_store.load_feature_rows(stored)
+    assert len(rows) == 4 and all(row["fraud_score"] == 0.2 for row in rows.values())
+    assert len(output.read_text().splitlines()) == 4
+
+
+def test_an_interrupted_run_resumes_where_it_stopped(claims_dir, tmp_path):
+    from app.database.mongo import claims_collection
+
+    output = tmp_path / "results.jsonl"
+    first = run_batch(claims_dir, str(output), workers=2, workflow=_Workflow(failing={f"{PREFIX}2"}))
+
+    assert first["succeeded"] == 3 and first["failed"] == 1
+    assert claims_collection.count_documents({"claim_id": f"{PREFIX}2"}) == 0
+    assert ProgressLedger(f"{output}.ledger").completed() == {f"{PREFIX}{index}" for index in (0, 1, 3)}
+
+    retry = _Workflow()
+    second = run_batch(claims_dir, str(output), workers=2, workflow=retry)
+
+    assert retry.calls == [f"{PREFIX}2"]
+    assert second["skipped"] == 3 and second["succeeded"] == 1
+    assert claims_collection.count_documents({"claim_id": {"$regex": f"^{PREFIX}"}}) == 4
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [record["status"] for record in records].count("failed") == 1 and len(records) == 5
+
+
+def test_a_claim_that_cannot_be_stored_is_not_marked_done(claims_dir, tmp_path, monkeypatch):
+    from app.services import claim_processing
+
+    def broken(claim_id, final_state, document_paths=None):
+        raise ConnectionError("mongo unavailable")
+
+    monkeypatch.setattr(claim_processing, "persist_resumed_claim", broken)
+    output = tmp_path / "results.jsonl"
+
+    summary = run_batch(claims_dir, str(output), workers=1, workflow=_Workflow())
+
+    assert summary["failed"] == 4
+    assert ProgressLedger(f"{output}.ledger").completed() == set()
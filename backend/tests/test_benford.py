@@ -0,0 +1,141 @@
+"""Benford engine: digit extraction, chi-square/MAD, observation and backfill."""
+import math
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.nodes.node4_fraud_detection import benford
+from app.nodes.node4_fraud_detection.benford import EXPECTED, BenfordEngine, benford_tests, digit_histogram, first_digits
+from app.nodes.node4_fraud_detection.history_sync import SYNC_ENV
+
+
+def test_first_digits():
+    amounts = [0.5, 1, 19, 230.7, -4000, float("nan"), float("inf"), 9999.99]
+    assert first_digits(amounts).tolist() == [1, 1, 2, 4, 9]
+    assert first_digits([]).size == 0
+    assert digit_histogram([1, 10, 100, 2, 9]).tolist() == [3, 1, 0, 0, 0, 0, 0, 0, 1]
+
+
+def test_chi_square_and_mad():
+    benford_counts = np.round(EXPECTED * 10_000)
+    uniform = np.full(9, 100)
+    empty = np.zeros(9)
+
+    tests = benford_tests([benford_counts, uniform, empty])
+
+    assert tests["samples"].tolist() == [benford_counts.sum(), 900, 0]
+    assert tests["chi2"][0] < 0.1 and tests["mad"][0] < 1e-4
+
+    probabilities = [math.log10(1 + 1 / digit) for digit in range(1, 10)]
+    chi2 = sum((100 - 900 * p) ** 2 / (900 * p) for p in probabilities)
+    mad = sum(abs(1 / 9 - p) for p in probabilities) / 9
+    assert tests["chi2"][1] == pytest.approx(chi2)
+    assert tests["mad"][1] == pytest.approx(mad)
+    assert tests["chi2"][2] == 0.0 and tests["mad"][2] == 0.0
+
+
+def test_observe_counts_each_claim_once():
+    engine = BenfordEngine()
+    keys = {"claimant": "A@X.COM", "provider": None, "policy": "MOT-1"}
+
+    assert engine.observe("C1", keys, 1200)
+    assert not engine.observe("C1", keys, 1200)
+    # no claim id: a repeat cannot be told from a new claim, so nothing is recorded
+    assert not engine.observe(None, keys, 1200)
+    assert not engine.observe(None, keys, 1200)
+    assert engine.observe("C2", keys, 310)
+
+    results = {result["scope"]: result for result in engine.evaluate(keys)}
+    assert set(results) == {"claimant", "policy"}
+    assert results["claimant"]["samples"] == 2
+
+    # cached until the key changes again
+    engine.observe("C3", keys, 45)
+    assert {result["samples"] for result in engine.evaluate(keys)} == {3}
+
+
+def test_backfill_matches_observe():
+    records = [
+        (f"C{index}", {"claimant": f"P{index % 3}", "provider": "HOSP", "policy": None}, amount)
+        for index, amount in enumerate([1200, 130, 99, 4500, 1100, 870, 15, 2300, 1999])
+    ]
+    observed = BenfordEngine()
+    assert observed.observe_many(records) == len(records)
+
+    rebuilt = BenfordEngine()
+    # duplicates and id-less records are skipped like observe skips them
+    assert rebuilt.backfill(records + records[:2] + [(None, {"claimant": "P0"}, 100)]) == len(records)
+
+    keys = {"claimant": "P0", "provider": "HOSP"}
+    assert rebuilt.evaluate(keys) == observed.evaluate(keys)
+    assert not rebuilt.observe("C0", keys, 1200)
+
+
+def test_benford_risk_flags_a_nonconforming_history(monkeypatch):
+    monkeypatch.setenv(SYNC_ENV, "0")
+    monkeypatch.setenv(benford.MIN_SAMPLES_ENV, "30")
+    engine = BenfordEngine()
+    monkeypatch.setattr(benford, "benford_engine", engine)
+
+    # every amount starts with 9: far from Benford
+    engine.backfill(
+        (f"H{index}", {"claimant": "FRAUD@X.COM"}, 9000 + index) for index in range(40)
+    )
+    features = SimpleNamespace(claimant_email="fraud@x.com", claimant_name=None, provider=None, policy_number=None, claim_amount=9500)
+
+    hits = benford.benford_risk("NEW-1", features)
+
+    assert [hit["scope"] for hit in hits] == ["claimant"]
+    assert hits[0]["samples"] == 41
+
+
+def test_live_and_stored_claims_get_the_same_scope_keys(monkeypatch):
+    from app.core.claim_features import ClaimFeatures
+    from app.database.feature_store import claim_features_collection
+    from app.database.mongo import claims_collection
+    from app.services.claim_processing import persist_claim, persist_resumed_claim
+
+    monkeypatch.setenv(SYNC_ENV, "0")
+    live = BenfordEngine()
+    monkeypatch.setattr(benford, "benford_engine", live)
+
+    def node1(**fields):
+        fields = {"amount": "Rs. 1,840", "policy_number": "HLT-20240001", "provider": " City Hospital ", **fields}
+        return {"documents": [{"document_type": "bill", "structured_fields": fields, "extracted_text": ""}]}
+
+    submissions = [
+        ("BEN-S1", node1(claimer_email="asha@x.com"), {"name": "Asha", "email": "asha@x.com"}),
+        # nothing extracted: the submitted claimer is the claimant
+        ("BEN-S2", node1(), {"name": "Ravi", "email": "Ravi@X.com "}),
+    ]
+    selector = {"claim_id": {"$regex": "^BEN-"}}
+    try:
+        for claim_id, output, claimer in submissions:
+            benford.benford_risk(claim_id, ClaimFeatures.from_node1_output(output), claimer)
+            # the submitted amount and policy differ from the extracted ones the live path used
+            claim = {"claim_type": "Health", "claim_amount": 99.0, "policy_number": "HLT-1", "claimer": claimer, "document_paths": []}
+            persist_claim(claim, {"node1_output": output}, claim_id)
+        # a batch claim is stored with the placeholder claimer, which is not a claimant
+        batch = node1(claimer_name="Meera")
+        benford.benford_risk("BEN-S3", ClaimFeatures.from_node1_output(batch))
+        persist_resumed_claim("BEN-S3", {"node1_output": batch})
+
+        stored = [record for record in benford.iter_stored_amounts() if record[0].startswith("BEN-")]
+    finally:
+        claims_collection.delete_many(selector)
+        claim_features_collection.delete_many(selector)
+
+    assert sorted(stored) == [
+        ("BEN-S1", {"claimant": "ASHA@X.COM", "provider": "CITY HOSPITAL", "policy": "HLT-20240001"}, 1840.0),
+        ("BEN-S2", {"claimant": "RAVI@X.COM", "provider": "CITY HOSPITAL", "policy": "HLT-20240001"}, 1840.0),
+        ("BEN-S3", {"claimant": "MEERA", "provider": "CITY HOSPITAL", "policy": "HLT-20240001"}, 1840.0),
+    ]
+    rebuilt = BenfordEngine()
+    rebuilt.backfill(stored)
+    keys = [scope_keys for _, scope_keys, _ in stored]
+    assert rebuilt.snapshot()["rows"] == live.snapshot()["rows"]
+    assert [rebuilt.evaluate(scope_keys) for scope_keys in keys] == [live.evaluate(scope_keys) for scope_keys in keys]
+    assert benford.claim_scope_keys(ClaimFeatures(), {"name": "Unknown Claimer", "email": "unknown@example.com"}) == {
+        "claimant": None, "provider": None, "policy": None,
+    }
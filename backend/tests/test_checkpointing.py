@@ -0,0 +1,131 @@
+"""Workflow checkpoints: backend selection per role, resume after a failure, re-run from a node, pruning."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core import checkpointing, langgraph_builder
+from app.core.checkpointing import (
+    CHECKPOINT_BACKEND_ENV,
+    CheckpointConfigError,
+    get_checkpoint_backend,
+    prune_checkpoints,
+    validate_checkpoint_backend,
+)
+from app.core.roles import APP_ROLE_ENV
+
+
+@pytest.fixture
+def memory_workflow(monkeypatch):
+    """The shared workflow, compiled against a fresh in-memory saver."""
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    app = langgraph_builder.build_claim_workflow(checkpointer=InMemorySaver())
+    monkeypatch.setattr(langgraph_builder, "_workflow", app)
+    return app
+
+
+@pytest.mark.parametrize("role, configured, expected", [
+    ("all", None, "sqlite"),
+    ("api", None, "mongo"),
+    ("worker", None, "mongo"),
+    ("worker", "none", "none"),
+    ("all", "memory", "memory"),
+])
+def test_backend_defaults_per_role(monkeypatch, role, configured, expected):
+    monkeypatch.setenv(APP_ROLE_ENV, role)
+    if configured:
+        monkeypatch.setenv(CHECKPOINT_BACKEND_ENV, configured)
+    else:
+        monkeypatch.delenv(CHECKPOINT_BACKEND_ENV, raising=False)
+
+    assert get_checkpoint_backend() == expected
+    assert validate_checkpoint_backend() == expected
+
+
+@pytest.mark.parametrize("role", ["api", "worker"])
+@pytest.mark.parametrize("backend", ["sqlite", "memory"])
+def test_split_roles_refuse_process_local_backends(monkeypatch, role, backend):
+    monkeypatch.setenv(APP_ROLE_ENV, role)
+    monkeypatch.setenv(CHECKPOINT_BACKEND_ENV, backend)
+    monkeypatch.setattr(checkpointing, "_initialized", False)
+
+    with pytest.raises(CheckpointConfigError, match=f"APP_ROLE={role}"):
+        validate_checkpoint_backend()
+    with pytest.raises(CheckpointConfigError):
+        checkpointing.get_checkpointer()
+
+
+def test_a_failed_run_resumes_from_the_last_completed_node(synthetic_claims, memory_workflow, monkeypatch):
+    claim_id, paths = synthetic_claims[0]
+    real_predictive = langgraph_builder.predictive_analysis
+    fraud_calls = []
+
+    def failing(*args, **kwargs):
+        raise RuntimeError("model store unavailable")
+
+    def counted_fraud(*args, **kwargs):
+        fraud_calls.append(kwargs.get("claim_id"))
+        return real_fraud(*args, **kwargs)
+
+    real_fraud = langgraph_builder.fraud_detection
+    monkeypatch.setattr(langgraph_builder, "fraud_detection", counted_fraud)
+    monkeypatch.setattr(langgraph_builder, "predictive_analysis", failing)
+    with pytest.raises(RuntimeError, match="model store"):
+        langgraph_builder.run_claim_workflow(claim_id=claim_id, document_paths=paths)
+
+    snapshot = langgraph_builder.get_checkpoint(claim_id)
+    assert snapshot.next == ("node5_predictive",)
+    assert snapshot.values["node4_output"]
+
+    monkeypatch.setattr(langgraph_builder, "predictive_analysis", real_predictive)
+    state = langgraph_builder.resume_claim_workflow(claim_id)
+
+    assert state["node5_output"]["predicted_final_cost"] >= 0
+    assert state["node7_output"]["final_status"]
+    assert fraud_calls == [claim_id]  # nodes 1-4 were not repeated
+    assert not langgraph_builder.get_checkpoint(claim_id).next
+    with pytest.raises(ValueError, match="already completed"):
+        langgraph_builder.resume_claim_workflow(claim_id)
+
+
+def test_rerun_from_a_node_reuses_earlier_outputs(synthetic_claims, memory_workflow, monkeypatch):
+    claim_id, paths = synthetic_claims[1]
+    first = langgraph_builder.run_claim_workflow(claim_id=claim_id, document_paths=paths)
+
+    def no_extraction(*args, **kwargs):
+        raise AssertionError("node 1 must not run again")
+
+    monkeypatch.setattr(langgraph_builder, "extract_documents", no_extraction)
+    rerun = langgraph_builder.rerun_claim_workflow_from(claim_id, "node4_fraud_detection")
+
+    assert rerun["node1_output"] == first["node1_output"]
+    assert rerun["node7_output"]["final_status"]
+    with pytest.raises(ValueError, match="Unknown node"):
+        langgraph_builder.rerun_claim_workflow_from(claim_id, "node9")
+
+
+def test_prune_deletes_threads_of_claims_past_retention(monkeypatch):
+    from app.database.mongo import claims_collection
+
+    class Saver:
+        def __init__(self):
+            self.deleted = []
+
+        def delete_thread(self, thread_id):
+            self.deleted.append(thread_id)
+
+    now = datetime.utcnow()
+    claims_collection.delete_many({"claim_id": {"$regex": "^CKPT-"}})
+    claims_collection.insert_many([
+        {"claim_id": "CKPT-OLD", "updated_at": now - timedelta(days=40)},
+        {"claim_id": "CKPT-NEW", "updated_at": now - timedelta(days=2)},
+    ])
+    saver = Saver()
+
+    assert prune_checkpoints(30, checkpointer=saver) == 1
+    assert saver.deleted == ["CKPT-OLD"]
+    # pruned claims are marked and skipped next time
+    assert prune_checkpoints(30, checkpointer=saver) == 0
+    # CHECKPOINT_BACKEND=none: nothing to prune
+    assert prune_checkpoints(0) == 0
+    claims_collection.delete_many({"claim_id": {"$regex": "^CKPT-"}})
@@ -0,0 +1,87 @@
+"""Policy exclusion matcher: word boundaries, weak-term context, negation and per-version caching."""
+import pytest
+
+from app.nodes.node3_policy_coverage.exclusions_engine import AhoCorasick, check_exclusions, compile_exclusions, scan_exclusions
+
+
+POLICY = {
+    "policyNumber": "MOT-EXCL-1",
+    "version": 1,
+    "exclusions": [
+        "Driving under influence of alcohol",
+        "Commercial use of vehicle",
+        "Intentional damage",
+        "Racing",
+        "War, invasion and nuclear risks",
+    ],
+}
+
+
+def _clauses(description, policy=POLICY):
+    return check_exclusions(policy, {"description": description})
+
+
+def test_aho_corasick_respects_word_boundaries():
+    matcher = AhoCorasick([("ola", "ola"), ("war", "war"), ("drag race", "race")])
+
+    assert [hit[2] for hit in matcher.scan("Cola spilled at Kolar; warranty claim for a drag racer")] == []
+    assert [hit[2] for hit in matcher.scan("Booked an OLA. War zone. A drag race.")] == ["ola", "war", "drag race"]
+    assert list(matcher.scan("")) == []
+
+
+@pytest.mark.parametrize("description", [
+    "Parcel delivery van rear-ended me at the signal",
+    "Hired a mechanic after the breakdown",
+    "Hit a pothole near the race course road",
+    "Rust on the bumper was already there",
+    "My Ola cab was hit; I was a passenger",
+    "The learner in the other car reversed into us",
+    "Side mirror broken during a wedding procession, not a riot",
+    "Damage from a sudden swerve to avoid a dog",
+])
+def test_harmless_descriptions_match_nothing(description):
+    assert _clauses(description) == []
+
+
+@pytest.mark.parametrize("description, clause", [
+    ("Driver was drunk and hit the divider", "Driving under influence of alcohol"),
+    ("Vehicle used as a taxi service at the time", "Commercial use of vehicle"),
+    ("Doing an Uber ride, passenger paid the fare", "Commercial use of vehicle"),
+    ("Car was deliberately set on fire by the owner", "Intentional damage"),
+    ("Crashed during a street race on the highway", "Racing"),
+    ("Shop and car damaged in a terrorist attack", "War, invasion and nuclear risks"),
+])
+def test_descriptions_that_trigger_an_exclusion(description, clause):
+    assert _clauses(description) == [clause]
+
+
+def test_weak_terms_need_a_second_cue():
+    assert _clauses("Out on a delivery when it happened") == []
+
+    matches = scan_exclusions(POLICY, {"description": "Out on a delivery for Uber Eats when it happened"})
+
+    assert [match["clause"] for match in matches] == ["Commercial use of vehicle"]
+    assert matches[0]["term"] == "delivery" and matches[0]["context"] == ["uber"]
+
+
+def test_negated_mentions_are_ignored():
+    assert _clauses("The driver was not drunk and did not race") == []
+    assert _clauses("Never intentionally damaged; the other driver was drunk") == ["Driving under influence of alcohol"]
+
+
+def test_compiled_matcher_is_cached_per_policy_version():
+    first = compile_exclusions(POLICY)
+    assert compile_exclusions(dict(POLICY)) is first
+
+    revised = {**POLICY, "version": 2, "exclusions": ["Racing"]}
+    second = compile_exclusions(revised)
+    assert second is not first
+    assert _clauses("Driver was drunk", revised) == []
+    assert _clauses("Driver was drunk") == ["Driving under influence of alcohol"]
+
+
+def test_unversioned_policies_are_keyed_by_their_exclusions():
+    policy = {"policyNumber": "MOT-EXCL-2", "exclusions": ["Racing"]}
+    first = compile_exclusions(policy)
+    assert compile_exclusions({**policy}) is first
+    assert compile_exclusions({**policy, "exclusions": ["Racing", "Intentional damage"]}) is not first
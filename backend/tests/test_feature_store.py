@@ -0,0 +1,172 @@
+"""Claim feature table: columns, .npz export, backfill, Node 5 training and re-scoring reads."""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.core.claim_features import ClaimFeatures
+from app.database import feature_store
+from app.database.feature_store import (
+    backfill_feature_table,
+    export_feature_table,
+    load_feature_columns,
+    record_claim_outcome,
+    rows_to_columns,
+    save_claim_features,
+)
+from app.nodes.node5_predictive.train_models import load_feature_training_set, load_training_set, train
+
+
+SEVERITIES = ("LOW", "MEDIUM", "HIGH")
+
+
+def _node1(index):
+    return {"documents": [{
+        "file": f"claim_{index}_bill.png",
+        "document_type": "bill",
+        "extracted_text": f"Amount: Rs. {1000 * (index + 1)}",
+        "structured_fields": {
+            "amount": f"Rs. {1000 * (index + 1)}",
+            "claimer_name": f"Claimant {index}",
+            "claimer_email": f"c{index}@x.com",
+            "policy_number": "MOT-12345678",
+            "incident_date": "05/03/2026",
+            "description": "Rear bumper damaged in a collision",
+        },
+    }]}
+
+
+@pytest.fixture
+def stored(request):
+    from app.database.mongo import claims_collection
+
+    prefix = "FS-"
+    selector = {"claim_id": {"$regex": f"^{prefix}"}}
+    claims_collection.delete_many(selector)
+    feature_store.claim_features_collection.delete_many(selector)
+    claims = []
+    for index in range(30):
+        amount = 1000.0 * (index + 1)
+        claims.append({
+            "claim_id": f"{prefix}{index}",
+            "claim_amount": amount,
+            "fraud_score": 0.1 * (index % 5),
+            "node2_output": {"consistency_score": 0.9},
+            "node3_output": {"is_covered": index % 4 != 0},
+            "form_data": {"node1_output": _node1(index)},
+            "outcome": {"final_cost": amount * 0.8, "settlement_days": 5 + index % 10, "severity": SEVERITIES[index % 3]},
+            "updated_at": datetime.utcnow(),
+        })
+    claims_collection.insert_many([dict(claim) for claim in claims])
+    yield claims
+    claims_collection.delete_many(selector)
+    feature_store.claim_features_collection.delete_many(selector)
+
+
+def test_columns_have_no_object_dtype(tmp_path):
+    rows = [
+        {"claim_id": "A", "claim_amount": 10.0, "incident_date": datetime(2026, 3, 5), "fraud_score": 0.2, "provider": "City Hospital"},
+        {"claim_id": "B", "claim_amount": None, "incident_date": None, "provider": None},
+    ]
+    columns = rows_to_columns(rows)
+
+    assert columns["claim_amount"].tolist() == [10.0, 0.0]
+    assert columns["fraud_score"][0] == 0.2 and np.isnan(columns["fraud_score"][1])
+    assert columns["incident_date"].dtype == np.dtype("datetime64[s]") and np.isnat(columns["incident_date"][1])
+    assert columns["provider"].tolist() == ["City Hospital", ""]
+    assert all(column.dtype != object for column in columns.values())
+
+
+def test_export_loads_without_pickle(stored, tmp_path):
+    backfill_feature_table({"claim_id": {"$regex": "^FS-"}})
+    path = tmp_path / "features.npz"
+
+    count = export_feature_table(str(path), {"claim_id": {"$regex": "^FS-"}})
+
+    with np.load(path) as table:
+        assert count == len(stored)
+        assert sorted(table["claim_id"].tolist()) == sorted(claim["claim_id"] for claim in stored)
+        assert table["incident_date"][0] == np.datetime64("2026-03-05T00:00:00")
+        assert set(table["outcome_severity"].tolist()) == set(SEVERITIES)
+
+
+def test_save_and_label_a_claim(stored):
+    features = ClaimFeatures.from_node1_output(_node1(3), claim_id="FS-LIVE")
+    save_claim_features(features, {"fraud_score": 0.4, "consistency_score": 1.0, "is_covered": True})
+    assert record_claim_outcome("FS-LIVE", {"final_cost": 3000.0, "settlement_days": 9, "severity": "LOW"})
+    assert not record_claim_outcome("FS-MISSING", {"final_cost": 1.0})
+
+    columns = load_feature_columns({"claim_id": "FS-LIVE"})
+    assert columns["claim_amount"].tolist() == [4000.0]
+    assert columns["fraud_score"].tolist() == [0.4]
+    assert columns["outcome_settlement_days"].tolist() == [9.0]
+
+    row = feature_store.load_feature_rows(["FS-LIVE"])["FS-LIVE"]
+    rebuilt = ClaimFeatures.from_row(row)
+    assert rebuilt.to_row() == {**features.to_row()}
+
+
+def test_a_settling_review_labels_the_claim(stored):
+    from fastapi.testclient import TestClient
+
+    from app.database.mongo import claims_collection
+    from app.main import app
+
+    claims_collection.insert_one({
+        "claim_id": "FS-REVIEW",
+        "claim_amount": 4000.0,
+        "form_data": {"node1_output": _node1(3)},
+        "created_at": datetime.utcnow() - timedelta(days=12),
+    })
+    backfill_feature_table({"claim_id": "FS-REVIEW"})
+    client = TestClient(app)
+    decision = {"reviewer_name": "U", "reviewer_email": "u@x.com"}
+
+    # asking for more information settles nothing
+    client.post("/api/reviewer/claims/FS-REVIEW/decision", json={**decision, "decision": "request_more_info", "final_cost": 1.0})
+    assert feature_store.load_feature_rows(["FS-REVIEW"])["FS-REVIEW"].get("outcome_final_cost") is None
+
+    response = client.post(
+        "/api/reviewer/claims/FS-REVIEW/decision",
+        json={**decision, "decision": "approve", "final_cost": 3600.0, "severity": "MEDIUM"},
+    )
+
+    assert response.status_code == 200
+    outcome = {"final_cost": 3600.0, "settlement_days": 12, "severity": "MEDIUM"}
+    assert claims_collection.find_one({"claim_id": "FS-REVIEW"})["outcome"] == outcome
+    _, costs, days, severities = load_feature_training_set({"claim_id": "FS-REVIEW"})
+    assert costs.tolist() == [3600.0] and days.tolist() == [12.0] and severities.tolist() == ["MEDIUM"]
+
+
+def test_training_from_the_feature_table_matches_the_claims(stored):
+    backfill_feature_table({"claim_id": {"$regex": "^FS-"}})
+
+    X, costs, days, severities = load_feature_training_set({"claim_id": {"$regex": "^FS-"}})
+    expected = load_training_set(sorted(stored, key=lambda claim: claim["claim_id"]))
+
+    order = np.argsort(costs)
+    expected_order = np.argsort(expected[1])
+    assert np.allclose(X[order], expected[0][expected_order])
+    assert np.allclose(days[order], expected[2][expected_order])
+    assert severities[order].tolist() == expected[3][expected_order].tolist()
+
+    models, metrics = train(X, costs, days, severities)
+    assert set(models) == {"cost_model", "timeline_model", "severity_model"}
+    assert metrics["severity_accuracy"] >= 0.0
+
+
+def test_rescoring_reads_features_from_the_table(stored, offline_pipeline):
+    from app.services.rescoring_service import rescore_chunk
+
+    backfill_feature_table({"claim_id": "FS-0"})
+    # the stored row wins over the Node 1 output: the rewritten description now hits an exclusion
+    feature_store.claim_features_collection.update_one(
+        {"claim_id": "FS-0"}, {"$set": {"description": "Crashed during a street race"}}
+    )
+    claims = [{"claim_id": claim["claim_id"], "form_data": claim["form_data"]} for claim in stored[:2]]
+
+    results = rescore_chunk(claims)
+
+    node3 = {result["claim_id"]: result["outputs"]["node3_output"] for result in results}
+    assert node3["FS-0"].get("exclusions") == ["Racing"]
+    assert not node3["FS-1"].get("exclusions")
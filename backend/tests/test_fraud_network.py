@@ -0,0 +1,168 @@
+"""Claim network: union-find ring features, stored-claim loading and catch-up."""
+import threading
+from datetime import datetime
+
+import pytest
+
+from app.nodes.node4_fraud_detection import network_analysis
+from app.nodes.node4_fraud_detection.history_sync import SYNC_SECONDS_ENV, HistorySync
+from app.nodes.node4_fraud_detection.network_analysis import ClaimNetwork, extract_entities, network_features
+
+
+def _node1(email=None, phone=None, address=None, policy="MOT-12345678", text=""):
+    fields = {
+        "claimer_email": email,
+        "claimer_phone": phone,
+        "claimer_address": address,
+        "policy_number": policy,
+    }
+    return {"documents": [{"document_type": "bill", "structured_fields": fields, "extracted_text": text}]}
+
+
+def test_component_and_entity_features():
+    network = ClaimNetwork()
+    network.add_claim("A", {"phone:1", "bank:9"}, "email:a")
+    network.add_claim("B", {"phone:2", "bank:9"}, "email:b")
+    features = network.add_claim("C", {"phone:2", "address:X"}, "email:c")
+
+    assert features["component_claims"] == 3
+    assert features["component_claimants"] == 3
+    assert features["component_entities"] == 4
+    assert features["shared_entities"] == ["phone:2"]
+    assert features["max_entity_degree"] == 2
+    assert features["max_entity_claimants"] == 2
+    # unions are seen by every member of the merged component
+    assert network.claim_features("A")["component_claims"] == 3
+    assert network.claim_features("missing") is None
+    assert network.stats() == {"claims": 3, "entities": 4, "components": 1}
+
+
+def test_one_claimants_repeat_claims_are_not_a_ring():
+    network = ClaimNetwork()
+    for index in range(5):
+        features = network.add_claim(f"R{index}", {"email:a", "address:X"}, "email:a")
+
+    assert features["component_claims"] == 5
+    assert features["component_claimants"] == 1
+    assert features["max_entity_claimants"] == 1
+    assert features["shared_entities"] == []
+
+
+def test_claims_without_a_claimant_count_separately():
+    network = ClaimNetwork()
+    network.add_claim("A", {"bank:9"})
+    assert network.add_claim("B", {"bank:9"})["component_claimants"] == 2
+
+
+def test_reinserting_a_claim_is_a_no_op():
+    network = ClaimNetwork()
+    network.add_claim("A", {"phone:1"}, "email:a")
+    network.add_claim("A", {"phone:1", "bank:2"}, "email:a")
+    assert network.add_claims([("A", {"bank:3"}, "email:a"), ("B", {"phone:1"}, "email:b")]) == 1
+    assert network.claim_features("A")["entity_count"] == 1
+    assert network.claim_features("B")["component_claims"] == 2
+
+
+def test_policy_number_does_not_link_claims():
+    assert not any(entity.startswith("policy:") for entity in extract_entities(_node1(email="a@x.com")))
+
+    network = ClaimNetwork()
+    for index in range(5):
+        node1 = _node1(email=f"person{index}@x.com", address=f"{index} Main Road")
+        features = network.add_claim(f"P{index}", extract_entities(node1), f"email:person{index}@x.com")
+    assert features["component_claims"] == 1
+
+
+@pytest.fixture
+def stored_claims():
+    from app.database.feature_store import claim_features_collection
+    from app.database.mongo import claims_collection
+
+    selector = {"claim_id": {"$regex": "^NET-"}}
+    claims_collection.delete_many(selector)
+    network_analysis.claim_network.rebuild([])
+    yield claims_collection
+    claims_collection.delete_many(selector)
+    claim_features_collection.delete_many(selector)
+
+
+def _store(collection, claim_id, node1, claimer=None):
+    collection.insert_one({
+        "claim_id": claim_id,
+        "claimer": claimer or {"email": "unknown@example.com", "name": "Unknown Claimer"},
+        "form_data": {"node1_output": node1},
+        "updated_at": datetime.utcnow(),
+    })
+
+
+def test_network_loads_and_catches_up_from_stored_claims(monkeypatch, stored_claims):
+    monkeypatch.setenv(SYNC_SECONDS_ENV, "0")
+    sync = HistorySync(
+        "test network",
+        load=network_analysis.rebuild_claim_network,
+        catch_up=lambda since: network_analysis.claim_network.add_claims(network_analysis.iter_stored_claims(since)),
+    )
+    monkeypatch.setattr(network_analysis, "network_sync", sync)
+
+    _store(stored_claims, "NET-1", _node1(email="ring1@x.com", phone="+91 98765 43210"))
+    features = network_features("NET-LIVE-1", _node1(email="ring2@x.com", phone="9876543210"))
+    assert features["component_claimants"] == 2
+    assert features["shared_entities"] == ["phone:9876543210"]
+
+    # stored later by another process: pulled in before the next claim is scored
+    _store(stored_claims, "NET-2", _node1(email="ring3@x.com", phone="098765 43210"))
+    features = network_features("NET-LIVE-2", _node1(email="ring4@x.com", phone="9876543210"))
+    assert features["component_claimants"] == 4
+    assert features["max_entity_claimants"] == 4
+
+
+def test_history_sync_loads_once_under_concurrency(monkeypatch):
+    monkeypatch.setenv(SYNC_SECONDS_ENV, "60")
+    loads = []
+    release = threading.Event()
+
+    def load():
+        loads.append(1)
+        release.wait(1)
+        return 0
+
+    sync = HistorySync("test", load=load, catch_up=lambda since: 0)
+    threads = [threading.Thread(target=sync.ensure) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [1]
+    assert sync.watermark is not None
+
+
+def test_live_and_stored_entries_build_the_same_graph(monkeypatch, stored_claims):
+    from app.services.claim_processing import persist_claim, persist_resumed_claim
+
+    live = ClaimNetwork()
+    monkeypatch.setattr(network_analysis, "claim_network", live)
+    monkeypatch.setattr(network_analysis.network_sync, "ensure", lambda: None)
+    submissions = [
+        ("NET-S1", _node1(email="a@x.com", address="1 Main Rd"), {"name": "A", "email": "a@x.com", "phone": "+91 98765 43210"}),
+        ("NET-S2", _node1(phone="9876543210"), {"name": "B", "email": "b@x.com", "phone": None, "address": "1, Main Rd"}),
+        ("NET-S3", _node1(address="1 Main Rd"), {"name": "C", "email": "c@x.com", "phone": "09876 543210"}),
+    ]
+    for claim_id, node1, claimer in submissions:
+        network_features(claim_id, node1, claimer=claimer)
+        claim = {"claim_type": "Motor", "claim_amount": 1000.0, "policy_number": "MOT-12345678", "claimer": claimer, "document_paths": []}
+        persist_claim(claim, {"node1_output": node1}, claim_id)
+    # a batch claim with no submitted claimer is stored with the placeholder claimer
+    network_features("NET-S4", _node1(email="d@x.com", address="1 Main Rd"))
+    persist_resumed_claim("NET-S4", {"node1_output": _node1(email="d@x.com", address="1 Main Rd")})
+
+    stored = ClaimNetwork()
+    stored.rebuild(record for record in network_analysis.iter_stored_claims() if record[0].startswith("NET-S"))
+
+    for claim_id in ("NET-S1", "NET-S2", "NET-S3", "NET-S4"):
+        node = f"claim:{claim_id}"
+        assert set(stored._claim_entities[node]) == set(live._claim_entities[node])
+        assert stored.claim_features(claim_id) == live.claim_features(claim_id)
+    assert stored._entity_claimants == live._entity_claimants
+    assert live.claim_features("NET-S4")["component_claimants"] == 4
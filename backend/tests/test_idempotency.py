@@ -0,0 +1,161 @@
+"""Idempotent intake: per-user keys, replay, coalescing onto a running submission and takeover."""
+import threading
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes_claims
+from app.core.dependencies import get_current_user
+from app.database import job_queue, request_store
+from app.database.request_store import FAILED
+from app.services.idempotency import (
+    IDEMPOTENCY_STALE_SECONDS_ENV,
+    IdempotencyConflict,
+    complete,
+    release,
+    request_key,
+    reserve,
+    wait_for_response,
+)
+from app.utils import hashing
+from app.utils.hashing import file_digest, submission_fingerprint
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    request_store.claim_requests_collection.delete_many({})
+    job_queue.claim_jobs_collection.delete_many({})
+    yield
+    request_store.claim_requests_collection.delete_many({})
+    job_queue.claim_jobs_collection.delete_many({})
+
+
+def _fingerprint(submitter, documents=("a" * 64,)):
+    return submission_fingerprint(list(documents), "Ravi@Example.com ", "Motor", None, submitter)
+
+
+def test_keys_and_fingerprints_are_scoped_to_the_user():
+    alice, bob = _fingerprint("alice"), _fingerprint("bob")
+
+    assert alice != bob
+    assert submission_fingerprint(["a" * 64], "ravi@example.com", "Motor", submitter="alice") == alice
+    assert request_key("retry-1", alice, "alice") != request_key("retry-1", bob, "bob")
+    assert request_key(None, alice, "alice") != request_key(None, bob, "bob")
+
+    # the same Idempotency-Key from two users is two submissions, not a conflict
+    first = reserve(request_key("retry-1", alice, "alice"), alice, "CL-A")
+    second = reserve(request_key("retry-1", bob, "bob"), bob, "CL-B")
+    assert first.owner and second.owner and second.claim_id == "CL-B"
+
+
+def test_completed_submissions_are_replayed():
+    fingerprint = _fingerprint("alice")
+    key = request_key("retry-2", fingerprint, "alice")
+    owner = reserve(key, fingerprint, "CL-1")
+    complete(key, {"claim_id": "CL-1", "status": "APPROVED"})
+
+    replay = reserve(key, fingerprint, "CL-2")
+
+    assert owner.owner and not replay.owner
+    assert replay.claim_id == "CL-1" and replay.response == {"claim_id": "CL-1", "status": "APPROVED"}
+    with pytest.raises(IdempotencyConflict):
+        reserve(key, _fingerprint("alice", documents=("b" * 64,)), "CL-3")
+
+
+def test_duplicates_coalesce_onto_the_running_submission():
+    fingerprint = _fingerprint("alice")
+    key = request_key(None, fingerprint, "alice")
+    reserve(key, fingerprint, "CL-1")
+
+    duplicate = reserve(key, fingerprint, "CL-2")
+    assert not duplicate.owner and duplicate.response is None and duplicate.job is None
+
+    finisher = threading.Timer(0.2, complete, args=(key, {"claim_id": "CL-1"}))
+    finisher.start()
+    assert wait_for_response(duplicate, timeout=5) == {"claim_id": "CL-1"}
+    finisher.join()
+
+
+def test_duplicates_of_a_queued_submission_get_its_job():
+    fingerprint = _fingerprint("alice")
+    key = request_key("retry-3", fingerprint, "alice")
+    reserve(key, fingerprint, "CL-1")
+    job = job_queue.enqueue_job("submit", "CL-1", {"claim": {}})
+    request_store.attach_job(key, job["job_id"])
+
+    duplicate = reserve(key, fingerprint, "CL-2")
+    assert duplicate.job["job_id"] == job["job_id"]
+
+    job_queue.claim_jobs_collection.update_one(
+        {"job_id": job["job_id"]}, {"$set": {"status": "succeeded", "result": {"claim_id": "CL-1"}}}
+    )
+    assert reserve(key, fingerprint, "CL-2").response == {"claim_id": "CL-1"}
+
+
+def test_failed_and_abandoned_submissions_are_taken_over(monkeypatch):
+    fingerprint = _fingerprint("alice")
+    failed_key = request_key("retry-4", fingerprint, "alice")
+    reserve(failed_key, fingerprint, "CL-1")
+    release(failed_key, "ollama timed out")
+
+    retry = reserve(failed_key, fingerprint, "CL-NEW")
+    # the retry keeps the claim id so the workflow resumes from its checkpoint
+    assert retry.owner and retry.claim_id == "CL-1"
+
+    stale_key = request_key("retry-5", fingerprint, "alice")
+    reserve(stale_key, fingerprint, "CL-2")
+    assert not reserve(stale_key, fingerprint, "CL-NEW").owner
+
+    # its owner stopped making progress two minutes ago
+    monkeypatch.setenv(IDEMPOTENCY_STALE_SECONDS_ENV, "60")
+    last_progress = request_store.get_request(stale_key)["updated_at"]
+    request_store.claim_requests_collection.update_one(
+        {"key": stale_key}, {"$set": {"updated_at": last_progress - timedelta(seconds=120)}}
+    )
+    takeover = reserve(stale_key, fingerprint, "CL-NEW")
+    assert takeover.owner and takeover.claim_id == "CL-2"
+    assert not reserve(stale_key, fingerprint, "CL-NEW").owner
+
+
+def test_a_failed_upload_write_gives_the_reservation_back(monkeypatch):
+    from app.main import app
+
+    def full_disk(uploads):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(routes_claims, "_save_uploads", full_disk)
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "alice"}
+    try:
+        response = TestClient(app).post(
+            "/api/claims/submit-upload",
+            files=[("files", ("bill.png", b"png bytes", "image/png"))],
+            data={"claim_type": "Motor", "claimer_email": "ravi@example.com", "claim_id": "CL-DISK"},
+            headers={"Idempotency-Key": "retry-6"},
+        )
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+    assert response.status_code == 500 and "No space left" in response.json()["detail"]
+    stored = request_store.claim_requests_collection.find_one({"claim_id": "CL-DISK"})
+    assert stored["status"] == FAILED
+    # the client's retry owns the submission again instead of waiting on a dead one
+    assert reserve(stored["key"], stored["fingerprint"], "CL-NEW").owner
+
+
+def test_file_digests_keep_only_the_most_recently_used(monkeypatch, tmp_path):
+    monkeypatch.setattr(hashing, "MAX_CACHED_DIGESTS", 2)
+    monkeypatch.setattr(hashing, "_file_digests", type(hashing._file_digests)())
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        paths.append(str(path))
+
+    file_digest(paths[0])
+    file_digest(paths[1])
+    file_digest(paths[0])
+    file_digest(paths[2])
+
+    assert [key[0] for key in hashing._file_digests] == [paths[0], paths[2]]
+    assert file_digest(paths[1]) == hashing.bytes_digest(b"b")
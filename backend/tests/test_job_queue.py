@@ -0,0 +1,125 @@
+"""Claim job queue: leases, heartbeats, expiry takeover, retries and the worker's failure handling."""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.checkpointing import CheckpointNotFoundError
+from app.database import job_queue
+from app.database.job_queue import (
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    complete_job,
+    enqueue_job,
+    extend_lease,
+    fail_job,
+    get_job,
+    lease_job,
+)
+from app.services import claim_processing
+from app.worker import Worker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = datetime(2026, 3, 1, 9, 0)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    job_queue.claim_jobs_collection.delete_many({})
+    clock = _Clock()
+    monkeypatch.setattr(job_queue, "_utcnow", clock)
+    yield clock
+    job_queue.claim_jobs_collection.delete_many({})
+
+
+def test_lease_is_exclusive_and_heartbeats_extend_it(clock):
+    job = enqueue_job("resume", "JQ-1")
+
+    leased = lease_job("w1", lease_seconds=60)
+    assert leased["job_id"] == job["job_id"] and leased["status"] == RUNNING and leased["attempts"] == 1
+    assert lease_job("w2", lease_seconds=60) is None
+
+    clock.advance(50)
+    assert extend_lease(job["job_id"], "w1", lease_seconds=60)
+    assert not extend_lease(job["job_id"], "w2", lease_seconds=60)
+    clock.advance(50)
+    # the heartbeat pushed expiry to t+110, so the lease still holds at t+100
+    assert lease_job("w2", lease_seconds=60) is None
+
+    assert complete_job(job["job_id"], "w1", {"status": "APPROVED"})
+    stored = get_job(job["job_id"])
+    assert stored["status"] == SUCCEEDED and stored["result"] == {"status": "APPROVED"} and stored["lease_owner"] is None
+
+
+def test_an_expired_lease_is_taken_over(clock):
+    job = enqueue_job("resume", "JQ-2")
+    lease_job("w1", lease_seconds=60)
+
+    clock.advance(61)
+    taken = lease_job("w2", lease_seconds=60)
+
+    assert taken["job_id"] == job["job_id"] and taken["lease_owner"] == "w2" and taken["attempts"] == 2
+    # the original holder can neither heartbeat nor finish the job any more
+    assert not extend_lease(job["job_id"], "w1")
+    assert not complete_job(job["job_id"], "w1")
+    assert fail_job(job["job_id"], "w1", "late") is None
+    assert get_job(job["job_id"])["lease_owner"] == "w2"
+
+
+def test_failures_retry_with_backoff_until_attempts_run_out(clock):
+    job = enqueue_job("resume", "JQ-3", max_attempts=2)
+    lease_job("w1")
+
+    assert fail_job(job["job_id"], "w1", "ollama timed out", retry_delay_seconds=30) == QUEUED
+    assert get_job(job["job_id"])["available_at"] == clock.now + timedelta(seconds=30)
+    clock.advance(29)
+    assert lease_job("w1") is None
+    clock.advance(1)
+    assert lease_job("w1")["attempts"] == 2
+
+    assert fail_job(job["job_id"], "w1", "ollama timed out") == FAILED
+    assert get_job(job["job_id"])["finished_at"] == clock.now
+
+    permanent = enqueue_job("rerun", "JQ-4", {"from_node": "node9"})
+    lease_job("w1")
+    assert fail_job(permanent["job_id"], "w1", "Unknown node", permanent=True) == FAILED
+
+
+@pytest.mark.parametrize("error, status", [
+    (json.JSONDecodeError("Expecting value", "", 0), QUEUED),
+    (ConnectionError("mongo unavailable"), QUEUED),
+    (CheckpointNotFoundError("No checkpoint found for claim"), FAILED),
+])
+def test_worker_retries_transient_errors_only(clock, monkeypatch, error, status):
+    def failing(job):
+        raise error
+
+    monkeypatch.setattr(claim_processing, "run_job", failing)
+    job = enqueue_job("resume", "JQ-5")
+
+    assert Worker(lease_seconds=60).process_one("w1")
+    assert get_job(job["job_id"])["status"] == status
+
+
+def test_worker_fails_malformed_jobs_without_retrying(clock):
+    unknown = enqueue_job("reprocess", "JQ-6")
+    missing = enqueue_job("rerun", "JQ-7")
+    worker = Worker(lease_seconds=60)
+
+    assert worker.process_one("w1") and worker.process_one("w1")
+    assert not worker.process_one("w1")
+
+    assert get_job(unknown["job_id"])["status"] == FAILED
+    assert "Unknown job kind" in get_job(unknown["job_id"])["error"]
+    assert get_job(missing["job_id"])["status"] == FAILED
+    assert "from_node" in get_job(missing["job_id"])["error"]
@@ -0,0 +1,128 @@
+"""
+Extraction + fraud-analysis LLM traffic for concurrent claims, one request
+per document (the old path) against combined per-claim prompts sent through
+the batching window, on a fake Ollama with realistic latency: a fixed cost
+per request, a cost per prompt size and four parallel slots. Combined
+answers that do not line up with their documents fall back to one prompt
+per document.
+
+    pytest tests/test_llm_batching.py --bench-claims 48
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.nodes.node1_extraction.extractor import classify_document
+from app.services.llm_service import (
+    LLM_BATCH_WINDOW_MS_ENV,
+    LLM_COMBINE_DOCUMENTS_ENV,
+    LLM_COMBINE_MAX_DOCUMENTS_ENV,
+    LLMService,
+)
+from tests.stand_ins import FakeOllamaServer, answer_prompt, fake_ocr
+
+
+CONCURRENT_CLAIMS = 8
+
+
+@pytest.fixture(scope="module")
+def realistic_ollama():
+    server = FakeOllamaServer(latency_s=0.05, latency_per_1k_chars=0.02, parallel=4).start()
+    yield server
+    server.stop()
+
+
+def _claim_texts(paths):
+    texts = [fake_ocr(path) for path in paths]
+    return [(text, classify_document(text)) for text in texts]
+
+
+def _process(service, texts, batched):
+    if batched:
+        fields = service.extract_claim_documents(texts)
+    else:
+        fields = [service.extract_structured_data(text, doc_type) for text, doc_type in texts]
+    service.analyze_claim_context("\n\n".join(text[:1000] for text, _ in texts))
+    return fields
+
+
+@pytest.mark.parametrize("mode", ["per_document", "batched"])
+def test_llm_throughput(benchmark, monkeypatch, realistic_ollama, synthetic_claims, mode):
+    batched = mode == "batched"
+    monkeypatch.setenv(LLM_BATCH_WINDOW_MS_ENV, "10" if batched else "0")
+    monkeypatch.setenv(LLM_COMBINE_DOCUMENTS_ENV, "1" if batched else "0")
+    service = LLMService()
+    service.base_url = realistic_ollama.base_url
+    claims = [_claim_texts(paths) for _, paths in synthetic_claims]
+
+    def run_all():
+        with ThreadPoolExecutor(max_workers=CONCURRENT_CLAIMS) as pool:
+            return list(pool.map(lambda texts: _process(service, texts, batched), claims))
+
+    before = realistic_ollama.requests
+    results = benchmark.pedantic(run_all, rounds=3, iterations=1)
+    rounds = getattr(getattr(benchmark, "stats", None), "stats", None)
+    requests_per_round = (realistic_ollama.requests - before) / (rounds.rounds if rounds else 1)
+
+    documents = sum(len(texts) for texts in claims)
+    expected = 2 * len(claims) if batched else documents + len(claims)
+    assert requests_per_round == expected
+    for texts, fields in zip(claims, results):
+        assert len(fields) == len(texts)
+        for (text, _), extracted in zip(texts, fields):
+            assert extracted.get("claimer_email") and extracted["claimer_email"] in text
+
+    if rounds:
+        benchmark.extra_info["claims_per_s"] = round(len(claims) / rounds.mean, 2)
+    benchmark.extra_info["llm_requests_per_claim"] = requests_per_round / len(claims)
+
+
+def _documents(count):
+    return [
+        (f"Claim form {index}\nName: Claimant {index}\nEmail: claimant{index}@example.com\nAmount: {1000 * index}", "claim_form")
+        for index in range(count)
+    ]
+
+
+def _drop_last_document(prompt):
+    answer = answer_prompt(prompt)
+    if "documents" in answer:
+        answer["documents"] = answer["documents"][:-1]
+    return answer
+
+
+def _documents_as_object(prompt):
+    answer = answer_prompt(prompt)
+    if "documents" in answer:
+        answer["documents"] = {f"document_{index}": entry for index, entry in enumerate(answer["documents"], start=1)}
+    return answer
+
+
+def _break_full_groups(prompt):
+    # only the first group of three documents is answered wrongly
+    return _drop_last_document(prompt) if "### Document 3" in prompt else answer_prompt(prompt)
+
+
+@pytest.mark.parametrize("answer, separate_requests", [
+    (_drop_last_document, 5),
+    (_documents_as_object, 5),
+    (_break_full_groups, 3),
+])
+def test_unusable_combined_answers_are_extracted_one_by_one(monkeypatch, answer, separate_requests):
+    monkeypatch.setenv(LLM_BATCH_WINDOW_MS_ENV, "0")
+    monkeypatch.setenv(LLM_COMBINE_DOCUMENTS_ENV, "1")
+    monkeypatch.setenv(LLM_COMBINE_MAX_DOCUMENTS_ENV, "3")
+    server = FakeOllamaServer(answer=answer).start()
+    service = LLMService()
+    service.base_url = server.base_url
+    documents = _documents(5)
+
+    try:
+        fields = service.extract_claim_documents(documents)
+    finally:
+        server.stop()
+
+    # two combined prompts (3 + 2 documents), then one per document of each unusable group
+    assert server.requests == 2 + separate_requests
+    assert [entry["claimer_email"] for entry in fields] == [f"claimant{index}@example.com" for index in range(5)]
+    assert [entry["amount"] for entry in fields] == [str(1000 * index) for index in range(5)]
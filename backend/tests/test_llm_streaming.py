@@ -0,0 +1,110 @@
+"""
+Streamed against whole-completion Ollama calls on a fake model that keeps
+generating whitespace after its JSON answer (as ``format: json`` models
+do until ``num_predict``). Streaming hangs up once the object closes.
+The scanner that finds the closing brace is tested on its own below.
+
+    pytest tests/test_llm_streaming.py
+"""
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.nodes.node1_extraction.extractor import classify_document
+from app.services.llm_service import LLM_BATCH_WINDOW_MS_ENV, LLM_STREAM_ENV, LLMService, _JsonStreamScanner
+from tests.stand_ins import ANALYSIS_RESPONSE, TOKEN_CHARS, FakeOllamaServer, fake_ocr
+
+
+CONCURRENT_CALLS = 4
+
+
+@pytest.fixture(scope="module")
+def wandering_ollama():
+    server = FakeOllamaServer(latency_s=0.02, token_latency_s=0.002, trailing_tokens=150, parallel=4).start()
+    yield server
+    server.stop()
+
+
+@pytest.mark.parametrize("mode", ["whole", "stream"])
+def test_llm_tail_latency(benchmark, monkeypatch, wandering_ollama, synthetic_claims, mode):
+    monkeypatch.setenv(LLM_STREAM_ENV, "1" if mode == "stream" else "0")
+    monkeypatch.setenv(LLM_BATCH_WINDOW_MS_ENV, "0")
+    service = LLMService()
+    service.base_url = wandering_ollama.base_url
+    texts = [fake_ocr(path) for _, paths in synthetic_claims[:4] for path in paths]
+
+    def call(text):
+        fields = service.extract_structured_data(text, classify_document(text))
+        analysis = service.analyze_claim_context(text)
+        return fields, analysis
+
+    def run_all():
+        with ThreadPoolExecutor(max_workers=CONCURRENT_CALLS) as pool:
+            return list(pool.map(call, texts))
+
+    results = benchmark.pedantic(run_all, rounds=3, iterations=1)
+
+    for text, (fields, analysis) in zip(texts, results):
+        assert fields["claimer_email"] in text
+        assert analysis["risk_level"] == "LOW"
+    if mode == "stream":
+        assert wandering_ollama.cancelled > 0
+
+
+def _scan(*chunks):
+    scanner = _JsonStreamScanner()
+    for chunk in chunks:
+        end = scanner.feed(chunk)
+        if end is not None:
+            return end
+    return None
+
+
+@pytest.mark.parametrize("text", [
+    '{"note": "a } and a { in a string"}',
+    '{"quote": "she said \\"}\\" twice", "n": 1}',
+    '{"path": "C:\\\\", "ok": true}',
+    '{"documents": [{"a": [1, [2, {"b": []}]]}, {}], "z": null}',
+])
+def test_scanner_finds_the_closing_brace(text):
+    json.loads(text)
+    whole = _scan(text + "\n  trailing")
+
+    assert whole == len(text)
+    # any split into chunks gives the same offset over the whole stream
+    for cut in range(1, len(text)):
+        assert _scan(text[:cut], text[cut:] + " ") == len(text)
+    assert _scan(*text) == len(text)
+
+
+def test_scanner_skips_leading_whitespace_and_waits_for_the_close():
+    assert _scan("  \n", '{"a": ', "1", "}") == len('  \n{"a": 1}')
+    assert _scan('{"a": [1, ', '2]') is None
+
+
+@pytest.mark.parametrize("text", ["Sure! {\"a\": 1}", "[1, 2]", "null"])
+def test_scanner_rejects_output_that_is_not_an_object(text):
+    with pytest.raises(ValueError, match="does not start with a JSON object"):
+        _scan(text)
+
+
+@pytest.fixture
+def streaming_service(monkeypatch):
+    monkeypatch.setenv(LLM_STREAM_ENV, "1")
+    monkeypatch.setenv(LLM_BATCH_WINDOW_MS_ENV, "0")
+    server = FakeOllamaServer(trailing_tokens=20).start()
+    service = LLMService()
+    service.base_url = server.base_url
+    yield service
+    server.stop()
+
+
+def test_an_object_closed_on_the_last_budgeted_token_is_kept(streaming_service):
+    answer = json.dumps(ANALYSIS_RESPONSE)
+    tokens = math.ceil(len(answer) / TOKEN_CHARS)
+
+    assert json.loads(streaming_service._call_ollama("Analyze", max_tokens=tokens)) == ANALYSIS_RESPONSE
+    # one token short, the object never closes
+    assert streaming_service._call_ollama("Analyze", max_tokens=tokens - 1) == ""
@@ -0,0 +1,92 @@
+"""In-process metrics: registry, label children and Prometheus text rendering."""
+import pytest
+
+from app.utils.logging import Registry, render_metrics, timed
+
+
+def _samples(registry):
+    return [line for line in registry.render().splitlines() if not line.startswith("#")]
+
+
+def test_counter_and_gauge_render_per_label_child():
+    registry = Registry()
+    runs = registry.counter("jobs_total", "Jobs run", ("kind", "outcome"))
+    depth = registry.gauge("queue_depth", "Queued jobs")
+
+    runs.labels(kind="submit", outcome="ok").inc()
+    runs.inc(2, kind="submit", outcome="ok")
+    runs.labels(kind="backfill", outcome="failed").inc()
+    depth.set(5)
+    depth.labels().dec(2)
+
+    text = registry.render()
+    assert "# HELP jobs_total Jobs run\n# TYPE jobs_total counter\n" in text
+    assert "# TYPE queue_depth gauge" in text
+    assert _samples(registry) == [
+        'jobs_total{kind="backfill",outcome="failed"} 1',
+        'jobs_total{kind="submit",outcome="ok"} 3',
+        "queue_depth 3",
+    ]
+    assert text.endswith("\n")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram("op_seconds", "Op latency", ("op",), buckets=(0.5, 0.1, 1.0))
+    child = latency.labels(op="read")
+
+    for value in (0.05, 0.1, 0.7, 3.0):
+        child.observe(value)
+
+    assert _samples(registry) == [
+        'op_seconds_bucket{op="read",le="0.1"} 2',
+        'op_seconds_bucket{op="read",le="0.5"} 2',
+        'op_seconds_bucket{op="read",le="1.0"} 3',
+        'op_seconds_bucket{op="read",le="+Inf"} 4',
+        'op_seconds_sum{op="read"} 3.85',
+        'op_seconds_count{op="read"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    errors = registry.counter("errors_total", "Errors", ("message",))
+
+    errors.labels(message='bad "quote"\\path\nnext').inc()
+
+    assert _samples(registry) == ['errors_total{message="bad \\"quote\\"\\\\path\\nnext"} 1']
+
+
+def test_registering_a_name_twice_returns_the_first_metric():
+    registry = Registry()
+    first = registry.counter("dup_total", "First")
+
+    assert registry.counter("dup_total", "Second") is first
+    assert registry.render().count("# TYPE dup_total") == 1
+
+
+def test_timed_records_latency_and_errors():
+    registry = Registry()
+    latency = registry.histogram("call_seconds", "Call latency", ("fn",))
+    errors = registry.counter("call_errors_total", "Call errors", ("fn",))
+
+    @timed(latency, errors, fn="work")
+    def work(fail=False):
+        if fail:
+            raise RuntimeError("boom")
+        return 42
+
+    assert work() == 42
+    with pytest.raises(RuntimeError):
+        work(fail=True)
+
+    assert latency.labels(fn="work").counts[-1] == 0
+    assert sum(latency.labels(fn="work").counts) == 2
+    assert errors.labels(fn="work").value == 1
+
+
+def test_shared_registry_is_served():
+    text = render_metrics()
+
+    assert "# TYPE claim_node_duration_seconds histogram" in text
+    assert "# TYPE claim_jobs_total counter" in text
@@ -0,0 +1,43 @@
+"""Per-node latency benchmarks on one synthetic claim, run fully offline."""
+import pytest
+
+from app.core import langgraph_builder as workflow
+
+
+NODES = (
+    "node2_cross_validation",
+    "node3_policy_coverage",
+    "node4_fraud_detection",
+    "node5_predictive",
+    "node6_explanation",
+    "node8_subrogation",
+    "node7_decision",
+)
+
+
+@pytest.fixture(scope="module")
+def claim(synthetic_claims):
+    claim_id, paths = synthetic_claims[0]
+    state = workflow.run_claim_workflow(claim_id=claim_id, document_paths=paths)
+    return claim_id, paths, state
+
+
+def test_node1_document_ingestion(benchmark, claim):
+    claim_id, paths, state = claim
+    config = {"configurable": {"document_paths": paths}}
+
+    result = benchmark(workflow.node1_document_ingestion, state, config)
+
+    documents = result["node1_output"]["documents"]
+    assert len(documents) == len(paths)
+    assert result["claim_features"]["policy_number"] == "MOT-12345678"
+
+
+@pytest.mark.parametrize("node", NODES)
+def test_node_latency(benchmark, claim, node):
+    _, _, state = claim
+    output_key = f"{node[:5]}_output"
+
+    result = benchmark(getattr(workflow, node), state)
+
+    assert result[output_key]
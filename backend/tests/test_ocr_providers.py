@@ -0,0 +1,374 @@
+"""
+OCR provider benchmarks: latency and character accuracy per provider on
+the synthetic documents (known ground truth), and latency and confidence
+on ``sample_docs``. Providers that are not installed or configured here
+are skipped; the fallback chain is checked with stand-in providers, the
+in-process tesserocr path with a stubbed API and the Azure REST calls
+with a stubbed session.
+
+    pytest tests/test_ocr_providers.py
+    BENCHMARK_REAL_OCR=1 pytest tests/test_ocr_providers.py --bench-claims 8
+"""
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import cv2
+import fitz
+import numpy as np
+import pytest
+
+from app.nodes.node1_extraction.ocr_engine import (
+    OCR_ADAPTIVE_ENV,
+    analyze_page,
+    binarize,
+    load_pages,
+    prepare_page,
+    preprocess_image,
+)
+from app.services import azure_ocr_service, ocr_service
+from app.services.azure_ocr_service import AZURE_ENDPOINT_ENV, AZURE_KEY_ENV, AZURE_TIMEOUT_SECONDS_ENV
+from app.services.ocr_service import (
+    OCR_PROVIDERS_ENV,
+    OcrPage,
+    OcrProvider,
+    OcrResult,
+    get_provider,
+    guess_document_type,
+    provider_chain,
+    recognize,
+)
+from tests.stand_ins import fake_ocr, photo_variant
+
+
+SAMPLE_DOCS = Path(__file__).resolve().parents[1] / "sample_docs"
+BENCH_DOCUMENTS = 12
+
+
+def _provider_or_skip(name):
+    provider = get_provider(name)
+    if provider is None or not provider.available():
+        pytest.skip(f"OCR provider {name} is not available here")
+    return provider
+
+
+def _accuracy(text, truth):
+    return SequenceMatcher(None, " ".join(text.split()), " ".join(truth.split())).ratio()
+
+
+def _mean_accuracy(results, paths):
+    return sum(_accuracy(result.text, fake_ocr(path)) for path, result in zip(paths, results)) / len(paths)
+
+
+@pytest.mark.parametrize("name", ["fake", "tesseract", "easyocr", "azure"])
+def test_provider_accuracy(benchmark, synthetic_claims, name):
+    provider = _provider_or_skip(name)
+    paths = [path for _, paths in synthetic_claims for path in paths][:BENCH_DOCUMENTS]
+
+    results = benchmark.pedantic(lambda: [provider.recognize(path) for path in paths], rounds=1, iterations=1)
+
+    accuracy = _mean_accuracy(results, paths)
+    confidences = [result.confidence for result in results if result.confidence is not None]
+    benchmark.extra_info["accuracy"] = round(accuracy, 3)
+    benchmark.extra_info["mean_confidence"] = round(sum(confidences) / len(confidences), 3) if confidences else None
+    if name == "fake":
+        assert accuracy == 1.0
+    assert all(result.provider == name for result in results)
+
+
+@pytest.mark.parametrize("name", ["tesseract", "easyocr", "azure"])
+def test_provider_sample_docs(benchmark, name):
+    provider = _provider_or_skip(name)
+    paths = sorted(str(path) for path in SAMPLE_DOCS.iterdir() if path.suffix.lower() in {".pdf", ".png", ".jpg", ".jpeg"} and path.stat().st_size)
+
+    results = benchmark.pedantic(lambda: [provider.recognize(path) for path in paths], rounds=1, iterations=1)
+
+    confidences = [result.confidence for result in results if result.confidence is not None]
+    benchmark.extra_info["documents"] = len(paths)
+    benchmark.extra_info["mean_confidence"] = round(sum(confidences) / len(confidences), 3) if confidences else None
+    assert all(result.pages for result in results)
+
+
+@pytest.fixture(scope="module")
+def photo_documents(synthetic_claims, tmp_path_factory):
+    root = tmp_path_factory.mktemp("photos")
+    paths = [path for _, paths in synthetic_claims for path in paths][:BENCH_DOCUMENTS]
+    return [photo_variant(path, root / Path(path).name, angle=(-3.0, 2.0, 4.0)[index % 3], scale=4.0) for index, path in enumerate(paths)]
+
+
+def test_tesseract_preparation(benchmark, monkeypatch, photo_documents):
+    provider = _provider_or_skip("tesseract")
+    monkeypatch.setenv(OCR_ADAPTIVE_ENV, "0")
+    fixed = _mean_accuracy([provider.recognize(path) for path in photo_documents], photo_documents)
+    monkeypatch.setenv(OCR_ADAPTIVE_ENV, "1")
+
+    results = benchmark.pedantic(lambda: [provider.recognize(path) for path in photo_documents], rounds=1, iterations=1)
+
+    adaptive = _mean_accuracy(results, photo_documents)
+    benchmark.extra_info["fixed_accuracy"] = round(fixed, 3)
+    benchmark.extra_info["adaptive_accuracy"] = round(adaptive, 3)
+    assert adaptive >= fixed
+
+
+def _ink_overlap(binary, clean):
+    """Intersection over union of the ink on ``binary``, scaled to ``clean``, and on ``clean``."""
+    height, width = clean.shape
+    ink = cv2.resize(binary, (width, height), interpolation=cv2.INTER_AREA) < 128
+    clean_ink = clean < 128
+    return (ink & clean_ink).sum() / max((ink | clean_ink).sum(), 1)
+
+
+def test_adaptive_preparation_recovers_the_clean_page(monkeypatch, synthetic_claims, photo_documents):
+    """
+    What Tesseract would be handed in each mode, without Tesseract: the
+    binarized photo is compared with the binarized original document.
+    """
+    monkeypatch.setenv(OCR_ADAPTIVE_ENV, "1")
+    originals = [path for _, paths in synthetic_claims for path in paths][:BENCH_DOCUMENTS]
+    overlaps = []
+    for original, photo in zip(originals, photo_documents):
+        clean = preprocess_image(cv2.imread(original, cv2.IMREAD_GRAYSCALE))
+        (page,) = load_pages(photo)
+        image, profile = prepare_page(page.image, page.source)
+        overlaps.append((_ink_overlap(preprocess_image(page.image), clean), _ink_overlap(binarize(image, profile), clean)))
+
+    # the fixed pipeline's single Otsu threshold blacks out the shaded side of the photo
+    assert all(adaptive > fixed for fixed, adaptive in overlaps)
+    assert np.mean([adaptive for _, adaptive in overlaps]) > 0.35
+
+
+def test_page_preparation(benchmark, photo_documents):
+    pages = [page for path in photo_documents for page in load_pages(path)]
+
+    prepared = benchmark(lambda: [prepare_page(page.image, page.source) for page in pages])
+
+    for page, (image, profile) in zip(pages, prepared):
+        # the 4x enlargement is brought back to the target glyph height and the rotation straightened
+        assert max(image.shape) < max(page.image.shape)
+        assert 20 <= profile.glyph_px <= 28
+        assert abs(analyze_page(image).skew) < 1.0
+        assert profile.uneven
+
+
+def test_pdf_page_render(benchmark, synthetic_claims, tmp_path):
+    # a scanned PDF: page images and no text layer
+    pdf_path = tmp_path / "scan.pdf"
+    doc = fitz.open()
+    for path in synthetic_claims[0][1]:
+        page = doc.new_page(width=612, height=792)
+        page.insert_image(page.rect, filename=path, keep_proportion=True)
+    doc.save(pdf_path)
+    doc.close()
+
+    pages = benchmark(lambda: list(load_pages(str(pdf_path))))
+
+    assert len(pages) == len(synthetic_claims[0][1])
+    for page in pages:
+        assert page.text is None and page.image.ndim == 2 and page.image.dtype == np.uint8
+        # the image is the pixmap's own buffer, not a converted copy
+        assert np.shares_memory(page.image, np.frombuffer(page.pixmap.samples_mv, dtype=np.uint8))
+
+
+class _Broken(OcrProvider):
+    name = "broken"
+
+    def recognize(self, path):
+        raise RuntimeError("engine crashed")
+
+
+class _Blurry(OcrProvider):
+    name = "blurry"
+
+    def recognize(self, path):
+        return OcrResult(provider=self.name, pages=[OcrPage("Am0unt: 5OO\n", 0.9), OcrPage("??\n", 0.2)])
+
+
+@pytest.fixture
+def stand_in_providers(monkeypatch):
+    """``broken`` and ``blurry``, registered for one test only."""
+    for provider in (_Broken(), _Blurry()):
+        monkeypatch.setitem(ocr_service._providers, provider.name, provider)
+
+
+def test_fallback_chain(monkeypatch, synthetic_claims, stand_in_providers):
+    path = synthetic_claims[0][1][1]
+
+    monkeypatch.setenv(OCR_PROVIDERS_ENV, "missing,broken,blurry,fake")
+    result = recognize(path)
+    assert result.provider == "fake"
+    assert result.text == fake_ocr(path)
+
+    # nothing passes the confidence bar: the best attempt is kept
+    monkeypatch.setenv(OCR_PROVIDERS_ENV, "broken,blurry")
+    assert recognize(path).provider == "blurry"
+
+    # per document type, guessed from the file name ("..._bill.png")
+    monkeypatch.setenv("OCR_PROVIDERS_BILL", "blurry,fake")
+    assert provider_chain(path) == ["blurry", "fake"]
+    assert provider_chain(synthetic_claims[0][1][0]) == ["broken", "blurry"]
+
+
+def test_stand_in_providers_do_not_outlive_their_test():
+    assert get_provider("broken") is None and get_provider("blurry") is None
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("CL-1_bill.png", "bill"),
+    ("hospital-invoice-2.pdf", "bill"),
+    ("policy_schedule.pdf", "policy"),
+    ("aadhaar_front.jpg", "id_proof"),
+    ("fir_report.pdf", "report"),
+    # "id" is part of too many names to mean an identity document
+    ("claim_id_17.png", None),
+    ("id_photo.jpg", None),
+])
+def test_document_type_from_file_name(name, expected):
+    assert guess_document_type(f"/uploads/{name}") == expected
+
+
+class _StubTessApi:
+    """Records what TesseractProvider hands to tesserocr's PyTessBaseAPI."""
+
+    def __init__(self, text, score):
+        self.text, self.score = text, score
+        self.calls = []
+
+    def SetPageSegMode(self, psm):
+        self.calls.append(("psm", psm))
+
+    def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+        self.calls.append(("image", data, width, height, bytes_per_pixel, bytes_per_line))
+
+    def GetUTF8Text(self):
+        return self.text
+
+    def MeanTextConf(self):
+        return self.score
+
+
+@pytest.mark.parametrize("text, score, confidence", [
+    ("Amount: 500\n", 87, 0.87),
+    ("   \n", 95, None),
+    ("Amount: 500\n", -1, None),
+])
+def test_tesserocr_gets_the_page_bytes_and_reports_its_confidence(text, score, confidence):
+    provider = ocr_service.TesseractProvider()
+    api = provider._local.api = _StubTessApi(text, score)
+    binary = np.arange(15, dtype=np.uint8).reshape(3, 5)
+
+    page = provider._read_in_process(binary[:, ::-1], 6)
+
+    assert api.calls == [("psm", 6), ("image", binary[:, ::-1].tobytes(), 5, 3, 1, 5)]
+    assert page.text == text and page.confidence == confidence
+
+
+def test_tesserocr_is_used_when_installed(monkeypatch):
+    provider = ocr_service.TesseractProvider()
+    provider._local.api = _StubTessApi("Policy Number: MOT-1\n", 90)
+    monkeypatch.setattr(ocr_service, "_tesserocr_enabled", lambda: True)
+
+    def no_binary(*args, **kwargs):
+        raise AssertionError("the tesseract binary must not be called")
+
+    monkeypatch.setattr(provider, "_read_with_binary", no_binary)
+    page = provider.recognize_page(np.full((40, 60), 255, dtype=np.uint8))
+
+    assert page.text == "Policy Number: MOT-1\n" and page.confidence == 0.9
+    assert provider.available()
+
+
+class _Response:
+    def __init__(self, body=None, headers=None):
+        self.body, self.headers = body, headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class _StubSession:
+    """Answers the analyze POST, then one poll response per GET."""
+
+    def __init__(self, polls):
+        self.polls = list(polls)
+        self.requests = []
+
+    def post(self, url, **kwargs):
+        self.requests.append(("POST", url, kwargs))
+        return _Response(headers={"Operation-Location": "https://ocr.test/operations/42"})
+
+    def get(self, url, **kwargs):
+        self.requests.append(("GET", url, kwargs))
+        return self.polls.pop(0)
+
+
+class _Clock:
+    def __init__(self):
+        self.now, self.sleeps = 0.0, []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def azure(monkeypatch, tmp_path):
+    monkeypatch.setenv(AZURE_ENDPOINT_ENV, "https://ocr.test/")
+    monkeypatch.setenv(AZURE_KEY_ENV, "secret")
+    monkeypatch.setenv(AZURE_TIMEOUT_SECONDS_ENV, "10")
+    clock = _Clock()
+    monkeypatch.setattr(azure_ocr_service, "time", clock)
+    document = tmp_path / "bill.png"
+    document.write_bytes(b"png bytes")
+    return azure_ocr_service.AzureReadProvider(), clock, str(document)
+
+
+def test_azure_polls_until_the_read_succeeds(azure):
+    provider, clock, path = azure
+    analysis = {"pages": [
+        {
+            "lines": [{"content": "Hospital Bill"}, {"content": "Amount: Rs. 1,840"}],
+            "words": [{"content": "Hospital", "confidence": 0.9}, {"content": "Bill", "confidence": 0.7}, {"content": "Amount:"}],
+        },
+        {"lines": [], "words": []},
+    ]}
+    provider.session = _StubSession([
+        _Response({"status": "notStarted"}, {"Retry-After": "2"}),
+        _Response({"status": "running"}, {"Retry-After": "30"}),
+        _Response({"status": "succeeded", "analyzeResult": analysis}),
+    ])
+
+    result = provider.recognize(path)
+
+    method, url, post = provider.session.requests[0]
+    assert method == "POST" and url == "https://ocr.test/formrecognizer/documentModels/prebuilt-read:analyze"
+    assert post["data"] == b"png bytes" and post["headers"]["Ocp-Apim-Subscription-Key"] == "secret"
+    assert post["params"] == {"api-version": "2023-07-31"}
+    assert [request[1] for request in provider.session.requests[1:]] == ["https://ocr.test/operations/42"] * 3
+    # Retry-After is honoured, capped at five seconds
+    assert clock.sleeps == [2.0, 5.0]
+
+    assert result.provider == "azure"
+    assert [page.text for page in result.pages] == ["Hospital Bill\nAmount: Rs. 1,840\n", ""]
+    assert result.pages[0].confidence == pytest.approx(0.8) and result.pages[1].confidence is None
+
+
+def test_azure_reports_a_failed_read(azure):
+    provider, _, path = azure
+    provider.session = _StubSession([_Response({"status": "failed", "error": {"code": "InvalidImage"}})])
+
+    with pytest.raises(RuntimeError, match="InvalidImage"):
+        provider.recognize(path)
+
+
+def test_azure_gives_up_at_its_deadline(azure):
+    provider, clock, path = azure
+    provider.session = _StubSession([_Response({"status": "running"}, {"Retry-After": "4"}) for _ in range(10)])
+
+    with pytest.raises(TimeoutError, match="10s"):
+        provider.recognize(path)
+    assert clock.sleeps == [4.0, 4.0, 4.0] and clock.now > 10
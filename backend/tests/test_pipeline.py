@@ -0,0 +1,47 @@
+"""
+End-to-end benchmarks of the claim workflow against offline stand-ins:
+single-claim latency and claims/sec at several concurrency levels, with
+peak RSS attached to each result's ``extra_info``.
+
+    pytest tests --bench-claims 48
+    pytest tests --update-benchmark-baseline
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.langgraph_builder import run_claim_workflow
+from tests.stand_ins import peak_rss_mb
+
+
+FINAL_STATUSES = {"APPROVED", "REJECTED", "PENDING_REVIEW", "FLAGGED_FOR_REVIEW", "ESCALATED_FRAUD_REVIEW"}
+
+
+def _run(claim):
+    claim_id, paths = claim
+    return run_claim_workflow(claim_id=claim_id, document_paths=paths)
+
+
+def test_end_to_end_latency(benchmark, synthetic_claims):
+    state = benchmark(_run, synthetic_claims[0])
+
+    assert state["node7_output"]["final_status"] in FINAL_STATUSES
+    benchmark.extra_info["peak_rss_mb"] = peak_rss_mb()
+
+
+@pytest.mark.parametrize("concurrency", [1, 4, 8])
+def test_throughput(benchmark, synthetic_claims, concurrency):
+    def run_all():
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(_run, synthetic_claims))
+
+    states = benchmark.pedantic(run_all, rounds=3, iterations=1)
+
+    assert len(states) == len(synthetic_claims)
+    assert all(state["node7_output"]["final_status"] in FINAL_STATUSES for state in states)
+
+    stats = getattr(benchmark, "stats", None)
+    if stats:
+        benchmark.extra_info["claims_per_s"] = round(len(synthetic_claims) / stats.stats.mean, 2)
+    benchmark.extra_info["concurrency"] = concurrency
+    benchmark.extra_info["peak_rss_mb"] = peak_rss_mb()
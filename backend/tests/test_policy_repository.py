@@ -0,0 +1,196 @@
+"""Policy repository: validation, versioned bulk import, file readers and the duplicate migration."""
+import json
+from datetime import datetime
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app.database import policy_repository
+from app.database.mongo import policies_collection
+from app.database.policy_repository import (
+    PolicyValidationError,
+    dedupe_policies,
+    ensure_policy_indexes,
+    get_policy,
+    import_policies,
+    import_policy_file,
+    iter_json_array,
+    list_policy_versions,
+    normalize_policy,
+)
+
+
+PREFIX = "PRT-"
+
+
+def _raw(number="PRT-1", **overrides):
+    return {
+        "policyNumber": number,
+        "effectiveDate": "01/01/2026",
+        "expiryDate": "2026-12-31",
+        "sumInsured": "5,00,000",
+        "coverageDetails": {"deductible": "2500", "limits": {"ownDamage": "300000"}},
+        "exclusions": "Racing|Intentional damage",
+        **overrides,
+    }
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    collections = (
+        policies_collection,
+        policy_repository.policy_versions_collection,
+        policy_repository.policy_duplicates_collection,
+    )
+    for collection in collections:
+        collection.delete_many({"policyNumber": {"$regex": f"^{PREFIX}"}})
+    yield
+    for collection in collections:
+        collection.delete_many({"policyNumber": {"$regex": f"^{PREFIX}"}})
+
+
+def test_normalize_coerces_only_known_numeric_fields():
+    policy = normalize_policy(_raw(
+        policyNumber=" prt-1 ",
+        coverageDetails={
+            "deductible": "2,500",
+            "limits": {"ownDamage": "300000", "thirdParty": 750000.0},
+            "addOns": "Zero depreciation",
+            "roadsideAssistance": "yes",
+            "notes": "",
+        },
+    ))
+
+    assert policy["policyNumber"] == "PRT-1"
+    assert policy["sumInsured"] == 500000
+    assert policy["effectiveDate"] == datetime(2026, 1, 1)
+    assert policy["coverageDetails"] == {
+        "deductible": 2500,
+        "limits": {"ownDamage": 300000, "thirdParty": 750000.0},
+        "addOns": "Zero depreciation",
+        "roadsideAssistance": "yes",
+    }
+    assert policy["exclusions"] == ["Racing", "Intentional damage"]
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"sumInsured": ""}, "missing required"),
+    ({"expiryDate": "not a date"}, "expiryDate is not a recognised date"),
+    ({"expiryDate": "2025-01-01"}, "after effectiveDate"),
+    ({"sumInsured": "-5"}, "must be positive"),
+    ({"coverageDetails": {"limits": {"ownDamage": "unlimited"}}}, "coverageDetails.limits.ownDamage must be a number"),
+    ({"coverageDetails": "full"}, "must be an object"),
+])
+def test_normalize_rejects_bad_records(overrides, message):
+    with pytest.raises(PolicyValidationError, match=message):
+        normalize_policy(_raw(**overrides))
+
+
+def test_import_versions_only_real_changes():
+    first = import_policies([_raw("PRT-1"), _raw("PRT-2"), _raw("PRT-3", sumInsured="x")], source="a.jsonl")
+    assert (first["created"], first["invalid"]) == (2, 1)
+    assert first["errors"][0]["policyNumber"] == "PRT-3"
+
+    again = import_policies([_raw("PRT-1")])
+    assert again["unchanged"] == 1 and get_policy("PRT-1")["version"] == 1
+
+    changed = import_policies([_raw("PRT-1", exclusions="Racing")], source="b.jsonl")
+    assert changed["updated"] == 1
+
+    current = get_policy("PRT-1")
+    assert current["version"] == 2 and current["exclusions"] == ["Racing"] and current["source"] == "b.jsonl"
+    assert get_policy("PRT-1", version=1)["exclusions"] == ["Racing", "Intentional damage"]
+    assert [entry["version"] for entry in list_policy_versions("PRT-1")] == [2, 1]
+
+
+def test_repeated_policy_within_one_batch_gets_successive_versions():
+    stats = import_policies([_raw("PRT-9"), _raw("PRT-9", sumInsured=600000), _raw("PRT-9", sumInsured=600000)])
+
+    assert (stats["created"], stats["updated"], stats["unchanged"]) == (1, 1, 1)
+    assert get_policy("PRT-9")["version"] == 2 and get_policy("PRT-9")["sumInsured"] == 600000
+
+
+def test_lookups_normalize_the_policy_number():
+    import_policies([_raw("PRT-7")])
+
+    assert get_policy(" prt-7 ")["policyNumber"] == "PRT-7"
+    assert get_policy("prt-7", version=1)["version"] == 1
+    assert [entry["version"] for entry in list_policy_versions("Prt-7")] == [1]
+
+
+class _FailingWrites:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return self._collection.find(*args, **kwargs)
+
+    def bulk_write(self, *args, **kwargs):
+        raise ConnectionError("mongo went away")
+
+
+def test_an_import_interrupted_after_the_versions_write_can_be_rerun(monkeypatch):
+    import_policies([_raw("PRT-5")])
+    changed = _raw("PRT-5", sumInsured=750000)
+
+    # the versions write lands, the current-document write does not
+    with monkeypatch.context() as crashed:
+        crashed.setattr(policy_repository, "policies_collection", _FailingWrites(policies_collection))
+        with pytest.raises(ConnectionError):
+            import_policies([changed])
+    assert get_policy("PRT-5")["version"] == 1
+
+    assert import_policies([changed])["updated"] == 1
+    assert get_policy("PRT-5")["version"] == 2 and get_policy("PRT-5")["sumInsured"] == 750000
+    assert [entry["version"] for entry in list_policy_versions("PRT-5")] == [2, 1]
+    assert get_policy("PRT-5", version=2)["sumInsured"] == 750000
+
+
+def test_csv_headers_nest_into_coverage_details(tmp_path):
+    path = tmp_path / "policies.csv"
+    path.write_text(
+        "policyNumber,effectiveDate,expiryDate,sumInsured,coverageDetails.deductible,"
+        "coverageDetails.limits.ownDamage,coverageDetails.addOns,exclusions\n"
+        "PRT-CSV,01/01/2026,31/12/2026,400000,1000,200000,Engine protect,Racing;War\n"
+    )
+
+    assert import_policy_file(path)["created"] == 1
+    policy = get_policy("PRT-CSV")
+    assert policy["coverageDetails"] == {"deductible": 1000, "limits": {"ownDamage": 200000}, "addOns": "Engine protect"}
+    assert policy["exclusions"] == ["Racing", "War"] and policy["source"] == "policies.csv"
+
+
+def test_json_array_streams_across_chunk_boundaries(tmp_path):
+    records = [_raw(f"PRT-J{index}", coverageDetails={"notes": "brace } and [bracket"}) for index in range(5)]
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps(records, indent=1))
+
+    assert [record["policyNumber"] for record in iter_json_array(path, chunk_size=16)] == [f"PRT-J{index}" for index in range(5)]
+
+    bad = tmp_path / "bad.json"
+    bad.write_text('{"policyNumber": "PRT-X"}')
+    with pytest.raises(PolicyValidationError, match="JSON array"):
+        list(iter_json_array(bad))
+
+
+def test_duplicates_are_moved_aside_before_the_unique_index():
+    policies_collection.drop_indexes()
+    now = datetime.utcnow()
+    policies_collection.insert_many([
+        {"policyNumber": "PRT-D1", "sumInsured": 1, "updated_at": now},
+        {"policyNumber": "PRT-D1", "sumInsured": 2, "version": 3, "updated_at": now},
+        {"policyNumber": "PRT-D1", "sumInsured": 3, "updated_at": now},
+        {"policyNumber": "PRT-D2", "sumInsured": 4},
+        {"policyNumber": "PRT-D2", "sumInsured": 5},
+    ])
+    last_d2 = list(policies_collection.find({"policyNumber": "PRT-D2"}).sort("_id", -1))[0]["_id"]
+
+    assert dedupe_policies() == 3
+    assert policies_collection.find_one({"policyNumber": "PRT-D1"})["sumInsured"] == 2
+    assert policies_collection.find_one({"policyNumber": "PRT-D2"})["_id"] == last_d2
+    assert policy_repository.policy_duplicates_collection.count_documents({"policyNumber": "PRT-D1"}) == 2
+    assert dedupe_policies() == 0
+
+    ensure_policy_indexes()
+    with pytest.raises(DuplicateKeyError):
+        policies_collection.insert_one({"policyNumber": "PRT-D1"})
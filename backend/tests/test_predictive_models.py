@@ -0,0 +1,129 @@
+"""Node 5 models: ridge/softmax fit and predict, artifact versioning and reload, heuristic fallback."""
+import numpy as np
+import pytest
+
+from app.nodes.node5_predictive import cost_model, severity_model, timeline_model
+from app.nodes.node5_predictive.linear_models import (
+    MODELS_DIR_ENV,
+    ModelHandle,
+    RidgeRegressor,
+    SoftmaxClassifier,
+    build_feature_matrix,
+    save_model,
+)
+from app.nodes.node5_predictive.predictive_agent import (
+    estimate_reserve,
+    predictive_analysis_batch,
+    prediction_confidence,
+)
+
+
+HANDLES = (
+    (cost_model.cost_model, cost_model.MODEL_PATH_ENV),
+    (severity_model.severity_model, severity_model.MODEL_PATH_ENV),
+    (timeline_model.timeline_model, timeline_model.MODEL_PATH_ENV),
+)
+
+
+@pytest.fixture
+def models_dir(monkeypatch, tmp_path):
+    """An empty models directory; every handle falls back to its heuristic until something is saved."""
+    monkeypatch.setenv(MODELS_DIR_ENV, str(tmp_path))
+    for handle, env_name in HANDLES:
+        monkeypatch.delenv(env_name, raising=False)
+        handle.reload()
+    yield tmp_path
+    for handle, _ in HANDLES:
+        handle.reload()
+
+
+def _features(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return build_feature_matrix(
+        rng.uniform(1000, 150000, n),
+        rng.uniform(0, 1, n),
+        rng.uniform(0.5, 1, n),
+        rng.integers(0, 2, n),
+    )
+
+
+def test_ridge_recovers_a_linear_target():
+    X = _features()
+    y = 2.0 + X @ np.array([1.0, -0.5, 0.25, 0.1])
+
+    model = RidgeRegressor(alpha=1e-6).fit(X, y)
+
+    assert np.allclose(model.predict(X), y, atol=1e-4)
+
+
+def test_softmax_separates_amount_bands():
+    X = _features()
+    amounts = np.expm1(X[:, 0])
+    labels = np.select([amounts < 20000, amounts < 80000], ["LOW", "MEDIUM"], default="HIGH")
+
+    model = SoftmaxClassifier(("LOW", "MEDIUM", "HIGH"), epochs=2000).fit(X, labels)
+
+    assert np.mean(model.predict(X) == labels) >= 0.9
+    assert set(model.predict(X[:5])) <= {"LOW", "MEDIUM", "HIGH"}
+
+
+def test_save_model_versions_and_handle_reload(models_dir):
+    X = _features()
+    y = np.log1p(np.expm1(X[:, 0]) * 0.5)
+    handle = ModelHandle("cost_model", cost_model.MODEL_PATH_ENV)
+    assert handle.get() is None
+
+    assert save_model("cost_model", RidgeRegressor().fit(X, y), {"mae": 1.0}) == 1
+    assert handle.get() is None  # cached until reloaded
+    handle.reload()
+    assert handle.version() == 1
+
+    assert save_model("cost_model", RidgeRegressor().fit(X, y)) == 2
+    handle.reload()
+    assert handle.version() == 2
+    assert sorted(path.name for path in models_dir.iterdir()) == ["cost_model.pkl", "cost_model.v1.pkl", "cost_model.v2.pkl"]
+
+
+def test_handle_honours_its_path_override_and_rejects_other_features(models_dir, monkeypatch):
+    import joblib
+
+    save_model("severity_model", SoftmaxClassifier(("LOW", "HIGH"), epochs=1).fit(_features(10), ["LOW", "HIGH"] * 5))
+    pinned = models_dir / "pinned.pkl"
+    joblib.dump({**joblib.load(models_dir / "severity_model.v1.pkl"), "version": 9}, pinned)
+    stale = models_dir / "stale.pkl"
+    joblib.dump({**joblib.load(pinned), "features": ("log_amount",)}, stale)
+    handle = ModelHandle("severity_model", severity_model.MODEL_PATH_ENV)
+
+    monkeypatch.setenv(severity_model.MODEL_PATH_ENV, str(pinned))
+    assert handle.version() == 9
+
+    monkeypatch.setenv(severity_model.MODEL_PATH_ENV, str(stale))
+    handle.reload()
+    assert handle.get() is None
+
+
+def test_heuristic_fallback_matches_the_original_formulas(models_dir):
+    amounts = [5000.0, 50000.0, 120000.0]
+    fraud_scores = [0.0, 0.5, 0.9]
+    consistency_scores = [1.0, 0.8, 0.4]
+
+    results = predictive_analysis_batch(amounts, fraud_scores, consistency_scores, [True, True, False])
+
+    for result, amount, fraud, consistency, severity in zip(
+        results, amounts, fraud_scores, consistency_scores, ("LOW", "MEDIUM", "HIGH")
+    ):
+        assert result["damage_severity"] == severity
+        assert result["estimated_settlement_days"] == {"LOW": 7, "MEDIUM": 21, "HIGH": 45}[severity] + int(fraud * 30)
+        assert result["predicted_final_cost"] == pytest.approx(amount * (1 + fraud * 0.3) * (1 + (1 - consistency) * 0.2), abs=0.01)
+        assert result["recommended_reserve"] == round(amount + amount * (0.1 + fraud * 0.2), 2)
+        assert result["prediction_confidence"] == round(0.7 * consistency + 0.3 * (1 - fraud), 2)
+        assert result["model_versions"] == {"cost": None, "severity": None, "timeline": None}
+        assert type(result["predicted_final_cost"]) is float and type(result["estimated_settlement_days"]) is int
+
+
+def test_scalar_helpers_return_python_floats():
+    reserve = estimate_reserve(10000, 0.5)
+    confidence = prediction_confidence(0.9, 0.2)
+
+    assert reserve == 12000.0 and type(reserve) is float
+    assert confidence == 0.87 and type(confidence) is float
@@ -0,0 +1,148 @@
+"""Bulk re-scoring: fraud-history hand-off to worker processes, write-back and feature refresh."""
+import json
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from app.database import feature_store
+from app.database.feature_store import backfill_feature_table
+from app.nodes.node4_fraud_detection import benford, network_analysis
+from app.nodes.node4_fraud_detection.benford import BenfordEngine
+from app.nodes.node4_fraud_detection.network_analysis import ClaimNetwork
+from app.services import rescoring_service
+from app.services.rescoring_service import install_fraud_history, run_rescore
+
+
+PREFIX = "RS-TEST-"
+
+
+def _node1(index):
+    return {"documents": [{
+        "file": f"claim_{index}_bill.png",
+        "document_type": "bill",
+        "extracted_text": f"Amount: Rs. {2000 * (index + 1)}",
+        "structured_fields": {
+            "amount": f"Rs. {2000 * (index + 1)}",
+            "claimer_name": f"Claimant {index}",
+            "claimer_email": f"rs{index}@x.com",
+            "policy_number": "MOT-12345678",
+            "incident_date": "05/03/2026",
+            "description": "Rear bumper damaged in a collision",
+        },
+    }]}
+
+
+class _InProcessPool(ThreadPoolExecutor):
+    """Stands in for the spawn pool; the initializer payload still has to survive pickling."""
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        super().__init__(max_workers, initializer=initializer, initargs=pickle.loads(pickle.dumps(initargs)))
+
+
+@pytest.fixture
+def stored(offline_pipeline):
+    from app.database.mongo import claims_collection
+
+    selector = {"claim_id": {"$regex": f"^{PREFIX}"}}
+    claims_collection.delete_many(selector)
+    feature_store.claim_features_collection.delete_many(selector)
+    claims = [
+        {
+            "claim_id": f"{PREFIX}{index}",
+            "status": "PENDING_REVIEW",
+            "fraud_score": 0.99,
+            "claim_amount": 2000.0 * (index + 1),
+            "form_data": {"node1_output": _node1(index)},
+            "updated_at": datetime.utcnow(),
+        }
+        for index in range(6)
+    ]
+    claims[0]["review"] = {"decision": "PENDING_REVIEW", "reviewer": "u1"}
+    claims_collection.insert_many([dict(claim) for claim in claims])
+    backfill_feature_table(selector)
+    yield claims
+    claims_collection.delete_many(selector)
+    feature_store.claim_features_collection.delete_many(selector)
+
+
+def test_snapshots_round_trip_through_pickle():
+    network = ClaimNetwork()
+    network.add_claim("A", {"phone:1"}, "email:a")
+    network.add_claim("B", {"phone:1"}, "email:b")
+    engine = BenfordEngine()
+    engine.observe("A", {"claimant": "X"}, 1234)
+
+    copy = ClaimNetwork()
+    copy.restore(pickle.loads(pickle.dumps(network.snapshot())))
+    engine_copy = BenfordEngine()
+    engine_copy.restore(pickle.loads(pickle.dumps(engine.snapshot())))
+
+    assert copy.claim_features("B") == network.claim_features("B")
+    network.add_claim("C", {"phone:1"}, "email:c")
+    assert copy.claim_features("B")["component_claims"] == 2
+    assert not engine_copy.observe("A", {"claimant": "X"}, 1234)
+    assert engine_copy.evaluate({"claimant": "X"})[0]["samples"] == 1
+
+
+def test_workers_start_from_the_parents_history(stored, monkeypatch, tmp_path):
+    loads = {"network": 0, "benford": 0}
+
+    def counting(name, load):
+        def wrapped():
+            loads[name] += 1
+            return load()
+        return wrapped
+
+    for name, sync, load in (
+        ("network", network_analysis.network_sync, network_analysis.rebuild_claim_network),
+        ("benford", benford.benford_sync, benford.backfill_benford),
+    ):
+        monkeypatch.setattr(sync, "_load", counting(name, load))
+        monkeypatch.setattr(sync, "_watermark", None)
+        monkeypatch.setattr(sync, "_checked_at", None)
+    monkeypatch.setattr(rescoring_service, "ProcessPoolExecutor", _InProcessPool)
+    report = tmp_path / "diff.jsonl"
+
+    summary = run_rescore(
+        query={"claim_id": {"$regex": f"^{PREFIX}"}},
+        workers=2,
+        chunk_size=2,
+        apply=True,
+        diff_report=str(report),
+    )
+
+    # one load in the parent; the workers installed its snapshot instead of backfilling
+    assert loads == {"network": 1, "benford": 1}
+    assert summary["claims"] == 6 and summary["errors"] == 0
+    assert summary["written"] == 6 and summary["features_refreshed"] == 6
+
+    from app.database.mongo import claims_collection
+
+    stored_claims = {claim["claim_id"]: claim for claim in claims_collection.find({"claim_id": {"$regex": f"^{PREFIX}"}})}
+    rows = feature_store.load_feature_rows(stored_claims)
+    for claim_id, claim in stored_claims.items():
+        assert claim["rescore"]["run_id"] == summary["run_id"]
+        assert rows[claim_id]["fraud_score"] == pytest.approx(claim["fraud_score"])
+        assert rows[claim_id]["fraud_score"] != 0.99
+    # a human decision survives the re-score
+    assert stored_claims[f"{PREFIX}0"]["status"] == "PENDING_REVIEW"
+
+    changed = [json.loads(line)["claim_id"] for line in report.read_text().splitlines()]
+    assert len(changed) == summary["changed"]
+
+
+def test_install_without_a_watermark_leaves_sync_alone(monkeypatch):
+    monkeypatch.setattr(network_analysis, "claim_network", ClaimNetwork())
+    monkeypatch.setattr(benford, "benford_engine", BenfordEngine())
+    marked = []
+    monkeypatch.setattr(network_analysis.network_sync, "mark_loaded", marked.append)
+    monkeypatch.setattr(benford.benford_sync, "mark_loaded", marked.append)
+    network = ClaimNetwork()
+    network.add_claim("A", {"phone:1"}, "email:a")
+
+    install_fraud_history({"network": (network.snapshot(), None), "benford": (BenfordEngine().snapshot(), None)})
+
+    assert network_analysis.claim_network.claim_features("A")["entity_count"] == 1
+    assert marked == []
@@ -0,0 +1,138 @@
+"""Fraud rule engine: compilation, scalar and batch evaluation, hot reload and back-testing."""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.nodes.node4_fraud_detection.rule_engine import (
+    RELOAD_INTERVAL_ENV,
+    RULES_PATH_ENV,
+    RuleConfigError,
+    RuleRegistry,
+    RuleSet,
+    backtest,
+    feature_columns,
+)
+
+
+CONFIG = {
+    "version": 7,
+    "rules": [
+        {"id": "big", "indicator": "amount {claim_amount:.0f}", "weight": 0.2,
+         "when": {"feature": "claim_amount", "op": "gt", "value": 100000}},
+        {"id": "early_round", "weight": 0.1,
+         "when": {"all": [
+             {"feature": "days_since_policy", "op": "lt", "value": 7},
+             {"feature": "round_amount", "op": "eq", "value": True},
+         ]}},
+        {"id": "not_watchlist", "weight": 0.05,
+         "when": {"not": {"feature": "watchlist_hit", "op": "eq", "value": True}}},
+        {"id": "ring", "weight": 0.3,
+         "when": {"any": [
+             {"feature": "network_component_claimants", "op": "gte", "value": 3},
+             {"feature": "network_max_entity_claimants", "op": "in", "value": [5, 6]},
+         ]}},
+        {"id": "off", "enabled": False, "weight": 1.0,
+         "when": {"feature": "claim_amount", "op": "gte", "value": 0}},
+    ],
+}
+
+ROWS = [
+    {"claim_amount": 250000, "days_since_policy": 3, "round_amount": True},
+    {"claim_amount": 500, "days_since_policy": 30, "watchlist_hit": True, "network_component_claimants": 4},
+    {"claim_amount": 120000, "network_max_entity_claimants": 5},
+    {},
+]
+
+
+@pytest.mark.parametrize("rule, message", [
+    ({"id": "x", "when": {"feature": "nope", "op": "eq", "value": 1}}, "unknown feature"),
+    ({"id": "x", "when": {"feature": "claim_amount", "op": "approx", "value": 1}}, "unknown operator"),
+    ({"id": "x", "when": {"all": []}}, "empty 'all'"),
+    ({"when": {"feature": "claim_amount", "op": "eq", "value": 1}}, "needs an 'id'"),
+])
+def test_compile_rejects_bad_rules(rule, message):
+    with pytest.raises(RuleConfigError, match=message):
+        RuleSet({"rules": [rule]})
+
+
+def test_compile_rejects_duplicate_ids():
+    rule = {"id": "x", "when": {"feature": "claim_amount", "op": "eq", "value": 1}}
+    with pytest.raises(RuleConfigError, match="duplicate"):
+        RuleSet({"rules": [rule, rule]})
+
+
+def test_evaluate():
+    rule_set = RuleSet(CONFIG)
+    assert [rule.id for rule in rule_set.rules] == ["big", "early_round", "not_watchlist", "ring"]
+
+    score, indicators, fired = rule_set.evaluate(ROWS[0])
+    assert fired == ["big", "early_round", "not_watchlist"]
+    assert score == pytest.approx(0.35)
+    assert indicators == ["amount 250000", "early_round", "not_watchlist"]
+
+    assert rule_set.evaluate(ROWS[1])[2] == ["ring"]
+    assert rule_set.evaluate(ROWS[3]) == (pytest.approx(0.05), ["not_watchlist"], ["not_watchlist"])
+    assert rule_set.risk_level(0.35) == "MEDIUM" and rule_set.risk_level(0.9) == "CRITICAL"
+
+    stats = {rule["id"]: rule for rule in rule_set.stats()["rules"]}
+    assert stats["not_watchlist"]["hits"] == 2 and stats["not_watchlist"]["evaluations"] == 3
+
+
+def test_evaluate_batch_matches_evaluate():
+    rule_set = RuleSet(CONFIG)
+
+    result = rule_set.evaluate_batch(feature_columns(ROWS))
+
+    assert result["hits"].shape == (4, len(ROWS))
+    for column, row in enumerate(ROWS):
+        score, _, fired = rule_set.evaluate(row)
+        assert result["scores"][column] == pytest.approx(score)
+        assert [rule_id for rule_id, hit in zip(result["rule_ids"], result["hits"][:, column]) if hit] == fired
+
+    empty = RuleSet({"rules": []}).evaluate_batch(feature_columns(ROWS))
+    assert empty["hits"].shape == (0, len(ROWS)) and not np.any(empty["scores"])
+
+
+def test_backtest():
+    records = [(f"C{index}", 0.1 * index, row) for index, row in enumerate(ROWS)]
+
+    summary = backtest(RuleSet(CONFIG), records)
+
+    assert summary["version"] == 7 and summary["claims"] == 4
+    hits = {rule["id"]: rule["hits"] for rule in summary["rules"]}
+    assert hits == {"big": 2, "early_round": 1, "not_watchlist": 3, "ring": 2}
+    assert summary["mean_stored_fraud_score"] == pytest.approx(0.15)
+
+
+def test_registry_hot_reloads_and_keeps_the_last_good_rules(monkeypatch, tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(CONFIG))
+    monkeypatch.setenv(RULES_PATH_ENV, str(path))
+    monkeypatch.setenv(RELOAD_INTERVAL_ENV, "0")
+    registry = RuleRegistry()
+
+    first = registry.get()
+    assert first.version == 7 and registry.get() is first
+
+    path.write_text(json.dumps({**CONFIG, "version": 8, "rules": CONFIG["rules"][:1]}))
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+    second = registry.get()
+    assert second.version == 8 and [rule.id for rule in second.rules] == ["big"]
+
+    path.write_text("{not json")
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+    assert registry.get() is second
+
+
+def test_shipped_rules_ignore_one_claimants_repeat_claims(monkeypatch):
+    monkeypatch.delenv(RULES_PATH_ENV, raising=False)
+    rule_set = RuleRegistry().get()
+
+    repeat_customer = {"network_component_claims": 6, "network_component_claimants": 1,
+                       "network_max_entity_degree": 6, "network_max_entity_claimants": 1, "days_since_policy": 400}
+    ring = {**repeat_customer, "network_component_claimants": 4, "network_max_entity_claimants": 3}
+
+    assert not {"network_ring", "shared_entity"} & set(rule_set.evaluate(repeat_customer)[2])
+    assert {"network_ring", "shared_entity"} <= set(rule_set.evaluate(ring)[2])
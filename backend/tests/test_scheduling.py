@@ -0,0 +1,126 @@
+"""Priority classes: classification, sched_at ordering with aging, and reclassifying uploads after Node 1."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.scheduling import BACKFILL, EXPEDITED, HIGH_VALUE, STANDARD, classify, sched_at
+from app.database import job_queue
+from app.database.job_queue import QUEUED, SUCCEEDED, enqueue_job, get_job, lease_job
+from app.nodes.node1_extraction import extractor
+from app.services import claim_processing
+from app.worker import Worker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    job_queue.claim_jobs_collection.delete_many({})
+    now = [datetime(2026, 3, 1, 9, 0)]
+    monkeypatch.setattr(job_queue, "_utcnow", lambda: now[0])
+    yield now
+    job_queue.claim_jobs_collection.delete_many({})
+
+
+@pytest.mark.parametrize("claim_type, amount, backfill, expected", [
+    ("Health", 20_000, False, EXPEDITED),
+    ("Health", 50_000, False, EXPEDITED),
+    ("Health", 50_001, False, STANDARD),
+    ("Property", 1_000_000, False, HIGH_VALUE),
+    ("Property", 999_999, False, STANDARD),
+    ("Motor", 5_000_000, False, STANDARD),
+    ("Property", None, False, STANDARD),
+    ("Health", 20_000, True, BACKFILL),
+])
+def test_classify(claim_type, amount, backfill, expected):
+    assert classify(claim_type, amount, backfill=backfill) == expected
+
+
+def test_classes_are_leased_in_sched_at_order(clock):
+    for claim_id, priority_class in [("SCH-B", BACKFILL), ("SCH-S", STANDARD), ("SCH-H", HIGH_VALUE), ("SCH-E", EXPEDITED)]:
+        enqueue_job("resume", claim_id, priority_class=priority_class)
+
+    leased = [lease_job("w1")["claim_id"] for _ in range(4)]
+
+    assert leased == ["SCH-E", "SCH-H", "SCH-S", "SCH-B"]
+
+
+def test_waiting_backfill_ages_past_fresh_standard_work(clock):
+    enqueue_job("backfill", "SCH-OLD", {"document_paths": ["a.png"]}, priority_class=BACKFILL)
+    clock[0] += timedelta(minutes=29)
+    enqueue_job("submit", "SCH-NEW", {"claim": {}}, priority_class=STANDARD)
+
+    # backfill is due at +30 min, the standard job at +31 min
+    assert sched_at(BACKFILL, clock[0] - timedelta(minutes=29)) < sched_at(STANDARD, clock[0])
+    assert lease_job("w1")["claim_id"] == "SCH-OLD"
+    assert lease_job("w1")["claim_id"] == "SCH-NEW"
+
+
+def _extraction(amount):
+    return {"documents": [{
+        "file": "estimate.png",
+        "document_type": "bill",
+        "extracted_text": "",
+        "structured_fields": {"amount": f"Rs. {amount}", "policy_number": "MOT-12345678"},
+    }]}
+
+
+@pytest.mark.parametrize("claim_type, amount, expected", [
+    ("Property", 2_500_000, HIGH_VALUE),
+    ("Health", 12_000, EXPEDITED),
+])
+def test_uploads_are_reclassified_after_extraction(clock, monkeypatch, claim_type, amount, expected):
+    extractions, runs = [], []
+
+    def extract(document_paths):
+        extractions.append(document_paths)
+        return _extraction(amount)
+
+    def upload(claim_id, document_paths, claim_type, claimer, node1_output=None):
+        runs.append(node1_output)
+        return {"claim_id": claim_id, "status": "APPROVED"}
+
+    monkeypatch.setattr(extractor, "extract_documents", extract)
+    monkeypatch.setattr(claim_processing, "process_upload", upload)
+    job = enqueue_job("submit_upload", "SCH-UP", {"document_paths": ["estimate.png"], "claim_type": claim_type})
+    worker = Worker(lease_seconds=60)
+
+    assert worker.process_one("w1")
+    requeued = get_job(job["job_id"])
+    assert requeued["status"] == QUEUED and requeued["priority_class"] == expected
+    assert requeued["reclassified_from"] == STANDARD and requeued["attempts"] == 0
+    assert requeued["sched_at"] == sched_at(expected, job["created_at"])
+    assert requeued["payload"]["node1_output"] == _extraction(amount)
+    assert runs == []
+
+    assert worker.process_one("w1")
+    assert get_job(job["job_id"])["status"] == SUCCEEDED
+    assert extractions == [["estimate.png"]] and runs == [_extraction(amount)]
+
+
+def test_standard_uploads_run_straight_on(clock, monkeypatch):
+    runs = []
+    monkeypatch.setattr(extractor, "extract_documents", lambda document_paths: _extraction(80_000))
+    monkeypatch.setattr(
+        claim_processing,
+        "process_upload",
+        lambda claim_id, document_paths, claim_type, claimer, node1_output=None: runs.append(node1_output) or {},
+    )
+    job = enqueue_job("submit_upload", "SCH-STD", {"document_paths": ["bill.png"], "claim_type": "Motor"})
+
+    assert Worker(lease_seconds=60).process_one("w1")
+    assert get_job(job["job_id"])["status"] == SUCCEEDED and runs == [_extraction(80_000)]
+
+
+def test_the_workflow_reuses_an_earlier_extraction(synthetic_claims, monkeypatch):
+    from app.core import langgraph_builder
+
+    claim_id, paths = synthetic_claims[2]
+    node1_output = langgraph_builder.extract_documents(paths)
+
+    def no_extraction(*args, **kwargs):
+        raise AssertionError("Node 1 must reuse the queued extraction")
+
+    monkeypatch.setattr(langgraph_builder, "extract_documents", no_extraction)
+    state = langgraph_builder.run_claim_workflow(claim_id, paths, node1_output=node1_output)
+
+    assert state["node1_output"] == node1_output
+    assert state["node7_output"]["final_status"]
@@ -0,0 +1,86 @@
+"""
+Startup budgets for API workers and the CLI. Each check runs in a fresh
+interpreter, since the test session itself has already imported the
+pipeline.
+
+``import app.main`` must not load the OCR/ML/LangGraph stack or open a
+Mongo connection, and must fit in STARTUP_IMPORT_BUDGET_MS (1500 ms by
+default; cumulative ``-X importtime`` figure, best of three runs).
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = (
+    "cv2",
+    "fitz",
+    "pytesseract",
+    "PIL",
+    "langgraph",
+    "langsmith",
+    "joblib",
+    "numpy",
+    "rapidfuzz",
+    "app.core.langgraph_builder",
+)
+
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500"))
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def _python(*args):
+    env = {**os.environ, "PYTHONPATH": str(BACKEND_DIR), "MONGO_URI": "mongodb://localhost:27017"}
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _import_ms(module):
+    stderr = _python("-X", "importtime", "-c", f"import {module}").stderr
+    for cumulative_us, name in _IMPORTTIME_LINE.findall(stderr):
+        if name == module:
+            return int(cumulative_us) / 1000
+    raise AssertionError(f"{module} missing from -X importtime output")
+
+
+def test_api_import_is_light():
+    script = (
+        "import json, sys\n"
+        "import app.main\n"
+        "from app.database import mongo\n"
+        "import logging\n"
+        "print(json.dumps({'modules': sorted(sys.modules), 'clients': len(mongo._clients),"
+        " 'handlers': len(logging.getLogger().handlers)}))\n"
+    )
+    result = json.loads(_python("-c", script).stdout.strip().splitlines()[-1])
+
+    loaded = [name for name in HEAVY_MODULES if name in result["modules"]]
+    assert not loaded, f"importing app.main loaded {loaded}"
+    assert result["clients"] == 0, "MongoClient created at import time"
+    assert result["handlers"] == 0, "root logging configured at import time"
+
+
+@pytest.mark.parametrize("module", ["app.main", "app.database.mongo"])
+def test_import_time_budget(module):
+    best = min(_import_ms(module) for _ in range(3))
+    assert best <= IMPORT_BUDGET_MS, f"import {module} took {best:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
+
+
+def test_cli_help_startup(benchmark):
+    result = benchmark.pedantic(_python, args=("-m", "app.main", "--help"), rounds=3, iterations=1)
+
+    assert "usage:" in result.stdout
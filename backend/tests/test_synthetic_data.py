@@ -0,0 +1,62 @@
+"""Synthetic dataset: claimants claim on their own policies, rings share entities, policies load versioned."""
+from collections import defaultdict
+
+import pytest
+
+from app.utils.synthetic_data import DatasetSpec, claim_at, iter_claims, load_policy_chunk, make_policy, policy_number
+
+
+@pytest.mark.parametrize("policies, claimants", [(300, 300), (100, 400), (400, 100)])
+def test_claims_are_filed_by_the_policy_holder(policies, claimants):
+    spec = DatasetSpec(seed=3, policies=policies, claimants=claimants, claims=2000, ring_fraction=0.05, duplicate_fraction=0.0)
+    holders = {policy_number(spec, index): make_policy(spec, index)["holderName"] for index in range(policies)}
+    claimants_per_policy = defaultdict(set)
+
+    for claim in iter_claims(spec, 0, spec.claims):
+        assert claim["claimer"]["name"].upper() == holders[claim["policy_number"]]
+        claimants_per_policy[claim["policy_number"]].add(claim["claimer"]["email"])
+
+    assert max(len(emails) for emails in claimants_per_policy.values()) == 1
+
+
+def test_ring_members_share_contact_details_across_policies():
+    spec = DatasetSpec(seed=5, policies=500, claimants=500, claims=3000, ring_fraction=0.1, ring_size=4, duplicate_fraction=0.0)
+    rings = defaultdict(list)
+    for claim in iter_claims(spec, 0, spec.claims):
+        if claim["synthetic"]["ring_id"] is not None:
+            rings[claim["synthetic"]["ring_id"]].append(claim)
+
+    members = max(rings.values(), key=lambda claims: len({claim["claimer"]["email"] for claim in claims}))
+    assert len({claim["claimer"]["email"] for claim in members}) > 1
+    assert len({claim["policy_number"] for claim in members}) > 1
+    assert len({claim["claimer"]["phone"] for claim in members}) == 1
+    assert all(claim["claim_amount"] % 1000 == 0 for claim in members)
+
+
+def test_duplicates_resubmit_an_earlier_claim():
+    spec = DatasetSpec(seed=9, policies=50, claimants=50, claims=400, duplicate_fraction=0.2)
+    duplicate = next(claim for claim in iter_claims(spec, 0, spec.claims) if claim["synthetic"]["duplicate_of"])
+    original = claim_at(spec, int(duplicate["synthetic"]["duplicate_of"].rsplit("-", 1)[1]))
+
+    assert duplicate["form_data"]["node1_output"]["documents"] == original["form_data"]["node1_output"]["documents"]
+    assert duplicate["claim_id"] != original["claim_id"] and duplicate["status"] == "PENDING_REVIEW"
+
+
+def test_policies_load_through_the_versioned_repository():
+    from app.database.mongo import get_client
+
+    db = get_client()["synthetic_test_db"]
+    db["policies"].delete_many({})
+    db["policy_versions"].delete_many({})
+    spec = DatasetSpec(seed=1, policies=20, claimants=20, claims=0)
+
+    assert load_policy_chunk(spec.to_dict(), 0, 20, "synthetic_test_db") == 20
+    policy = db["policies"].find_one({"policyNumber": policy_number(spec, 7)})
+    assert policy["version"] == 1 and policy["content_hash"] and policy["source"] == "synthetic"
+    assert db["policy_versions"].count_documents({}) == 20
+
+    # reloading the same seed is a no-op, not a second version
+    assert load_policy_chunk(spec.to_dict(), 0, 20, "synthetic_test_db") == 20
+    assert db["policy_versions"].count_documents({}) == 20
+    db["policies"].delete_many({})
+    db["policy_versions"].delete_many({})
@@ -0,0 +1,189 @@
+"""Tracing: backend selection, head sampling, span nesting and the batched JSONL exporter."""
+import json
+import logging
+import sys
+import threading
+import time
+
+import pytest
+
+from app.utils import tracing
+from app.utils.tracing import BACKEND_ENV, BATCH_SIZE, JSONL_PATH_ENV, SAMPLE_RATE_ENV, BatchExporter, Tracer, traced
+
+
+@pytest.fixture(autouse=True)
+def fresh_tracer(monkeypatch):
+    # the backend is resolved once per process; make each test resolve it again
+    monkeypatch.setattr(tracing, "_tracer", None)
+    monkeypatch.setattr(tracing, "_tracer_resolved", False)
+
+
+class _Recording(Tracer):
+    def __init__(self, sample_rate):
+        super().__init__(sample_rate)
+        self.spans = []
+
+    def finish(self, span):
+        self.spans.append(span)
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out waiting for the exporter"
+        time.sleep(0.005)
+
+
+@pytest.mark.parametrize("backend, rate", [("off", "1.0"), ("none", "1.0"), ("jsonl", "0")])
+def test_disabled_tracing_returns_the_function_unchanged(monkeypatch, backend, rate):
+    monkeypatch.setenv(BACKEND_ENV, backend)
+    monkeypatch.setenv(SAMPLE_RATE_ENV, rate)
+
+    def node(state):
+        return state
+
+    assert traced("node")(node) is node
+    assert tracing.get_tracer() is None
+
+
+def test_sampling_is_decided_once_per_trace(monkeypatch):
+    draws = []
+
+    def draw():
+        draws.append(1)
+        return rolls.pop(0)
+
+    monkeypatch.setattr(tracing.random, "random", draw)
+    tracer = _Recording(0.5)
+    inner = tracer.wrap(lambda: "done", "inner")
+    outer = tracer.wrap(lambda: [inner(), inner()], "outer")
+
+    # a dropped trace drops its nested spans without drawing again
+    rolls = [0.9]
+    assert outer() == ["done", "done"]
+    assert tracer.spans == [] and len(draws) == 1
+
+    rolls = [0.1]
+    outer()
+    first, second, root = tracer.spans
+    assert len(draws) == 2
+    assert [span["name"] for span in tracer.spans] == ["inner", "inner", "outer"]
+    assert root["parent_id"] is None
+    assert first["parent_id"] == second["parent_id"] == root["span_id"]
+    assert first["trace_id"] == second["trace_id"] == root["trace_id"]
+    assert first["span_id"] != second["span_id"]
+
+
+def test_errors_are_recorded_on_the_span():
+    tracer = _Recording(1.0)
+
+    def fail():
+        raise ValueError("bad amount")
+
+    with pytest.raises(ValueError):
+        tracer.wrap(fail, "node4")()
+
+    assert tracer.spans[0]["status"] == "error"
+    assert tracer.spans[0]["error"] == "ValueError: bad amount"
+
+
+def test_exporter_writes_full_batches_without_waiting_for_the_timer():
+    batches = []
+    exporter = BatchExporter(batches.append, flush_seconds=60, max_queue=10_000)
+
+    for index in range(BATCH_SIZE - 1):
+        exporter.export({"span_id": index})
+    time.sleep(0.05)
+    assert batches == []
+
+    exporter.export({"span_id": BATCH_SIZE - 1})
+    _wait_until(lambda: sum(map(len, batches)) == BATCH_SIZE)
+    assert [len(batch) for batch in batches] == [BATCH_SIZE]
+    exporter.shutdown()
+
+
+def test_exporter_flushes_partial_batches_on_its_timer():
+    batches = []
+    exporter = BatchExporter(batches.append, flush_seconds=0.05, max_queue=10_000)
+
+    exporter.export({"span_id": 1})
+
+    _wait_until(lambda: batches)
+    assert batches == [[{"span_id": 1}]]
+    exporter.shutdown()
+
+
+def test_a_full_exporter_drops_new_spans():
+    written = []
+    exporter = BatchExporter(written.extend, flush_seconds=60, max_queue=3)
+
+    for index in range(5):
+        exporter.export({"span_id": index})
+    assert exporter.dropped == 2
+
+    exporter.shutdown()
+    assert written == [{"span_id": 0}, {"span_id": 1}, {"span_id": 2}]
+
+
+def test_a_failing_write_does_not_stop_the_exporter():
+    written = []
+    failed = threading.Event()
+
+    def write(batch):
+        if not failed.is_set():
+            failed.set()
+            raise OSError("disk full")
+        written.extend(batch)
+
+    exporter = BatchExporter(write, flush_seconds=0.05, max_queue=10)
+    exporter.export({"span_id": 1})
+    _wait_until(failed.is_set)
+    exporter.export({"span_id": 2})
+
+    _wait_until(lambda: written)
+    assert written == [{"span_id": 2}]
+    exporter.shutdown()
+
+
+def test_jsonl_backend_writes_nested_spans(monkeypatch, tmp_path):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv(BACKEND_ENV, "jsonl")
+    monkeypatch.setenv(SAMPLE_RATE_ENV, "1.0")
+    monkeypatch.setenv(JSONL_PATH_ENV, str(path))
+
+    @traced("node1")
+    def extract():
+        return "documents"
+
+    @traced("workflow")
+    def workflow():
+        return extract()
+
+    assert workflow() == "documents"
+    tracing.get_tracer().exporter.shutdown()
+
+    child, root = [json.loads(line) for line in path.read_text().splitlines()]
+    assert (child["name"], root["name"]) == ("node1", "workflow")
+    assert child["parent_id"] == root["span_id"] and child["trace_id"] == root["trace_id"]
+    assert root["status"] == "ok"
+
+
+@pytest.mark.parametrize("backend, missing, message", [
+    ("zipkin", None, "Unknown tracing backend"),
+    ("otel", "opentelemetry", "unavailable"),
+    ("langsmith", "langsmith", "unavailable"),
+])
+def test_unknown_or_unavailable_backends_disable_tracing(monkeypatch, caplog, backend, missing, message):
+    monkeypatch.setenv(BACKEND_ENV, backend)
+    if missing:
+        # a None entry makes the import raise ImportError
+        monkeypatch.setitem(sys.modules, missing, None)
+
+    def node(state):
+        return state
+
+    with caplog.at_level(logging.WARNING, logger=tracing.__name__):
+        assert traced("node")(node) is node
+
+    assert tracing.get_tracer() is None
+    assert message in caplog.text and backend in caplog.text